@@ -10,6 +10,7 @@ from app.routes import upload
 from app.routes import detections
 from app.routes import videos  # ADD THIS
 from app.routes import narrative
+from app.routes import search
 
 app = FastAPI(
     title="Video AI Detection API",
@@ -37,6 +38,7 @@ app.include_router(upload.router, prefix="/api")
 app.include_router(detections.router, prefix="/api")
 app.include_router(videos.router, prefix="/api")  # ADD THIS
 app.include_router(narrative.router, prefix="/api", tags=["narratives"])
+app.include_router(search.router, prefix="/api")
 
 @app.get("/")
 async def root():
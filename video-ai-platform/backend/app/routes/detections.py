@@ -1,15 +1,17 @@
 """
 Detection API Routes — list, detail, detections, rename, delete, thumbnail, logs
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import List, Optional
 from app.models.detection import VideoResponse, VideoDetailResponse, VideoListResponse
 from app.utils.cognito import get_current_user
 from app.utils.db_handler import DBHandler
+from app.utils.chunked_results import load_results
+from app.utils.frame_index import drop_video, index_videos, needs_indexing
+from app.utils.timeline import read_window, timeline_key, window_captions
 import boto3
 from botocore.exceptions import ClientError
-import json
 import os
 import subprocess
 import tempfile
@@ -18,9 +20,21 @@ router = APIRouter(prefix="/videos", tags=["videos"])
 db = DBHandler()
 
 S3_BUCKET = os.getenv('S3_BUCKET_NAME', 'video-ai-uploads')
+# Longest ?start=&end= window served by /timeline (bounds the response size)
+TIMELINE_MAX_WINDOW_S = float(os.getenv('TIMELINE_MAX_WINDOW_S', '300'))
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-2')
 s3_client = boto3.client('s3', region_name=AWS_REGION)
 
+# Binary sidecars the worker writes next to the results (results/{id}/…)
+SIDECAR_NAMES = ("masks.npz", "embeddings.npz")
+
+
+def _schedule_indexing(background_tasks: BackgroundTasks, videos: List[dict]):
+    """Index newly completed videos for frame search after the response is sent."""
+    pending = [v for v in videos if needs_indexing(v)]
+    if pending:
+        background_tasks.add_task(index_videos, pending)
+
 
 class RenameRequest(BaseModel):
     display_name: str
@@ -32,9 +46,10 @@ class FolderRequest(BaseModel):
 # ── List ──────────────────────────────────────────────────────────────────────
 
 @router.get("/", response_model=VideoListResponse)
-async def list_user_videos(current_user: dict = Depends(get_current_user)):
+async def list_user_videos(background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)):
     user_id = current_user['user_id']
     videos = db.get_videos_by_user(user_id)
+    _schedule_indexing(background_tasks, videos)
     videos.sort(key=lambda x: x.get('created_at', ''), reverse=True)
     return {"videos": videos, "count": len(videos)}
 
@@ -66,12 +81,17 @@ async def get_system_logs(current_user: dict = Depends(get_current_user)):
 # ── Video detail ──────────────────────────────────────────────────────────────
 
 @router.get("/{video_id}", response_model=VideoDetailResponse)
-async def get_video_details(video_id: str, current_user: dict = Depends(get_current_user)):
+async def get_video_details(
+    video_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+):
     video = db.get_video_by_id(video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     if video.get('user_id') != current_user['user_id']:
         raise HTTPException(status_code=403, detail="Access denied")
+    _schedule_indexing(background_tasks, [video])
     return video
 
 
@@ -96,8 +116,8 @@ async def get_video_detections(video_id: str, current_user: dict = Depends(get_c
 
     try:
         print(f"Fetching analysis from S3: {s3_key}")
-        s3_response = s3_client.get_object(Bucket=S3_BUCKET, Key=s3_key)
-        s3_data = json.loads(s3_response['Body'].read())
+        # Chunked results: only the summary and audio sections are fetched
+        s3_data = load_results(s3_client, S3_BUCKET, s3_key, sections=("summary", "audio"))
 
         if 'detections' in s3_data:
             detections = s3_data.get('detections', [])
@@ -143,15 +163,65 @@ async def get_video_detections(video_id: str, current_user: dict = Depends(get_c
     }
 
 
+# ── Timeline window (per-frame records, ranged S3 reads) ──────────────────────
+
+@router.get("/{video_id}/timeline")
+async def get_video_timeline(
+    video_id: str,
+    start: float = Query(0.0, ge=0.0),
+    end: Optional[float] = Query(None, ge=0.0),
+    current_user: dict = Depends(get_current_user),
+):
+    """Frames, object tracks and captions for [start, end] seconds of the video."""
+    video = db.get_video_by_id(video_id)
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    if video.get('user_id') != current_user['user_id']:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    end = start + TIMELINE_MAX_WINDOW_S if end is None else end
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if end - start > TIMELINE_MAX_WINDOW_S:
+        raise HTTPException(status_code=400, detail=f"Window longer than {TIMELINE_MAX_WINDOW_S:g}s")
+
+    stats = {}
+    try:
+        window = read_window(s3_client, S3_BUCKET, timeline_key(video_id), start, end, stats)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', 'InvalidRange', '404'):
+            raise HTTPException(status_code=404, detail="No timeline for this video (processed before timelines were written)")
+        raise HTTPException(status_code=502, detail=f"Timeline fetch failed: {str(e)}")
+    print(f"✓ Timeline {video_id} [{start:g}, {end:g}]s: {len(window['frames'])} frames, "
+          f"{stats['requests']} GETs, {stats['bytes']} bytes in {stats['load_ms']:.1f}ms")
+
+    return {
+        "video_id": video_id,
+        "start": start,
+        "end": end,
+        "duration": window['duration'],
+        "segment_s": window['segment_s'],
+        "frames": window['frames'],
+        "tracks": window['tracks'],
+        "captions": window_captions(window),
+        "scenes": window['scenes'],
+    }
+
+
 # ── Status (lightweight) ──────────────────────────────────────────────────────
 
 @router.get("/{video_id}/status")
-async def get_video_status(video_id: str, current_user: dict = Depends(get_current_user)):
+async def get_video_status(
+    video_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+):
     video = db.get_video_by_id(video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     if video.get('user_id') != current_user['user_id']:
         raise HTTPException(status_code=403, detail="Access denied")
+    _schedule_indexing(background_tasks, [video])
     return {
         "video_id": video['video_id'],
         "status": video['status'],
@@ -364,6 +434,31 @@ async def move_video_to_folder(video_id: str, body: FolderRequest, current_user:
 
 # ── Delete ─────────────────────────────────────────────────────────────────────
 
+def _sidecar_keys(video_id: str, video: dict) -> List[str]:
+    """
+    S3 keys of a video's binary sidecars: the ones its results list under
+    'sidecars', plus the default names (results written before a sidecar
+    was listed, or unreadable results).
+    """
+    keys = [f"results/{video_id}/{name}" for name in SIDECAR_NAMES]
+    if video.get('results_s3_key'):
+        try:
+            summary = load_results(s3_client, S3_BUCKET, video['results_s3_key'], sections=("summary",))
+            keys += [k for k in (summary.get('sidecars') or {}).values() if k]
+        except Exception:
+            pass  # best effort — default names still deleted
+    return keys
+
+
+def _delete_prefix(prefix: str):
+    """Delete every object under an S3 prefix (list pages hold ≤1000 keys, the delete_objects limit)."""
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=prefix):
+        objects = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+        if objects:
+            s3_client.delete_objects(Bucket=S3_BUCKET, Delete={'Objects': objects, 'Quiet': True})
+
+
 @router.delete("/{video_id}")
 async def delete_video(video_id: str, current_user: dict = Depends(get_current_user)):
     video = db.get_video_by_id(video_id)
@@ -374,15 +469,19 @@ async def delete_video(video_id: str, current_user: dict = Depends(get_current_u
 
     user_id = video.get('user_id')
 
-    # Delete S3 objects (video, results, thumbnail) — best effort
+    # Delete S3 objects (video, results, thumbnail, trace) — best effort
     s3_keys_to_delete = [
         f"uploads/{user_id}/{video_id}.mp4",
         f"results/{video_id}/analysis.json",
+        f"results/{video_id}/analysis.jsonl.gz",
+        timeline_key(video_id),
         f"results/{video_id}/detections.json",
         f"thumbnails/{video_id}.jpg",
+        f"logs/{video_id}/trace.json",
     ]
     if video.get('results_s3_key'):
         s3_keys_to_delete.append(video['results_s3_key'])
+    s3_keys_to_delete += _sidecar_keys(video_id, video)
 
     for key in set(s3_keys_to_delete):
         try:
@@ -390,6 +489,18 @@ async def delete_video(video_id: str, current_user: dict = Depends(get_current_u
         except Exception:
             pass  # best effort
 
+    # Per-frame checkpoints of an unfinished or failed run
+    try:
+        _delete_prefix(f"checkpoints/{video_id}/")
+    except Exception:
+        pass  # best effort
+
+    # Drop its frames from the search index
+    try:
+        drop_video(user_id, video_id)
+    except Exception as e:
+        print(f"⚠️ Removing {video_id} from the search index failed: {e}")
+
     # Delete DynamoDB record
     try:
         db.table.delete_item(Key={'video_id': video_id})
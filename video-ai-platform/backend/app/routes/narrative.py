@@ -6,13 +6,13 @@ Endpoints for generating AI-powered video narratives
 from fastapi import APIRouter, HTTPException
 from typing import Dict
 import boto3
-import json
 from decimal import Decimal
 from datetime import datetime
 import os
 import anthropic
 
 from app.utils.narrative_service import generate_phase4_narrative
+from app.utils.chunked_results import load_results
 
 router = APIRouter()
 
@@ -116,8 +116,7 @@ async def generate_narrative(video_id: str):
 
         try:
             print(f"📥 Fetching detections from S3: {s3_key}")
-            s3_response = s3_client.get_object(Bucket=S3_BUCKET, Key=s3_key)
-            detections_data = json.loads(s3_response['Body'].read())
+            detections_data = load_results(s3_client, S3_BUCKET, s3_key, sections=("detections",))
             detections = detections_data.get('detections', [])
             print(f"✓ Loaded {len(detections)} detections from S3")
         except Exception as e:
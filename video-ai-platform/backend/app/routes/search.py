@@ -0,0 +1,72 @@
+"""
+Semantic Frame Search Routes — query SigLIP embeddings across a user's videos
+"""
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import Optional
+from app.utils.cognito import get_current_user
+from app.utils.db_handler import DBHandler
+from app.utils.frame_index import index, index_videos, needs_indexing
+import time
+
+router = APIRouter(prefix="/search", tags=["search"])
+db = DBHandler()
+
+
+class FrameSearchRequest(BaseModel):
+    text: Optional[str] = None          # free-text query (SigLIP text tower)
+    video_id: Optional[str] = None      # …or a reference frame
+    timestamp: Optional[float] = None
+    k: int = 10
+    exact: bool = False                 # brute force instead of IVF
+    nprobe: int = 8
+
+
+# ── Frame search ──────────────────────────────────────────────────────────────
+
+@router.post("/frames")
+async def search_frames(body: FrameSearchRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Top-k (video_id, timestamp) frames across all of this user's videos for
+    a text query or a reference frame (video_id + timestamp).
+    """
+    if not body.text and not body.video_id:
+        raise HTTPException(status_code=400, detail="Provide 'text' or 'video_id' (+ 'timestamp')")
+    if not 1 <= body.k <= 100:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+    if body.nprobe < 1:
+        raise HTTPException(status_code=400, detail="nprobe must be at least 1")
+
+    user_id = current_user['user_id']
+    shard = index.shard(user_id)
+
+    if body.text:
+        from app.utils.siglip_text import encode_text
+        try:
+            query = encode_text(body.text)
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    else:
+        video = db.get_video_by_id(body.video_id)
+        if not video:
+            raise HTTPException(status_code=404, detail="Video not found")
+        if video.get('user_id') != user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        if needs_indexing(video):
+            await run_in_threadpool(index_videos, [video])
+        query = shard.frame_embedding(body.video_id, body.timestamp or 0.0)
+        if query is None:
+            raise HTTPException(status_code=404, detail="Video has no indexed frames")
+
+    t0 = time.time()
+    hits = shard.search(query, k=body.k, exact=body.exact, nprobe=body.nprobe)
+    return {
+        "query": body.text or {"video_id": body.video_id, "timestamp": body.timestamp},
+        "results": [
+            {"video_id": vid, "timestamp": round(ts, 3), "score": round(score, 4)}
+            for vid, ts, score in hits
+        ],
+        "indexed_frames": shard.size,
+        "search_ms": round((time.time() - t0) * 1000, 2),
+    }
@@ -0,0 +1,196 @@
+"""
+Chunked Results — read only the sections a route needs from analysis.jsonl.gz
+
+The worker writes results/{video_id}/analysis.jsonl.gz: a header gzip
+member indexing one gzip member of JSONL per section (summary, narrative,
+audio, ...).  Section offsets are counted from the end of the header
+member:
+
+  member 0   {"format": "video-analysis-chunked", "version": 1, "video_id",
+              "sections": [{"name", "offset", "length", "records"}]}
+  member 1+  section records, one JSON object per line
+
+Reading a section costs one ranged GET for the head of the object (the
+header, and often the first sections with it) plus one ranged GET per run
+of adjacent wanted sections; each member is inflated as its body streams
+in and parsed line by line.  Older results (analysis.json /
+detections.json) are still read whole.
+"""
+
+import json
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CHUNKED_FORMAT = "video-analysis-chunked"
+CHUNKED_VERSION = 1
+CHUNKED_SUFFIX = ".jsonl.gz"
+
+# First ranged GET — the header member is a few hundred bytes
+HEAD_BYTES = 8192
+# Body read size while streaming a section range
+STREAM_CHUNK = 64 * 1024
+
+
+def is_chunked(s3_key: str) -> bool:
+    return s3_key.endswith(CHUNKED_SUFFIX)
+
+
+class JsonlDecoder:
+    """Inflates one gzip member incrementally and parses complete JSONL lines."""
+
+    def __init__(self):
+        self._inflater = zlib.decompressobj(wbits=31)
+        self._pending = b""
+        self.records: List[Dict[str, Any]] = []
+
+    def feed(self, data: bytes):
+        lines = (self._pending + self._inflater.decompress(data)).split(b"\n")
+        self._pending = lines.pop()
+        self.records.extend(json.loads(line) for line in lines if line)
+
+    def close(self) -> List[Dict[str, Any]]:
+        tail = self._pending + self._inflater.flush()
+        if tail.strip():
+            self.records.append(json.loads(tail))
+        if not self._inflater.eof:
+            raise ValueError("truncated section")
+        return self.records
+
+
+def get_range(client, bucket: str, key: str, start: int, end: int, stats: Dict[str, Any]):
+    """Ranged GET of bytes [start, end); returns the streaming body."""
+    body = client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end - 1}")['Body']
+    stats['requests'] += 1
+    return body
+
+
+def read_head(
+    client,
+    bucket: str,
+    key: str,
+    stats: Dict[str, Any],
+    fmt: str = CHUNKED_FORMAT,
+    version: int = CHUNKED_VERSION,
+) -> Tuple[Dict[str, Any], int, bytes]:
+    """
+    (header, byte length of the header member, head bytes fetched so far)
+    for an object that starts with a one-line gzip JSON header.
+    """
+    head = b""
+    while True:
+        chunk = get_range(client, bucket, key, len(head), len(head) + HEAD_BYTES, stats).read()
+        stats['bytes'] += len(chunk)
+        head += chunk
+        inflater = zlib.decompressobj(wbits=31)
+        line = inflater.decompress(head)
+        if inflater.eof:
+            break
+        if len(chunk) < HEAD_BYTES:
+            raise ValueError(f"{key}: truncated header")
+    header = json.loads(line)
+    if header.get('format') != fmt:
+        raise ValueError(f"{key}: not a {fmt} file")
+    if header.get('version', 0) > version:
+        raise ValueError(f"{key}: unsupported {fmt} version {header['version']}")
+    return header, len(head) - len(inflater.unused_data), head
+
+
+def read_members(
+    client,
+    bucket: str,
+    key: str,
+    head: bytes,
+    spans: List[Tuple[int, int]],
+    stats: Dict[str, Any],
+) -> List[List[Dict[str, Any]]]:
+    """
+    Records of each gzip member at the absolute, back-to-back byte spans
+    [(start, end), ...] — bytes already in head are reused, the rest come
+    from one ranged GET, inflated as it streams in.
+    """
+    start, end = spans[0][0], spans[-1][1]
+    decoders = [(lo, hi, JsonlDecoder()) for lo, hi in spans]
+
+    def _feed(pos: int, data: bytes):
+        for lo, hi, decoder in decoders:
+            a, b = max(lo, pos), min(hi, pos + len(data))
+            if a < b:
+                decoder.feed(data[a - pos:b - pos])
+
+    pos = start
+    if pos < len(head):                             # already fetched with the header
+        _feed(pos, head[pos:end])
+        pos = min(end, len(head))
+    if pos < end:
+        body = get_range(client, bucket, key, pos, end, stats)
+        for chunk in body.iter_chunks(STREAM_CHUNK):
+            stats['bytes'] += len(chunk)
+            _feed(pos, chunk)
+            pos += len(chunk)
+    return [decoder.close() for _, _, decoder in decoders]
+
+
+def read_sections(
+    client,
+    bucket: str,
+    key: str,
+    sections: Iterable[str],
+    stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    {name: [records]} for the wanted sections of a chunked results object.
+    Sections the file does not have are left out.  stats (if given) gets
+    'requests' and 'bytes' transferred.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault('requests', 0)
+    stats.setdefault('bytes', 0)
+    header, base, head = read_head(client, bucket, key, stats)
+
+    wanted = set(sections)
+    entries = sorted((e for e in header['sections'] if e['name'] in wanted), key=lambda e: e['offset'])
+    # Runs of adjacent sections → one range each
+    runs: List[List[Dict[str, Any]]] = []
+    for entry in entries:
+        if runs and runs[-1][-1]['offset'] + runs[-1][-1]['length'] == entry['offset']:
+            runs[-1].append(entry)
+        else:
+            runs.append([entry])
+
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for run in runs:
+        spans = [(base + e['offset'], base + e['offset'] + e['length']) for e in run]
+        for entry, records in zip(run, read_members(client, bucket, key, head, spans, stats)):
+            out[entry['name']] = records
+    return out
+
+
+def load_results(
+    client,
+    bucket: str,
+    key: str,
+    sections: Iterable[str],
+    stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    The worker's results as one to_dict()-shaped dict.
+
+    For chunked results only the named sections are fetched and merged;
+    a plain JSON object is downloaded and parsed whole.  stats (if given)
+    gets 'requests', 'bytes' and 'load_ms'.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(requests=0, bytes=0)
+    t0 = time.perf_counter()
+    if is_chunked(key):
+        merged: Dict[str, Any] = {}
+        for records in read_sections(client, bucket, key, sections, stats).values():
+            for record in records:
+                merged.update(record)
+    else:
+        body = client.get_object(Bucket=bucket, Key=key)['Body'].read()
+        stats.update(requests=1, bytes=len(body))
+        merged = json.loads(body)
+    stats['load_ms'] = round((time.perf_counter() - t0) * 1000, 3)
+    return merged
@@ -0,0 +1,110 @@
+"""
+Frame Index — keeps each user's search shard in step with their videos
+
+A video is folded into its owner's shard the first time the API sees it
+completed (list, detail or status poll schedule it as a background task,
+so no request waits on S3), and its rows are dropped when the video is
+deleted.  The embeddings sidecar is read from the key its results list
+under sidecars['embeddings'] (the default name for older results).
+
+A sidecar that does not exist (404) is remembered for SEARCH_MISS_TTL_S
+so polling does not re-fetch it; any other error is retried on the next
+sighting.
+"""
+import os
+import threading
+import time
+from typing import Dict, Iterable, Set
+
+import boto3
+from botocore.exceptions import ClientError
+
+from app.utils.chunked_results import load_results
+from app.utils.vector_index import VectorIndex, load_embedding_sidecar
+
+S3_BUCKET = os.getenv('S3_BUCKET_NAME', 'video-ai-uploads')
+AWS_REGION = os.getenv('AWS_REGION', 'us-east-2')
+SEARCH_INDEX_DIR = os.getenv('SEARCH_INDEX_DIR', './search_index')
+# Seconds a missing sidecar is remembered before the video is checked again
+SEARCH_MISS_TTL_S = float(os.getenv('SEARCH_MISS_TTL_S', '600'))
+s3_client = boto3.client('s3', region_name=AWS_REGION)
+
+index = VectorIndex(SEARCH_INDEX_DIR)
+
+_lock = threading.Lock()
+_misses: Dict[str, float] = {}      # video_id → monotonic time to check again
+_inflight: Set[str] = set()         # video_ids being indexed right now
+
+
+def _is_not_found(error: ClientError) -> bool:
+    return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+
+def needs_indexing(video: dict) -> bool:
+    """True if a completed video is not in its owner's shard yet (and not a recent miss)."""
+    if video.get('status') != 'completed' or not video.get('user_id'):
+        return False
+    video_id = video['video_id']
+    with _lock:
+        if video_id in _inflight or _misses.get(video_id, 0.0) > time.monotonic():
+            return False
+    return video_id not in index.shard(video['user_id']).video_ids
+
+
+def _sidecar_key(video: dict) -> str:
+    video_id = video['video_id']
+    if video.get('results_s3_key'):
+        summary = load_results(s3_client, S3_BUCKET, video['results_s3_key'], sections=("summary",))
+        key = (summary.get('sidecars') or {}).get('embeddings')
+        if key:
+            return key
+    return f"results/{video_id}/embeddings.npz"
+
+
+def index_video(video: dict) -> int:
+    """
+    Fold one completed video's embeddings sidecar into its owner's shard.
+    Returns rows added (0 if already indexed or the video has no sidecar).
+    """
+    video_id = video['video_id']
+    with _lock:
+        if video_id in _inflight:
+            return 0
+        _inflight.add(video_id)
+    try:
+        shard = index.shard(video['user_id'])
+        if video_id in shard.video_ids:
+            return 0
+        try:
+            body = s3_client.get_object(Bucket=S3_BUCKET, Key=_sidecar_key(video))['Body'].read()
+        except ClientError as e:
+            if not _is_not_found(e):
+                raise
+            with _lock:
+                _misses[video_id] = time.monotonic() + SEARCH_MISS_TTL_S
+            return 0
+        timestamps, embeddings = load_embedding_sidecar(body)
+        added = shard.add_video(video_id, timestamps, embeddings)
+        with _lock:
+            _misses.pop(video_id, None)
+        print(f"✓ Indexed {added} frames from {video_id}")
+        return added
+    finally:
+        with _lock:
+            _inflight.discard(video_id)
+
+
+def index_videos(videos: Iterable[dict]):
+    """Background task: index each video, logging (not raising) failures."""
+    for video in videos:
+        try:
+            index_video(video)
+        except Exception as e:
+            print(f"⚠️ Indexing {video['video_id']} failed: {e}")
+
+
+def drop_video(user_id: str, video_id: str) -> int:
+    """Remove a deleted video's rows from its owner's shard."""
+    with _lock:
+        _misses.pop(video_id, None)
+    return index.shard(user_id).remove_video(video_id)
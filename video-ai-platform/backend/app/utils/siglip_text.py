@@ -0,0 +1,50 @@
+"""
+SigLIP text tower for semantic frame search.
+
+Encodes a text query into the same embedding space as the worker's
+SigLIP image embeddings (vision_model pooler output == image features).
+torch + transformers are optional backend dependencies: they are only
+imported on the first text query, and their absence surfaces as a
+RuntimeError the route turns into a 503.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+SIGLIP_MODEL = os.getenv("SIGLIP_MODEL", "google/siglip-base-patch16-224")
+
+_model = None
+_processor = None
+_lock = threading.Lock()
+
+
+def _load():
+    global _model, _processor
+    with _lock:
+        if _model is None:
+            try:
+                import torch  # noqa: F401
+                from transformers import AutoModel, AutoProcessor
+            except ImportError as e:
+                raise RuntimeError(
+                    "Text search needs torch and transformers installed on the backend"
+                ) from e
+            print(f"Loading SigLIP text tower: {SIGLIP_MODEL}")
+            _processor = AutoProcessor.from_pretrained(SIGLIP_MODEL)
+            _model = AutoModel.from_pretrained(SIGLIP_MODEL).eval()
+            print("✓ SigLIP text tower loaded (CPU)")
+    return _model, _processor
+
+
+def encode_text(text: str) -> np.ndarray:
+    """(D,) float32 text embedding for a search query."""
+    import torch
+
+    model, processor = _load()
+    # SigLIP was trained with max_length padding — other padding hurts recall
+    inputs = processor(text=[text], padding="max_length", return_tensors="pt")
+    with torch.no_grad():
+        features = model.get_text_features(**inputs)
+    return features[0].float().numpy()
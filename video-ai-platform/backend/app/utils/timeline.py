@@ -0,0 +1,104 @@
+"""
+Timeline — time-window queries over the worker's per-frame timeline.bin
+
+The worker writes results/{video_id}/timeline.bin: a one-line gzip JSON
+header, a fixed-width index, then one gzip JSONL member per segment_s
+seconds of video (frames, plus the tracks and scenes alive in it):
+
+  header   {"format": "video-timeline", "version": 1, "video_id",
+            "duration", "segment_s", "segments": N, "frames"}
+  index    N × 16 bytes <QII (offset, length, records); offsets count
+           from the end of the index
+  segments {"type": "frame" | "track" | "scene", ...} per line
+
+A [start, end] window maps straight to segments floor(start / segment_s)
+… floor(end / segment_s), so a query is at most three ranged GETs — the
+head (header and, for most videos, the whole index), the index entries if
+they lie past it, and the run of segments — and the bytes read depend on
+the window, not on the video's length.
+"""
+
+import struct
+import time
+from typing import Any, Dict, List, Optional
+
+from app.utils.chunked_results import get_range, read_head, read_members
+
+TIMELINE_FORMAT = "video-timeline"
+TIMELINE_VERSION = 1
+
+INDEX_ENTRY = struct.Struct("<QII")
+
+
+def timeline_key(video_id: str) -> str:
+    return f"results/{video_id}/timeline.bin"
+
+
+def read_window(
+    client,
+    bucket: str,
+    key: str,
+    start: float,
+    end: float,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Frames with start <= timestamp <= end, and the tracks and scenes that
+    overlap the window (each once).  stats (if given) gets 'requests',
+    'bytes' and 'load_ms'.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(requests=0, bytes=0)
+    t0 = time.perf_counter()
+
+    header, index_at, head = read_head(client, bucket, key, stats,
+                                       fmt=TIMELINE_FORMAT, version=TIMELINE_VERSION)
+    n, segment_s = header['segments'], header['segment_s']
+    base = index_at + n * INDEX_ENTRY.size
+    first = min(int(max(start, 0.0) // segment_s), n - 1)
+    last = min(int(max(end, 0.0) // segment_s), n - 1)
+
+    lo, hi = index_at + first * INDEX_ENTRY.size, index_at + (last + 1) * INDEX_ENTRY.size
+    if hi <= len(head):
+        raw = head[lo:hi]
+    else:
+        raw = get_range(client, bucket, key, lo, hi, stats).read()
+        stats['bytes'] += len(raw)
+    spans = [
+        (base + offset, base + offset + length)
+        for offset, length, _ in INDEX_ENTRY.iter_unpack(raw) if length
+    ]
+
+    frames: Dict[int, Dict[str, Any]] = {}
+    tracks: Dict[int, Dict[str, Any]] = {}
+    scenes: Dict[float, Dict[str, Any]] = {}
+    for records in read_members(client, bucket, key, head, spans, stats) if spans else []:
+        for r in records:
+            kind = r.pop('type')
+            if kind == 'frame' and start <= r['timestamp'] <= end:
+                frames[r['frame_id']] = r
+            elif kind == 'track' and r['first_ts'] <= end and r['last_ts'] >= start:
+                tracks[r['track_id']] = r
+            elif kind == 'scene' and r['start_ts'] <= end and r['end_ts'] >= start:
+                scenes[r['start_ts']] = r
+
+    stats['load_ms'] = round((time.perf_counter() - t0) * 1000, 3)
+    return {
+        "duration": header['duration'],
+        "segment_s": segment_s,
+        "frames": sorted(frames.values(), key=lambda f: f['timestamp']),
+        "tracks": list(tracks.values()),
+        "scenes": sorted(scenes.values(), key=lambda s: s['start_ts']),
+    }
+
+
+def window_captions(window: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Frame captions and multi-frame scene captions in the window, by start time."""
+    captions = [
+        {"start": f['timestamp'], "end": f['timestamp'], "frame_id": f['frame_id'], "text": f['caption']}
+        for f in window['frames'] if f.get('caption')
+    ] + [
+        {"start": s['start_ts'], "end": s['end_ts'], "scene_type": s['scene_type'], "text": s['caption']}
+        for s in window['scenes'] if s.get('caption')
+    ]
+    return sorted(captions, key=lambda c: c['start'])
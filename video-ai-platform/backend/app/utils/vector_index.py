@@ -0,0 +1,352 @@
+"""
+Vector Index — cross-video semantic frame search over SigLIP embeddings
+
+The worker writes one embeddings sidecar per video
+(results/{video_id}/embeddings.npz, float16 or int8 + per-row scale).
+This module folds those sidecars into an on-disk, memory-mapped index
+with one shard per user, and answers top-k cosine queries either
+exactly (brute force) or approximately (IVF: spherical k-means coarse
+quantiser + inverted lists, nprobe lists scanned per query).
+
+Shard layout ({root}/{user_id}/):
+  manifest.json   {"dim", "videos": [{"video_id", "start", "count"}],
+                   "trained_at": N rows when the IVF was last trained}
+  vectors.f16     (N, dim) float16, L2-normalised rows
+  times.f32       (N,) float32 frame timestamps (s)
+  lists.i32       (N,) int32 IVF list of each row
+  centroids.npy   (nlist, dim) float32 IVF centroids (absent until trained)
+
+Adding a video appends to the raw files; the IVF is (re)trained whenever
+the shard has doubled since the last training, so assignment quality
+tracks the data without retraining on every upload.  Removing a video
+rewrites the raw files without its rows (the rest keep their IVF lists).
+One process owns a shard at a time — writes are serialised with an
+in-process lock.
+"""
+
+import io
+import json
+import os
+import shutil
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Rows scored per matmul block in brute-force search (bounds temp memory)
+_SEARCH_BLOCK = 65536
+
+# Below this many rows an IVF is pointless — search stays exact
+MIN_IVF_ROWS = 2048
+
+
+def normalize_rows(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 1:
+        x = x[None]
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def load_embedding_sidecar(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """(timestamps float32 (N,), embeddings float32 (N, D)) from sidecar bytes."""
+    with np.load(io.BytesIO(data)) as npz:
+        timestamps = npz["timestamps"].astype(np.float32)
+        embeddings = npz["embeddings"].astype(np.float32)
+        if "scales" in npz:     # int8 sidecar
+            embeddings *= npz["scales"][:, None]
+    return timestamps, embeddings
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    idx = np.argpartition(-scores, k)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def spherical_kmeans(
+    x: np.ndarray,
+    k: int,
+    iters: int = 10,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    k-means on the unit sphere (cosine similarity), returns (k, D) centroids.
+
+    Empty clusters are re-seeded from the points worst served by their
+    current centroid.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=np.float32)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(iters):
+        sims = x @ centroids.T
+        assign = sims.argmax(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            worst = np.argsort(sims[np.arange(len(x)), assign])[:len(empty)]
+            sums[empty] = x[worst]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid per row, computed in blocks."""
+    out = np.empty(len(vectors), dtype=np.int32)
+    for lo in range(0, len(vectors), _SEARCH_BLOCK):
+        block = np.asarray(vectors[lo:lo + _SEARCH_BLOCK], dtype=np.float32)
+        out[lo:lo + len(block)] = (block @ centroids.T).argmax(axis=1)
+    return out
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Per-user shard
+# ─────────────────────────────────────────────────────────────────────────────
+
+class UserShard:
+    """
+    One user's memory-mapped index.
+
+    Example:
+        shard = UserShard("./search_index", user_id, dim=768)
+        shard.add_video(video_id, timestamps, embeddings)
+        hits = shard.search(query_vec, k=10)   # [(video_id, ts, score), ...]
+    """
+
+    def __init__(self, root: str, user_id: str, dim: int = 768):
+        if not user_id or user_id in (".", "..") or "/" in user_id or os.sep in user_id:
+            raise ValueError(f"Invalid shard user_id: {user_id!r}")
+        self.path = os.path.join(root, user_id)
+        self.dim = dim
+        self._lock = threading.Lock()
+        # (vectors, times, centroids, order, bounds, starts, videos) — one
+        # consistent snapshot; writes replace it rather than mutate it
+        self._cache = None
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+            self.dim = self.manifest["dim"]
+        else:
+            self.manifest = {"dim": dim, "videos": [], "trained_at": 0}
+
+    # ── bookkeeping ──────────────────────────────────────────────────
+
+    @property
+    def size(self) -> int:
+        videos = self.manifest["videos"]
+        return videos[-1]["start"] + videos[-1]["count"] if videos else 0
+
+    @property
+    def video_ids(self) -> set:
+        return {v["video_id"] for v in self.manifest["videos"]}
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _save_manifest(self):
+        tmp = self._file("manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self._file("manifest.json"))
+
+    # ── writes ───────────────────────────────────────────────────────
+
+    def add_video(self, video_id: str, timestamps: Sequence[float], embeddings: np.ndarray) -> int:
+        """
+        Append one video's frame embeddings.  Returns rows added (0 if the
+        video is already indexed).
+        """
+        with self._lock:
+            if video_id in self.video_ids or len(embeddings) == 0:
+                return 0
+            if embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {embeddings.shape[1]} != index dim {self.dim}")
+            os.makedirs(self.path, exist_ok=True)
+
+            vecs = normalize_rows(embeddings)
+            lists = np.full(len(vecs), -1, dtype=np.int32)
+            centroids_path = self._file("centroids.npy")
+            if os.path.exists(centroids_path):
+                lists = assign_lists(vecs, np.load(centroids_path))
+
+            with open(self._file("vectors.f16"), "ab") as f:
+                f.write(vecs.astype(np.float16).tobytes())
+            with open(self._file("times.f32"), "ab") as f:
+                f.write(np.asarray(timestamps, dtype=np.float32).tobytes())
+            with open(self._file("lists.i32"), "ab") as f:
+                f.write(lists.tobytes())
+
+            self.manifest["videos"].append(
+                {"video_id": video_id, "start": self.size, "count": len(vecs)}
+            )
+            if self.size >= MIN_IVF_ROWS and self.size >= 2 * self.manifest["trained_at"]:
+                self._train()
+            self._save_manifest()
+            self._cache = None
+            return len(vecs)
+
+    def remove_video(self, video_id: str) -> int:
+        """
+        Drop one video's rows, e.g. when the video is deleted.  Returns rows
+        removed (0 if the video is not indexed).
+        """
+        with self._lock:
+            videos = self.manifest["videos"]
+            entry = next((v for v in videos if v["video_id"] == video_id), None)
+            if entry is None:
+                return 0
+            lo, hi = entry["start"], entry["start"] + entry["count"]
+            for name, row_bytes in (("vectors.f16", 2 * self.dim), ("times.f32", 4), ("lists.i32", 4)):
+                _drop_rows(self._file(name), row_bytes, lo, hi)
+            videos.remove(entry)
+            for v in videos:
+                if v["start"] > lo:
+                    v["start"] -= entry["count"]
+            self._save_manifest()
+            self._cache = None
+            return entry["count"]
+
+    def _train(self):
+        """(Re)build IVF centroids from a sample and reassign every row."""
+        n = self.size
+        vectors = np.memmap(self._file("vectors.f16"), dtype=np.float16, mode="r", shape=(n, self.dim))
+        nlist = max(16, int(np.sqrt(n)))
+        rng = np.random.default_rng(n)
+        sample = vectors[np.sort(rng.choice(n, size=min(n, nlist * 64), replace=False))]
+        centroids = spherical_kmeans(sample, nlist, seed=n)
+        np.save(self._file("centroids.npy"), centroids)
+        assign_lists(vectors, centroids).tofile(self._file("lists.i32"))
+        self.manifest["trained_at"] = n
+        print(f"✓ Vector index {os.path.basename(self.path)}: IVF trained ({nlist} lists, {n} rows)")
+
+    # ── reads ────────────────────────────────────────────────────────
+
+    def _open(self):
+        """
+        The read snapshot, built under the write lock so its rows, starts
+        and video list always agree.  Memory maps keep a file that
+        remove_video has since replaced readable, so a search already
+        holding a snapshot finishes against the rows it started with.
+        """
+        with self._lock:
+            if self._cache is not None:
+                return self._cache
+            n = self.size
+            if n == 0:
+                return None
+            vectors = np.memmap(self._file("vectors.f16"), dtype=np.float16, mode="r", shape=(n, self.dim))
+            times = np.memmap(self._file("times.f32"), dtype=np.float32, mode="r", shape=(n,))
+            centroids = order = bounds = None
+            if os.path.exists(self._file("centroids.npy")):
+                centroids = np.load(self._file("centroids.npy"))
+                lists = np.fromfile(self._file("lists.i32"), dtype=np.int32, count=n)
+                # Inverted lists: rows grouped by list, bounds[l]:bounds[l+1]
+                order = np.argsort(lists, kind="stable").astype(np.int64)
+                bounds = np.searchsorted(lists[order], np.arange(len(centroids) + 1))
+            videos = [dict(v) for v in self.manifest["videos"]]
+            starts = np.asarray([v["start"] for v in videos])
+            self._cache = (vectors, times, centroids, order, bounds, starts, videos)
+            return self._cache
+
+    def frame_embedding(self, video_id: str, timestamp: float) -> Optional[np.ndarray]:
+        """Stored embedding of the indexed frame closest to timestamp."""
+        opened = self._open()
+        if opened is None:
+            return None
+        vectors, times, videos = opened[0], opened[1], opened[6]
+        entry = next((v for v in videos if v["video_id"] == video_id), None)
+        if entry is None:
+            return None
+        lo, hi = entry["start"], entry["start"] + entry["count"]
+        row = lo + int(np.abs(np.asarray(times[lo:hi]) - timestamp).argmin())
+        return np.asarray(vectors[row], dtype=np.float32)
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        exact: bool = False,
+        nprobe: int = 8,
+    ) -> List[Tuple[str, float, float]]:
+        """
+        Top-k frames by cosine similarity → [(video_id, timestamp, score)].
+
+        Uses the IVF when trained (unless exact=True), otherwise brute force.
+        """
+        opened = self._open()
+        if opened is None:
+            return []
+        vectors, times, centroids, order, bounds, starts, videos = opened
+        q = normalize_rows(query)[0]
+
+        if exact or centroids is None:
+            rows, scores = exact_search(vectors, q, k)
+        else:
+            probe = top_k(centroids @ q, min(max(nprobe, 1), len(centroids)))
+            rows = np.concatenate([order[bounds[l]:bounds[l + 1]] for l in probe])
+            rows.sort()                  # sequential memmap access
+            cand = np.asarray(vectors[rows], dtype=np.float32) @ q
+            best = top_k(cand, k)
+            rows, scores = rows[best], cand[best]
+
+        owners = np.searchsorted(starts, rows, side="right") - 1
+        return [
+            (videos[o]["video_id"], float(times[r]), float(s))
+            for r, o, s in zip(rows, owners, scores)
+        ]
+
+
+def _drop_rows(path: str, row_bytes: int, lo: int, hi: int):
+    """Rewrite a raw row file without rows [lo, hi), replacing it atomically."""
+    tmp = path + ".tmp"
+    with open(path, "rb") as src, open(tmp, "wb") as dst:
+        remaining = lo * row_bytes
+        while remaining:
+            chunk = src.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            dst.write(chunk)
+            remaining -= len(chunk)
+        src.seek(hi * row_bytes)
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(tmp, path)
+
+
+def exact_search(vectors: np.ndarray, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Brute-force top-k over (N, D) rows in blocks → (rows, scores)."""
+    best_rows = np.zeros(0, dtype=np.int64)
+    best_scores = np.zeros(0, dtype=np.float32)
+    for lo in range(0, len(vectors), _SEARCH_BLOCK):
+        block = np.asarray(vectors[lo:lo + _SEARCH_BLOCK], dtype=np.float32) @ q
+        keep = top_k(block, k)
+        best_rows = np.concatenate([best_rows, keep + lo])
+        best_scores = np.concatenate([best_scores, block[keep]])
+        sel = top_k(best_scores, k)
+        best_rows, best_scores = best_rows[sel], best_scores[sel]
+    return best_rows, best_scores
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Index of shards
+# ─────────────────────────────────────────────────────────────────────────────
+
+class VectorIndex:
+    """Process-wide registry of per-user shards under one root directory."""
+
+    def __init__(self, root: str, dim: int = 768):
+        self.root = root
+        self.dim = dim
+        self._shards: Dict[str, UserShard] = {}
+        self._lock = threading.Lock()
+
+    def shard(self, user_id: str) -> UserShard:
+        with self._lock:
+            if user_id not in self._shards:
+                self._shards[user_id] = UserShard(self.root, user_id, self.dim)
+            return self._shards[user_id]
@@ -0,0 +1,139 @@
+"""
+Results format benchmark — analysis.json vs chunked analysis.jsonl.gz
+
+Builds a synthetic worker result (narrative, transcript and audio events
+sized for the given video length), writes it in both formats exactly as
+the worker does, and reads it back through app.utils.chunked_results the
+way each route does, against an in-memory S3 that honours Range and
+counts what it sends.  Reports bytes transferred, GET requests and decode
+latency (no network time) per route.
+
+Run with:  python bench_results_format.py [duration_minutes]
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.chunked_results import load_results
+
+# Vocabulary of pseudo-words — compresses about as well as real transcripts
+_vocab_rng = random.Random(42)
+WORDS = ["".join(_vocab_rng.choice("etaoinshrdlucmfwypvbgk") for _ in range(_vocab_rng.randint(2, 9)))
+         for _ in range(3000)]
+
+NARRATIVE_KEYS = ("narrative", "narrative_summary", "narrative_model", "narrative_input_tokens",
+                  "narrative_output_tokens", "narrative_processing_time")
+
+# Route → sections it reads
+ROUTES = {
+    "detections": ("summary", "audio"),
+    "narrative":  ("narrative",),
+    "full":       ("summary", "narrative", "audio"),
+}
+
+
+def synthetic_result(minutes: float, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    text = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+    seconds = minutes * 60
+    return {
+        "video_id": "bench-video", "video_path": "/tmp/bench-video.mp4",
+        "duration": seconds, "frame_count": int(seconds),
+        "narrative": text(700), "narrative_summary": text(80),
+        "narrative_model": "claude", "narrative_input_tokens": 9000,
+        "narrative_output_tokens": 1000, "narrative_processing_time": 12.5,
+        "scene_types": ["street", "cafe", "park", "crosswalk"],
+        "object_class_counts": {f"class_{i}": rng.randint(1, 40) for i in range(15)},
+        "audio_analysis": {
+            "has_speech": True, "transcription": text(int(130 * minutes)),
+            "speech_confidence": 0.81, "has_music": True,
+            "music_match": {"title": "Song", "artist": "Artist", "score": 0.9},
+            "audio_events": [{"event": f"event_{i}", "confidence": rng.random()} for i in range(10)],
+            "music_descriptions": [{"label": f"genre_{i}", "score": rng.random()} for i in range(5)],
+            "dominant_type": "speech", "fusion_notes": "speech detected over identified music track",
+        },
+        "total_processing_time": 240.0, "avg_frame_processing_time": 1.8,
+        "passes_5min_target": True, "peak_vram_gb": 17.2,
+        "num_scenes": 12, "num_object_tracks": 85,
+        "sidecars": {"masks": "results/bench-video/masks.npz",
+                     "embeddings": "results/bench-video/embeddings.npz"},
+    }
+
+
+def chunked_bytes(result: dict) -> bytes:
+    """Round-trip through the worker's analysis.jsonl.gz layout."""
+    jsonl = lambda r: json.dumps(r, separators=(",", ":")).encode("utf-8") + b"\n"
+    sections = {
+        "summary": {k: v for k, v in result.items() if k not in NARRATIVE_KEYS and k != "audio_analysis"},
+        "narrative": {k: result[k] for k in NARRATIVE_KEYS},
+        "audio": {"audio_analysis": result["audio_analysis"]},
+    }
+    members, index, offset = [], [], 0
+    for name, record in sections.items():
+        member = gzip.compress(jsonl(record), mtime=0)
+        index.append({"name": name, "offset": offset, "length": len(member), "records": 1})
+        members.append(member)
+        offset += len(member)
+    header = {"format": "video-analysis-chunked", "version": 1, "video_id": result["video_id"],
+              "sections": index}
+    return gzip.compress(jsonl(header), mtime=0) + b"".join(members)
+
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+    def iter_chunks(self, chunk_size: int):
+        for i in range(0, len(self._data), chunk_size):
+            yield self._data[i:i + chunk_size]
+
+
+class MemS3:
+    """get_object with Range support over a dict of objects."""
+
+    def __init__(self, objects: dict):
+        self.objects = objects
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self.objects[Key]
+        if Range:
+            start, end = (int(x) for x in Range[len("bytes="):].split("-"))
+            data = data[start:end + 1]
+        return {"Body": _Body(data)}
+
+
+def main(minutes: float = 10.0, repeats: int = 200):
+    result = synthetic_result(minutes)
+    s3 = MemS3({
+        "analysis.json": json.dumps(result, indent=2).encode("utf-8"),
+        "analysis.jsonl.gz": chunked_bytes(result),
+    })
+    print(f"{minutes:g}-minute video: analysis.json {len(s3.objects['analysis.json']) / 1024:.1f} KB, "
+          f"analysis.jsonl.gz {len(s3.objects['analysis.jsonl.gz']) / 1024:.1f} KB")
+    print(f"{'route':<12}{'format':<20}{'bytes':>10}{'GETs':>6}{'decode ms':>12}")
+    for route, sections in ROUTES.items():
+        for key in ("analysis.json", "analysis.jsonl.gz"):
+            loaded = load_results(s3, "bench", key, sections)
+            if key == "analysis.json":
+                wanted = loaded
+            best, stats = float("inf"), {}
+            for _ in range(repeats):
+                stats = {}
+                t = time.perf_counter()
+                loaded = load_results(s3, "bench", key, sections, stats)
+                best = min(best, time.perf_counter() - t)
+            if key != "analysis.json":
+                assert all(loaded[k] == wanted[k] for k in loaded)
+            print(f"{route:<12}{key:<20}{stats['bytes']:>10}{stats['requests']:>6}{best * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 10.0)
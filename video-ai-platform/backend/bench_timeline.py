@@ -0,0 +1,85 @@
+"""
+Timeline window benchmark — cost of a ?start=&end= query vs video length
+
+Writes synthetic per-frame timelines (1 analysed frame per second, USR-
+sized records, tracks and scenes) in the worker's timeline.bin layout for
+videos of increasing length, then serves the same 30 s window from each
+through app.utils.timeline against the in-memory ranged S3 of
+bench_results_format.  Bytes, GETs and latency should stay flat while
+the object (and a whole-object read) grows with the video.
+
+Run with:  python bench_timeline.py [window_s]
+"""
+import gzip
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.timeline import read_window
+from bench_results_format import MemS3, WORDS
+
+SEGMENT_S = 10.0
+LENGTHS_MIN = (5, 30, 120, 480)
+
+
+def synthetic_timeline(minutes: float, seed: int = 0) -> bytes:
+    """Round-trip through the worker's timeline.bin layout."""
+    rng = random.Random(seed)
+    text = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+    jsonl = lambda r: json.dumps(r, separators=(",", ":")).encode("utf-8") + b"\n"
+    duration = minutes * 60
+    n = int(-(-duration // SEGMENT_S))
+    segments = [[] for _ in range(n)]
+    for ts in range(int(duration)):
+        objects = [{"track_id": rng.randint(0, 400), "label": rng.choice(WORDS),
+                    "bbox": [rng.random() for _ in range(4)], "depth_zone": "mid"} for _ in range(6)]
+        segments[int(ts // SEGMENT_S)].append({
+            "type": "frame", "frame_id": ts, "timestamp": float(ts), "caption": text(40),
+            "usr": {"frame_id": ts, "timestamp": float(ts), "objects": objects,
+                    "actions": [{"action": rng.choice(WORDS), "confidence": rng.random()}] * 5,
+                    "depth_stats": {"mean": rng.random(), "near": 0.2, "far": 0.5},
+                    "scene_type": "street", "context_tags": ["outdoor", "urban"]},
+        })
+    for tid in range(int(minutes * 20)):
+        first = rng.uniform(0, duration - 1)
+        track = {"type": "track", "track_id": tid, "label": rng.choice(WORDS), "first_ts": first,
+                 "last_ts": min(duration - 1, first + rng.uniform(1, 40)), "frame_count": 10,
+                 "depth_zones": ["mid"]}
+        for i in range(int(track["first_ts"] // SEGMENT_S), int(track["last_ts"] // SEGMENT_S) + 1):
+            segments[i].append(track)
+
+    index, members, offset = [], [], 0
+    for records in segments:
+        member = gzip.compress(b"".join(jsonl(r) for r in records), mtime=0) if records else b""
+        index.append(struct.pack("<QII", offset, len(member), len(records)))
+        members.append(member)
+        offset += len(member)
+    header = {"format": "video-timeline", "version": 1, "video_id": "bench", "duration": duration,
+              "segment_s": SEGMENT_S, "segments": n, "frames": int(duration)}
+    return gzip.compress(jsonl(header), mtime=0) + b"".join(index) + b"".join(members)
+
+
+def main(window_s: float = 30.0, repeats: int = 50):
+    print(f"{window_s:g}s window at the middle of each video ({SEGMENT_S:g}s segments)")
+    print(f"{'video':>8}{'object KB':>12}{'window bytes':>14}{'GETs':>6}{'frames':>8}{'ms':>10}")
+    for minutes in LENGTHS_MIN:
+        s3 = MemS3({"timeline.bin": synthetic_timeline(minutes)})
+        start = minutes * 30 - window_s / 2
+        best, stats, window = float("inf"), {}, None
+        for _ in range(repeats):
+            stats = {}
+            t = time.perf_counter()
+            window = read_window(s3, "bench", "timeline.bin", start, start + window_s, stats)
+            best = min(best, time.perf_counter() - t)
+        assert len(window["frames"]) == int(window_s) + 1
+        print(f"{minutes:>6}m {len(s3.objects['timeline.bin']) / 1024:>11.0f}{stats['bytes']:>14}"
+              f"{stats['requests']:>6}{len(window['frames']):>8}{best * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 30.0)
@@ -0,0 +1,83 @@
+"""
+Vector index benchmark — recall and latency on synthetic SigLIP-like vectors
+
+Builds a user shard incrementally (one "video" at a time, exactly as
+completed videos are indexed from their embeddings sidecars), then
+compares IVF search at several nprobe settings against the brute-force
+baseline.
+
+Run with:  python bench_vector_index.py [num_frames]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.vector_index import UserShard, exact_search, load_embedding_sidecar, normalize_rows
+
+DIM = 768
+FRAMES_PER_VIDEO = 120
+
+
+def synthetic_videos(num_frames: int, seed: int = 0):
+    """Clustered unit vectors: each video drifts around a few scene centres."""
+    rng = np.random.default_rng(seed)
+    scenes = normalize_rows(rng.normal(size=(max(8, num_frames // 200), DIM)))
+    for v in range(num_frames // FRAMES_PER_VIDEO):
+        picks = rng.choice(len(scenes), size=3)
+        centre = scenes[picks[np.arange(FRAMES_PER_VIDEO) * 3 // FRAMES_PER_VIDEO]]
+        emb = normalize_rows(centre + rng.normal(scale=0.04, size=(FRAMES_PER_VIDEO, DIM)))
+        buf = io.BytesIO()      # round-trip through the worker's sidecar format
+        np.savez(buf, frame_ids=np.arange(FRAMES_PER_VIDEO, dtype=np.int32),
+                 timestamps=np.arange(FRAMES_PER_VIDEO, dtype=np.float32),
+                 embeddings=emb.astype(np.float16))
+        yield f"video-{v:05d}", buf.getvalue()
+
+
+def main(num_frames: int = 48000, num_queries: int = 200, k: int = 10):
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as root:
+        shard = UserShard(root, "bench-user", dim=DIM)
+        t0 = time.time()
+        for video_id, sidecar in synthetic_videos(num_frames):
+            shard.add_video(video_id, *load_embedding_sidecar(sidecar))
+        build_s = time.time() - t0
+        print(f"Indexed {shard.size} frames in {build_s:.1f}s "
+              f"({shard.size / build_s:.0f} frames/s, incremental)")
+
+        vectors = np.memmap(os.path.join(shard.path, "vectors.f16"), dtype=np.float16,
+                            mode="r", shape=(shard.size, DIM))
+        rows = rng.choice(shard.size, size=num_queries, replace=False)
+        queries = normalize_rows(vectors[rows].astype(np.float32)
+                                 + rng.normal(scale=0.03, size=(num_queries, DIM)))
+
+        truth, exact_ms = [], []
+        for q in queries:
+            t = time.perf_counter()
+            truth.append(set(exact_search(vectors, q, k)[0].tolist()))
+            exact_ms.append((time.perf_counter() - t) * 1000)
+        print(f"\n{'mode':<14}{'recall@' + str(k):>10}{'p50 ms':>10}{'p95 ms':>10}")
+        print(f"{'exact':<14}{1.0:>10.3f}{np.percentile(exact_ms, 50):>10.2f}"
+              f"{np.percentile(exact_ms, 95):>10.2f}")
+
+        start_of = {v["video_id"]: v["start"] for v in shard.manifest["videos"]}
+        for nprobe in (1, 4, 8, 16, 32):
+            hits, lat = 0, []
+            for q, want in zip(queries, truth):
+                t = time.perf_counter()
+                res = shard.search(q, k=k, nprobe=nprobe)
+                lat.append((time.perf_counter() - t) * 1000)
+                # timestamps are frame offsets in the synthetic videos
+                got = {start_of[vid] + int(ts) for vid, ts, _ in res}
+                hits += len(got & want)
+            print(f"{'ivf nprobe=' + str(nprobe):<14}{hits / (k * num_queries):>10.3f}"
+                  f"{np.percentile(lat, 50):>10.2f}{np.percentile(lat, 95):>10.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 48000)
@@ -6,7 +6,8 @@ combines them into a single UnifiedSceneRepresentation per frame.
 
 Responsibilities:
   1. Temporal alignment  — all outputs indexed by (frame_id, timestamp)
-  2. Spatial alignment   — link tracked objects to depth zones and stuff labels
+  2. Spatial alignment   — link tracked objects to depth zones (integral-image
+                           box means when a DepthMap is attached) and stuff labels
   3. Semantic enrichment — infer context_tags and scene_type
   4. VLM prompt building — format everything into a structured text prompt
                            ready for Qwen2-VL
@@ -18,8 +19,11 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
+import numpy as np
+
 from perception.base import PerceptionOutput
-from .unified_representation import UnifiedSceneRepresentation
+from perception.utils.depth_ops import DepthMap
+from .unified_representation import EMBEDDING_DIM, UnifiedSceneRepresentation
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -92,7 +96,7 @@ class MultiModalFusionEngine:
         """
 
         # ── 1. Extract per-module data ────────────────────────────────
-        vision_embedding = self._get(siglip,      "vision_embedding", [0.0] * 768)
+        vision_embedding = self._get_embedding(siglip)
         depth_stats      = self._get_depth(depth)
         panoptic_data    = self._get_panoptic(panoptic)
         sg_data          = self._get_sg(scene_graph)
@@ -101,7 +105,8 @@ class MultiModalFusionEngine:
         audio_data       = self._get_audio(audio)
 
         # ── 2. Spatial alignment: enrich tracked objects with depth ───
-        objects = self._enrich_objects(tracker_data, depth_stats, panoptic_data)
+        depth_map        = depth.artifacts.get("depth_map") if depth else None
+        objects = self._enrich_objects(tracker_data, depth_stats, panoptic_data, depth_map)
 
         # ── 3. Flatten scene graph edges → spatial_relationships ──────
         spatial_rels = self._flatten_edges(sg_data.get("edges", []))
@@ -144,6 +149,7 @@ class MultiModalFusionEngine:
             scene_type=scene_type,
             vlm_prompt=vlm_prompt,
             processing_metadata=metadata,
+            panoptic_masks=(panoptic.artifacts.get("masks") or {}) if panoptic else {},
         )
 
         return usr
@@ -158,6 +164,16 @@ class MultiModalFusionEngine:
             return default
         return output.data.get(key, default)
 
+    @staticmethod
+    def _get_embedding(output: Optional[PerceptionOutput]) -> np.ndarray:
+        """(768,) float16 SigLIP embedding; zeros when SigLIP did not run."""
+        if output is None:
+            return np.zeros(EMBEDDING_DIM, dtype=np.float16)
+        emb = output.artifacts.get("vision_embedding")
+        if emb is None:
+            emb = output.data.get("vision_embedding", np.zeros(EMBEDDING_DIM))
+        return np.asarray(emb, dtype=np.float16)
+
     @staticmethod
     def _get_depth(output: Optional[PerceptionOutput]) -> Dict[str, Any]:
         if output is None:
@@ -207,37 +223,53 @@ class MultiModalFusionEngine:
         tracker_data: Dict,
         depth_stats: Dict,
         panoptic_data: Dict,
+        depth_map: Optional[DepthMap] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Return one dict per tracked object, augmented with a depth_zone
-        annotation based on bbox vertical position heuristic.
+        Return one dict per tracked object, augmented with a depth_zone.
+
+        With a DepthMap the zone comes from the mean normalised depth inside
+        the object's bbox (four integral-image lookups per object); without
+        one, from the bbox's vertical position in the frame.
         """
         tracks = tracker_data.get("tracks", [])
-        dominant_zone = depth_stats.get("dominant_zone", "unknown")
         image_h = panoptic_data.get("image_size", [360, 640])[0]
 
+        box_depths = (
+            depth_map.box_means([t.get("bbox", [0, 0, 0, 0]) for t in tracks])
+            if depth_map is not None and tracks else None
+        )
+
         objects = []
-        for t in tracks:
+        for i, t in enumerate(tracks):
             bbox = t.get("bbox", [0, 0, 0, 0])
-            cy = (bbox[1] + bbox[3]) / 2.0
-            # Objects lower in frame tend to be closer in natural scenes
-            rel_y = cy / max(image_h, 1)
-            if rel_y > 0.66:
-                zone = "near"
-            elif rel_y > 0.33:
-                zone = "mid"
+            if box_depths is not None:
+                # Same thresholds as DepthEstimator's near/mid/far split
+                rel_depth = float(box_depths[i])
+                zone = "near" if rel_depth < 0.33 else "mid" if rel_depth < 0.66 else "far"
             else:
-                zone = "far"
-
-            objects.append(
-                {
-                    "track_id": t["track_id"],
-                    "label": t["label"],
-                    "bbox": bbox,
-                    "depth_zone": zone,
-                    "score": t.get("score", 0.0),
-                }
-            )
+                rel_depth = None
+                cy = (bbox[1] + bbox[3]) / 2.0
+                # Objects lower in frame tend to be closer in natural scenes
+                rel_y = cy / max(image_h, 1)
+                if rel_y > 0.66:
+                    zone = "near"
+                elif rel_y > 0.33:
+                    zone = "mid"
+                else:
+                    zone = "far"
+
+            obj = {
+                "track_id": t["track_id"],
+                "label": t["label"],
+                "bbox": bbox,
+                "depth_zone": zone,
+                "score": t.get("score", 0.0),
+                "segment_id": t.get("segment_id"),
+            }
+            if rel_depth is not None:
+                obj["mean_depth"] = round(rel_depth, 4)
+            objects.append(obj)
         return objects
 
     # ─────────────────────────────────────────────────────────────────
@@ -6,7 +6,8 @@ UnifiedSceneRepresentation that is then handed to the VLM (Qwen2-VL)
 and finally to Claude for narrative generation.
 
 Schema mirrors the architecture diagram in infra/:
-  vision_embedding    : 768-dim SigLIP vector
+  vision_embedding    : 768-dim float16 SigLIP vector — serialised only as a
+                        reference into the per-video embeddings sidecar
   depth_stats         : DepthAnything V2 statistics
   panoptic            : Mask2Former things + stuff
   objects             : tracked objects (ByteTrack IDs)
@@ -17,14 +18,22 @@ Schema mirrors the architecture diagram in infra/:
   context_tags        : inferred semantic tags (outdoor, nature, …)
   scene_type          : coarse scene category (forest, urban, indoor, …)
   vlm_prompt          : pre-formatted text prompt for Qwen2-VL
+  panoptic_masks      : {segment_id: RLEMask} — binary, excluded from JSON
+                        (persisted in the per-video mask sidecar)
 """
 
 from __future__ import annotations
 
 import json
-from dataclasses import asdict, dataclass, field
+from dataclasses import asdict, dataclass, field, replace
 from typing import Any, Dict, List, Optional
 
+import numpy as np
+
+EMBEDDING_DIM = 768
+# Sidecar that holds the embedding rows (see pipeline/sidecars.py)
+EMBEDDING_SIDECAR = "embeddings"
+
 
 @dataclass
 class UnifiedSceneRepresentation:
@@ -33,7 +42,7 @@ class UnifiedSceneRepresentation:
     timestamp: float                  # seconds from video start
 
     # ── perception outputs ────────────────────────────────────────────
-    vision_embedding: List[float]     # (768,) from SigLIP
+    vision_embedding: np.ndarray      # (768,) float16 from SigLIP
     depth_stats: Dict[str, Any]       # from DepthAnything V2
     panoptic: Dict[str, Any]          # {"things": [...], "stuff": [...]}
     objects: List[Dict[str, Any]]     # tracked things with track_id
@@ -52,18 +61,34 @@ class UnifiedSceneRepresentation:
     # ── diagnostics ───────────────────────────────────────────────────
     processing_metadata: Dict[str, Any] = field(default_factory=dict)
 
+    # ── binary payloads (never serialised to JSON) ────────────────────
+    panoptic_masks: Dict[int, Any] = field(default_factory=dict, repr=False)
+
+    _BINARY_FIELDS = ("vision_embedding", "panoptic_masks")
+
     # ─────────────────────────────────────────────────────────────────
     #  Serialisation helpers
     # ─────────────────────────────────────────────────────────────────
 
     def to_dict(self) -> Dict[str, Any]:
-        """Return a fully JSON-serialisable dictionary (vision_embedding omitted)."""
-        d = asdict(self)
-        # Vision embedding is large — keep it but callers can strip it if needed
+        """
+        Return a fully JSON-serialisable dictionary.
+
+        Binary payloads are omitted; vision_embedding becomes a reference
+        to this frame's row in the per-video embeddings sidecar.
+        """
+        d = asdict(replace(self, **{f: None for f in self._BINARY_FIELDS}))
+        for f in self._BINARY_FIELDS:
+            d.pop(f)
+        d["vision_embedding"] = {
+            "sidecar": EMBEDDING_SIDECAR,
+            "frame_id": self.frame_id,
+            "dim": len(self.vision_embedding),
+        }
         return d
 
     def to_dict_no_embedding(self) -> Dict[str, Any]:
-        """Like to_dict but drops vision_embedding (saves bandwidth for logging)."""
+        """Like to_dict but drops the vision_embedding reference."""
         d = self.to_dict()
         d.pop("vision_embedding", None)
         return d
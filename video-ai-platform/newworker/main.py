@@ -1,10 +1,26 @@
 """
 NewWorker Main — Video AI Pipeline Worker
 Polls SQS, processes videos with the full multimodal pipeline, saves results.
+
+Each message is a VideoJob that goes through three stages:
+  prepare_video   DB record, start the download
+  analyze_video   perception + captions on the GPU (decoding while the
+                  download is still streaming in)
+  finish_video    thumbnail, music ID, narrative, uploads, DynamoDB,
+                  delete the message
+Every span a stage records (optimization.tracing) carries its video_id;
+with TRACE=1 they are saved per video to logs/<id>/trace.json.  Stage,
+queue-wait and per-module metrics and the health check are served on
+METRICS_PORT (worker/metrics.py).
+With WORKER_PREFETCH > 0 (default) the stages run pipelined on their own
+threads (worker/staged_worker.py); WORKER_PREFETCH=0 runs them serially.
 """
 
-import os, sys, time, traceback, subprocess, tempfile
+import os, sys, json, time, threading, traceback, subprocess, tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Any, Optional
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -14,7 +30,15 @@ from worker.config import settings
 from worker.sqs_handler import SQSHandler
 from worker.s3_handler import S3Handler
 from worker.db_handler import DBHandler
+from worker.staged_worker import StagedWorker
+from worker.metrics import (JOBS, QUEUE_WAIT, STAGE_SECONDS, health, metrics, observe_analysis,
+                            serve_metrics)
+from optimization.tracing import chrome_trace, format_summary, summarize, tracer
 from pipeline.video_pipeline import VideoPipeline
+from pipeline.checkpoint import FrameCheckpoint, LocalCheckpointStore, S3CheckpointStore
+from pipeline.sidecars import EMBEDDING_SIDECAR_NAME, MASK_SIDECAR_NAME
+from pipeline.chunked_results import CHUNKED_RESULTS_NAME
+from pipeline.timeline import TIMELINE_NAME
 from perception.music_identifier import MusicIdentifier
 
 
@@ -25,6 +49,25 @@ def extract_user_id(s3_key: str) -> str:
     parts = s3_key.split('/')
     return parts[1] if len(parts) >= 3 else 'unknown'
 
+def open_checkpoint(video_id: str, s3, receive_count: int):
+    """
+    Per-video FrameCheckpoint, or None when CHECKPOINT_BACKEND is off.
+
+    Only a redelivered message (ApproximateReceiveCount > 1) may resume;
+    the first delivery clears whatever an earlier upload left behind.
+    """
+    backend = settings.CHECKPOINT_BACKEND
+    if backend == "local":
+        store = LocalCheckpointStore(os.path.join(settings.CHECKPOINT_DIR, video_id))
+    elif backend == "s3":
+        store = S3CheckpointStore(s3.s3_client, s3.bucket_name, f"checkpoints/{video_id}/")
+    else:
+        return None
+    checkpoint = FrameCheckpoint(store)
+    if receive_count <= 1:
+        checkpoint.clear()
+    return checkpoint
+
 def _log(logs: list, level: str, step: str, message: str):
     entry = {
         "timestamp": datetime.utcnow().isoformat(),
@@ -62,19 +105,28 @@ def extract_thumbnail(video_path: str):
             os.remove(tmp_path)
 
 
-class _TeeCapture:
+class _LogRouter:
     """
-    Intercepts sys.stdout: every write goes to the real stdout AND is
-    accumulated in an internal buffer so we can save it as a log file.
+    Replaces sys.stdout: every write goes to the real stdout AND to the log
+    buffer of the job the writing thread is working on, so jobs running on
+    different stage threads each get their own worker.log.
     """
     def __init__(self, original):
         self._orig = original
-        self._buf = []
+        self._local = threading.local()
+
+    def attach(self, buf):
+        """Route this thread's output into buf (None = stdout only); returns the previous buffer."""
+        prev = getattr(self._local, 'buf', None)
+        self._local.buf = buf
+        return prev
 
     def write(self, text):
         self._orig.write(text)
         self._orig.flush()
-        self._buf.append(text)
+        buf = getattr(self._local, 'buf', None)
+        if buf is not None:
+            buf.append(text)
 
     def flush(self):
         self._orig.flush()
@@ -82,92 +134,253 @@ class _TeeCapture:
     def isatty(self):
         return getattr(self._orig, 'isatty', lambda: False)()
 
-    def getvalue(self) -> str:
-        return ''.join(self._buf)
 
+@contextmanager
+def _stage(job, name):
+    """One stage of job: stdout capture, trace span, health mark and stage-time histogram."""
+    with _capture(job), tracer.span(name, cat="stage"), health.active(name), STAGE_SECONDS.time(stage=name):
+        yield
 
-def process_message(message, sqs, s3, db, pipeline):
+
+@contextmanager
+def _capture(job):
+    """Tee this thread's stdout into job.log_buffer (and tag its spans with the video) for the block."""
+    router = sys.stdout
+    installed = not isinstance(router, _LogRouter)
+    if installed:
+        router = sys.stdout = _LogRouter(sys.stdout)
+    prev = router.attach(job.log_buffer)
+    try:
+        with tracer.context(video_id=job.video_id):
+            yield
+    finally:
+        router.attach(prev)
+        if installed:
+            sys.stdout = router._orig
+
+
+@dataclass
+class VideoJob:
+    """One SQS message on its way through the worker stages."""
+    message: dict
+    video_id: str
+    user_id: str
+    s3_key: str
+    receive_count: int
+    heartbeat: threading.Event
+    local_video: str
+    logs: list = field(default_factory=list)          # structured, saved to DynamoDB
+    log_buffer: list = field(default_factory=list)    # raw stdout → logs/<id>/worker.log
+    start_time: float = field(default_factory=time.time)
+    checkpoint: Any = None
+    download: Any = None                              # RangedDownload while streaming
+    keep_download: bool = False                       # local file kept for a checkpointed retry
+    music_result: Optional[dict] = None
+    analysis: Any = None                              # VideoAnalysis once on the GPU
+    prepared_at: Optional[float] = None               # queued for the GPU stage
+    analyzed_at: Optional[float] = None               # queued for the post stage
+    failed: bool = False
+    permanent_failure: bool = False
+    success: bool = False
+
+
+# ─────────────────────────────────────────────────────────────────────
+#  Stages — begin_job → prepare_video → analyze_video → finish_video
+# ─────────────────────────────────────────────────────────────────────
+
+def begin_job(message, sqs):
+    """
+    Parse a message and start its heartbeat. Returns a VideoJob, or None for
+    an unparseable message (deleted so it doesn't loop forever).
+    """
     event = sqs.parse_s3_event(message['Body'])
     if not event:
-        # Unparseable message — delete it so it doesn't loop forever
         sqs.delete_message(message['ReceiptHandle'])
-        return False
+        return None
 
     s3_key   = event['s3_key']
     video_id = extract_video_id(s3_key)
-    user_id  = extract_user_id(s3_key)
-
-    # How many times has this message been received (including this attempt)?
-    receive_count = int(message.get('Attributes', {}).get('ApproximateReceiveCount', 1))
+    sent_ms = message.get('Attributes', {}).get('SentTimestamp')
+    if sent_ms:
+        QUEUE_WAIT.observe(max(0.0, time.time() - int(sent_ms) / 1000), queue="sqs")
+
+    # Keep message invisible while it is in the worker (prevents duplicate runs);
+    # bounded so a stuck job's message is eventually redelivered
+    max_s = settings.HEARTBEAT_MAX_H * 3600 if settings.HEARTBEAT_MAX_H else None
+    return VideoJob(
+        message=message,
+        video_id=video_id,
+        user_id=extract_user_id(s3_key),
+        s3_key=s3_key,
+        # How many times has this message been received (including this attempt)?
+        receive_count=int(message.get('Attributes', {}).get('ApproximateReceiveCount', 1)),
+        heartbeat=sqs.start_heartbeat(message['ReceiptHandle'], max_seconds=max_s),
+        local_video=os.path.join(settings.TEMP_DIR, f"{video_id}.mp4"),
+    )
 
-    # ── Intercept stdout so we can save the full log to S3 ────────────
-    _real_stdout = sys.stdout
-    _cap = _TeeCapture(_real_stdout)
-    sys.stdout = _cap
 
-    # Keep message invisible while processing (prevents duplicate runs)
-    heartbeat_stop = sqs.start_heartbeat(message['ReceiptHandle'])
-    try:
-        result, permanent_failure = _run_video(
-            video_id, user_id, s3_key, s3, db, pipeline, receive_count
-        )
-    finally:
-        heartbeat_stop.set()   # stop heartbeat thread
-        sys.stdout = _real_stdout
+def prepare_video(job, s3, db):
+    """Stage 1 (network): DB record, checkpoint, start (or finish) the download."""
+    with _stage(job, "prepare"):
         try:
-            raw_bytes = _cap.getvalue().encode('utf-8', errors='replace')
-            log_key = f"logs/{video_id}/worker.log"
-            s3.upload_bytes(raw_bytes, log_key, 'text/plain; charset=utf-8')
-            db.save_raw_log_key(video_id, log_key)
+            _prepare_video(job, s3, db)
         except Exception as e:
-            print(f"Warning: could not save raw log: {e}")
-
-    if permanent_failure:
-        print(f"Permanent failure (attempt #{receive_count}) — deleting message to stop retry loop")
-        sqs.delete_message(message['ReceiptHandle'])
-        return False
-
-    return result
-
-
-def _run_video(video_id, user_id, s3_key, s3, db, pipeline, receive_count=1):
-    """
-    Core processing logic. Returns (success: bool, permanent_failure: bool).
-
-    permanent_failure=True means retrying will never help (e.g. file not in S3).
-    The caller deletes the SQS message immediately in that case.
-    """
-    logs = []
-    start_time = time.time()
-
-    _log(logs, 'INFO', 'start', f"Worker started for video {video_id} (user: {user_id})")
+            # e.g. DynamoDB throttling — the job still goes through the later
+            # stages so the post stage counts it and settles the message
+            _log(job.logs, 'ERROR', 'prepare', f"Preparing video failed: {str(e)[:200]}")
+            if job.download is not None:
+                job.download.cancel()
+            job.failed = True       # transient — SQS can retry
+            try:
+                db.update_status(job.video_id, 'failed', str(e))
+                _save_failed_logs(db, job.video_id, job.logs)
+            except Exception as db_error:
+                print(f"Warning: could not record the failure: {db_error}")
+        finally:
+            job.prepared_at = time.time()
+
+
+def _prepare_video(job, s3, db):
+    logs, video_id = job.logs, job.video_id
+    local_video = job.local_video
+
+    _log(logs, 'INFO', 'start', f"Worker started for video {video_id} (user: {job.user_id})")
 
     print(f"Video ID : {video_id}")
-    print(f"User ID  : {user_id}")
-    print(f"S3 Key   : {s3_key}")
+    print(f"User ID  : {job.user_id}")
+    print(f"S3 Key   : {job.s3_key}")
 
     os.makedirs(settings.TEMP_DIR, exist_ok=True)
-    local_video = os.path.join(settings.TEMP_DIR, f"{video_id}.mp4")
 
-    db.create_video_record(video_id, user_id, s3_key)
+    db.create_video_record(video_id, job.user_id, job.s3_key)
     db.update_status(video_id, 'processing')
 
-    # Download
-    _log(logs, 'INFO', 'download', f"Downloading video from S3: {s3_key} (attempt #{receive_count})")
-    if not s3.download_video(s3_key, local_video):
-        _log(logs, 'ERROR', 'download', "Download failed — file not found or inaccessible in S3")
-        db.update_status(video_id, 'failed', 'File not found in S3')
-        _save_failed_logs(db, video_id, logs)
-        # 404 means the file was never uploaded — permanent failure, no point retrying
-        return False, True
+    checkpoint = job.checkpoint = open_checkpoint(video_id, s3, job.receive_count)
+
+    # Download — a checkpointed retry on the same host reuses the earlier one
+    if (checkpoint is not None and job.receive_count > 1 and os.path.exists(local_video)
+            and os.path.getsize(local_video) == s3.object_size(job.s3_key)):
+        _log(logs, 'INFO', 'download', f"Reusing local download from an earlier attempt (attempt #{job.receive_count})")
+    else:
+        _log(logs, 'INFO', 'download', f"Downloading video from S3: {job.s3_key} (attempt #{job.receive_count})")
+        if settings.STREAM_DOWNLOAD:
+            # Ranges keep landing while the GPU stage decodes the first ones
+            job.download = s3.start_download(job.s3_key, local_video)
+            ok = job.download is not None
+        else:
+            ok = s3.download_video(job.s3_key, local_video)
+        if not ok:
+            _log(logs, 'ERROR', 'download', "Download failed — file not found or inaccessible in S3")
+            db.update_status(video_id, 'failed', 'File not found in S3')
+            _save_failed_logs(db, video_id, logs)
+            # 404 means the file was never uploaded — permanent failure, no point retrying
+            job.failed = job.permanent_failure = True
+            return
 
     file_mb = os.path.getsize(local_video) / 1024 / 1024
-    _log(logs, 'INFO', 'download', f"Download complete ({file_mb:.1f} MB)")
+    if job.download is not None:
+        _log(logs, 'INFO', 'download', f"Download started ({file_mb:.1f} MB, decoded while streaming)")
+    else:
+        _log(logs, 'INFO', 'download', f"Download complete ({file_mb:.1f} MB)")
+
+
+def analyze_video(job, db, pipeline):
+    """Stage 2 (GPU): perception + captions → job.analysis."""
+    if job.failed:
+        return
+    QUEUE_WAIT.observe(time.time() - job.prepared_at, queue="gpu")
+    try:
+        with _stage(job, "analyze"):
+            logs, checkpoint = job.logs, job.checkpoint
+            _log(logs, 'INFO', 'pipeline', "Starting multimodal pipeline...")
+            pipeline_ok = False
+            try:
+                job.analysis = pipeline.analyze(
+                    job.local_video, video_id=job.video_id, checkpoint=checkpoint, download=job.download,
+                )
+                pipeline_ok = True
+                observe_analysis(job.analysis)
+                frame_count = len(job.analysis.frame_results)
+                stats = job.analysis.download_stats
+                if stats:
+                    _log(logs, 'INFO', 'download',
+                         f"Download complete ({stats['bytes'] / 2**20:.1f} MB at {stats['mb_per_s']:.1f} MB/s) — "
+                         f"first frame decoded after {job.analysis.time_to_first_frame or 0.0:.2f}s")
+                _log(logs, 'INFO', 'pipeline', f"Pipeline complete — {frame_count} frames processed")
+                if checkpoint is not None and checkpoint.saved < frame_count:
+                    _log(logs, 'INFO', 'pipeline', f"Resumed from checkpoint — {frame_count - checkpoint.saved} frames restored")
+            except Exception as e:
+                _log(logs, 'ERROR', 'pipeline', f"Pipeline failed: {str(e)[:200]}")
+                job.failed = True       # transient — SQS can retry
+                db.update_status(job.video_id, 'failed', str(e))
+                _save_failed_logs(db, job.video_id, logs)
+            finally:
+                if job.download is not None and not pipeline_ok:
+                    job.download.cancel()
+                # Keep the download for a checkpointed retry of a failed run
+                job.keep_download = not pipeline_ok and checkpoint is not None
+    finally:
+        job.analyzed_at = time.time()
+
+
+def finish_video(job, sqs, s3, db, pipeline):
+    """
+    Stage 3 (CPU / network): thumbnail, music ID, narrative, sidecars,
+    results JSON, DynamoDB — then settle the message: stop its heartbeat,
+    save the raw log, delete it on success or permanent failure.  A run no
+    retry will resume (permanent failure, or the SQS_MAX_RECEIVE-th attempt)
+    has its checkpoint cleared.
+    """
+    try:
+        if not job.failed:
+            QUEUE_WAIT.observe(time.time() - job.analyzed_at, queue="post")
+            with _stage(job, "finish"):
+                job.success = _finish_video(job, s3, db, pipeline)
+    finally:
+        job.heartbeat.set()   # stop heartbeat thread
+        last_attempt = bool(settings.SQS_MAX_RECEIVE) and job.receive_count >= settings.SQS_MAX_RECEIVE
+        if not job.success and (job.permanent_failure or last_attempt):
+            # No retry will resume this run — drop its checkpoint and download
+            job.keep_download = False
+            if job.checkpoint is not None:
+                try:
+                    job.checkpoint.clear()
+                except Exception as e:
+                    print(f"Warning: could not clear checkpoint: {e}")
+        if os.path.exists(job.local_video) and not job.keep_download:
+            os.remove(job.local_video)
+        with tracer.context(video_id=job.video_id):
+            try:
+                raw_bytes = ''.join(job.log_buffer).encode('utf-8', errors='replace')
+                log_key = f"logs/{job.video_id}/worker.log"
+                s3.upload_bytes(raw_bytes, log_key, 'text/plain; charset=utf-8')
+                db.save_raw_log_key(job.video_id, log_key)
+            except Exception as e:
+                print(f"Warning: could not save raw log: {e}")
+            if tracer.enabled:
+                _save_trace(job, s3)
+
+    JOBS.inc(outcome='success' if job.success else 'permanent_failure' if job.permanent_failure else 'failed')
+    if job.success:
+        sqs.delete_message(job.message['ReceiptHandle'])
+    elif job.permanent_failure:
+        print(f"Permanent failure (attempt #{job.receive_count}) — deleting message to stop retry loop")
+        sqs.delete_message(job.message['ReceiptHandle'])
+    elif last_attempt:
+        print(f"Message processing failed for {job.video_id} — no retries left (attempt #{job.receive_count})")
+    else:
+        print(f"Message processing failed for {job.video_id} — will retry")
+
+
+def _describe_media(job, s3, db):
+    """Thumbnail + music ID — both need the whole file, so they run after the GPU stage."""
+    logs, video_id, local_video = job.logs, job.video_id, job.local_video
 
     # Thumbnail
     _log(logs, 'INFO', 'thumbnail', "Extracting video thumbnail...")
     try:
-        thumb_bytes = extract_thumbnail(local_video)
+        with tracer.span("thumbnail", cat="io"):
+            thumb_bytes = extract_thumbnail(local_video)
         if thumb_bytes:
             thumb_key = f"thumbnails/{video_id}.jpg"
             if s3.upload_bytes(thumb_bytes, thumb_key, 'image/jpeg'):
@@ -181,18 +394,18 @@ def _run_video(video_id, user_id, s3_key, s3, db, pipeline, receive_count=1):
         _log(logs, 'WARNING', 'thumbnail', f"Thumbnail step error: {e}")
 
     # ── Music identification (Chromaprint + AcoustID) — whole-video ──────────
-    # Run BEFORE the visual pipeline so we can attach results to temporal_assembly.
+    # Attached to temporal_assembly before the results JSON is written.
     # Extracts only the first 30s of audio; does NOT affect visual models.
-    music_result = None
     _log(logs, 'INFO', 'audio_music', "Running music fingerprinting (Chromaprint + AcoustID)...")
     audio_tmp = None
     try:
         with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as af:
             audio_tmp = af.name
-        extracted = MusicIdentifier.extract_audio(local_video, audio_tmp, max_secs=30)
+        with tracer.span("music_id", cat="audio"):
+            extracted = MusicIdentifier.extract_audio(local_video, audio_tmp, max_secs=30)
+            if extracted:
+                music_result = job.music_result = MusicIdentifier().identify(audio_tmp)
         if extracted:
-            identifier = MusicIdentifier()
-            music_result = identifier.identify(audio_tmp)
             if music_result.get('best_match'):
                 m = music_result['best_match']
                 _log(logs, 'INFO', 'audio_music',
@@ -210,25 +423,26 @@ def _run_video(video_id, user_id, s3_key, s3, db, pipeline, receive_count=1):
         if audio_tmp and os.path.exists(audio_tmp):
             os.remove(audio_tmp)
 
-    # Process
-    _log(logs, 'INFO', 'pipeline', "Starting multimodal pipeline...")
+
+def _finish_video(job, s3, db, pipeline):
+    """Returns True once results are uploaded and saved."""
+    logs, video_id, checkpoint = job.logs, job.video_id, job.checkpoint
+
+    _describe_media(job, s3, db)
+
     try:
-        video_result = pipeline.process(local_video, video_id=video_id)
-        frame_count = len(getattr(video_result, 'frame_results', [])) or getattr(video_result, 'frame_count', 0)
-        _log(logs, 'INFO', 'pipeline', f"Pipeline complete — {frame_count} frames processed")
+        video_result = pipeline.finish(job.analysis)
     except Exception as e:
-        _log(logs, 'ERROR', 'pipeline', f"Pipeline failed: {str(e)[:200]}")
+        _log(logs, 'ERROR', 'narrative', f"Narrative generation failed: {str(e)[:200]}")
         db.update_status(video_id, 'failed', str(e))
         _save_failed_logs(db, video_id, logs)
-        return False, False  # transient — SQS can retry
-    finally:
-        if os.path.exists(local_video):
-            os.remove(local_video)
+        return False  # transient — SQS can retry
+    job.analysis = None
 
     # Attach music identification result to temporal assembly (before to_dict())
     try:
-        if music_result is not None:
-            video_result.temporal_assembly.music_identification = music_result
+        if job.music_result is not None:
+            video_result.temporal_assembly.music_identification = job.music_result
     except Exception:
         pass
 
@@ -259,24 +473,134 @@ def _run_video(video_id, user_id, s3_key, s3, db, pipeline, receive_count=1):
     except Exception:
         pass
 
-    # Upload results JSON to S3
+    # Upload binary sidecars first so the results can reference them
+    try:
+        mask_bytes = video_result.mask_sidecar()
+        if mask_bytes:
+            masks_key = f"results/{video_id}/{MASK_SIDECAR_NAME}"
+            if s3.upload_bytes(mask_bytes, masks_key):
+                video_result.sidecars['masks'] = masks_key
+                _log(logs, 'INFO', 'upload', f"Mask sidecar uploaded ({len(mask_bytes) / 1024:.0f} KB)")
+            else:
+                _log(logs, 'WARNING', 'upload', "Mask sidecar upload failed — continuing without masks")
+    except Exception as e:
+        _log(logs, 'WARNING', 'upload', f"Mask sidecar skipped: {str(e)[:120]}")
+
+    try:
+        emb_bytes = video_result.embedding_sidecar(dtype=settings.EMBEDDING_DTYPE)
+        if emb_bytes:
+            emb_key = f"results/{video_id}/{EMBEDDING_SIDECAR_NAME}"
+            if s3.upload_bytes(emb_bytes, emb_key):
+                video_result.sidecars['embeddings'] = emb_key
+                _log(logs, 'INFO', 'upload', f"Embedding sidecar uploaded ({len(emb_bytes) / 1024:.0f} KB, {settings.EMBEDDING_DTYPE})")
+            else:
+                _log(logs, 'WARNING', 'upload', "Embedding sidecar upload failed — continuing without embeddings")
+    except Exception as e:
+        _log(logs, 'WARNING', 'upload', f"Embedding sidecar skipped: {str(e)[:120]}")
+
+    try:
+        timeline_bytes = video_result.timeline(segment_s=settings.TIMELINE_SEGMENT_S)
+        timeline_key = f"results/{video_id}/{TIMELINE_NAME}"
+        if s3.upload_bytes(timeline_bytes, timeline_key):
+            video_result.sidecars['timeline'] = timeline_key
+            _log(logs, 'INFO', 'upload', f"Timeline uploaded ({len(timeline_bytes) / 1024:.0f} KB, {settings.TIMELINE_SEGMENT_S:g}s segments)")
+        else:
+            _log(logs, 'WARNING', 'upload', "Timeline upload failed — continuing without per-frame timeline")
+    except Exception as e:
+        _log(logs, 'WARNING', 'upload', f"Timeline skipped: {str(e)[:120]}")
+
+    # Upload results to S3 — chunked JSONL (indexed sections) unless RESULTS_FORMAT=json
     _log(logs, 'INFO', 'upload', "Uploading analysis results to S3...")
-    results_s3_key = f"results/{video_id}/analysis.json"
-    if not s3.upload_json(video_result.to_dict(), results_s3_key):
+    if settings.RESULTS_FORMAT == "json":
+        results_s3_key = f"results/{video_id}/analysis.json"
+        uploaded = s3.upload_json(video_result.to_dict(), results_s3_key)
+    else:
+        results_s3_key = f"results/{video_id}/{CHUNKED_RESULTS_NAME}"
+        results_bytes = video_result.chunked_results()
+        uploaded = s3.upload_bytes(results_bytes, results_s3_key, content_type='application/gzip')
+        if uploaded:
+            _log(logs, 'INFO', 'upload', f"Chunked results uploaded ({len(results_bytes) / 1024:.1f} KB)")
+    if not uploaded:
         _log(logs, 'ERROR', 'upload', "Results upload to S3 failed")
         db.update_status(video_id, 'failed', 'Upload failed')
         _save_failed_logs(db, video_id, logs)
-        return False, False  # transient — S3 may recover
+        return False  # transient — S3 may recover
 
-    elapsed = time.time() - start_time
+    elapsed = time.time() - job.start_time
     _log(logs, 'INFO', 'complete', f"Processing complete in {elapsed:.0f}s — results at {results_s3_key}")
 
     # Save summary + logs to DynamoDB
     db.save_narrative_result(video_id, video_result, results_s3_key, processing_logs=logs)
+    if checkpoint is not None:
+        checkpoint.clear()
 
     print(f"\n✓ Processing complete!")
     print(f"  Narrative: {video_result.narrative.narrative[:100]}...")
-    return True, False
+    return True
+
+
+def process_message(message, sqs, s3, db, pipeline):
+    """Serial worker: every stage of one message on this thread. Returns success."""
+    job = begin_job(message, sqs)
+    if job is None:
+        return False
+    prepare_video(job, s3, db)
+    analyze_video(job, db, pipeline)
+    finish_video(job, sqs, s3, db, pipeline)
+    return job.success
+
+
+def run_staged(sqs, s3, pipeline, make_db=DBHandler, prefetch=1, max_jobs=None):
+    """
+    Staged worker: the next message downloads while this one is on the GPU,
+    and the previous one's narrative / uploads / DB writes run meanwhile.
+
+    Each stage thread gets its own make_db() (boto3 resources are not
+    thread-safe; clients are).  Runs until interrupted (or max_jobs).
+    """
+    db_prefetch, db_gpu, db_post = make_db(), make_db(), make_db()
+
+    def receive():
+        messages = sqs.receive_messages(max_messages=1, wait_time=20)
+        health.beat()
+        if not messages:
+            print(".", end="", flush=True)
+            return None
+        print("\n" + "=" * 60)
+        return begin_job(messages[0], sqs)
+
+    worker = StagedWorker(
+        receive=receive,
+        prepare=lambda job: prepare_video(job, s3, db_prefetch),
+        analyze=lambda job: analyze_video(job, db_gpu, pipeline),
+        finish=lambda job: finish_video(job, sqs, s3, db_post, pipeline),
+        prefetch=prefetch,
+    )
+    # One router for all stage threads, installed before any of them starts
+    real_stdout = sys.stdout
+    sys.stdout = _LogRouter(real_stdout)
+    try:
+        worker.run(max_jobs=max_jobs)
+    finally:
+        sys.stdout = real_stdout
+    return worker
+
+
+def _save_trace(job, s3):
+    """Upload the job's spans as logs/<id>/trace.json (Chrome trace_event) and print their summary."""
+    spans = tracer.pop(job.video_id)
+    if not spans:
+        return
+    try:
+        summary = summarize(spans, overhead_us=tracer.overhead_us)
+        print(f"\nTrace summary — {job.video_id}")
+        print(format_summary(summary))
+        body = json.dumps(chrome_trace(spans, summary=summary), separators=(',', ':')).encode('utf-8')
+        s3.upload_bytes(body, f"logs/{job.video_id}/trace.json", 'application/json')
+    except Exception as e:
+        print(f"Warning: could not save trace: {e}")
+    finally:
+        tracer.pop(job.video_id)    # the trace upload's own span
 
 
 def _save_failed_logs(db, video_id: str, logs: list):
@@ -299,6 +623,17 @@ def main():
     print(f"Bucket: {settings.S3_BUCKET_NAME}")
     print(f"Table : {settings.DYNAMODB_TABLE_NAME}")
     print(f"Device: {settings.DEVICE}")
+    if settings.TRACE:
+        tracer.enable(memory=settings.TRACE_MEMORY)
+        cost = tracer.measure_overhead()
+        print(f"Trace : on — {tracer.overhead_us:.1f} µs/span "
+              f"({cost['disabled_us']:.2f} µs disabled), uploaded to logs/<id>/trace.json")
+    if settings.METRICS_PORT:
+        health.max_idle_s = settings.HEALTH_MAX_IDLE_S
+        health.max_stage_s = settings.HEARTBEAT_MAX_H * 3600 if settings.HEARTBEAT_MAX_H else None
+        health.require_cuda = settings.DEVICE == "cuda"
+        serve_metrics(settings.METRICS_PORT, metrics, health)
+        print(f"Metrics: :{settings.METRICS_PORT}/metrics, health :{settings.METRICS_PORT}/healthz")
 
     sqs = SQSHandler()
     s3  = S3Handler()
@@ -308,24 +643,45 @@ def main():
         device=settings.DEVICE,
         quantize_bits=settings.QUANTIZE_BITS,
         sample_fps=settings.SAMPLE_FPS,
+        analysis_max_side=settings.ANALYSIS_MAX_SIDE,
+        gate_threshold=settings.GATE_THRESHOLD,
+        gate_full_every=settings.GATE_FULL_EVERY,
+        action_window_s=settings.ACTION_WINDOW_S,
+        action_batch_size=settings.ACTION_BATCH_SIZE,
+        device_preprocess=settings.DEVICE_PREPROCESS,
+        defer_captions=settings.DEFER_CAPTIONS,
+        vlm_batch_size=settings.VLM_BATCH_SIZE,
+        vlm_prefix_cache=settings.VLM_PREFIX_CACHE,
+        caption_cache_path=settings.CAPTION_CACHE_PATH or None,
+        caption_cache_mb=settings.CAPTION_CACHE_MB,
+        perception_cache_path=settings.PERCEPTION_CACHE_PATH or None,
+        perception_cache_gb=settings.PERCEPTION_CACHE_GB,
+        perception_cache_ttl_h=settings.PERCEPTION_CACHE_TTL_H,
+        caption_mode=settings.CAPTION_MODE,
+        segment_frame_captions=settings.SEGMENT_FRAME_CAPTIONS,
     )
 
     print("\nWaiting for messages...")
 
+    if settings.WORKER_PREFETCH > 0:
+        print(f"Staged worker: {settings.WORKER_PREFETCH} message(s) prefetched ahead of the GPU")
+        try:
+            run_staged(sqs, s3, pipeline, prefetch=settings.WORKER_PREFETCH)
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+        return
+
     while True:
         try:
             messages = sqs.receive_messages(max_messages=1, wait_time=20)
+            health.beat()
             if not messages:
                 print(".", end="", flush=True)
                 continue
 
             for message in messages:
                 print("\n" + "=" * 60)
-                success = process_message(message, sqs, s3, db, pipeline)
-                if success:
-                    sqs.delete_message(message['ReceiptHandle'])
-                else:
-                    print("Message processing failed — will retry")
+                process_message(message, sqs, s3, db, pipeline)
 
         except KeyboardInterrupt:
             print("\nShutting down...")
@@ -12,6 +12,9 @@ API key : ANTHROPIC_API_KEY environment variable
 The prompt is structured in three parts:
   1. Video overview  (duration, scene type, context)
   2. Frame analyses  (one block per frame: VLM caption + objects + actions + audio)
+     — preceded by one multi-frame VLM caption per scene segment when the
+     pipeline ran with caption_mode="segment"; frames that only share their
+     segment's caption then omit the per-frame caption line
   3. Temporal summary (persistent tracks, action timeline, audio events)
 """
 
@@ -130,6 +133,7 @@ class NarrativeGenerator:
             metadata={
                 "max_tokens": self.max_tokens,
                 "num_scenes": len(assembly.scenes),
+                "num_segment_captions": sum(1 for s in assembly.scenes if s.caption),
                 "num_tracks": len(assembly.object_tracks),
             },
         )
@@ -156,11 +160,24 @@ class NarrativeGenerator:
             "",
         ]
 
+        # ── Segment captions ──────────────────────────────────────────
+        captioned = [s for s in assembly.scenes if s.caption]
+        if captioned:
+            lines.append("SCENE SEGMENTS (multi-frame VLM captions)")
+            for s in captioned:
+                lines += [
+                    f"\n[{s.start_ts:.1f}s–{s.end_ts:.1f}s — {s.scene_type}, "
+                    f"{len(s.frame_ids)} frames]",
+                    f"  VLM Caption : {s.caption}",
+                ]
+            lines.append("")
+
         # ── Per-frame analysis ────────────────────────────────────────
         lines.append("FRAME-BY-FRAME ANALYSIS")
         for r in results:
             usr = r.usr
-            caption = r.caption.caption
+            # Frames captioned only through their segment add no caption line
+            caption = None if r.caption.metadata.get("source") == "segment" else r.caption.caption
 
             # Objects (track_id + label)
             objs = usr.objects
@@ -197,9 +214,10 @@ class NarrativeGenerator:
             )
             audio_str = " | ".join(filter(None, [speech, ev_str])) or "none"
 
+            lines.append(f"\n[{r.timestamp:.1f}s — Frame {r.frame_id}]")
+            if caption is not None:
+                lines.append(f"  VLM Caption : {caption}")
             lines += [
-                f"\n[{r.timestamp:.1f}s — Frame {r.frame_id}]",
-                f"  VLM Caption : {caption}",
                 f"  Objects     : {obj_str}",
                 f"  Environment : {env_str}",
                 f"  Actions     : {act_str}",
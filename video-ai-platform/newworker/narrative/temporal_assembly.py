@@ -29,6 +29,7 @@ class SceneSegment:
     dominant_stuff: List[str]          # top-3 environment labels
     dominant_action: Optional[str]
     frame_ids: List[int]
+    caption: Optional[str] = None      # multi-frame VLM caption (caption_mode="segment")
 
 
 @dataclass
@@ -1,7 +1,8 @@
 """
-Optimization utilities — profiling, VRAM management, quantization helpers.
+Optimization utilities — profiling, span tracing, VRAM management, quantization helpers.
 """
 
 from .profiler import TimingProfiler
+from .tracing import SpanTracer, chrome_trace, format_summary, summarize, tracer
 
-__all__ = ["TimingProfiler"]
+__all__ = ["TimingProfiler", "SpanTracer", "tracer", "chrome_trace", "summarize", "format_summary"]
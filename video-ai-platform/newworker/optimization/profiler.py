@@ -12,6 +12,9 @@ Usage:
 
     print(profiler.summary(frame_id=0, target_s=5.0))
     assert profiler.passes_target(5.0)
+
+Each step is also a span on the process tracer (optimization.tracing),
+recorded only while tracing is enabled.
 """
 
 from __future__ import annotations
@@ -20,11 +23,14 @@ import time
 from contextlib import contextmanager
 from typing import Dict, List, Optional
 
+from .tracing import SpanTracer, tracer as _default_tracer
+
 
 class TimingProfiler:
     """Records wall-clock time for each named step in a pipeline pass."""
 
-    def __init__(self):
+    def __init__(self, tracer: Optional[SpanTracer] = None):
+        self._tracer = tracer or _default_tracer
         self._steps: Dict[str, float] = {}   # name → elapsed seconds
         self._order: List[str] = []           # insertion order
 
@@ -39,7 +45,8 @@ class TimingProfiler:
         """
         t0 = time.perf_counter()
         try:
-            yield
+            with self._tracer.span(name, cat="step"):
+                yield
         finally:
             elapsed = time.perf_counter() - t0
             self._steps[name] = elapsed
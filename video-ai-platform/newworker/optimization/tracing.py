@@ -0,0 +1,363 @@
+"""
+SpanTracer — nested, per-thread timing spans with Chrome trace export.
+
+TimingProfiler keeps one flat name → seconds dict per frame, so it cannot
+say where a step's time went (model load vs inference), what ran on which
+thread while the staged worker overlapped videos, or how memory moved.
+The tracer records every span as
+
+  name, category     "SigLIPEncoder.inference", "perception"
+  start, duration    perf_counter ns (monotonic), exported in µs
+  thread             id + name (worker-prefetch / MainThread / worker-post)
+  args               the thread's context (video_id, frame_id) + span args
+  memory             host RSS delta (MB); with CUDA initialised, allocated
+                     delta and peak allocated at span end (GB) — the peak is
+                     since the last reset_peak_memory_stats(), which the
+                     perception modules do per call
+
+Spans nest by time on their thread, so a Chrome / Perfetto timeline shows
+frame → siglip → SigLIPEncoder.load / .preprocess / .inference / ... .
+
+Disabled, span() returns a shared no-op context manager.  Enabled, a span
+costs two clock reads, one /proc/self/statm read (memory=True) and an
+append under a lock — measure_overhead() reports the figure on this host.
+
+Usage:
+    from optimization.tracing import tracer
+    tracer.enable()
+    with tracer.context(video_id="abc"):
+        with tracer.span("decode", frames=120):
+            ...
+    spans = tracer.pop(video_id="abc")
+    json.dump(chrome_trace(spans), open("trace.json", "w"))   # chrome://tracing
+    print(format_summary(summarize(spans)))
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional
+
+try:
+    import torch
+except ImportError:     # tracer still works without torch (no GPU memory fields)
+    torch = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class Span(NamedTuple):
+    name: str
+    cat: str
+    start_ns: int
+    dur_ns: int
+    tid: int
+    args: Dict[str, Any]
+    rss_delta_mb: Optional[float]
+    gpu_delta_gb: Optional[float]
+    gpu_peak_gb: Optional[float]
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("_tracer", "_name", "_cat", "_args", "_t0", "_rss0", "_gpu0")
+
+    def __init__(self, tracer: "SpanTracer", name: str, cat: str, args: Dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._cat = cat
+        self._args = args
+
+    def __enter__(self):
+        tracer = self._tracer
+        self._rss0 = tracer._rss() if tracer.memory else None
+        self._gpu0 = tracer._gpu_allocated() if tracer.memory else None
+        self._t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = time.perf_counter_ns()
+        tracer = self._tracer
+        rss_delta = gpu_delta = gpu_peak = None
+        if self._rss0 is not None:
+            rss = tracer._rss()
+            if rss is not None:
+                rss_delta = round((rss - self._rss0) / 2**20, 2)
+        if self._gpu0 is not None:
+            gpu_delta = round((torch.cuda.memory_allocated() - self._gpu0) / 1e9, 3)
+            gpu_peak = round(torch.cuda.max_memory_allocated() / 1e9, 3)
+        tracer._append(Span(
+            self._name, self._cat, self._t0, t1 - self._t0, threading.get_ident(),
+            self._args, rss_delta, gpu_delta, gpu_peak,
+        ))
+        return False
+
+
+class SpanTracer:
+    """
+    Args:
+        enabled   : Record spans (off: span() is a no-op).
+        memory    : Capture RSS / CUDA memory deltas per span.
+        max_spans : Oldest spans are dropped beyond this many (pop() the
+                    spans of each finished video to keep the buffer small).
+    """
+
+    def __init__(self, enabled: bool = False, memory: bool = True, max_spans: int = 500_000):
+        self.enabled = enabled
+        self.memory = memory
+        self._spans: "deque[Span]" = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._threads: Dict[int, str] = {}
+        self._statm: Optional[int] = None
+        # µs per span at the current settings, once measure_overhead() has run
+        self.overhead_us: Optional[float] = None
+        # perf_counter_ns → epoch µs, for spans added from time.time() stamps
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    def enable(self, memory: bool = True):
+        self.memory = memory
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    # ─────────────────────────────────────────────────────────────────
+    #  Recording
+    # ─────────────────────────────────────────────────────────────────
+
+    def span(self, name: str, cat: str = "pipeline", **args):
+        """Context manager timing the block as one span."""
+        if not self.enabled:
+            return _NULL_SPAN
+        ctx = getattr(self._local, "context", None)
+        return _ActiveSpan(self, name, cat, {**ctx, **args} if ctx else args)
+
+    def context(self, **args):
+        """Context manager adding args (video_id, frame_id, ...) to every span this thread opens inside it."""
+        return _Context(self, args)
+
+    def add(self, name: str, start_s: float, end_s: float, cat: str = "pipeline", **args):
+        """Record a span measured elsewhere from time.time() stamps (e.g. a background download)."""
+        if not self.enabled:
+            return
+        ctx = getattr(self._local, "context", None)
+        start_ns = int(start_s * 1e9) - self._epoch_offset_ns
+        self._append(Span(
+            name, cat, start_ns, max(0, int((end_s - start_s) * 1e9)), threading.get_ident(),
+            {**ctx, **args} if ctx else args, None, None, None,
+        ))
+
+    def _append(self, span: Span):
+        tid = span.tid
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        with self._lock:
+            self._spans.append(span)
+
+    def _rss(self) -> Optional[int]:
+        if self._statm is None:
+            try:
+                self._statm = os.open("/proc/self/statm", os.O_RDONLY)
+            except OSError:
+                self.memory = False
+                return None
+        try:
+            return int(os.pread(self._statm, 64, 0).split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def _gpu_allocated() -> Optional[int]:
+        if torch is None or not torch.cuda.is_initialized():
+            return None
+        return torch.cuda.memory_allocated()
+
+    # ─────────────────────────────────────────────────────────────────
+    #  Access
+    # ─────────────────────────────────────────────────────────────────
+
+    def spans(self, video_id: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            spans = list(self._spans)
+        if video_id is None:
+            return spans
+        return [s for s in spans if s.args.get("video_id") == video_id]
+
+    def pop(self, video_id: str) -> List[Span]:
+        """Remove and return the spans of one video."""
+        with self._lock:
+            mine = [s for s in self._spans if s.args.get("video_id") == video_id]
+            if mine:
+                rest = [s for s in self._spans if s.args.get("video_id") != video_id]
+                self._spans.clear()
+                self._spans.extend(rest)
+        return mine
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def thread_names(self) -> Dict[int, str]:
+        return dict(self._threads)
+
+    def epoch_us(self, start_ns: int) -> float:
+        """Span start as Unix epoch µs."""
+        return (start_ns + self._epoch_offset_ns) / 1000.0
+
+    def measure_overhead(self, n: int = 20000) -> Dict[str, float]:
+        """
+        µs per span, disabled / enabled / enabled with memory capture, from
+        n empty spans on a scratch tracer (no spans land in this one).
+        Sets overhead_us for this tracer's memory setting.
+        """
+        out = {}
+        for label, enabled, memory in (("disabled_us", False, False),
+                                       ("enabled_us", True, False),
+                                       ("memory_us", True, True)):
+            probe = SpanTracer(enabled=enabled, memory=memory, max_spans=n)
+            with probe.context(video_id="overhead"):
+                t0 = time.perf_counter_ns()
+                for _ in range(n):
+                    with probe.span("probe"):
+                        pass
+                out[label] = round((time.perf_counter_ns() - t0) / n / 1000, 3)
+            if probe._statm is not None:
+                os.close(probe._statm)
+        self.overhead_us = out["memory_us" if self.memory else "enabled_us"]
+        return out
+
+
+class _Context:
+    __slots__ = ("_tracer", "_args", "_saved")
+
+    def __init__(self, tracer: SpanTracer, args: Dict[str, Any]):
+        self._tracer = tracer
+        self._args = args
+
+    def __enter__(self):
+        local = self._tracer._local
+        self._saved = getattr(local, "context", None)
+        local.context = {**self._saved, **self._args} if self._saved else dict(self._args)
+        return self
+
+    def __exit__(self, *exc):
+        self._tracer._local.context = self._saved
+        return False
+
+
+# Process-wide tracer — disabled until enable() (worker: TRACE=1)
+tracer = SpanTracer()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Export
+# ─────────────────────────────────────────────────────────────────────────────
+
+def chrome_trace(
+    spans: List[Span],
+    source: Optional[SpanTracer] = None,
+    summary: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Chrome trace_event JSON (object form) — load in chrome://tracing or
+    ui.perfetto.dev.  Complete ("X") events, one track per thread; the
+    summary (if given) goes under otherData.
+    """
+    source = source or tracer
+    pid = os.getpid()
+    names = source.thread_names()
+    events: List[Dict[str, Any]] = [
+        {"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": "newworker"}},
+    ]
+    for tid in sorted({s.tid for s in spans}):
+        events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid,
+                       "args": {"name": names.get(tid, str(tid))}})
+    for s in spans:
+        args = dict(s.args)
+        if s.rss_delta_mb is not None:
+            args["rss_delta_mb"] = s.rss_delta_mb
+        if s.gpu_peak_gb is not None:
+            args["gpu_delta_gb"] = s.gpu_delta_gb
+            args["gpu_peak_gb"] = s.gpu_peak_gb
+        events.append({
+            "ph": "X", "name": s.name, "cat": s.cat, "pid": pid, "tid": s.tid,
+            "ts": round(source.epoch_us(s.start_ns), 3), "dur": round(s.dur_ns / 1000, 3),
+            "args": args,
+        })
+    trace: Dict[str, Any] = {"traceEvents": events, "displayTimeUnit": "ms"}
+    if summary is not None:
+        trace["otherData"] = summary
+    return trace
+
+
+def summarize(spans: List[Span], overhead_us: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Per span name: count, total / mean / p95 / max ms, largest RSS delta
+    and GPU peak; plus the wall time the spans cover and (given the
+    per-span cost) the tracer's own estimated share of it.
+    """
+    by_name: Dict[str, List[Span]] = {}
+    for s in spans:
+        by_name.setdefault(s.name, []).append(s)
+    steps = {}
+    for name, group in by_name.items():
+        durs = sorted(s.dur_ns / 1e6 for s in group)
+        rss = [s.rss_delta_mb for s in group if s.rss_delta_mb is not None]
+        gpu = [s.gpu_peak_gb for s in group if s.gpu_peak_gb is not None]
+        steps[name] = {
+            "cat": group[0].cat,
+            "count": len(durs),
+            "total_ms": round(sum(durs), 3),
+            "mean_ms": round(sum(durs) / len(durs), 3),
+            "p95_ms": round(durs[min(len(durs) - 1, int(0.95 * len(durs)))], 3),
+            "max_ms": round(durs[-1], 3),
+            "max_rss_delta_mb": max(rss) if rss else None,
+            "gpu_peak_gb": max(gpu) if gpu else None,
+        }
+    wall_ms = 0.0
+    if spans:
+        wall_ms = (max(s.start_ns + s.dur_ns for s in spans) - min(s.start_ns for s in spans)) / 1e6
+    summary: Dict[str, Any] = {
+        "spans": len(spans),
+        "wall_ms": round(wall_ms, 3),
+        "steps": dict(sorted(steps.items(), key=lambda kv: -kv[1]["total_ms"])),
+    }
+    if overhead_us is not None:
+        summary["tracer_overhead_ms"] = round(len(spans) * overhead_us / 1000, 3)
+        summary["tracer_overhead_pct"] = round(100 * summary["tracer_overhead_ms"] / wall_ms, 4) if wall_ms else 0.0
+    return summary
+
+
+def format_summary(summary: Dict[str, Any], top: int = 20) -> str:
+    """Print-friendly table of the slowest span names by total time."""
+    steps = list(summary["steps"].items())[:top]
+    col_w = max([len(n) for n, _ in steps] + [14]) + 2
+    lines = [
+        f"  {'Span':<{col_w}}  {'count':>6}  {'total s':>8}  {'mean ms':>8}  {'p95 ms':>8}  {'GPU GB':>6}",
+        f"  {'─' * col_w}  {'─' * 6}  {'─' * 8}  {'─' * 8}  {'─' * 8}  {'─' * 6}",
+    ]
+    for name, st in steps:
+        gpu = f"{st['gpu_peak_gb']:.2f}" if st["gpu_peak_gb"] is not None else "—"
+        lines.append(f"  {name:<{col_w}}  {st['count']:>6}  {st['total_ms'] / 1000:>8.2f}  "
+                     f"{st['mean_ms']:>8.1f}  {st['p95_ms']:>8.1f}  {gpu:>6}")
+    footer = f"  {summary['spans']} spans over {summary['wall_ms'] / 1000:.2f}s"
+    if "tracer_overhead_ms" in summary:
+        footer += (f" — tracer overhead ≈ {summary['tracer_overhead_ms']:.1f} ms "
+                   f"({summary['tracer_overhead_pct']:.3f}%)")
+    return "\n".join(lines + [footer])
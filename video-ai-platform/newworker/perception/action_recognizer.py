@@ -8,6 +8,7 @@ fast: high frame rate, low spatial res).
 Model: facebookresearch/pytorchvideo — slowfast_r50 (Kinetics-400 pretrained)
 Input: clip of 32 frames (or single frame tiled for testing)
 Output: top-5 actions with confidence scores
+Batched: classify_clips() scores several clips in one forward pass
 VRAM: ~3.5GB (FP32, can run FP16 manually)
 Time: ~0.2s per clip on A10
 """
@@ -15,11 +16,14 @@ Time: ~0.2s per clip on A10
 import time
 from typing import Any, Dict, List, Optional
 
+import cv2
 import numpy as np
 import torch
-import torch.nn.functional as F
+
+from optimization.tracing import tracer
 
 from .base import BasePerceptionModule, PerceptionOutput
+from .utils.frame_context import FrameContext
 
 # Kinetics-400 label list (full 400 classes)
 _K400_LABELS = [
@@ -137,11 +141,16 @@ class ActionRecognizer(BasePerceptionModule):
         output = rec(frame, frame_id=5, timestamp=2.0, clip=frames_buffer)
         top = output.data["top_action"]   # {"action": "jogging", "confidence": 0.87}
         rec.unload()
+
+    Batched (see pipeline.action_scheduler):
+        results = rec.classify_clips([clip_a, clip_b, ...])   # one forward pass
     """
 
     NUM_FRAMES = 32    # fast-pathway frame count
     ALPHA = 4          # slow/fast ratio  → slow gets NUM_FRAMES // ALPHA frames
     CROP_SIZE = 224
+    MEAN = (0.45, 0.45, 0.45)
+    STD = (0.225, 0.225, 0.225)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -174,9 +183,12 @@ class ActionRecognizer(BasePerceptionModule):
         if self.device == "cuda":
             torch.cuda.reset_peak_memory_stats()
 
-        preprocessed = self.preprocess(frame, clip=clip)
-        raw = self.inference(preprocessed)
-        data = self.postprocess(raw)
+        with tracer.span(f"{self.name}.preprocess", cat="perception"):
+            preprocessed = self.preprocess(frame, clip=clip)
+        with tracer.span(f"{self.name}.inference", cat="perception"):
+            raw = self.inference(preprocessed)
+        with tracer.span(f"{self.name}.postprocess", cat="perception"):
+            data = self.postprocess(raw)
 
         gpu_mem = None
         if self.device == "cuda":
@@ -201,71 +213,98 @@ class ActionRecognizer(BasePerceptionModule):
     # ------------------------------------------------------------------ #
 
     def preprocess(self, frame: Any, clip: Optional[Any] = None) -> List[torch.Tensor]:
-        """Build [slow_pathway, fast_pathway] from clip or single frame."""
-        # --- assemble raw frames array (T, H, W, 3) uint8 ---------------
-        if clip is None:
-            frames_np = np.stack(
-                [frame.cpu().numpy() if isinstance(frame, torch.Tensor) else frame]
-                * self.NUM_FRAMES
-            )
-        elif isinstance(clip, list):
-            frames_np = np.stack(
-                [f.cpu().numpy() if isinstance(f, torch.Tensor) else f for f in clip]
-            )
-        else:
-            frames_np = clip.cpu().numpy() if isinstance(clip, torch.Tensor) else clip
+        """
+        Build [slow_pathway, fast_pathway] from clip or single frame.
 
+        Frames are picked and resized to CROP_SIZE while still uint8, so
+        only the (NUM_FRAMES, CROP_SIZE, CROP_SIZE, 3) clip is ever
+        converted to float — a 32-frame 1080p clip no longer materialises
+        ~800 MB of float32 before the resize.
+        """
         # --- temporal resampling to exactly NUM_FRAMES -------------------
-        T = frames_np.shape[0]
-        if T != self.NUM_FRAMES:
-            idx = np.linspace(0, T - 1, self.NUM_FRAMES, dtype=int)
-            frames_np = frames_np[idx]
-
-        # --- normalise & convert to (1, 3, T, H, W) float tensor --------
-        frames_f = frames_np.astype(np.float32) / 255.0
-        mean = np.array([0.45, 0.45, 0.45], dtype=np.float32)
-        std  = np.array([0.225, 0.225, 0.225], dtype=np.float32)
-        frames_f = (frames_f - mean) / std
-
-        # (T, H, W, 3) → (3, T, H, W) → (1, 3, T, H, W)
-        t = torch.from_numpy(frames_f).permute(3, 0, 1, 2).unsqueeze(0)  # (1,3,T,H,W)
-
-        # --- spatial resize to CROP_SIZE × CROP_SIZE --------------------
-        b, c, tf, h, w = t.shape
-        flat = t.reshape(b * tf, c, h, w)
-        flat = F.interpolate(flat, size=(self.CROP_SIZE, self.CROP_SIZE),
-                             mode="bilinear", align_corners=False)
-        t = flat.reshape(b, c, tf, self.CROP_SIZE, self.CROP_SIZE)
+        if clip is None:
+            clip = [frame]
+        T = len(clip)
+        idx = np.linspace(0, T - 1, self.NUM_FRAMES, dtype=int)
+
+        # --- spatial resize to CROP_SIZE × CROP_SIZE (uint8, once per source frame)
+        small = {i: self._to_crop(clip[i]) for i in np.unique(idx).tolist()}
+        frames_np = np.stack([small[i] for i in idx.tolist()])   # (T, S, S, 3) uint8
+
+        # --- normalise the small clip on device → (1, 3, T, S, S) --------
+        t = torch.from_numpy(frames_np).to(self.device)
+        t = t.permute(3, 0, 1, 2).unsqueeze(0).float()
+        mean = torch.tensor(self.MEAN, device=t.device).view(1, 3, 1, 1, 1)
+        std = torch.tensor(self.STD, device=t.device).view(1, 3, 1, 1, 1)
+        fast = (t / 255.0 - mean) / std
 
         # --- build slow / fast pathways ----------------------------------
-        fast = t.to(self.device)
-        slow_idx = torch.linspace(0, tf - 1, tf // self.ALPHA).long()
-        slow = t[:, :, slow_idx, :, :].to(self.device)
+        tf = fast.shape[2]
+        slow_idx = torch.linspace(0, tf - 1, tf // self.ALPHA).long().to(fast.device)
+        slow = fast[:, :, slow_idx, :, :]
 
         return [slow, fast]
 
+    def _to_crop(self, frame: Any) -> np.ndarray:
+        """(H, W, 3) uint8 frame → (CROP_SIZE, CROP_SIZE, 3) uint8."""
+        if isinstance(frame, FrameContext):
+            frame = frame.numpy()
+        elif isinstance(frame, torch.Tensor):
+            frame = frame.cpu().numpy()
+        size = self.CROP_SIZE
+        if frame.shape[:2] == (size, size):
+            return frame
+        interp = cv2.INTER_AREA if max(frame.shape[:2]) > size else cv2.INTER_LINEAR
+        return cv2.resize(frame, (size, size), interpolation=interp)
+
+    def classify_clips(self, clips: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Score several clips in a single forward pass.
+
+        Each clip is preprocessed exactly as in __call__, then the slow and
+        fast pathways are concatenated along the batch dimension.
+
+        Returns:
+            One postprocess()-style dict per clip, in input order.
+        """
+        if not clips:
+            return []
+        pathways = [self.preprocess(None, clip=c) for c in clips]
+        slow = torch.cat([p[0] for p in pathways])
+        fast = torch.cat([p[1] for p in pathways])
+        raw = self.inference([slow, fast])
+        return self._decode_logits(raw["logits"])
+
     def inference(self, preprocessed: List[torch.Tensor]) -> Dict[str, Any]:
         with torch.no_grad():
             logits = self.model(preprocessed)
         return {"logits": logits}
 
     def postprocess(self, raw_output: Dict[str, Any]) -> Dict[str, Any]:
-        logits = raw_output["logits"]
-        probs = torch.softmax(logits, dim=-1)[0]
-        top5_probs, top5_idx = torch.topk(probs, min(5, probs.shape[-1]))
-
-        actions = []
-        for prob, idx in zip(top5_probs.cpu().numpy(), top5_idx.cpu().numpy()):
-            label = (
-                _K400_LABELS[idx]
-                if idx < len(_K400_LABELS)
-                else f"action_{idx}"
-            )
-            actions.append(
-                {"action": label, "confidence": round(float(prob), 4), "class_id": int(idx)}
-            )
-
-        return {
-            "actions": actions,
-            "top_action": actions[0] if actions else None,
-        }
+        return self._decode_logits(raw_output["logits"])[0]
+
+    @staticmethod
+    def _decode_logits(logits: torch.Tensor) -> List[Dict[str, Any]]:
+        """(B, C) logits → per-row {"actions": top-5, "top_action"}."""
+        probs = torch.softmax(logits.float(), dim=-1)
+        top5_probs, top5_idx = torch.topk(probs, min(5, probs.shape[-1]), dim=-1)
+        top5_probs = top5_probs.cpu().numpy()
+        top5_idx = top5_idx.cpu().numpy()
+
+        results = []
+        for row_probs, row_idx in zip(top5_probs, top5_idx):
+            actions = []
+            for prob, idx in zip(row_probs, row_idx):
+                label = (
+                    _K400_LABELS[idx]
+                    if idx < len(_K400_LABELS)
+                    else f"action_{idx}"
+                )
+                actions.append(
+                    {"action": label, "confidence": round(float(prob), 4), "class_id": int(idx)}
+                )
+            results.append({
+                "actions": actions,
+                "top_action": actions[0] if actions else None,
+            })
+        return results
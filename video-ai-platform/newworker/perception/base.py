@@ -11,10 +11,15 @@ All perception models inherit from BasePerceptionModule to ensure:
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 import torch
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field, replace
 import time
 import json
 
+from optimization.tracing import tracer
+
+# postprocess() key whose value becomes PerceptionOutput.artifacts
+ARTIFACTS_KEY = "_artifacts"
+
 
 @dataclass
 class PerceptionOutput:
@@ -29,6 +34,8 @@ class PerceptionOutput:
         metadata: Additional module-specific metadata
         processing_time: Time taken for inference (seconds)
         gpu_memory_used: Peak GPU memory during inference (GB), None if CPU
+        artifacts: Binary side outputs (masks, maps, arrays) handed to later
+                   stages by reference; never included in to_dict()/to_json()
     """
     module_name: str
     timestamp: float
@@ -37,10 +44,13 @@ class PerceptionOutput:
     metadata: Dict[str, Any]
     processing_time: float
     gpu_memory_used: Optional[float] = None
+    artifacts: Dict[str, Any] = field(default_factory=dict, repr=False)
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary"""
-        return asdict(self)
+        """Convert to dictionary (artifacts excluded)"""
+        d = asdict(replace(self, artifacts={}))
+        d.pop("artifacts")
+        return d
     
     def to_json(self) -> str:
         """Serialize to JSON string"""
@@ -138,7 +148,10 @@ class BasePerceptionModule(ABC):
             raw_output: Output from inference()
         
         Returns:
-            Structured, JSON-serializable dictionary with perception results
+            Structured, JSON-serializable dictionary with perception results.
+            Non-serialisable side outputs may be returned under the
+            ARTIFACTS_KEY entry; __call__ moves them to
+            PerceptionOutput.artifacts.
         """
         pass
     
@@ -148,7 +161,7 @@ class BasePerceptionModule(ABC):
         Run full perception pipeline
         
         Args:
-            frame: (H, W, 3) RGB tensor, uint8
+            frame: (H, W, 3) RGB tensor, uint8, or a FrameContext wrapping it
             frame_id: Frame identifier
             timestamp: Frame timestamp (seconds)
             **kwargs: Additional module-specific arguments
@@ -163,9 +176,13 @@ class BasePerceptionModule(ABC):
             torch.cuda.reset_peak_memory_stats()
         
         # Run pipeline
-        preprocessed = self.preprocess(frame)
-        raw_output = self.inference(preprocessed)
-        structured_data = self.postprocess(raw_output)
+        with tracer.span(f"{self.name}.preprocess", cat="perception"):
+            preprocessed = self.preprocess(frame)
+        with tracer.span(f"{self.name}.inference", cat="perception"):
+            raw_output = self.inference(preprocessed)
+        with tracer.span(f"{self.name}.postprocess", cat="perception"):
+            structured_data = self.postprocess(raw_output)
+        artifacts = structured_data.pop(ARTIFACTS_KEY, None) or {}
         
         # Track GPU memory after
         gpu_mem = None
@@ -185,7 +202,8 @@ class BasePerceptionModule(ABC):
                 **kwargs  # Include any additional args
             },
             processing_time=processing_time,
-            gpu_memory_used=gpu_mem
+            gpu_memory_used=gpu_mem,
+            artifacts=artifacts,
         )
     
     def unload(self):
@@ -11,6 +11,8 @@ Relationships detected:
   - Proximity  : near  (IoU > threshold)
   - Size       : larger_than, smaller_than  (area ratio > 2×)
   - Containment: contains, inside
+  - Support    : on  (object's bottom edge rests on a thing or surface
+                 "stuff" region — from RLE mask contact, when masks given)
 
 Output: nodes[] + edges[]
 VRAM: 0 MB
@@ -20,9 +22,11 @@ Time: ~0.01s per frame
 import time
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 import torch
 
 from .base import BasePerceptionModule, PerceptionOutput
+from .utils.mask_ops import RLEMask, rle_intersection_area, rle_shift
 
 
 class SceneGraphGenerator(BasePerceptionModule):
@@ -30,6 +34,9 @@ class SceneGraphGenerator(BasePerceptionModule):
     CPU heuristic scene graph builder.
 
     Accepts panoptic things[] via the `panoptic_things` kwarg in __call__.
+    When `panoptic_masks` ({segment_id: RLEMask}) is also given, support
+    relations are derived from true mask contact against things and
+    `panoptic_stuff` surfaces, without decoding masks.
     The frame tensor is accepted but not used — it exists to satisfy the
     BasePerceptionModule interface.
 
@@ -46,10 +53,28 @@ class SceneGraphGenerator(BasePerceptionModule):
     # Avoids labelling nearly-overlapping objects as "above/below".
     _MIN_DIRECTIONAL_PX = 20
 
-    def __init__(self, proximity_iou_threshold: float = 0.15, **kwargs):
+    # Stuff labels that can support an object ("person on grass")
+    _SUPPORT_KEYWORDS = (
+        "floor", "ground", "grass", "road", "pavement", "sand", "snow",
+        "dirt", "gravel", "playingfield", "platform", "rug", "carpet",
+        "table", "shelf", "counter", "bed", "water", "river", "sea",
+    )
+
+    # Contact probe depth as a fraction of mask height (min 1 px)
+    _CONTACT_DEPTH_FRAC = 0.01
+
+    def __init__(
+        self,
+        proximity_iou_threshold: float = 0.15,
+        support_contact_threshold: float = 0.4,
+        **kwargs,
+    ):
         kwargs["device"] = "cpu"   # Always CPU
         super().__init__(**kwargs)
         self.proximity_iou_threshold = proximity_iou_threshold
+        # Fraction of an object's bottom-edge columns that must touch a
+        # region for an "on" relation
+        self.support_contact_threshold = support_contact_threshold
 
     # ------------------------------------------------------------------ #
     #  BasePerceptionModule abstract methods (not used directly)           #
@@ -78,6 +103,8 @@ class SceneGraphGenerator(BasePerceptionModule):
         frame_id: int,
         timestamp: float,
         panoptic_things: Optional[List[Dict[str, Any]]] = None,
+        panoptic_stuff: Optional[List[Dict[str, Any]]] = None,
+        panoptic_masks: Optional[Dict[int, RLEMask]] = None,
         **kwargs,
     ) -> PerceptionOutput:
         start_time = time.time()
@@ -85,6 +112,8 @@ class SceneGraphGenerator(BasePerceptionModule):
         things = panoptic_things or []
         nodes = self._build_nodes(things)
         edges = self._build_edges(things)
+        if panoptic_masks:
+            edges += self._build_support_edges(things, panoptic_stuff or [], panoptic_masks)
 
         return PerceptionOutput(
             module_name=self.name,
@@ -145,6 +174,49 @@ class SceneGraphGenerator(BasePerceptionModule):
                     )
         return edges
 
+    def _build_support_edges(
+        self,
+        things: List[Dict],
+        stuff: List[Dict],
+        masks: Dict[int, RLEMask],
+    ) -> List[Dict]:
+        """
+        "on" edges from mask contact: shift each thing's mask down by a few
+        pixels and measure how much of its bottom edge lands on another
+        segment.  Panoptic masks never overlap, so any intersection after
+        the shift is pixels directly beneath the object.
+        """
+        supports = [t for t in things if t.get("id") in masks] + [
+            s for s in stuff
+            if s.get("id") in masks
+            and any(kw in s["label"].lower() for kw in self._SUPPORT_KEYWORDS)
+        ]
+        edges = []
+        for a in things:
+            mask_a = masks.get(a.get("id"))
+            if mask_a is None or mask_a.area() == 0:
+                continue
+            h = mask_a.size[0]
+            depth = max(1, int(round(h * self._CONTACT_DEPTH_FRAC)))
+            probe = rle_shift(mask_a, dy=depth)
+            bottom_cols = len(np.unique(mask_a.starts // h))
+            capacity = bottom_cols * depth
+            for b in supports:
+                if b["id"] == a["id"]:
+                    continue
+                contact = rle_intersection_area(probe, masks[b["id"]]) / capacity
+                if contact >= self.support_contact_threshold:
+                    edges.append(
+                        {
+                            "subject_id": a["id"],
+                            "subject_label": a["label"],
+                            "predicate": "on",
+                            "object_id": b["id"],
+                            "object_label": b["label"],
+                        }
+                    )
+        return edges
+
     def _get_relations(self, a: Dict, b: Dict) -> List[str]:
         relations: List[str] = []
         ba = a.get("bbox", [0, 0, 0, 0])
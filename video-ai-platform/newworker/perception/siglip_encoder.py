@@ -6,16 +6,19 @@ SigLIP is similar to CLIP but uses a sigmoid loss instead of softmax,
 making it better for dense retrieval tasks.
 
 Model: google/siglip-base-patch16-224
-Output: 768-dimensional embedding per image
+Output: 768-dimensional float16 embedding per image, returned as
+        output.artifacts["vision_embedding"] (kept out of JSON — persisted
+        per video in the embeddings sidecar)
 VRAM: ~2GB (FP16)
 Time: ~0.1s per frame on A10
 """
 
 from transformers import AutoProcessor, AutoModel
 import torch
-from PIL import Image
 import numpy as np
-from .base import BasePerceptionModule
+from .base import ARTIFACTS_KEY, BasePerceptionModule
+from .utils.device_preprocess import ImageSpec, device_preprocess
+from .utils.frame_context import FrameContext, resizes_with_pil
 from typing import Dict, Any
 
 
@@ -34,7 +37,7 @@ class SigLIPEncoder(BasePerceptionModule):
         encoder.load_model()
         
         output = encoder(frame, frame_id=0, timestamp=0.0)
-        embedding = output.data["vision_embedding"]  # (768,)
+        embedding = output.artifacts["vision_embedding"]  # (768,) float16
         
         encoder.unload()
     """
@@ -42,6 +45,7 @@ class SigLIPEncoder(BasePerceptionModule):
     def __init__(
         self, 
         model_name: str = "google/siglip-base-patch16-224",
+        preprocess_on_device: bool = True,
         **kwargs
     ):
         """
@@ -49,11 +53,16 @@ class SigLIPEncoder(BasePerceptionModule):
         
         Args:
             model_name: HuggingFace model name
+            preprocess_on_device: Resize/normalise with torch on the module's
+                                  device (utils/device_preprocess.py) instead
+                                  of the HF processor on the CPU
             **kwargs: Passed to BasePerceptionModule (device, quantize)
         """
         super().__init__(**kwargs)
         self.model_name = model_name
+        self.preprocess_on_device = preprocess_on_device
         self.processor = None
+        self._image_spec = None
         
     def load_model(self):
         """Load SigLIP model and processor"""
@@ -61,6 +70,7 @@ class SigLIPEncoder(BasePerceptionModule):
         
         # Load processor
         self.processor = AutoProcessor.from_pretrained(self.model_name)
+        self._image_spec = ImageSpec.from_processor(self.processor) if self.preprocess_on_device else None
         
         # Load model
         self.model = AutoModel.from_pretrained(
@@ -78,14 +88,24 @@ class SigLIPEncoder(BasePerceptionModule):
         Preprocess frame for SigLIP
         
         Args:
-            frame: (H, W, 3) RGB tensor, uint8, values [0, 255]
+            frame: (H, W, 3) RGB tensor, uint8, values [0, 255], or FrameContext
         
         Returns:
             Dict with preprocessed pixel_values
         """
-        # Convert to PIL Image
-        frame_np = frame.cpu().numpy()
-        pil_image = Image.fromarray(frame_np)
+        ctx = FrameContext.of(frame)
+        if self._image_spec is not None:
+            return {"pixel_values": device_preprocess([ctx], self._image_spec, self.device)}
+
+        # CPU fallback — pre-resize to the processor's fixed input size with
+        # its own filter: the processor's resize then becomes a no-op, pixels
+        # are identical, and it never converts the full-resolution frame
+        image_processor = getattr(self.processor, "image_processor", None)
+        size = getattr(image_processor, "size", None) or {}
+        if "height" in size and "width" in size and resizes_with_pil(image_processor):
+            pil_image = ctx.resized((size["width"], size["height"]), resample=image_processor.resample)
+        else:
+            pil_image = ctx.pil()
         
         # Process with SigLIP processor
         inputs = self.processor(images=pil_image, return_tensors="pt")
@@ -123,20 +143,20 @@ class SigLIPEncoder(BasePerceptionModule):
             raw_output: Output from inference() containing embeddings tensor
         
         Returns:
-            Structured dict with vision embedding as list
+            Structured dict; the embedding itself is a float16 artifact
         """
         # Extract embeddings tensor
         embeddings = raw_output["embeddings"]
         
-        # Convert to CPU numpy for JSON serialization
+        # One float16 host copy — no Python float list
         # embeddings shape: (batch_size, embedding_dim) = (1, 768)
-        embeddings_np = embeddings.cpu().numpy()
+        embedding = embeddings[0].to(torch.float16).cpu().numpy()
         
         return {
-            "vision_embedding": embeddings_np[0].tolist(),  # (768,) -> list
-            "embedding_dim": embeddings_np.shape[-1],
+            "embedding_dim": int(embedding.shape[-1]),
             "model": self.model_name,
-            "norm": float(np.linalg.norm(embeddings_np[0]))  # L2 norm for debugging
+            "norm": float(embeddings[0].float().norm()),  # L2 norm for debugging
+            ARTIFACTS_KEY: {"vision_embedding": embedding},
         }
     
     def unload(self):
@@ -161,7 +181,7 @@ def extract_embedding(
         device: "cuda" or "cpu"
     
     Returns:
-        (768,) numpy array
+        (768,) float16 numpy array
     
     Example:
         embedding = extract_embedding(frame)
@@ -171,7 +191,7 @@ def extract_embedding(
     encoder.load_model()
     
     output = encoder(frame, frame_id=0, timestamp=0.0)
-    embedding = np.array(output.data["vision_embedding"])
+    embedding = output.artifacts["vision_embedding"]
     
     encoder.unload()
     
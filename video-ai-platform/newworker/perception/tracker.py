@@ -69,6 +69,18 @@ class _KalmanBox:
         self.P = (np.eye(8) - K @ _KalmanBox._H) @ self.P
         return self._to_xyxy()
 
+    def to_state(self) -> Dict[str, Any]:
+        """Filter state as plain lists (dtypes kept so a resume is bit-exact)."""
+        return {"x": self.x.tolist(), "P": self.P.tolist(),
+                "x_dtype": str(self.x.dtype), "P_dtype": str(self.P.dtype)}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "_KalmanBox":
+        kf = cls([0.0, 0.0, 0.0, 0.0])
+        kf.x = np.array(state["x"], dtype=state["x_dtype"])
+        kf.P = np.array(state["P"], dtype=state["P_dtype"])
+        return kf
+
     def _to_xyxy(self) -> List[float]:
         cx, cy, w, h = self.x[:4]
         return [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]
@@ -92,6 +104,7 @@ class _Track:
         self.label = detection["label"]
         self.bbox  = detection["bbox"]
         self.score = detection.get("coverage", 1.0)
+        self.segment_id = detection.get("id")
         self.kf    = _KalmanBox(self.bbox)
         self.age   = 1
         self.hits  = 1
@@ -102,12 +115,37 @@ class _Track:
         self.age += 1
         self.time_since_update += 1
 
+    def coast(self):
+        """Advance the Kalman state one frame without counting a miss."""
+        self.bbox = self.kf.predict()
+        self.age += 1
+
     def update(self, detection: Dict):
         self.bbox  = self.kf.update(detection["bbox"])
         self.score = detection.get("coverage", self.score)
+        self.segment_id = detection.get("id")
         self.hits += 1
         self.time_since_update = 0
 
+    _STATE_FIELDS = ("track_id", "label", "score", "segment_id", "age", "hits", "time_since_update")
+
+    def to_state(self) -> Dict[str, Any]:
+        """Everything needed to continue the track, as JSON-serialisable data."""
+        state = {name: getattr(self, name) for name in self._STATE_FIELDS}
+        state["score"] = float(self.score)
+        state["bbox"] = [float(v) for v in self.bbox]
+        state["kf"] = self.kf.to_state()
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "_Track":
+        track = cls.__new__(cls)      # no new ID: the counter is restored separately
+        for name in cls._STATE_FIELDS:
+            setattr(track, name, state[name])
+        track.bbox = list(state["bbox"])
+        track.kf = _KalmanBox.from_state(state["kf"])
+        return track
+
     def to_dict(self) -> Dict:
         bbox = [round(float(v), 1) for v in self.bbox]
         return {
@@ -117,6 +155,8 @@ class _Track:
             "score": round(float(self.score), 4),
             "age": self.age,
             "hits": self.hits,
+            # Panoptic segment matched this frame (None while coasting)
+            "segment_id": self.segment_id if self.time_since_update == 0 else None,
         }
 
 
@@ -129,6 +169,8 @@ class ByteTracker(BasePerceptionModule):
     IoU + Kalman multi-object tracker.
 
     Call with `panoptic_things` kwarg (list of thing dicts from Mask2Former).
+    Pass `coast=True` on frames where detection was skipped: tracks advance
+    by Kalman prediction alone and are not aged towards "lost".
     Internally maintains track state across frames — **do not re-instantiate
     between frames**; keep one ByteTracker instance alive for the whole video.
 
@@ -157,6 +199,15 @@ class ByteTracker(BasePerceptionModule):
         self._tracks = []
         _Track._next_id = 1
 
+    def state_dict(self) -> Dict[str, Any]:
+        """Snapshot of the tracks and ID counter (plain JSON-serialisable data)."""
+        return {"tracks": [t.to_state() for t in self._tracks], "next_id": _Track._next_id}
+
+    def load_state_dict(self, state: Dict[str, Any]):
+        """Continue from a state_dict() snapshot, e.g. when resuming a video."""
+        self._tracks = [_Track.from_state(t) for t in state["tracks"]]
+        _Track._next_id = state["next_id"]
+
     def load_model(self):
         self.model = True   # sentinel
         print("✓ ByteTracker initialized (CPU, no model)")
@@ -171,11 +222,18 @@ class ByteTracker(BasePerceptionModule):
         frame_id: int,
         timestamp: float,
         panoptic_things: Optional[List[Dict]] = None,
+        coast: bool = False,
         **kwargs,
     ) -> PerceptionOutput:
         t0 = time.time()
-        detections = panoptic_things or []
-        tracks = self._update(detections)
+        if coast:
+            for t in self._tracks:
+                t.coast()
+            # Only tracks matched at the last detection pass — lost tracks
+            # kept for re-identification are not reported as visible
+            tracks = [t for t in self._tracks if t.time_since_update == 0]
+        else:
+            tracks = self._update(panoptic_things or [])
 
         return PerceptionOutput(
             module_name=self.name,
@@ -185,7 +243,7 @@ class ByteTracker(BasePerceptionModule):
                 "tracks": [t.to_dict() for t in tracks],
                 "num_tracks": len(tracks),
             },
-            metadata={"device": "cpu", "quantized": False},
+            metadata={"device": "cpu", "quantized": False, "coasted": coast},
             processing_time=time.time() - t0,
             gpu_memory_used=None,
         )
@@ -225,7 +283,8 @@ class ByteTracker(BasePerceptionModule):
             [t for t in active if t.time_since_update == 0]          # matched active
             + [remaining_lost[i] for i, _ in matched_l]              # rescued lost
             + new_tracks                                               # newborn
-            + [t for t in still_lost if t.age < self.MAX_AGE]        # still lost (keep)
+            + [remaining_lost[i] for i in still_lost
+               if remaining_lost[i].age < self.MAX_AGE]              # still lost (keep)
         )
 
         return [t for t in self._tracks if t.hits >= 1]
@@ -7,8 +7,20 @@ for the perception layer.
 
 from .gpu_manager import SequentialGPUManager
 from .quantization import load_quantized_model
+from .mask_ops import analysis_size, rescale_bbox, segment_stats
+from .depth_ops import DepthMap, integral_image
+from .frame_context import FrameContext
+from .device_preprocess import ImageSpec, device_preprocess
 
 __all__ = [
     "SequentialGPUManager",
     "load_quantized_model",
+    "segment_stats",
+    "analysis_size",
+    "rescale_bbox",
+    "DepthMap",
+    "integral_image",
+    "FrameContext",
+    "ImageSpec",
+    "device_preprocess",
 ]
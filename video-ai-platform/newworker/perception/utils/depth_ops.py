@@ -0,0 +1,143 @@
+"""
+Depth Map Operations
+
+A small downsampled depth map plus its summed-area table (integral image)
+lets the fusion layer read the mean depth inside any box with four
+lookups, so per-object depth costs O(1) per object regardless of box size.
+
+histogram_depth_stats() summarises a depth map from one fixed-bin
+histogram built on the model's device.  Against the exact numpy
+statistics on the same map, with B bins:
+  near_pct / mid_pct / far_pct : exact (0.33 / 0.66 are bin edges when B
+                                 is a multiple of 100) — only pixels
+                                 within float rounding of an edge can move
+  near_p10 / far_p90           : within 1 / B
+  mean                         : within 1 / (2B)
+  std                          : within 1 / B
+With the default B = 1000 every field matches to the 4-decimal rounding
+of the output up to ±0.001.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import torch
+
+# Default histogram resolution (multiple of 100 keeps zone edges exact)
+DEPTH_HIST_BINS = 1000
+
+
+def integral_image(values: np.ndarray) -> np.ndarray:
+    """
+    Summed-area table with a zero top row / left column.
+
+    table[y, x] = values[:y, :x].sum(), shape (H+1, W+1), float64 so sums
+    over large maps stay exact to well below the 4-decimal output rounding.
+    """
+    h, w = values.shape
+    table = np.zeros((h + 1, w + 1), dtype=np.float64)
+    np.cumsum(values, axis=0, dtype=np.float64, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table
+
+
+@dataclass
+class DepthMap:
+    """
+    Downsampled normalised depth map (0 = closest, 1 = farthest) with its
+    integral image, addressed in source-frame pixel coordinates.
+
+    Attributes:
+        depth:       (h, w) float32 normalised depth
+        integral:    (h+1, w+1) float64 summed-area table of depth
+        source_size: (H, W) of the frame that boxes are expressed in
+    """
+    depth: np.ndarray
+    integral: np.ndarray
+    source_size: Tuple[int, int]
+
+    @classmethod
+    def from_array(cls, depth: np.ndarray, source_size: Tuple[int, int]) -> "DepthMap":
+        return cls(depth, integral_image(depth), (int(source_size[0]), int(source_size[1])))
+
+    def box_means(self, bboxes: Sequence[Sequence[float]]) -> np.ndarray:
+        """
+        Mean depth inside each [x1, y1, x2, y2] source-pixel box.
+
+        Boxes are clipped to the frame and mapped outward to whole map
+        cells; every box covers at least one cell.  Vectorised over boxes.
+        """
+        boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        if len(boxes) == 0:
+            return np.zeros(0, dtype=np.float64)
+        h, w = self.depth.shape
+        sh, sw = self.source_size
+        sx, sy = w / sw, h / sh
+
+        x0 = np.clip(np.floor(boxes[:, 0] * sx), 0, w - 1).astype(np.intp)
+        y0 = np.clip(np.floor(boxes[:, 1] * sy), 0, h - 1).astype(np.intp)
+        x1 = np.clip(np.ceil(boxes[:, 2] * sx), x0 + 1, w).astype(np.intp)
+        y1 = np.clip(np.ceil(boxes[:, 3] * sy), y0 + 1, h).astype(np.intp)
+
+        t = self.integral
+        sums = t[y1, x1] - t[y0, x1] - t[y1, x0] + t[y0, x0]
+        return sums / ((y1 - y0) * (x1 - x0))
+
+
+def histogram_depth_stats(depth: torch.Tensor, bins: int = DEPTH_HIST_BINS) -> Dict[str, float]:
+    """
+    Normalised-depth statistics from a single histogram pass.
+
+    Args:
+        depth: (H, W) model output — inverse depth, larger = closer.
+               Stays on its device; only the final scalars are copied back.
+        bins:  Histogram resolution over the normalised [0, 1] range.
+
+    Returns:
+        {mean, std, min, max, near_p10, far_p90, near_pct, mid_pct, far_pct}
+        on the normalised scale (0 = closest, 1 = farthest).
+    """
+    flat = depth.reshape(-1).float()
+    d_min, d_max = torch.aminmax(flat)
+
+    # Bin index of the normalised value (d_max - d) / range, without ever
+    # materialising the normalised map
+    scale = bins / (d_max - d_min + 1e-8)
+    idx = ((d_max - flat) * scale).long().clamp_(0, bins - 1)
+    counts = torch.bincount(idx, minlength=bins).double()
+    n = counts.sum()
+
+    width = 1.0 / bins
+    centers = (torch.arange(bins, device=counts.device, dtype=torch.float64) + 0.5) * width
+    mean = (counts * centers).sum() / n
+    var = (counts * centers * centers).sum() / n - mean * mean
+
+    cdf = counts.cumsum(0) / n
+    prev = torch.cat([cdf.new_zeros(1), cdf[:-1]])
+
+    def quantile(q: float) -> torch.Tensor:
+        k = torch.searchsorted(cdf, cdf.new_tensor([q])).clamp_(max=bins - 1)
+        frac = (q - prev[k]) / (cdf[k] - prev[k]).clamp_(min=1e-12)
+        return ((k + frac.clamp(0, 1)) * width)[0]
+
+    # First / last occupied bin (argmax keeps it sync-free, unlike nonzero)
+    occupied = (counts > 0).double()
+    first = occupied.argmax()
+    last = bins - 1 - occupied.flip(0).argmax()
+    near_edge, far_edge = round(0.33 * bins), round(0.66 * bins)
+    out = torch.stack([
+        mean,
+        var.clamp(min=0).sqrt(),
+        first.double() * width,
+        (last.double() + 1) * width,
+        quantile(0.10),
+        quantile(0.90),
+        counts[:near_edge].sum() / n,
+        counts[near_edge:far_edge].sum() / n,
+        counts[far_edge:].sum() / n,
+    ]).cpu().tolist()      # the only device → host copy
+
+    keys = ("mean", "std", "min", "max", "near_p10", "far_p90",
+            "near_pct", "mid_pct", "far_pct")
+    return dict(zip(keys, out))
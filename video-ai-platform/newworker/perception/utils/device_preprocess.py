@@ -0,0 +1,174 @@
+"""
+Device-side image preprocessing for the HF vision models.
+
+The HF image processors resize, rescale and normalise with PIL/numpy on
+the CPU, one image at a time, and only then copy float32 pixels to the
+GPU.  Here the uint8 frame is uploaded once (memoised on the frame's
+FrameContext, so SigLIP, DepthAnything and Mask2Former share it) and every
+model's input is produced with batched torch ops on the module's device:
+
+  uint8 (B, 3, H, W) → float → resize (antialiased, like PIL)
+      → round/clamp to [0, 255] (PIL resizes in uint8)
+      → × rescale_factor → (x − mean) / std
+
+ImageSpec.from_processor() reads the processor's own settings, so the
+output geometry follows the same rules as the processor:
+
+  fixed           size = {height, width}                     (SigLIP)
+  aspect_multiple DPT keep_aspect_ratio + ensure_multiple_of (DepthAnything)
+  shortest_edge   shortest/longest edge + size_divisor       (Mask2Former)
+
+Processors with settings this layer does not reproduce (padding, no
+resize, unknown filters) give None — callers then fall back to the HF
+processor on the CPU.
+
+Parity with the PIL-backed processors (1080p frame): identical output
+sizes; pixels within 1/255 before normalisation (PIL's fixed-point filter
+weights vs float weights), mean error < 0.2/255.  tests/test_postprocess.py
+checks a 2/255 bound.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from .frame_context import FrameContext
+
+# PIL resample code → F.interpolate mode
+_INTERPOLATION = {0: "nearest", 2: "bilinear", 3: "bicubic"}
+
+
+def _size_field(size: Any, key: str) -> Optional[int]:
+    if size is None:
+        return None
+    if isinstance(size, dict):
+        return size.get(key)
+    return getattr(size, key, None)
+
+
+def _constrain_to_multiple_of(val: float, multiple: int) -> int:
+    # DPT rounding rule: nearest multiple (Python round, as in transformers)
+    return int(round(val / multiple) * multiple)
+
+
+@dataclass(frozen=True)
+class ImageSpec:
+    """One model's expected pixel_values: geometry + value transform."""
+
+    mode: str                                  # "fixed" | "aspect_multiple" | "shortest_edge"
+    height: Optional[int] = None
+    width: Optional[int] = None
+    keep_aspect_ratio: bool = False
+    multiple: int = 1
+    shortest_edge: Optional[int] = None
+    longest_edge: Optional[int] = None
+    size_divisor: int = 0
+    interpolation: str = "bilinear"
+    rescale_factor: Optional[float] = 1 / 255
+    mean: Optional[Tuple[float, float, float]] = None
+    std: Optional[Tuple[float, float, float]] = None
+
+    def output_size(self, h: int, w: int) -> Tuple[int, int]:
+        """(height, width) the model input will have for an (h, w) frame."""
+        if self.mode == "fixed":
+            return self.height, self.width
+        if self.mode == "aspect_multiple":
+            scale_h, scale_w = self.height / h, self.width / w
+            if self.keep_aspect_ratio:
+                if abs(1 - scale_w) < abs(1 - scale_h):
+                    scale_h = scale_w
+                else:
+                    scale_w = scale_h
+            return (
+                _constrain_to_multiple_of(scale_h * h, self.multiple),
+                _constrain_to_multiple_of(scale_w * w, self.multiple),
+            )
+        # shortest_edge
+        short, long = min(h, w), max(h, w)
+        new_short, new_long = self.shortest_edge, int(self.shortest_edge * long / short)
+        if self.longest_edge is not None and new_long > self.longest_edge:
+            new_short, new_long = int(self.longest_edge * new_short / new_long), self.longest_edge
+        out_h, out_w = (new_long, new_short) if w <= h else (new_short, new_long)
+        if self.size_divisor:
+            out_h = int(math.ceil(out_h / self.size_divisor) * self.size_divisor)
+            out_w = int(math.ceil(out_w / self.size_divisor) * self.size_divisor)
+        return out_h, out_w
+
+    @classmethod
+    def from_processor(cls, processor: Any) -> Optional["ImageSpec"]:
+        """Spec matching an HF (image) processor, or None if unsupported."""
+        ip = getattr(processor, "image_processor", processor)
+        if ip is None or not getattr(ip, "do_resize", False):
+            return None
+        if getattr(ip, "do_pad", None) and hasattr(ip, "keep_aspect_ratio"):
+            return None     # DPT padding to size_divisor is not reproduced
+        interpolation = _INTERPOLATION.get(int(getattr(ip, "resample", 2)))
+        if interpolation is None:
+            return None
+
+        values = dict(
+            interpolation=interpolation,
+            rescale_factor=ip.rescale_factor if getattr(ip, "do_rescale", False) else None,
+            mean=tuple(ip.image_mean) if getattr(ip, "do_normalize", False) else None,
+            std=tuple(ip.image_std) if getattr(ip, "do_normalize", False) else None,
+        )
+        size = getattr(ip, "size", None)
+        height, width = _size_field(size, "height"), _size_field(size, "width")
+        shortest = _size_field(size, "shortest_edge")
+
+        if hasattr(ip, "keep_aspect_ratio") and height and width:
+            return cls(
+                mode="aspect_multiple", height=height, width=width,
+                keep_aspect_ratio=bool(ip.keep_aspect_ratio),
+                multiple=int(getattr(ip, "ensure_multiple_of", 1) or 1), **values,
+            )
+        if height and width:
+            return cls(mode="fixed", height=height, width=width, **values)
+        if shortest:
+            return cls(
+                mode="shortest_edge", shortest_edge=shortest,
+                longest_edge=_size_field(size, "longest_edge"),
+                size_divisor=int(getattr(ip, "size_divisor", 0) or 0), **values,
+            )
+        return None
+
+
+def device_preprocess(
+    frames: Sequence[Any],
+    spec: ImageSpec,
+    device: str,
+    dtype: torch.dtype = torch.float32,
+) -> torch.Tensor:
+    """
+    Frames (FrameContexts or (H, W, 3) uint8 tensors/arrays of one size)
+    → (B, 3, h, w) pixel_values on device, in one batched pass.
+    """
+    ctxs = [FrameContext.of(f) for f in frames]
+    shapes = {c.shape[:2] for c in ctxs}
+    if len(shapes) != 1:
+        raise ValueError(f"device_preprocess batches need one frame size, got {sorted(shapes)}")
+    (h, w), = shapes
+    out_h, out_w = spec.output_size(h, w)
+
+    x = torch.stack([c.device_tensor(device) for c in ctxs]).float()
+    if (out_h, out_w) != (h, w):
+        if spec.interpolation == "nearest":
+            x = F.interpolate(x, size=(out_h, out_w), mode="nearest")
+        else:
+            x = F.interpolate(
+                x, size=(out_h, out_w), mode=spec.interpolation,
+                align_corners=False, antialias=True,
+            )
+        x = x.round_().clamp_(0, 255)
+    if spec.rescale_factor is not None:
+        x = x * spec.rescale_factor
+    if spec.mean is not None:
+        mean = torch.tensor(spec.mean, device=x.device).view(1, 3, 1, 1)
+        std = torch.tensor(spec.std, device=x.device).view(1, 3, 1, 1)
+        x = (x - mean) / std
+    return x.to(dtype)
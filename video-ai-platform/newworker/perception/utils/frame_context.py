@@ -0,0 +1,151 @@
+"""
+FrameContext — per-frame memo of host-side image representations.
+
+Every vision module used to start from the raw frame tensor: copy it to a
+numpy array, wrap it in a PIL image, then let its HF processor resize it.
+The VLM captioner did the same again.  FramePipeline now wraps each frame
+in one FrameContext and passes it to every module; representations are
+built on first use and shared afterwards:
+
+  numpy()                 (H, W, 3) uint8 view (zero-copy for CPU tensors)
+  pil()                   full-resolution PIL image
+  device_tensor(device)   (3, H, W) uint8 tensor on device — uploaded once
+                          for every module's device-side preprocessing
+  resized((w, h), mode)   PIL image resized with PIL's own resize — the
+                          same call PIL-backed HF image processors make, so
+                          a module that pre-resizes to such a processor's
+                          target size feeds it bit-identical pixels (see
+                          resizes_with_pil)
+
+hits / bytes_saved count the conversions that were served from the memo;
+stats() is recorded per frame in processing_metadata["frame_context"].
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+
+class FrameContext:
+    """
+    Example:
+        ctx = FrameContext(frame_tensor)
+        ctx.pil()                    # built
+        ctx.pil()                    # memo hit
+        ctx.resized((224, 224))      # built from the memoised pil()
+        ctx.stats()                  # {"hits": 1, "builds": 3, "bytes_saved": ...}
+    """
+
+    def __init__(self, frame: Any):
+        if isinstance(frame, FrameContext):
+            raise TypeError("FrameContext already wraps a frame; use FrameContext.of()")
+        self.frame = frame
+        self._memo: Dict[Hashable, Tuple[Any, int]] = {}
+        self.hits = 0
+        self.builds = 0
+        self.bytes_built = 0
+        self.bytes_saved = 0
+
+    @classmethod
+    def of(cls, frame: Any) -> "FrameContext":
+        """Wrap a raw frame, or return it unchanged if already a FrameContext."""
+        return frame if isinstance(frame, cls) else cls(frame)
+
+    # ── geometry ─────────────────────────────────────────────────────
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        if isinstance(self.frame, Image.Image):
+            return (self.frame.height, self.frame.width, len(self.frame.getbands()))
+        return tuple(self.frame.shape)
+
+    # ── representations ──────────────────────────────────────────────
+
+    def numpy(self) -> np.ndarray:
+        """(H, W, 3) uint8 array."""
+        def build():
+            f = self.frame
+            if isinstance(f, torch.Tensor):
+                arr = f.cpu().numpy()
+                copied = f.device.type != "cpu"
+            elif isinstance(f, Image.Image):
+                arr, copied = np.asarray(f), True
+            else:
+                arr, copied = np.asarray(f), False
+            if arr.dtype != np.uint8:
+                arr, copied = (arr * 255).clip(0, 255).astype(np.uint8), True
+            return arr, arr.nbytes if copied else 0
+        return self._get("numpy", build)
+
+    def device_tensor(self, device: Any) -> torch.Tensor:
+        """(3, H, W) uint8 tensor on device."""
+        def build():
+            f = self.frame
+            if isinstance(f, torch.Tensor) and f.dtype == torch.uint8:
+                t = f.to(device)
+                copied = t.data_ptr() != f.data_ptr()
+            else:
+                t, copied = torch.from_numpy(self.numpy()).to(device), torch.device(device).type != "cpu"
+            t = t.permute(2, 0, 1)
+            return t, t.numel() if copied else 0
+        return self._get(("device", str(device)), build)
+
+    def pil(self) -> Image.Image:
+        """Full-resolution RGB PIL image."""
+        def build():
+            if isinstance(self.frame, Image.Image):
+                return self.frame, 0
+            img = Image.fromarray(self.numpy())
+            return img, img.width * img.height * len(img.getbands())
+        return self._get("pil", build)
+
+    def resized(self, size: Tuple[int, int], resample: int = Image.BILINEAR) -> Image.Image:
+        """PIL image resized to size=(width, height) with the given filter."""
+        size = (int(size[0]), int(size[1]))
+
+        def build():
+            img = self.pil()
+            if img.size == size:
+                return img, 0
+            out = img.resize(size, resample=resample, reducing_gap=None)
+            return out, out.width * out.height * len(out.getbands())
+        return self._get(("resized", size, int(resample)), build)
+
+    # ── bookkeeping ──────────────────────────────────────────────────
+
+    def _get(self, key: Hashable, build: Callable[[], Tuple[Any, int]]) -> Any:
+        if key in self._memo:
+            value, nbytes = self._memo[key]
+            self.hits += 1
+            self.bytes_saved += nbytes
+            return value
+        value, nbytes = build()
+        self._memo[key] = (value, nbytes)
+        self.builds += 1
+        self.bytes_built += nbytes
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "builds": self.builds,
+            "bytes_built": self.bytes_built,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def resizes_with_pil(image_processor: Any) -> bool:
+    """
+    True if an HF image processor resizes through PIL.Image.resize.
+
+    transformers 4.x: slow processors do, *Fast (torchvision) ones don't.
+    transformers 5.x: processors expose backend = "pil" | "torchvision".
+    """
+    backend = getattr(image_processor, "backend", None)
+    if backend is not None:
+        return backend == "pil"
+    return not type(image_processor).__name__.endswith("Fast")
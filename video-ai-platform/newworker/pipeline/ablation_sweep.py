@@ -0,0 +1,246 @@
+"""
+Ablation sweep — one perception pass, every disabled_modules variant.
+
+The ablation study used to upload each video once per variant, each with
+its own DISABLED_MODULES, and reprocess it end to end.  Every variant paid
+for the full perception stack even though disabling fusion inputs never
+changes what the perception models see.  The sweep instead:
+
+  1. runs the first variant (the full system) normally and keeps every
+     frame's perception outputs (SigLIP, Depth, Mask2Former, SceneGraph,
+     SlowFast, audio) in memory
+  2. replays fusion → Qwen2-VL → narrative for each other variant from
+     those outputs — no perception model is loaded again
+
+so a sweep costs one perception pass plus N fusion / caption / narrative
+passes.  Qwen2-VL stays loaded for the whole sweep.
+
+Outputs (out_dir):
+  narratives_<variant>.json   generated_narratives.json format, for
+                              evaluation/evaluate.py --narratives
+  results_<...>.json          evaluate.py --out, under the file names
+                              evaluation/ablation_summary.py reads
+                              (only with ground_truth)
+  sweep_timing.json           per-variant wall time, perception vs replay
+
+Usage:
+    python -m pipeline.ablation_sweep city2.mp4 \\
+        --video-ids 4836f75d-7130-4962-92f5-4f0ec9b3b3bf \\
+        --ground-truth ../evaluation/ground_truth.json --out-dir ablation/
+    python ../evaluation/ablation_summary.py --results-dir ablation/
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+import warnings
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from perception.base import PerceptionOutput
+from pipeline.video_pipeline import VideoPipeline
+
+EVALUATE_SCRIPT = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "evaluation", "evaluate.py"
+))
+
+
+@dataclass(frozen=True)
+class AblationVariant:
+    name: str
+    disabled_modules: frozenset
+    results_file: str       # evaluate.py --out name read by ablation_summary.py
+
+    @property
+    def narratives_file(self) -> str:
+        return f"narratives_{self.name}.json"
+
+
+# The full system comes first: its run is the perception pass the others replay
+ABLATION_VARIANTS: Tuple[AblationVariant, ...] = (
+    AblationVariant("full",           frozenset(),                 "results_city2_full.json"),
+    AblationVariant("no_depth",       frozenset({"depth"}),        "results_no_depth.json"),
+    AblationVariant("no_audio",       frozenset({"audio"}),        "results_no_audio.json"),
+    AblationVariant("no_action",      frozenset({"action"}),       "results_no_action.json"),
+    AblationVariant("no_scene_graph", frozenset({"scene_graph"}),  "results_no_scene_graph.json"),
+    AblationVariant("vlm_only",       frozenset({"fusion"}),       "results_vlm_only.json"),
+)
+
+
+def run_sweep(
+    pipeline: VideoPipeline,
+    videos: Sequence[Tuple[str, str]],
+    out_dir: str,
+    variants: Sequence[AblationVariant] = ABLATION_VARIANTS,
+    ground_truth: Optional[str] = None,
+    skip_bertscore: bool = False,
+) -> Dict[str, Any]:
+    """
+    Run every variant on every (video_path, video_id) and write the outputs.
+
+    Perception outputs are kept per video only while its variants run.
+    With ground_truth, evaluate.py scores each variant's narratives.
+    Returns the sweep_timing.json report.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    entries: Dict[str, List[Dict[str, Any]]] = {v.name: [] for v in variants}
+    seconds: Dict[str, float] = {v.name: 0.0 for v in variants}
+    replayed: Dict[str, bool] = {v.name: True for v in variants}
+
+    # Set up with nothing disabled so every variant finds the CPU modules
+    # (scene graph, tracker) it needs; process() then applies each variant
+    pipeline.frame_pipeline.disabled_modules = frozenset()
+    with pipeline.frame_pipeline:
+        for video_path, video_id in videos:
+            store: Dict[int, Dict[str, PerceptionOutput]] = {}
+            for variant in variants:
+                print(f"\n── {variant.name} · {video_id} " + "─" * 40)
+                replayed[variant.name] &= bool(store)
+                t0 = time.time()
+                try:
+                    result = pipeline.process(
+                        video_path,
+                        video_id=video_id,
+                        disabled_modules=variant.disabled_modules,
+                        perception_store=store,
+                    )
+                except Exception as exc:
+                    warnings.warn(
+                        f"{variant.name} failed on {video_id}: {exc}", RuntimeWarning, stacklevel=2
+                    )
+                    traceback.print_exc()
+                    continue
+                finally:
+                    seconds[variant.name] += time.time() - t0
+                entries[variant.name].append({
+                    "video_id":         video_id,
+                    "display_name":     os.path.basename(video_path),
+                    "status":           "completed",
+                    "narrative":        result.narrative.narrative,
+                    "disabled_modules": sorted(variant.disabled_modules),
+                    "frame_count":      result.frame_count,
+                    "processing_time":  result.total_processing_time,
+                })
+
+    report_variants = []
+    for variant in variants:
+        narratives_path = os.path.join(out_dir, variant.narratives_file)
+        with open(narratives_path, "w", encoding="utf-8") as f:
+            json.dump({"videos": entries[variant.name]}, f, indent=2)
+
+        results_path = None
+        if ground_truth and entries[variant.name]:
+            results_path = os.path.join(out_dir, variant.results_file)
+            if not _evaluate(ground_truth, narratives_path, results_path, skip_bertscore):
+                results_path = None
+
+        report_variants.append({
+            "name":             variant.name,
+            "disabled_modules": sorted(variant.disabled_modules),
+            "videos":           len(entries[variant.name]),
+            "seconds":          round(seconds[variant.name], 3),
+            "replayed":         replayed[variant.name],
+            "narratives":       variant.narratives_file,
+            "results":          results_path and variant.results_file,
+        })
+
+    perception_s = sum(v["seconds"] for v in report_variants if not v["replayed"])
+    replay_s = sum(v["seconds"] for v in report_variants if v["replayed"])
+    n_replays = sum(v["replayed"] for v in report_variants)
+    report = {
+        "videos":            len(videos),
+        "variants":          report_variants,
+        "perception_pass_s": round(perception_s, 3),
+        "replay_s":          round(replay_s, 3),
+        "total_s":           round(perception_s + replay_s, 3),
+    }
+    with open(os.path.join(out_dir, "sweep_timing.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n✓ Ablation sweep: {len(variants)} variants × {len(videos)} video(s) — "
+          f"perception pass {perception_s:.1f}s, {n_replays} replays {replay_s:.1f}s")
+    for v in report_variants:
+        mode = "replay" if v["replayed"] else "full pass"
+        print(f"  {v['name']:<16} {v['seconds']:>8.1f}s  ({mode})")
+    return report
+
+
+def _evaluate(ground_truth: str, narratives: str, out: str, skip_bertscore: bool) -> bool:
+    """Score narratives with evaluation/evaluate.py; False if it failed."""
+    cmd = [
+        sys.executable, EVALUATE_SCRIPT,
+        "--ground-truth", os.path.abspath(ground_truth),
+        "--narratives", os.path.abspath(narratives),
+        "--out", os.path.abspath(out),
+    ]
+    if skip_bertscore:
+        cmd.append("--skip-bertscore")
+    proc = subprocess.run(cmd, cwd=os.path.dirname(EVALUATE_SCRIPT))
+    if proc.returncode != 0:
+        print(f"⚠️  evaluate.py failed for {os.path.basename(narratives)} (exit {proc.returncode})")
+        return False
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  CLI
+# ─────────────────────────────────────────────────────────────────────────────
+
+def main(argv: Optional[Sequence[str]] = None):
+    from worker.config import settings
+
+    variant_names = [v.name for v in ABLATION_VARIANTS]
+    parser = argparse.ArgumentParser(description="Ablation sweep over one shared perception pass")
+    parser.add_argument("videos", nargs="+", help="Video files")
+    parser.add_argument("--video-ids", nargs="+", default=None,
+                        help="Video ids matching the ground truth (default: file stems)")
+    parser.add_argument("--variants", nargs="+", default=variant_names, choices=variant_names,
+                        help="Variants to run (default: all; the first is the perception pass)")
+    parser.add_argument("--out-dir", default="ablation", help="Output directory")
+    parser.add_argument("--ground-truth", default=None, help="Ground truth JSON for evaluate.py")
+    parser.add_argument("--skip-bertscore", action="store_true", help="Pass --skip-bertscore to evaluate.py")
+    parser.add_argument("--dry-run", action="store_true", help="No models (placeholder outputs)")
+    args = parser.parse_args(argv)
+
+    video_ids = args.video_ids or [os.path.splitext(os.path.basename(p))[0] for p in args.videos]
+    if len(video_ids) != len(args.videos):
+        parser.error("--video-ids needs one id per video")
+
+    pipeline = VideoPipeline(
+        device=settings.DEVICE,
+        quantize_bits=settings.QUANTIZE_BITS,
+        sample_fps=settings.SAMPLE_FPS,
+        dry_run=args.dry_run,
+        analysis_max_side=settings.ANALYSIS_MAX_SIDE,
+        gate_threshold=settings.GATE_THRESHOLD,
+        gate_full_every=settings.GATE_FULL_EVERY,
+        action_window_s=settings.ACTION_WINDOW_S,
+        action_batch_size=settings.ACTION_BATCH_SIZE,
+        device_preprocess=settings.DEVICE_PREPROCESS,
+        defer_captions=settings.DEFER_CAPTIONS,
+        vlm_batch_size=settings.VLM_BATCH_SIZE,
+        vlm_prefix_cache=settings.VLM_PREFIX_CACHE,
+        caption_cache_path=settings.CAPTION_CACHE_PATH or None,
+        caption_cache_mb=settings.CAPTION_CACHE_MB,
+        caption_mode=settings.CAPTION_MODE,
+        segment_frame_captions=settings.SEGMENT_FRAME_CAPTIONS,
+    )
+    variants = [v for name in args.variants for v in ABLATION_VARIANTS if v.name == name]
+    run_sweep(
+        pipeline,
+        list(zip(args.videos, video_ids)),
+        args.out_dir,
+        variants=variants,
+        ground_truth=args.ground_truth,
+        skip_bertscore=args.skip_bertscore,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+FrameCheckpoint — per-frame results persisted as a video is processed.
+
+A worker that crashes or is pre-empted at frame 100 of 120 used to start
+over once SQS redelivered the message.  With a checkpoint, VideoPipeline
+writes every completed FrameResult as it lands; the retry restores the
+frames already done and resumes at the first missing one.
+
+Layout (one store per video — a local directory or an S3 prefix):
+  manifest.json         fingerprint of the run: video content hash, sample
+                        fps, disabled modules, caption mode.  A checkpoint
+                        whose fingerprint differs is discarded, never mixed.
+  frame_<id>.npz        one completed frame:
+                          record     uint8  JSON — FrameResult minus binaries
+                                            (USR without embedding, caption)
+                          embedding  float16 (D,) SigLIP vector
+                          masks      uint8  mask sidecar bytes for the frame
+                          state      uint8  JSON — FramePipeline state after
+                                            this frame (tracker)
+
+Everything is plain arrays and JSON: a checkpoint object is data, never
+code, so reading one back from the bucket cannot execute anything.
+
+Usage:
+    checkpoint = FrameCheckpoint(S3CheckpointStore(client, bucket, f"checkpoints/{video_id}/"))
+    if receive_count == 1:
+        checkpoint.clear()               # first delivery: never resume
+    result = pipeline.process(path, video_id, checkpoint=checkpoint)
+    checkpoint.clear()                   # results are safely uploaded
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fusion.unified_representation import UnifiedSceneRepresentation
+from vlm.vlm_caption import VLMCaption
+from .frame_result import FrameResult
+from .sidecars import build_mask_sidecar, read_mask_sidecar
+
+# Bump when the frame record layout changes (2: JSON state, was pickle)
+CHECKPOINT_VERSION = 2
+
+MANIFEST_NAME = "manifest.json"
+_FRAME_NAME = re.compile(r"^frame_(\d+)\.npz$")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Stores
+# ─────────────────────────────────────────────────────────────────────────────
+
+class LocalCheckpointStore:
+    """Checkpoint objects as files in one directory (survives a process crash)."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def put(self, name: str, data: bytes):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)     # never leave a torn object behind
+
+    def get(self, name: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.root, name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def names(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return [n for n in os.listdir(self.root) if not n.endswith(".tmp")]
+
+    def clear(self):
+        for name in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            os.remove(os.path.join(self.root, name))
+
+
+class S3CheckpointStore:
+    """Checkpoint objects under an S3 prefix (survives losing the instance)."""
+
+    def __init__(self, client: Any, bucket: str, prefix: str):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def put(self, name: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + name, Body=data)
+
+    def get(self, name: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + name)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def _keys(self) -> List[str]:
+        keys: List[str] = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            keys.extend(obj["Key"] for obj in page.get("Contents", []))
+        return keys
+
+    def names(self) -> List[str]:
+        return [k[len(self.prefix):] for k in self._keys()]
+
+    def clear(self):
+        keys = self._keys()
+        for i in range(0, len(keys), 1000):          # delete_objects limit
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": k} for k in keys[i:i + 1000]], "Quiet": True},
+            )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Checkpoint
+# ─────────────────────────────────────────────────────────────────────────────
+
+class FrameCheckpoint:
+    """
+    Completed FrameResults of one video run, keyed by frame_id.
+
+    Args:
+        store : LocalCheckpointStore / S3CheckpointStore (put / get / names
+                / clear).
+    """
+
+    def __init__(self, store: Any):
+        self.store = store
+        self.saved = 0
+
+    def open(self, fingerprint: Dict[str, Any]) -> Dict[int, Tuple[FrameResult, Optional[Dict[str, Any]]]]:
+        """
+        Restore the frames saved under this fingerprint:
+        {frame_id: (FrameResult, pipeline state after that frame)}.
+
+        A checkpoint from a different video / configuration is cleared and
+        a fresh manifest written.
+        """
+        manifest = {"version": CHECKPOINT_VERSION, **fingerprint}
+        raw = self.store.get(MANIFEST_NAME)
+        if raw is not None and json.loads(raw) == json.loads(json.dumps(manifest)):
+            frames = {}
+            for name in self.store.names():
+                m = _FRAME_NAME.match(name)
+                data = self.store.get(name) if m else None
+                if data is not None:
+                    frames[int(m.group(1))] = _decode_frame(data)
+            return frames
+        if raw is not None:
+            print("Checkpoint: fingerprint changed (different video or settings) — starting over")
+        self.clear()
+        self.store.put(MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
+        return {}
+
+    def save(self, result: FrameResult, state: Optional[Dict[str, Any]] = None):
+        self.store.put(f"frame_{result.frame_id:06d}.npz", _encode_frame(result, state))
+        self.saved += 1
+
+    def clear(self):
+        self.store.clear()
+
+
+def _as_bytes_array(data: Optional[bytes]) -> np.ndarray:
+    return np.frombuffer(data or b"", dtype=np.uint8)
+
+
+def _encode_frame(result: FrameResult, state: Optional[Dict[str, Any]]) -> bytes:
+    record = {
+        "frame_id": result.frame_id,
+        "timestamp": result.timestamp,
+        "usr": result.usr.to_dict_no_embedding(),
+        "caption": result.caption.to_dict() if result.caption is not None else None,
+        "step_times": result.step_times,
+        "total_time": result.total_time,
+        "peak_vram_gb": result.peak_vram_gb,
+    }
+    buf = io.BytesIO()
+    np.savez(
+        buf,
+        record=_as_bytes_array(json.dumps(record).encode("utf-8")),
+        embedding=np.asarray(result.usr.vision_embedding, dtype=np.float16),
+        masks=_as_bytes_array(build_mask_sidecar([result])),
+        state=_as_bytes_array(json.dumps(state).encode("utf-8") if state is not None else None),
+    )
+    return buf.getvalue()
+
+
+def _decode_frame(data: bytes) -> Tuple[FrameResult, Optional[Dict[str, Any]]]:
+    with np.load(io.BytesIO(data)) as npz:
+        record = json.loads(npz["record"].tobytes())
+        embedding = npz["embedding"]
+        masks = npz["masks"].tobytes()
+        state = npz["state"].tobytes()
+
+    frame_id = record["frame_id"]
+    usr = UnifiedSceneRepresentation(
+        **record["usr"],
+        vision_embedding=embedding,
+        panoptic_masks=read_mask_sidecar(masks).get(frame_id, {}) if masks else {},
+    )
+    caption = VLMCaption(**record["caption"]) if record["caption"] is not None else None
+    result = FrameResult(
+        frame_id=frame_id,
+        timestamp=record["timestamp"],
+        usr=usr,
+        caption=caption,
+        step_times=record["step_times"],
+        total_time=record["total_time"],
+        peak_vram_gb=record["peak_vram_gb"],
+    )
+    return result, json.loads(state) if state else None
@@ -0,0 +1,128 @@
+"""
+Chunked analysis results — gzip-compressed JSONL with a header index.
+
+analysis.json was one indented JSON document, so every backend route
+downloaded and parsed all of it (narrative, transcription, audio events)
+even when it needed a handful of counts.  analysis.jsonl.gz instead holds
+one gzip member per section, preceded by a header member that indexes
+them:
+
+  member 0    one JSON line:
+                {"format": "video-analysis-chunked", "version": 1,
+                 "video_id": ...,
+                 "sections": [{"name", "offset", "length", "records"}]}
+              offset / length locate the section's gzip member in bytes,
+              counted from the end of member 0
+  member 1..  one section each, JSONL — one JSON object per line
+
+Sections written from VideoResult.to_dict():
+  summary     identity, scene types, class counts, timing, sidecars
+  narrative   narrative text, summary, model and token counts
+  audio       {"audio_analysis": ...}
+
+A reader fetches the first few KB, inflates member 0 for the index, then
+ranged-GETs and inflates only the members it needs.  Concatenated gzip
+members are themselves a valid gzip stream, so `gzip -dc` (or
+gzip.decompress) still yields the whole file as plain JSONL.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CHUNKED_RESULTS_NAME = "analysis.jsonl.gz"
+CHUNKED_FORMAT = "video-analysis-chunked"
+# Bump when the header or section layout changes
+CHUNKED_VERSION = 1
+
+NARRATIVE_KEYS = (
+    "narrative",
+    "narrative_summary",
+    "narrative_model",
+    "narrative_input_tokens",
+    "narrative_output_tokens",
+    "narrative_processing_time",
+)
+
+
+def split_sections(result: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """VideoResult.to_dict() → {section name: [records]}."""
+    summary = {k: v for k, v in result.items() if k not in NARRATIVE_KEYS and k != "audio_analysis"}
+    sections = {
+        "summary": [summary],
+        "narrative": [{k: result[k] for k in NARRATIVE_KEYS if k in result}],
+    }
+    if "audio_analysis" in result:
+        sections["audio"] = [{"audio_analysis": result["audio_analysis"]}]
+    return sections
+
+
+def encode_jsonl(records: Iterable[Dict[str, Any]]) -> bytes:
+    """Compact JSON, one object per line."""
+    return b"".join(
+        json.dumps(r, separators=(",", ":"), default=str).encode("utf-8") + b"\n" for r in records
+    )
+
+
+def build_chunked_results(
+    video_id: str,
+    sections: Dict[str, List[Dict[str, Any]]],
+    level: int = 6,
+) -> bytes:
+    """Header member + one gzip member per section (in dict order)."""
+    members: List[bytes] = []
+    index: List[Dict[str, Any]] = []
+    offset = 0
+    for name, records in sections.items():
+        member = gzip.compress(encode_jsonl(records), compresslevel=level, mtime=0)
+        index.append({"name": name, "offset": offset, "length": len(member), "records": len(records)})
+        members.append(member)
+        offset += len(member)
+    header = {"format": CHUNKED_FORMAT, "version": CHUNKED_VERSION, "video_id": video_id, "sections": index}
+    return gzip.compress(encode_jsonl([header]), compresslevel=level, mtime=0) + b"".join(members)
+
+
+def read_header(data: bytes) -> Tuple[Dict[str, Any], int]:
+    """(header dict, byte length of member 0) from the head of the file."""
+    inflater = zlib.decompressobj(wbits=31)
+    line = inflater.decompress(data)
+    if not inflater.eof:
+        raise ValueError("header member incomplete — read more of the file")
+    header = json.loads(line)
+    if header.get("format") != CHUNKED_FORMAT:
+        raise ValueError(f"not a chunked results file: {header.get('format')!r}")
+    if header.get("version", 0) > CHUNKED_VERSION:
+        raise ValueError(f"unsupported chunked results version {header['version']}")
+    return header, len(data) - len(inflater.unused_data)
+
+
+def read_chunked_results(
+    data: bytes,
+    sections: Optional[Iterable[str]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    {section name: [records]} for the named sections (all if None) from a
+    whole file in memory.  Unknown names are skipped.
+    """
+    header, base = read_header(data)
+    wanted = None if sections is None else set(sections)
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in header["sections"]:
+        if wanted is not None and entry["name"] not in wanted:
+            continue
+        start = base + entry["offset"]
+        body = gzip.decompress(data[start:start + entry["length"]])
+        out[entry["name"]] = [json.loads(line) for line in body.splitlines() if line]
+    return out
+
+
+def merge_records(sections: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Fold single-record sections back into one to_dict()-shaped dict."""
+    merged: Dict[str, Any] = {}
+    for records in sections.values():
+        for record in records:
+            merged.update(record)
+    return merged
@@ -0,0 +1,70 @@
+"""
+ClipRingBuffer — fixed-size rolling clip of downscaled frames for SlowFast.
+
+Replaces a deque of full-resolution frame tensors.  Frames are resized to
+the recognizer's crop size on append and written in place into one
+preallocated uint8 array, so the buffer never grows and SlowFast
+preprocessing only ever sees (T, S, S, 3) uint8 data.
+
+Every frame is written twice — at slot i and slot i + capacity — so the
+last `len(buffer)` frames are always one contiguous slice: view() returns
+them oldest-first without copying.  The view aliases the buffer and is
+only valid until the next append().
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import cv2
+import numpy as np
+import torch
+
+
+class ClipRingBuffer:
+    """
+    Example:
+        buf = ClipRingBuffer(capacity=32, size=224)
+        for fd in frames:
+            buf.append(fd.frame)
+            clip = buf.view()        # (min(n, 32), 224, 224, 3) uint8, oldest first
+    """
+
+    def __init__(self, capacity: int = 32, size: int = 224):
+        self.capacity = capacity
+        self.size = size
+        self._data = np.zeros((2 * capacity, size, size, 3), dtype=np.uint8)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def append(self, frame: Any):
+        """Resize an (H, W, 3) uint8 frame into the next slot (in place)."""
+        if isinstance(frame, torch.Tensor):
+            frame = frame.cpu().numpy()
+        slot = self._data[self._next]
+        if frame.shape[:2] == (self.size, self.size):
+            slot[...] = frame
+        else:
+            interp = cv2.INTER_AREA if max(frame.shape[:2]) > self.size else cv2.INTER_LINEAR
+            cv2.resize(frame, (self.size, self.size), dst=slot, interpolation=interp)
+        self._data[self._next + self.capacity] = slot
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def view(self) -> np.ndarray:
+        """Buffered frames oldest-first, as a zero-copy (T, S, S, 3) slice."""
+        start = self._next - self._count
+        if start < 0:
+            start += self.capacity
+        return self._data[start:start + self._count]
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
@@ -6,7 +6,9 @@ Execution order (all sequential, per architecture constraints):
   2. DepthAnything   load → infer → unload     (GPU ~1.5GB)
   3. Mask2Former     load → infer → unload     (GPU ~5.5GB)
   4. SceneGraph      infer                     (CPU, kept alive)
-  5. SlowFast        load → infer → unload     (GPU ~3.5GB)
+  5. SlowFast        load → infer → unload     (GPU ~3.5GB; skipped when
+                                                VideoPipeline's ActionScheduler
+                                                already scored this frame)
   6. ByteTracker     infer                     (CPU, kept alive)
   7. AudioProcessor  load → infer → unload     (GPU ~2.5GB, optional)
   8. FusionEngine    fuse                      (CPU)
@@ -16,6 +18,44 @@ Qwen2-VL stays loaded across frames (call setup() once before processing).
 All perception models load/unload each frame so they never coexist with VLM.
 Peak VRAM per frame: max(5.5GB perception, 8.5GB VLM) = 8.5GB — well within A10 24GB.
 
+Cascade gating (gate_threshold set):
+  SigLIP runs first and is the cheapest GPU model, so its embedding decides
+  whether the heavy models need to run.  When the cosine distance to the
+  last fully processed frame is below gate_threshold, Mask2Former and
+  SlowFast are skipped and their last outputs reused; the tracker coasts on
+  Kalman prediction.  A full pass is forced at least every gate_full_every
+  frames.  Decisions land in usr.processing_metadata["gate"].
+
+Deferred captioning (defer_captions=True):
+  Step 9 only keeps the USR and the frame downscaled to Qwen2-VL's input
+  size (~1 MB); process_frame returns the FrameResult with caption=None.
+  flush_captions() captions every pending frame with batched generate
+  calls and fills the results in place.  Pending frames are flushed
+  automatically once MAX_PENDING_CAPTIONS accumulate.
+
+Segment captioning (caption_mode="segment"):
+  Frames are held the same way (at Qwen2-VL's smaller per-image segment
+  budget) until caption_segments(scenes) runs one multi-image call per
+  TemporalAssembly scene segment.  Frames without a caption of their own
+  (segment_frame_captions=False) share their segment's caption.
+
+Perception cache (perception_cache_path set):
+  Before a GPU module is loaded — and before the scene graph runs — the
+  PerceptionCache is asked for this video's output at this timestamp under
+  the module's current settings; a hit skips the module.  VideoPipeline
+  sets cache_scope (video content hash) per video; without a scope
+  nothing is cached.  Hits/misses land in
+  usr.processing_metadata["perception_cache"]; the load time of every
+  module that did load, in usr.processing_metadata["model_load_s"].
+
+Replay (precomputed outputs):
+  process_frame(precomputed={class name: PerceptionOutput}) uses the given
+  outputs instead of running those modules (disabled modules still yield
+  placeholders), so fusion → VLM can be re-run under different
+  disabled_modules without loading a perception model.  After each frame
+  last_perception holds the outputs that were actually computed, keyed the
+  same way — see pipeline/ablation_sweep.py.
+
 dry_run mode:
   Skips all model loading and GPU calls.  Returns placeholder outputs.
   Used by the test suite on machines without CUDA / without model weights.
@@ -23,17 +63,31 @@ dry_run mode:
 
 from __future__ import annotations
 
+import dataclasses
 import gc
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import torch
 
 from fusion import MultiModalFusionEngine
 from optimization.profiler import TimingProfiler
+from optimization.tracing import tracer
 from perception.base import PerceptionOutput
+from perception.utils.frame_context import FrameContext
 from .frame_result import FrameResult
+from .perception_cache import PerceptionCache, module_fingerprint, perception_key
+
+
+# GPU module class → disabled_modules key
+_MODULE_KEYS = {
+    "SigLIPEncoder":     "siglip",
+    "DepthEstimator":    "depth",
+    "PanopticSegmenter": "panoptic",
+    "ActionRecognizer":  "action",
+    "AudioProcessor":    "audio",
+}
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -95,6 +149,9 @@ class FramePipeline:
             result = pipeline.process_frame(frame, frame_id=0, timestamp=0.0)
     """
 
+    # Deferred captions held before an automatic flush (~1 MB image each)
+    MAX_PENDING_CAPTIONS = 128
+
     def __init__(
         self,
         device: str = "cuda",
@@ -103,9 +160,39 @@ class FramePipeline:
         skip_audio: bool = False,
         dry_run: bool = False,
         disabled_modules: frozenset = frozenset(),
+        # Long-side cap (px) for depth / panoptic post-processing; None = full res
+        analysis_max_side: Optional[int] = 512,
         # Inject a pre-built captioner (e.g. for tests)
         captioner=None,
+        # Cascade gating: SigLIP cosine distance below which panoptic/action
+        # outputs are reused; None = always run every module
+        gate_threshold: Optional[float] = None,
+        # Force a full pass at least every K frames while gating
+        gate_full_every: int = 5,
+        # Resize/normalise SigLIP/Depth/Mask2Former inputs with torch on the
+        # device; False = HF processors on the CPU
+        device_preprocess: bool = True,
+        # Hold captions for a batched flush_captions() pass
+        defer_captions: bool = False,
+        # Qwen2-VL samples per generate call; None = from free VRAM
+        vlm_batch_size: Optional[int] = None,
+        # Prefill Qwen2-VL's system prompt once and reuse its KV cache
+        vlm_prefix_cache: bool = True,
+        # Persistent caption cache (SQLite file) and its size budget; None = off
+        caption_cache_path: Optional[str] = None,
+        caption_cache_mb: float = 256.0,
+        # On-disk perception output cache (SQLite file); None = off
+        perception_cache_path: Optional[str] = None,
+        perception_cache_gb: float = 4.0,
+        perception_cache_ttl_h: Optional[float] = 72.0,
+        # "frame" = one caption per frame; "segment" = one per scene segment
+        caption_mode: str = "frame",
+        # Segment mode: also caption every frame (batched), images per segment
+        segment_frame_captions: bool = False,
+        segment_max_images: int = 4,
     ):
+        if caption_mode not in ("frame", "segment"):
+            raise ValueError(f"caption_mode must be 'frame' or 'segment', got {caption_mode!r}")
         self.device = device
         self.quantize_bits = quantize_bits
         self.max_vlm_tokens = max_vlm_tokens
@@ -113,12 +200,38 @@ class FramePipeline:
         self.skip_audio = skip_audio or "audio" in disabled_modules
         self.dry_run = dry_run
         self.disabled_modules = disabled_modules
+        self.analysis_max_side = analysis_max_side
+        self.gate_threshold = gate_threshold
+        self.gate_full_every = max(1, gate_full_every)
+        self.device_preprocess = device_preprocess
+        self.defer_captions = defer_captions
+        self.vlm_batch_size = vlm_batch_size
+        self.vlm_prefix_cache = vlm_prefix_cache
+        self.caption_cache_path = caption_cache_path
+        self.caption_cache_mb = caption_cache_mb
+        self.perception_cache_path = perception_cache_path
+        self.perception_cache_gb = perception_cache_gb
+        self.perception_cache_ttl_h = perception_cache_ttl_h
+        # Identity of the video being processed (content hash); keys the cache
+        self.cache_scope: Optional[str] = None
+        self.caption_mode = caption_mode
+        self.segment_frame_captions = segment_frame_captions
+        self.segment_max_images = segment_max_images
 
         self._fusion = MultiModalFusionEngine()
         self._captioner = captioner       # injected or created in setup()
         self._tracker = None
         self._scene_graph = None
         self._ready = False
+        self._pending_captions: List[Tuple[FrameResult, Any]] = []
+        self._perception_cache: Optional[PerceptionCache] = None
+        self._cache_log: Dict[str, str] = {}      # module → "hit" | "miss", this frame
+        self._load_log: Dict[str, float] = {}     # module → load_model() seconds, this frame
+        self._precomputed: Dict[str, PerceptionOutput] = {}
+        # Perception outputs computed for the last frame, by module class
+        self.last_perception: Dict[str, PerceptionOutput] = {}
+        self._entered = 0
+        self._reset_gate()
 
     # ─────────────────────────────────────────────────────────────────
     #  Setup / teardown
@@ -133,6 +246,7 @@ class FramePipeline:
         """
         if self._ready:
             return
+        self._reset_gate()
 
         # GPU optimisation: allow cuDNN to benchmark and pick fastest kernels
         if torch.cuda.is_available() and not self.dry_run:
@@ -149,13 +263,28 @@ class FramePipeline:
                 self._tracker = ByteTracker()
                 self._tracker.load_model()
 
+        if self.perception_cache_path and not self.dry_run:
+            self._perception_cache = PerceptionCache(
+                self.perception_cache_path,
+                max_bytes=int(self.perception_cache_gb * 2**30),
+                ttl_s=None if self.perception_cache_ttl_h is None else self.perception_cache_ttl_h * 3600,
+            )
+
         # VLM — load once, keep resident
         if not self.dry_run and self._captioner is None:
-            from vlm import Qwen2VLCaptioner
+            from vlm import CaptionCache, Qwen2VLCaptioner
+            cache = None
+            if self.caption_cache_path:
+                cache = CaptionCache(
+                    self.caption_cache_path, max_bytes=int(self.caption_cache_mb * 2**20)
+                )
             self._captioner = Qwen2VLCaptioner(
                 quantize_bits=self.quantize_bits,
                 max_new_tokens=self.max_vlm_tokens,
                 device=self.device,
+                batch_size=self.vlm_batch_size,
+                reuse_prefix_cache=self.vlm_prefix_cache,
+                caption_cache=cache,
             )
             self._captioner.load()
 
@@ -163,6 +292,10 @@ class FramePipeline:
 
     def teardown(self):
         """Unload all models and release GPU memory."""
+        if self._pending_captions:
+            print(f"⚠️  Dropping {len(self._pending_captions)} uncaptioned frames "
+                  f"(flush_captions() not called)")
+            self._pending_captions = []
         if self._captioner is not None and not self.dry_run:
             self._captioner.unload()
             self._captioner = None
@@ -172,17 +305,50 @@ class FramePipeline:
         if self._scene_graph is not None:
             self._scene_graph.unload()
             self._scene_graph = None
+        if self._perception_cache is not None:
+            modules = self._perception_cache.stats()["modules"]
+            summary = ", ".join(
+                f"{name} {c['hits']}/{c['hits'] + c['misses']}" for name, c in modules.items()
+            )
+            print(f"✓ Perception cache hits: {summary or 'no lookups'}")
+            self._perception_cache.close()
+            self._perception_cache = None
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
             gc.collect()
         self._ready = False
 
+    def reset(self):
+        """Clear per-video state (tracks, gate reference) without unloading."""
+        self._reset_gate()
+        if self._tracker is not None:
+            self._tracker.reset()
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Cross-frame state to continue a video from after a crash."""
+        return {"tracker": self._tracker.state_dict() if self._tracker is not None else None}
+
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Continue from checkpoint_state().  Gate state is not kept: the
+        first resumed frame is a full pass.
+        """
+        self._reset_gate()
+        if self._tracker is not None and state.get("tracker") is not None:
+            self._tracker.load_state_dict(state["tracker"])
+
     def __enter__(self):
-        self.setup()
+        # Re-entrant: only the outermost block sets up / tears down, so a
+        # caller can keep Qwen2-VL resident across several videos
+        if self._entered == 0:
+            self.setup()
+        self._entered += 1
         return self
 
     def __exit__(self, *args):
-        self.teardown()
+        self._entered -= 1
+        if self._entered == 0:
+            self.teardown()
 
     # ─────────────────────────────────────────────────────────────────
     #  Main entry point
@@ -195,6 +361,8 @@ class FramePipeline:
         timestamp: float,
         audio: Optional[np.ndarray] = None,
         clip: Optional[Any] = None,
+        actions: Optional[PerceptionOutput] = None,
+        precomputed: Optional[Dict[str, PerceptionOutput]] = None,
     ) -> FrameResult:
         """
         Run the full pipeline for one frame.
@@ -207,6 +375,11 @@ class FramePipeline:
                         audio segment.  Pass None to skip AudioProcessor.
             clip      : List of frames (or (T,H,W,3) tensor) for SlowFast.
                         If None, the single frame is tiled.
+            actions   : Precomputed SlowFast output for this frame (from
+                        ActionScheduler).  When given, step 5 is skipped.
+            precomputed : Outputs by module class name (e.g. a previous
+                        run's last_perception) used instead of running
+                        those modules.
 
         Returns:
             FrameResult with usr, caption, timing breakdown.
@@ -218,35 +391,58 @@ class FramePipeline:
             torch.cuda.reset_peak_memory_stats()
 
         profiler = TimingProfiler()
+        self._cache_log = {}
+        self._load_log = {}
+        self._precomputed = precomputed or {}
+        # One memo of numpy / PIL / resized views shared by every module
+        ctx = FrameContext(frame)
 
         # ── 1. SigLIP ────────────────────────────────────────────────
         with profiler.step("siglip"):
-            siglip_out = self._run_gpu_module("SigLIPEncoder", frame, frame_id, timestamp)
+            siglip_out = self._perceive("SigLIPEncoder", ctx, frame_id, timestamp)
+        gated, distance, embedding = self._gate(siglip_out)
 
         # ── 2. DepthAnything ─────────────────────────────────────────
         with profiler.step("depth"):
-            depth_out = self._run_gpu_module("DepthEstimator", frame, frame_id, timestamp)
+            depth_out = self._perceive("DepthEstimator", ctx, frame_id, timestamp)
 
         # ── 3. Mask2Former ───────────────────────────────────────────
         with profiler.step("panoptic"):
-            panoptic_out = self._run_gpu_module("PanopticSegmenter", frame, frame_id, timestamp)
+            if gated:
+                panoptic_out = self._reuse(self._gate_last["panoptic"], frame_id, timestamp)
+            else:
+                panoptic_out = self._perceive("PanopticSegmenter", ctx, frame_id, timestamp)
 
         things = panoptic_out.data.get("things", []) if panoptic_out else []
+        stuff = panoptic_out.data.get("stuff", []) if panoptic_out else []
+        masks = panoptic_out.artifacts.get("masks") if panoptic_out else None
 
         # ── 4. Scene Graph (CPU) ─────────────────────────────────────
         with profiler.step("scene_graph"):
             if self.dry_run or "scene_graph" in self.disabled_modules or "fusion" in self.disabled_modules:
                 sg_out = _dummy_perception("SceneGraphGenerator", frame_id, timestamp)
+            elif "SceneGraphGenerator" in self._precomputed:
+                sg_out = self._precomputed["SceneGraphGenerator"]
             else:
-                sg_out = self._scene_graph(
-                    frame, frame_id, timestamp, panoptic_things=things
+                sg_out = self._cached(
+                    self._scene_graph, ctx, frame_id, timestamp,
+                    inputs={"things": things, "stuff": stuff},
+                    run=lambda: self._scene_graph(
+                        ctx, frame_id, timestamp, panoptic_things=things,
+                        panoptic_stuff=stuff, panoptic_masks=masks,
+                    ),
                 )
 
         # ── 5. SlowFast ──────────────────────────────────────────────
         with profiler.step("slowfast"):
-            action_out = self._run_gpu_module(
-                "ActionRecognizer", frame, frame_id, timestamp, clip=clip
-            )
+            if actions is not None:
+                action_out = actions
+            elif gated:
+                action_out = self._reuse(self._gate_last["action"], frame_id, timestamp)
+            else:
+                action_out = self._perceive(
+                    "ActionRecognizer", ctx, frame_id, timestamp, clip=clip
+                )
 
         # ── 6. ByteTracker (CPU) ─────────────────────────────────────
         with profiler.step("tracker"):
@@ -254,18 +450,37 @@ class FramePipeline:
                 tracker_out = _dummy_perception("ByteTracker", frame_id, timestamp)
             else:
                 tracker_out = self._tracker(
-                    frame, frame_id, timestamp, panoptic_things=things
+                    ctx, frame_id, timestamp, panoptic_things=things, coast=gated
                 )
 
+        if embedding is not None and not gated:
+            # Full pass completed — it becomes the gate's new reference
+            self._gate_ref = embedding
+            self._gate_ref_frame = frame_id
+            self._gate_last = {"panoptic": panoptic_out, "action": action_out}
+            self._gate_skipped = 0
+        elif gated:
+            self._gate_skipped += 1
+
         # ── 7. Audio (optional) ──────────────────────────────────────
         audio_out = None
         if audio is not None and not self.skip_audio:
             with profiler.step("audio"):
-                audio_out = self._run_gpu_module(
-                    "AudioProcessor", frame, frame_id, timestamp,
+                audio_out = self._perceive(
+                    "AudioProcessor", ctx, frame_id, timestamp,
                     audio_waveform=audio
                 )
 
+        self.last_perception = {
+            name: out
+            for name, out in (
+                ("SigLIPEncoder", siglip_out), ("DepthEstimator", depth_out),
+                ("PanopticSegmenter", panoptic_out), ("SceneGraphGenerator", sg_out),
+                ("ActionRecognizer", action_out), ("AudioProcessor", audio_out),
+            )
+            if out is not None and not out.metadata.get("dry_run")
+        }
+
         # ── 8. Fusion ────────────────────────────────────────────────
         # When "fusion" is disabled (VLM-only mode), all perception outputs are
         # passed as None so the engine returns an empty/minimal USR.
@@ -284,13 +499,39 @@ class FramePipeline:
                     actions=action_out,
                     audio=audio_out,
                 )
+            if self.gate_threshold is not None:
+                action = "reused" if gated else "ran"
+                usr.processing_metadata["gate"] = {
+                    "cosine_distance": None if distance is None else round(distance, 5),
+                    "threshold": self.gate_threshold,
+                    "reference_frame": self._gate_ref_frame,
+                    "modules": {
+                        "panoptic": action,
+                        "action": "scheduled" if actions is not None else action,
+                        "tracker": "coasted" if gated else "ran",
+                    },
+                }
 
         # ── 9. Qwen2-VL caption ──────────────────────────────────────
+        deferred_image = None
         with profiler.step("vlm"):
             if self.dry_run or "vlm" in self.disabled_modules:
                 caption = _dummy_vlm_caption(usr, frame_id, timestamp)
+            elif self.caption_mode == "segment":
+                caption = None
+                deferred_image = self._captioner.prepare_image(
+                    ctx, max_pixels=self._captioner.SEGMENT_MAX_PIXELS
+                )
+            elif self.defer_captions:
+                caption = None
+                deferred_image = self._captioner.prepare_image(ctx)
             else:
-                caption = self._captioner.caption(usr, frame)
+                caption = self._captioner.caption(usr, ctx)
+        usr.processing_metadata["frame_context"] = ctx.stats()
+        if self._cache_log:
+            usr.processing_metadata["perception_cache"] = dict(self._cache_log)
+        if self._load_log:
+            usr.processing_metadata["model_load_s"] = dict(self._load_log)
 
         # ── Collect diagnostics ──────────────────────────────────────
         peak_vram = None
@@ -299,7 +540,7 @@ class FramePipeline:
 
         step_times = profiler.to_dict()
         total_time = sum(step_times.values())
-        return FrameResult(
+        result = FrameResult(
             frame_id=frame_id,
             timestamp=timestamp,
             usr=usr,
@@ -308,15 +549,175 @@ class FramePipeline:
             total_time=total_time,
             peak_vram_gb=peak_vram,
         )
+        if caption is None:
+            self._pending_captions.append((result, deferred_image))
+            # Segment mode holds every frame until its segment is known
+            if (self.caption_mode == "frame"
+                    and len(self._pending_captions) >= self.MAX_PENDING_CAPTIONS):
+                self.flush_captions()
+        return result
+
+    def flush_captions(self) -> int:
+        """
+        Caption every deferred frame with batched Qwen2-VL generate calls.
+
+        Fills each pending FrameResult's caption in place and adds its
+        share of the batch time to step_times["vlm"].  Returns the number
+        of frames captioned.
+        """
+        pending, self._pending_captions = self._pending_captions, []
+        if not pending:
+            return 0
+        t0 = time.time()
+        with tracer.span("vlm.caption_batch", cat="vlm", frames=len(pending)):
+            captions = self._captioner.caption_batch(
+                [result.usr for result, _ in pending],
+                [image for _, image in pending],
+            )
+        for (result, _), caption in zip(pending, captions):
+            result.caption = caption
+            result.step_times["vlm"] += caption.processing_time
+            result.total_time = sum(result.step_times.values())
+        batch = max(c.metadata.get("batch_size", 1) for c in captions)
+        print(f"✓ Qwen2-VL: {len(pending)} deferred captions in batches of ≤{batch} "
+              f"({time.time() - t0:.2f}s)")
+        return len(pending)
+
+    def caption_segments(
+        self,
+        scenes,
+        frame_captions: Optional[bool] = None,
+        max_images: Optional[int] = None,
+    ) -> int:
+        """
+        Caption each scene segment with one multi-image Qwen2-VL call over
+        its held frames (caption_mode="segment").
+
+        Args:
+            scenes         : TemporalAssembly.scenes — scene.caption is set.
+            frame_captions : Also caption every held frame (batched);
+                             default segment_frame_captions.  Otherwise each
+                             frame's caption is a copy of its segment's
+                             (metadata["source"] = "segment", 0 tokens).
+            max_images     : Images per segment call; default
+                             segment_max_images.
+
+        Each frame's step_times["vlm"] gains its share of the segment call.
+        Returns the number of segments captioned.
+        """
+        if frame_captions is None:
+            frame_captions = self.segment_frame_captions
+        held = {result.frame_id: (result, image) for result, image in self._pending_captions}
+        if frame_captions:
+            self.flush_captions()
+        self._pending_captions = []
+
+        t0 = time.time()
+        n_segments = 0
+        for scene in scenes:
+            members = [held[fid] for fid in scene.frame_ids if fid in held]
+            if not members:
+                continue
+            with tracer.span("vlm.caption_segment", cat="vlm", frames=len(members)):
+                caption = self._captioner.caption_segment(
+                    [result.usr for result, _ in members],
+                    [image for _, image in members],
+                    max_images=max_images or self.segment_max_images,
+                )
+            scene.caption = caption.caption
+            share = caption.processing_time / len(members)
+            for result, _ in members:
+                if result.caption is None:
+                    result.caption = dataclasses.replace(
+                        caption,
+                        frame_id=result.frame_id,
+                        timestamp=result.timestamp,
+                        tokens_generated=0,
+                        processing_time=round(share, 3),
+                        metadata=dict(caption.metadata),
+                    )
+                result.step_times["vlm"] += share
+                result.total_time = sum(result.step_times.values())
+            n_segments += 1
+
+        print(f"✓ Qwen2-VL: {n_segments} segment captions for {len(held)} frames "
+              f"({time.time() - t0:.2f}s)")
+        return n_segments
 
     # ─────────────────────────────────────────────────────────────────
     #  Internal helpers
     # ─────────────────────────────────────────────────────────────────
 
+    def _reset_gate(self):
+        """Drop gate state (reference embedding and cached outputs)."""
+        self._gate_ref: Optional[np.ndarray] = None
+        self._gate_ref_frame: Optional[int] = None
+        self._gate_last: Optional[Dict[str, PerceptionOutput]] = None
+        self._gate_skipped = 0
+
+    def _gate(
+        self, siglip_out: PerceptionOutput
+    ) -> Tuple[bool, Optional[float], Optional[np.ndarray]]:
+        """
+        Decide whether this frame may reuse the last full pass.
+
+        Returns (gated, cosine distance to the reference or None,
+        unit-norm embedding or None when gating is off / unavailable).
+        """
+        if self.gate_threshold is None:
+            return False, None, None
+        emb = siglip_out.artifacts.get("vision_embedding")
+        if emb is None:
+            return False, None, None
+        emb = np.asarray(emb, dtype=np.float32)
+        norm = float(np.linalg.norm(emb))
+        if norm == 0.0:
+            return False, None, None
+        emb = emb / norm
+
+        if self._gate_ref is None or self._gate_last is None:
+            return False, None, emb
+        distance = float(1.0 - emb @ self._gate_ref)
+        gated = (
+            distance < self.gate_threshold
+            and self._gate_skipped + 1 < self.gate_full_every
+        )
+        return gated, distance, emb
+
+    @staticmethod
+    def _reuse(output: PerceptionOutput, frame_id: int, timestamp: float) -> PerceptionOutput:
+        """Re-stamp a cached output for the current frame."""
+        return dataclasses.replace(
+            output,
+            frame_id=frame_id,
+            timestamp=timestamp,
+            metadata={**output.metadata, "reused_from_frame": output.frame_id},
+            processing_time=0.0,
+            gpu_memory_used=None,
+        )
+
+    def _perceive(
+        self,
+        class_name: str,
+        frame: FrameContext,
+        frame_id: int,
+        timestamp: float,
+        **kwargs,
+    ) -> PerceptionOutput:
+        """A precomputed output for class_name if one was given, else run it."""
+        out = self._precomputed.get(class_name)
+        if out is not None and not self._module_disabled(class_name):
+            return out
+        return self._run_gpu_module(class_name, frame, frame_id, timestamp, **kwargs)
+
+    def _module_disabled(self, class_name: str) -> bool:
+        module_key = _MODULE_KEYS.get(class_name, class_name.lower())
+        return module_key in self.disabled_modules or "fusion" in self.disabled_modules
+
     def _run_gpu_module(
         self,
         class_name: str,
-        frame: torch.Tensor,
+        frame: FrameContext,
         frame_id: int,
         timestamp: float,
         **kwargs,
@@ -326,23 +727,56 @@ class FramePipeline:
 
         Always uses try/finally so unload() is called even on exception.
         In dry_run mode returns a placeholder output without touching the GPU.
+        A perception-cache hit returns before the model is loaded.
         """
-        _CLASS_TO_MODULE_KEY = {
-            "SigLIPEncoder":    "siglip",
-            "DepthEstimator":   "depth",
-            "PanopticSegmenter":"panoptic",
-            "ActionRecognizer": "action",
-            "AudioProcessor":   "audio",
-        }
-        module_key = _CLASS_TO_MODULE_KEY.get(class_name, class_name.lower())
-        if self.dry_run or module_key in self.disabled_modules or "fusion" in self.disabled_modules:
+        if self.dry_run or self._module_disabled(class_name):
             return _dummy_perception(class_name, frame_id, timestamp)
 
         import perception as _perc
         cls = getattr(_perc, class_name)
-        module = cls(device=self.device)
-        try:
-            module.load_model()
-            return module(frame, frame_id, timestamp, **kwargs)
-        finally:
-            module.unload()
+        module_kwargs: Dict[str, Any] = {"device": self.device}
+        if class_name in ("DepthEstimator", "PanopticSegmenter"):
+            module_kwargs["analysis_max_side"] = self.analysis_max_side
+        if class_name == "DepthEstimator":
+            # Fusion reads per-object depth from the map when objects are tracked
+            module_kwargs["return_depth_map"] = "tracker" not in self.disabled_modules
+        if class_name in ("SigLIPEncoder", "DepthEstimator", "PanopticSegmenter"):
+            module_kwargs["preprocess_on_device"] = self.device_preprocess
+        module = cls(**module_kwargs)
+
+        def run():
+            try:
+                t0 = time.perf_counter()
+                with tracer.span(f"{class_name}.load", cat="model"):
+                    module.load_model()
+                self._load_log[class_name] = round(time.perf_counter() - t0, 4)
+                return module(frame, frame_id, timestamp, **kwargs)
+            finally:
+                with tracer.span(f"{class_name}.unload", cat="model"):
+                    module.unload()
+
+        return self._cached(module, frame, frame_id, timestamp, inputs=kwargs, run=run)
+
+    def _cached(
+        self,
+        module: Any,
+        frame: FrameContext,
+        frame_id: int,
+        timestamp: float,
+        inputs: Dict[str, Any],
+        run,
+    ) -> PerceptionOutput:
+        """run() through the perception cache (when enabled for this video)."""
+        cache = self._perception_cache
+        if cache is None or self.cache_scope is None:
+            return run()
+        name = getattr(module, "name", type(module).__name__)
+        key = perception_key(
+            self.cache_scope, timestamp, name, module_fingerprint(module), inputs, frame.shape,
+        )
+        out = cache.get(key, name, frame_id, timestamp)
+        self._cache_log[name] = "miss" if out is None else "hit"
+        if out is None:
+            out = run()
+            cache.put(key, out)
+        return out
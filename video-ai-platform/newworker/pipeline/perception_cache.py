@@ -0,0 +1,241 @@
+"""
+PerceptionCache — on-disk, content-addressed store of perception outputs.
+
+Every SQS retry and every ablation run used to recompute all perception
+outputs from scratch.  FramePipeline now asks the cache before it loads a
+model; a hit returns the stored PerceptionOutput (data, metadata and
+artifacts — masks, depth map, embedding) re-stamped for the current frame.
+
+Key = SHA-256 over:
+  scope        video content hash (+ sample fps), set per video by
+               VideoPipeline — no scope, no caching
+  timestamp    frame time in ms, plus the frame's shape
+  module       class name
+  fingerprint  the module's public scalar settings (model name, analysis
+               size, quantisation, device, ...) and class constants
+  inputs       digest of extra inputs: SlowFast clip, audio segment,
+               the panoptic objects a scene graph is built from
+  CACHE_VERSION, bumped when a module's output format changes
+
+Payloads are pickled (data, metadata, artifacts), zlib-compressed, in one
+SQLite file.  Entries older than ttl_s are dropped on access; once the
+payloads exceed max_bytes the least recently used are evicted.  The
+cache is a private per-worker store — payloads are only ever read back by
+the process type that wrote them.
+
+Usage:
+    cache = PerceptionCache("/data/perception.sqlite", max_bytes=4 * 2**30)
+    key = perception_key(scope, ts, "DepthEstimator", module_fingerprint(m), {}, shape)
+    out = cache.get(key, "DepthEstimator", frame_id, ts) or run_and_put(...)
+    cache.stats()   # {"modules": {"DepthEstimator": {"hits": .., "hit_rate": ..}}, ...}
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import torch
+
+from perception.base import PerceptionOutput
+
+# Bump to invalidate every entry after a change to a module's outputs
+CACHE_VERSION = 1
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def video_content_hash(path: str, chunk_size: int = 8 * 2**20) -> str:
+    """SHA-256 of the file's bytes (streamed)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def module_fingerprint(module: Any) -> Dict[str, Any]:
+    """
+    Public scalar settings of a perception module: instance attributes
+    (model name, analysis_max_side, quantize, device, ...) and upper-case
+    class constants (crop size, mean/std, ...).  Loaded state is ignored.
+    """
+    fp: Dict[str, Any] = {"class": type(module).__qualname__}
+    for klass in reversed(type(module).__mro__):
+        for k, v in vars(klass).items():
+            if k.isupper() and _is_plain(v):
+                fp[k] = v
+    for k, v in vars(module).items():
+        if not k.startswith("_") and k != "model" and _is_plain(v):
+            fp[k] = v
+    return fp
+
+
+def _is_plain(v: Any) -> bool:
+    if isinstance(v, (tuple, list)):
+        return all(isinstance(x, _SCALARS) for x in v)
+    return isinstance(v, _SCALARS)
+
+
+def digest(value: Any) -> str:
+    """Stable hash of a module input (arrays/tensors by content)."""
+    h = hashlib.blake2b(digest_size=16)
+    _feed(h, value)
+    return h.hexdigest()
+
+
+def _feed(h, value: Any):
+    if isinstance(value, torch.Tensor):
+        value = value.detach().cpu().numpy()
+    if isinstance(value, np.ndarray):
+        h.update(f"nd{value.dtype}{value.shape}".encode())
+        h.update(memoryview(np.ascontiguousarray(value)).cast("B"))
+    elif isinstance(value, (list, tuple)) and value and all(
+        isinstance(v, (np.ndarray, torch.Tensor)) for v in value
+    ):
+        for v in value:
+            _feed(h, v)
+    else:
+        h.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+def perception_key(
+    scope: str,
+    timestamp: float,
+    module_name: str,
+    fingerprint: Dict[str, Any],
+    inputs: Dict[str, Any],
+    frame_shape: Sequence[int] = (),
+) -> str:
+    blob = json.dumps(
+        [CACHE_VERSION, scope, round(timestamp * 1000), list(frame_shape), module_name,
+         fingerprint, {k: digest(v) for k, v in sorted(inputs.items())}],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class PerceptionCache:
+    """
+    SQLite-backed LRU + TTL store of PerceptionOutputs by perception_key().
+
+    Args:
+        path      : SQLite file (created with its directory); ":memory:"
+                    for a process-local cache.
+        max_bytes : Budget for compressed payloads (LRU eviction on put).
+        ttl_s     : Entry lifetime in seconds; None = no expiry.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 4 * 2**30, ttl_s: Optional[float] = 72 * 3600):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.evictions = 0
+        self.expired = 0
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outputs ("
+            " key TEXT PRIMARY KEY, module TEXT NOT NULL, payload BLOB NOT NULL,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS outputs_lru ON outputs (last_used)")
+
+    # ── lookup / store ───────────────────────────────────────────────
+
+    def get(self, key: str, module_name: str, frame_id: int, timestamp: float) -> Optional[PerceptionOutput]:
+        """The stored output stamped for (frame_id, timestamp), or None."""
+        t0 = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, created FROM outputs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_s is not None and t0 - row[1] > self.ttl_s:
+                self._db.execute("DELETE FROM outputs WHERE key = ?", (key,))
+                self.expired += 1
+                row = None
+            self._count(module_name, "hits" if row is not None else "misses")
+            if row is None:
+                return None
+            self._db.execute("UPDATE outputs SET last_used = ? WHERE key = ?", (t0, key))
+
+        data, metadata, artifacts = pickle.loads(zlib.decompress(row[0]))
+        return PerceptionOutput(
+            module_name=module_name,
+            timestamp=timestamp,
+            frame_id=frame_id,
+            data=data,
+            metadata={**metadata, "cache_hit": True},
+            processing_time=round(time.time() - t0, 4),
+            gpu_memory_used=None,
+            artifacts=artifacts,
+        )
+
+    def put(self, key: str, output: PerceptionOutput):
+        payload = zlib.compress(
+            pickle.dumps((output.data, output.metadata, output.artifacts), protocol=pickle.HIGHEST_PROTOCOL),
+            6,
+        )
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?)",
+                (key, output.module_name, payload, len(payload), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        if self.ttl_s is not None:
+            cur = self._db.execute("DELETE FROM outputs WHERE created < ?", (now - self.ttl_s,))
+            self.expired += max(cur.rowcount, 0)
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM outputs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed, doomed = 0, []
+        for key, size in self._db.execute("SELECT key, size FROM outputs ORDER BY last_used"):
+            if total - freed <= self.max_bytes:
+                break
+            doomed.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM outputs WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    # ── bookkeeping ──────────────────────────────────────────────────
+
+    def _count(self, module_name: str, field: str):
+        counts = self._counts.setdefault(module_name, {"hits": 0, "misses": 0})
+        counts[field] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-module hits / misses / hit_rate since this cache was opened."""
+        with self._lock:
+            entries, nbytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM outputs"
+            ).fetchone()
+        modules = {
+            name: {**c, "hit_rate": round(c["hits"] / (c["hits"] + c["misses"]), 3)}
+            for name, c in self._counts.items()
+        }
+        return {
+            "entries": entries,
+            "bytes": nbytes,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "modules": modules,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,160 @@
+"""
+Per-video binary sidecars.
+
+Bulky per-frame arrays (panoptic masks, SigLIP embeddings) are kept out of
+analysis.json and written to one .npz per video instead; the JSON result
+only carries the sidecar's S3 key under "sidecars".
+
+Mask sidecar layout (all arrays flat, one entry per mask):
+  frame_ids   (M,)    int32   frame_id of each mask
+  timestamps  (M,)    float32 frame timestamp (s)
+  segment_ids (M,)    int32   panoptic segment ID
+  sizes       (M, 2)  int32   (H, W) the mask was encoded at
+  offsets     (M+1,)  int64   mask i owns runs[offsets[i]:offsets[i+1]]
+  starts      (R,)    int32   column-major run starts
+  lengths     (R,)    int32   run lengths
+
+Embedding sidecar layout (one row per analysed frame):
+  frame_ids   (N,)    int32
+  timestamps  (N,)    float32
+  embeddings  (N, D)  float16, or int8 when quantised
+  scales      (N,)    float32 — int8 only: row = embeddings[i] * scales[i]
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from perception.utils.mask_ops import RLEMask
+
+if TYPE_CHECKING:
+    from pipeline.frame_result import FrameResult
+
+MASK_SIDECAR_NAME = "masks.npz"
+EMBEDDING_SIDECAR_NAME = "embeddings.npz"
+EMBEDDING_DTYPES = ("float16", "int8")
+
+
+def build_mask_sidecar(frame_results: List["FrameResult"]) -> Optional[bytes]:
+    """
+    Pack every frame's panoptic RLE masks into one compressed .npz blob.
+
+    Returns None when no frame carries masks.
+    """
+    frame_ids: List[int] = []
+    timestamps: List[float] = []
+    segment_ids: List[int] = []
+    sizes: List[tuple] = []
+    starts: List[np.ndarray] = []
+    lengths: List[np.ndarray] = []
+
+    for fr in frame_results:
+        for seg_id, mask in fr.usr.panoptic_masks.items():
+            frame_ids.append(fr.frame_id)
+            timestamps.append(fr.timestamp)
+            segment_ids.append(seg_id)
+            sizes.append(tuple(mask.size))
+            starts.append(mask.starts)
+            lengths.append(mask.lengths)
+
+    if not segment_ids:
+        return None
+
+    offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in starts], out=offsets[1:])
+
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf,
+        frame_ids=np.asarray(frame_ids, dtype=np.int32),
+        timestamps=np.asarray(timestamps, dtype=np.float32),
+        segment_ids=np.asarray(segment_ids, dtype=np.int32),
+        sizes=np.asarray(sizes, dtype=np.int32).reshape(-1, 2),
+        offsets=offsets,
+        starts=np.concatenate(starts).astype(np.int32),
+        lengths=np.concatenate(lengths).astype(np.int32),
+    )
+    return buf.getvalue()
+
+
+def read_mask_sidecar(data: bytes) -> Dict[int, Dict[int, RLEMask]]:
+    """Inverse of build_mask_sidecar: {frame_id: {segment_id: RLEMask}}."""
+    with np.load(io.BytesIO(data)) as npz:
+        frame_ids = npz["frame_ids"]
+        segment_ids = npz["segment_ids"]
+        sizes = npz["sizes"]
+        offsets = npz["offsets"]
+        starts = npz["starts"]
+        lengths = npz["lengths"]
+
+    frames: Dict[int, Dict[int, RLEMask]] = {}
+    for i in range(len(segment_ids)):
+        lo, hi = offsets[i], offsets[i + 1]
+        frames.setdefault(int(frame_ids[i]), {})[int(segment_ids[i])] = RLEMask(
+            (int(sizes[i, 0]), int(sizes[i, 1])), starts[lo:hi], lengths[lo:hi]
+        )
+    return frames
+
+
+def build_embedding_sidecar(
+    frame_results: List["FrameResult"],
+    dtype: str = "float16",
+) -> Optional[bytes]:
+    """
+    Stack every frame's SigLIP embedding into one .npz blob.
+
+    Args:
+        dtype: "float16" (lossless w.r.t. the pipeline) or "int8"
+               (symmetric per-row quantisation, half the bytes again).
+
+    Returns None when there are no frames.  Uncompressed: float16
+    embeddings barely compress and stored arrays load without inflating.
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unknown embedding dtype {dtype!r}; expected one of {EMBEDDING_DTYPES}")
+    if not frame_results:
+        return None
+
+    embeddings = np.stack([fr.usr.vision_embedding for fr in frame_results]).astype(np.float16, copy=False)
+    arrays = {
+        "frame_ids": np.asarray([fr.frame_id for fr in frame_results], dtype=np.int32),
+        "timestamps": np.asarray([fr.timestamp for fr in frame_results], dtype=np.float32),
+    }
+    if dtype == "int8":
+        arrays["embeddings"], arrays["scales"] = quantize_int8(embeddings)
+    else:
+        arrays["embeddings"] = embeddings
+
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def read_embedding_sidecar(data: bytes) -> Dict[str, np.ndarray]:
+    """
+    Inverse of build_embedding_sidecar.
+
+    Returns {"frame_ids", "timestamps", "embeddings"}; int8 sidecars are
+    dequantised to float16.
+    """
+    with np.load(io.BytesIO(data)) as npz:
+        out = {k: npz[k] for k in ("frame_ids", "timestamps", "embeddings")}
+        if "scales" in npz:
+            out["embeddings"] = dequantize_int8(out["embeddings"], npz["scales"])
+    return out
+
+
+def quantize_int8(embeddings: np.ndarray):
+    """Symmetric per-row int8 quantisation → (codes int8, scales float32)."""
+    emb = embeddings.astype(np.float32)
+    scales = np.abs(emb).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(emb / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return (codes.astype(np.float32) * scales[:, None]).astype(np.float16)
@@ -0,0 +1,142 @@
+"""
+Per-frame timeline — full frame results in fixed-duration segments.
+
+VideoResult.to_dict() drops frame_results, so nothing per-frame outlived
+the worker except the binary sidecars.  timeline.bin keeps every frame
+(USR minus embedding / masks / VLM prompt, plus its caption) together
+with the object tracks and scene segments, cut into segments of
+segment_s seconds so a time window can be served with ranged reads whose
+size does not depend on the video's length:
+
+  header   gzip member, one JSON line:
+             {"format": "video-timeline", "version": 1, "video_id",
+              "duration", "segment_s", "segments": N, "frames"}
+  index    N × 16 bytes, little-endian (offset u64, length u32,
+           records u32) — segment i covers [i·segment_s, (i+1)·segment_s);
+           offsets count from the end of the index
+  segments one gzip member of JSONL each:
+             {"type": "frame", "frame_id", "timestamp", "caption", "usr"}
+             {"type": "track", ...ObjectTrack}   tracks alive in the segment
+             {"type": "scene", ...SceneSegment}  scenes overlapping it
+
+Tracks and scenes spanning several segments are repeated in each, so a
+window needs nothing outside its own segments.  An empty segment has
+length 0.
+
+A reader inflates the header from the first few KB, reads index entries
+floor(start / segment_s) … floor(end / segment_s) — 16 bytes each, at a
+computed position — then GETs that contiguous run of segments.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import math
+import struct
+import zlib
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+from .chunked_results import encode_jsonl
+
+if TYPE_CHECKING:
+    from pipeline.frame_result import FrameResult
+    from narrative.temporal_assembly import TemporalAssembly
+
+TIMELINE_NAME = "timeline.bin"
+TIMELINE_FORMAT = "video-timeline"
+# Bump when the header, index or record layout changes
+TIMELINE_VERSION = 1
+
+INDEX_ENTRY = struct.Struct("<QII")
+
+# USR fields left out of frame records (rebuilt from the rest on demand)
+_DROPPED_USR_FIELDS = ("vlm_prompt",)
+
+
+def _frame_record(fr: "FrameResult") -> Dict[str, Any]:
+    usr = fr.usr.to_dict_no_embedding()
+    for f in _DROPPED_USR_FIELDS:
+        usr.pop(f, None)
+    return {
+        "type": "frame",
+        "frame_id": fr.frame_id,
+        "timestamp": fr.timestamp,
+        "caption": fr.caption.caption if fr.caption is not None else None,
+        "usr": usr,
+    }
+
+
+def _span_segments(start: float, end: float, segment_s: float, n: int) -> range:
+    return range(min(int(start // segment_s), n - 1), min(int(end // segment_s), n - 1) + 1)
+
+
+def build_timeline(
+    video_id: str,
+    duration: float,
+    frame_results: List["FrameResult"],
+    temporal_assembly: Optional["TemporalAssembly"] = None,
+    segment_s: float = 10.0,
+    level: int = 6,
+) -> bytes:
+    """Header + index + one gzip member per segment_s seconds of video."""
+    last_ts = max((fr.timestamp for fr in frame_results), default=0.0)
+    n = max(1, math.ceil(duration / segment_s), int(last_ts // segment_s) + 1)
+    records: List[List[Dict[str, Any]]] = [[] for _ in range(n)]
+
+    for fr in sorted(frame_results, key=lambda r: r.timestamp):
+        records[min(int(fr.timestamp // segment_s), n - 1)].append(_frame_record(fr))
+    if temporal_assembly is not None:
+        for track in temporal_assembly.object_tracks:
+            for i in _span_segments(track.first_ts, track.last_ts, segment_s, n):
+                records[i].append({"type": "track", **asdict(track)})
+        for scene in temporal_assembly.scenes:
+            for i in _span_segments(scene.start_ts, scene.end_ts, segment_s, n):
+                records[i].append({"type": "scene", **asdict(scene)})
+
+    index, members, offset = [], [], 0
+    for segment in records:
+        member = gzip.compress(encode_jsonl(segment), compresslevel=level, mtime=0) if segment else b""
+        index.append(INDEX_ENTRY.pack(offset, len(member), len(segment)))
+        members.append(member)
+        offset += len(member)
+
+    header = {
+        "format": TIMELINE_FORMAT,
+        "version": TIMELINE_VERSION,
+        "video_id": video_id,
+        "duration": duration,
+        "segment_s": segment_s,
+        "segments": n,
+        "frames": len(frame_results),
+    }
+    return gzip.compress(encode_jsonl([header]), compresslevel=level, mtime=0) + b"".join(index) + b"".join(members)
+
+
+def read_timeline_window(data: bytes, start: float, end: float) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    {"frames", "tracks", "scenes"} overlapping [start, end] from a whole
+    timeline in memory — frames by timestamp, tracks / scenes once each.
+    """
+    inflater = zlib.decompressobj(wbits=31)
+    header = json.loads(inflater.decompress(data))
+    index_at = len(data) - len(inflater.unused_data)
+    n, segment_s = header["segments"], header["segment_s"]
+    base = index_at + n * INDEX_ENTRY.size
+
+    out: Dict[str, Dict[Any, Dict[str, Any]]] = {"frames": {}, "tracks": {}, "scenes": {}}
+    for i in _span_segments(max(start, 0.0), max(end, 0.0), segment_s, n):
+        offset, length, _ = INDEX_ENTRY.unpack_from(data, index_at + i * INDEX_ENTRY.size)
+        if not length:
+            continue
+        for line in gzip.decompress(data[base + offset:base + offset + length]).splitlines():
+            r = json.loads(line)
+            kind = r.pop("type")
+            if kind == "frame" and start <= r["timestamp"] <= end:
+                out["frames"][r["frame_id"]] = r
+            elif kind == "track" and r["first_ts"] <= end and r["last_ts"] >= start:
+                out["tracks"][r["track_id"]] = r
+            elif kind == "scene" and r["start_ts"] <= end and r["end_ts"] >= start:
+                out["scenes"][r["start_ts"]] = r
+    return {k: list(v.values()) for k, v in out.items()}
@@ -11,6 +11,10 @@ Usage:
     result = pipeline.process("path/to/video.mp4", video_id="abc123")
     print(result.summary())
 
+Staged (GPU half and narrative half on different threads):
+    analysis = pipeline.analyze("path/to/video.mp4", video_id="abc123")
+    result = pipeline.finish(analysis)      # narrative + diagnostics
+
 Dry-run (no GPU / no model weights required):
     pipeline = VideoPipeline(dry_run=True)
     result = pipeline.process("path/to/video.mp4")
@@ -23,15 +27,22 @@ import os
 import time
 import traceback
 import warnings
-from collections import deque
-from typing import Deque, List, Optional
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 
 import torch
 
 from narrative.narrative_generator import NarrativeGenerator
 from narrative.temporal_assembly import TemporalAssembly
+from pipeline.action_scheduler import ActionScheduler
+from pipeline.checkpoint import FrameCheckpoint
+from optimization.tracing import tracer
+from pipeline.clip_buffer import ClipRingBuffer
 from pipeline.frame_pipeline import FramePipeline
+from perception.action_recognizer import ActionRecognizer
+from perception.base import PerceptionOutput
 from pipeline.frame_result import FrameResult
+from pipeline.perception_cache import video_content_hash
 from pipeline.video_processor import FrameData, VideoProcessor
 from pipeline.video_result import VideoResult
 
@@ -59,15 +70,39 @@ class _DryRunNarrativeGenerator:
         )
 
 
+@dataclass
+class VideoAnalysis:
+    """
+    Everything process() has before the narrative: the GPU half of a run.
+
+    finish() turns it into a VideoResult; it holds no model state, so the
+    narrative can be generated on another thread while the next video is
+    analysed.
+    """
+    video_path: str
+    video_id: str
+    duration: float
+    frame_results: List[FrameResult]
+    temporal_assembly: TemporalAssembly
+    processing_time: float      # seconds spent in analyze()
+    # Streamed input only: seconds from download start to the first decoded
+    # frame, and the download's throughput report
+    time_to_first_frame: Optional[float] = None
+    download_stats: Optional[dict] = None
+
+
 class VideoPipeline:
     """
     Full video processing pipeline: MP4 → frames → per-frame analysis → narrative.
 
     Processing steps:
     1. VideoProcessor extracts sampled frames + full audio
-    2. FramePipeline processes each frame (with rolling clip buffer for SlowFast)
-    3. TemporalAssembly aggregates all FrameResults
-    4. NarrativeGenerator calls Claude API for final narrative
+    2. ActionScheduler scores SlowFast on batched windows of dense clips
+       (or, with action_window_s=None, FramePipeline runs SlowFast per frame
+       on a rolling clip buffer)
+    3. FramePipeline processes each frame
+    4. TemporalAssembly aggregates all FrameResults
+    5. NarrativeGenerator calls Claude API for final narrative
 
     Target: 33 s video in < 5 minutes on g5.2xlarge
     """
@@ -83,6 +118,27 @@ class VideoPipeline:
         skip_audio: bool = False,
         dry_run: bool = False,
         disabled_modules: frozenset = frozenset(),
+        analysis_max_side: Optional[int] = 512,
+        gate_threshold: Optional[float] = None,
+        gate_full_every: int = 5,
+        # SlowFast window length (s); None = per-frame clip buffer
+        action_window_s: Optional[float] = 2.0,
+        action_stride_s: Optional[float] = None,
+        action_batch_size: int = 8,
+        device_preprocess: bool = True,
+        # Caption all frames in a batched pass after perception
+        defer_captions: bool = False,
+        vlm_batch_size: Optional[int] = None,
+        vlm_prefix_cache: bool = True,
+        caption_cache_path: Optional[str] = None,
+        caption_cache_mb: float = 256.0,
+        # On-disk perception output cache keyed by video content hash
+        perception_cache_path: Optional[str] = None,
+        perception_cache_gb: float = 4.0,
+        perception_cache_ttl_h: Optional[float] = 72.0,
+        # "segment" = one multi-frame caption per scene segment
+        caption_mode: str = "frame",
+        segment_frame_captions: bool = False,
     ):
         self.device = device
         self.quantize_bits = quantize_bits
@@ -95,6 +151,15 @@ class VideoPipeline:
         self.disabled_modules = disabled_modules
 
         self.video_processor = VideoProcessor(sample_fps=sample_fps)
+        self.action_scheduler = (
+            ActionScheduler(
+                device=device,
+                window_s=action_window_s,
+                stride_s=action_stride_s,
+                batch_size=action_batch_size,
+            )
+            if action_window_s else None
+        )
 
         self.frame_pipeline = FramePipeline(
             device=device,
@@ -102,6 +167,20 @@ class VideoPipeline:
             skip_audio=self.skip_audio,
             dry_run=dry_run,
             disabled_modules=disabled_modules,
+            analysis_max_side=analysis_max_side,
+            gate_threshold=gate_threshold,
+            gate_full_every=gate_full_every,
+            device_preprocess=device_preprocess,
+            defer_captions=defer_captions,
+            vlm_batch_size=vlm_batch_size,
+            vlm_prefix_cache=vlm_prefix_cache,
+            caption_cache_path=caption_cache_path,
+            caption_cache_mb=caption_cache_mb,
+            perception_cache_path=perception_cache_path,
+            perception_cache_gb=perception_cache_gb,
+            perception_cache_ttl_h=perception_cache_ttl_h,
+            caption_mode=caption_mode,
+            segment_frame_captions=segment_frame_captions,
         )
 
         if dry_run:
@@ -113,16 +192,62 @@ class VideoPipeline:
     #  Main entry point
     # ─────────────────────────────────────────────────────────────────
 
-    def process(self, video_path: str, video_id: Optional[str] = None, disabled_modules=None) -> VideoResult:
+    def process(
+        self,
+        video_path: str,
+        video_id: Optional[str] = None,
+        disabled_modules=None,
+        perception_store: Optional[Dict[int, Dict[str, PerceptionOutput]]] = None,
+        checkpoint: Optional[FrameCheckpoint] = None,
+    ) -> VideoResult:
         """
-        Process a full video file end-to-end.
+        Process a full video file end-to-end: analyze() then finish().
+
+        Returns:
+            VideoResult containing narrative, frame results, and diagnostics.
+        """
+        analysis = self.analyze(
+            video_path,
+            video_id=video_id,
+            disabled_modules=disabled_modules,
+            perception_store=perception_store,
+            checkpoint=checkpoint,
+        )
+        return self.finish(analysis)
+
+    def analyze(
+        self,
+        video_path: str,
+        video_id: Optional[str] = None,
+        disabled_modules=None,
+        perception_store: Optional[Dict[int, Dict[str, PerceptionOutput]]] = None,
+        checkpoint: Optional[FrameCheckpoint] = None,
+        download=None,
+    ) -> VideoAnalysis:
+        """
+        Steps 1–7: frames, audio, per-frame analysis and temporal assembly.
 
         Args:
             video_path: Absolute or relative path to the MP4 file.
             video_id:   Optional identifier; defaults to the filename stem.
+            perception_store: frame_id → {module class: PerceptionOutput}.
+                        Frames already in the store are replayed from it
+                        (no SlowFast scheduling, no perception model loads);
+                        the others are computed and added.  Lets one
+                        perception pass serve several disabled_modules runs.
+            checkpoint: Saves every completed FrameResult (with tracker
+                        state).  Frames saved by an earlier attempt on the
+                        same video and settings are restored and processing
+                        resumes at the first missing frame.  Not used with
+                        caption_mode="segment" (captions need every frame).
+            download:   A started RangedDownload writing video_path.  Frames
+                        are decoded from its reader() while later ranges
+                        are still downloading; steps that need the whole
+                        file (audio, checkpoint hash, SlowFast windows)
+                        wait for it.
 
         Returns:
-            VideoResult containing narrative, frame results, and diagnostics.
+            VideoAnalysis for finish().
         """
         if video_id is None:
             video_id = os.path.splitext(os.path.basename(video_path))[0]
@@ -143,7 +268,19 @@ class VideoPipeline:
         t_start = time.time()
 
         # ── 1. Video info ─────────────────────────────────────────────
-        info = self.video_processor.get_video_info(video_path)
+        time_to_first_frame = download_stats = None
+        if download is not None:
+            try:
+                with download.reader() as stream:
+                    info = self.video_processor.get_video_info(stream)
+            except IOError as e:
+                # No stream capture in this OpenCV build (< 4.10, or no FFmpeg):
+                # let the download finish and decode the file instead
+                print(f"Streaming decode unavailable ({e}) — waiting for the download")
+                download_stats = self._finish_download(download)
+                download = None
+        if download is None:
+            info = self.video_processor.get_video_info(video_path)
         duration = info["duration"]
         print(f"Video   : {video_path}")
         print(f"ID      : {video_id}")
@@ -152,34 +289,116 @@ class VideoPipeline:
 
         # ── 2. Extract frames ─────────────────────────────────────────
         print("Extracting frames...")
-        all_frames = self.video_processor.extract_frames(video_path)
+        if download is None:
+            with tracer.span("decode", cat="io", sample_fps=self.sample_fps):
+                all_frames = self.video_processor.extract_frames(video_path)
+        else:
+            # Decode as the ranges land; the download finishes in the background
+            all_frames = []
+            with tracer.span("decode", cat="io", sample_fps=self.sample_fps, streaming=True):
+                with download.reader() as stream:
+                    for fd in self.video_processor.iter_frames(stream):
+                        if time_to_first_frame is None:
+                            time_to_first_frame = time.time() - download.started_at
+                        all_frames.append(fd)
+            print(f"Streaming: first frame {time_to_first_frame or 0.0:.2f}s after download start")
+            download_stats = self._finish_download(download)
         print(f"Extracted {len(all_frames)} frames (sample_fps={self.sample_fps})")
 
         # ── 3. Audio extraction ───────────────────────────────────────
         audio = None
         if not self.frame_pipeline.skip_audio:
             print("Extracting audio...")
-            audio = self.video_processor.extract_audio(video_path)
+            with tracer.span("audio.extract", cat="io"):
+                audio = self.video_processor.extract_audio(video_path)
             if audio is not None:
                 print(f"Audio   : {len(audio) / self.video_processor.audio_sample_rate:.1f}s "
                       f"@ {self.video_processor.audio_sample_rate} Hz")
             else:
                 print("Audio   : none (no audio track or extraction failed)")
 
-        # ── 4. Per-frame analysis ─────────────────────────────────────
-        frame_results: List[FrameResult] = []
-
-        # Rolling clip buffer for SlowFast (ActionRecognizer)
-        clip_buffer: Deque[torch.Tensor] = deque(maxlen=self.CLIP_BUFFER_SIZE)
+        # ── 4. Checkpoint: restore completed frames ───────────────────
+        video_hash = None
+        if checkpoint is not None and self.frame_pipeline.caption_mode == "segment":
+            print("Checkpoint: not supported with caption_mode='segment' — disabled")
+            checkpoint = None
+        restored: List[FrameResult] = []
+        resume_state = None
+        if checkpoint is not None:
+            video_hash = video_content_hash(video_path)
+            saved = checkpoint.open({
+                "video_hash": video_hash,
+                "sample_fps": self.sample_fps,
+                "disabled_modules": sorted(effective_dm),
+                "caption_mode": self.frame_pipeline.caption_mode,
+            })
+            for fd in all_frames:
+                if fd.frame_id not in saved:
+                    break
+                result, resume_state = saved[fd.frame_id]
+                restored.append(result)
+            if restored:
+                print(f"Checkpoint: {len(restored)}/{len(all_frames)} frames restored — "
+                      f"resuming at frame {len(restored) + 1}")
+        todo = all_frames[len(restored):]
+
+        # ── 5. Windowed SlowFast ──────────────────────────────────────
+        action_outputs: Dict[int, PerceptionOutput] = {}
+        if perception_store:
+            print(f"Replaying stored perception outputs for {len(perception_store)} frames")
+        # SlowFast outputs already stored for every frame → no clips needed
+        actions_stored = bool(perception_store) and all(
+            "ActionRecognizer" in outputs for outputs in perception_store.values()
+        )
+        use_windows = (
+            self.action_scheduler is not None
+            and not self.dry_run
+            and not actions_stored
+            and not effective_dm & {"action", "fusion"}
+        )
+        if use_windows:
+            print("Scoring SlowFast windows...")
+            with tracer.span("slowfast.windows", cat="perception"):
+                action_outputs = self.action_scheduler.run(
+                    video_path, all_frames, self.video_processor,
+                    frame_ids={fd.frame_id for fd in todo} if restored else None,
+                )
+
+        # ── 6. Per-frame analysis ─────────────────────────────────────
+        frame_results: List[FrameResult] = list(restored)
+        # (result, pipeline state) awaiting their caption before being saved
+        unsaved: List[tuple] = []
+
+        # Perception cache entries belong to this video's content + sampling
+        self.frame_pipeline.cache_scope = None
+        if self.frame_pipeline.perception_cache_path and not self.dry_run:
+            video_hash = video_hash or video_content_hash(video_path)
+            self.frame_pipeline.cache_scope = f"{video_hash}@{self.sample_fps}"
+
+        # Rolling clip buffer for per-frame SlowFast (ActionRecognizer)
+        # (frames stored pre-resized to the SlowFast crop, preallocated once)
+        clip_buffer = None
+        if not use_windows and not actions_stored:
+            clip_buffer = ClipRingBuffer(self.CLIP_BUFFER_SIZE, ActionRecognizer.CROP_SIZE)
 
         with self.frame_pipeline:
-            for fd in all_frames:
+            # Tracks and gate state start fresh for every video
+            self.frame_pipeline.reset()
+            if resume_state is not None:
+                self.frame_pipeline.restore_state(resume_state)
+            if clip_buffer is not None:
+                # The clip of the first resumed frame spans restored frames
+                for fd in all_frames[max(0, len(restored) - self.CLIP_BUFFER_SIZE):len(restored)]:
+                    clip_buffer.append(fd.frame)
+            for fd in todo:
                 i = fd.frame_id
                 print(f"Processing frame {i + 1} (t={fd.timestamp:.1f}s)...",
                       flush=True)
 
-                clip_buffer.append(fd.frame)
-                clip = list(clip_buffer)
+                clip = None
+                if clip_buffer is not None:
+                    clip_buffer.append(fd.frame)
+                    clip = clip_buffer.view()
 
                 # Slice 1 s audio segment at this frame's timestamp
                 audio_segment = None
@@ -196,14 +415,24 @@ class VideoPipeline:
                 timestamp    = fd.timestamp
 
                 try:
-                    result = self.frame_pipeline.process_frame(
-                        frame=frame_tensor,
-                        frame_id=frame_id,
-                        timestamp=timestamp,
-                        audio=audio_segment,
-                        clip=clip,
-                    )
+                    with tracer.context(frame_id=frame_id), \
+                            tracer.span("frame", cat="frame", timestamp=timestamp):
+                        result = self.frame_pipeline.process_frame(
+                            frame=frame_tensor,
+                            frame_id=frame_id,
+                            timestamp=timestamp,
+                            audio=audio_segment,
+                            clip=clip,
+                            actions=action_outputs.get(frame_id),
+                            precomputed=None if perception_store is None else perception_store.get(frame_id),
+                        )
                     frame_results.append(result)
+                    if (perception_store is not None and frame_id not in perception_store
+                            and self.frame_pipeline.last_perception):
+                        perception_store[frame_id] = self.frame_pipeline.last_perception
+                    if checkpoint is not None:
+                        unsaved.append((result, self.frame_pipeline.checkpoint_state()))
+                        unsaved = self._save_checkpoint(checkpoint, unsaved)
                 except Exception as exc:
                     warnings.warn(
                         f"Frame {frame_id} (t={timestamp:.1f}s) failed: {exc}",
@@ -219,33 +448,76 @@ class VideoPipeline:
                     if torch.cuda.is_available():
                         torch.cuda.empty_cache()
 
+            # Deferred captions: one batched Qwen2-VL pass over all frames,
+            # or one multi-frame caption per scene segment
+            temporal_assembly = None
+            try:
+                if self.frame_pipeline.caption_mode == "segment":
+                    print("Captioning scene segments...")
+                    temporal_assembly = TemporalAssembly.from_frame_results(frame_results)
+                    self.frame_pipeline.caption_segments(temporal_assembly.scenes)
+                elif self.frame_pipeline.defer_captions:
+                    print("Captioning frames (batched)...")
+                    self.frame_pipeline.flush_captions()
+            except Exception as exc:
+                warnings.warn(f"Deferred captioning failed: {exc}", RuntimeWarning, stacklevel=2)
+                traceback.print_exc()
+            if checkpoint is not None:
+                self._save_checkpoint(checkpoint, unsaved)
+            # Frames whose caption pass failed have no caption — drop them
+            if any(fr.caption is None for fr in frame_results):
+                frame_results = [fr for fr in frame_results if fr.caption is not None]
+                temporal_assembly = None
+
         if not frame_results:
             raise RuntimeError("All frames failed to process; cannot produce VideoResult.")
 
-        # ── 5. Temporal assembly ──────────────────────────────────────
-        print("Building temporal assembly...")
-        temporal_assembly = TemporalAssembly.from_frame_results(frame_results)
+        # ── 7. Temporal assembly ──────────────────────────────────────
+        if temporal_assembly is None:
+            print("Building temporal assembly...")
+            with tracer.span("temporal_assembly", cat="narrative"):
+                temporal_assembly = TemporalAssembly.from_frame_results(frame_results)
 
-        # ── 6. Narrative generation ───────────────────────────────────
-        print("Generating narrative...")
-        narrative = self.narrative_gen.generate(frame_results, temporal_assembly)
+        return VideoAnalysis(
+            video_path=video_path,
+            video_id=video_id,
+            duration=duration,
+            frame_results=frame_results,
+            temporal_assembly=temporal_assembly,
+            processing_time=time.time() - t_start,
+            time_to_first_frame=time_to_first_frame,
+            download_stats=download_stats,
+        )
 
-        # ── 7. Diagnostics ────────────────────────────────────────────
-        total_time = time.time() - t_start
+    def finish(self, analysis: VideoAnalysis) -> VideoResult:
+        """
+        Steps 8–9: narrative generation and diagnostics.
+
+        Uses no perception model — safe to run on another thread while
+        analyze() works on the next video.
+        """
+        t_start = time.time()
+        frame_results = analysis.frame_results
+
+        # ── 8. Narrative generation ───────────────────────────────────
+        print("Generating narrative...")
+        with tracer.span("narrative", cat="narrative"):
+            narrative = self.narrative_gen.generate(frame_results, analysis.temporal_assembly)
 
-        n_frames = len(frame_results)
+        # ── 9. Diagnostics ────────────────────────────────────────────
+        total_time = analysis.processing_time + (time.time() - t_start)
 
         # Peak VRAM = max across all frames
         vram_values = [fr.peak_vram_gb for fr in frame_results if fr.peak_vram_gb is not None]
         peak_vram = max(vram_values) if vram_values else None
 
         result = VideoResult(
-            video_path=video_path,
-            video_id=video_id,
-            duration=duration,
+            video_path=analysis.video_path,
+            video_id=analysis.video_id,
+            duration=analysis.duration,
             frame_count=len(frame_results),
             frame_results=frame_results,
-            temporal_assembly=temporal_assembly,
+            temporal_assembly=analysis.temporal_assembly,
             narrative=narrative,
             total_processing_time=round(total_time, 3),
             peak_vram_gb=peak_vram,
@@ -253,3 +525,28 @@ class VideoPipeline:
 
         print(result.summary())
         return result
+
+    @staticmethod
+    def _save_checkpoint(checkpoint: FrameCheckpoint, unsaved: List[tuple]) -> List[tuple]:
+        """Save every captioned frame; return the ones still awaiting a caption."""
+        waiting = []
+        for result, state in unsaved:
+            if result.caption is None:
+                waiting.append((result, state))
+                continue
+            try:
+                checkpoint.save(result, state)
+            except Exception as exc:
+                # A lost checkpoint only costs work on a retry — keep going
+                warnings.warn(f"Checkpoint save failed for frame {result.frame_id}: {exc}",
+                              RuntimeWarning, stacklevel=2)
+        return waiting
+
+    @staticmethod
+    def _finish_download(download) -> dict:
+        """Join a RangedDownload and record it as a span; returns its stats."""
+        with tracer.span("download.wait", cat="io"):
+            stats = download.wait()
+        tracer.add("download", download.started_at, download.started_at + stats["seconds"],
+                   cat="io", bytes=stats["bytes"], mb_per_s=stats["mb_per_s"])
+        return stats
@@ -1,7 +1,9 @@
 """
 VideoProcessor — extracts frames and audio from an MP4 file.
 
-Frame extraction uses OpenCV (cv2.VideoCapture).
+Frame extraction uses OpenCV (cv2.VideoCapture) on a path, or on a binary
+stream through the FFmpeg stream backend — e.g. a RangedDownload reader,
+so frames decode while the file is still downloading.
 Audio extraction uses a subprocess call to ffmpeg, loading the result
 with scipy.io.wavfile for reliability across platforms.
 """
@@ -13,13 +15,35 @@ import subprocess
 import tempfile
 import warnings
 from dataclasses import dataclass
-from typing import Generator, List, Optional
+from typing import BinaryIO, Dict, Generator, List, Optional, Sequence, Tuple, Union
 
 import cv2
 import numpy as np
 import torch
 
 
+# A file path, or a readable + seekable io.BufferedIOBase stream
+VideoSource = Union[str, BinaryIO]
+
+
+def open_capture(source: VideoSource) -> cv2.VideoCapture:
+    """
+    cv2.VideoCapture over a path or a binary stream; IOError if it can't be
+    opened.  Stream capture needs OpenCV ≥ 4.10 built with FFmpeg — older
+    builds reject the stream constructor, which is raised as IOError too.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        cap = cv2.VideoCapture(source)
+    else:
+        try:
+            cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG, [])
+        except (cv2.error, TypeError) as e:
+            raise IOError(f"OpenCV {cv2.__version__} cannot decode from a stream: {e}") from e
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {source}")
+    return cap
+
+
 @dataclass
 class FrameData:
     frame_id: int
@@ -47,16 +71,14 @@ class VideoProcessor:
     #  Frame extraction
     # ─────────────────────────────────────────────────────────────────
 
-    def extract_frames(self, video_path: str) -> List[FrameData]:
+    def extract_frames(self, video_path: VideoSource) -> List[FrameData]:
         """
-        Sample frames from the video at self.sample_fps.
+        Sample frames from the video (path or stream) at self.sample_fps.
 
         Returns:
             List of FrameData (up to MAX_FRAMES), ordered by timestamp.
         """
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise IOError(f"Cannot open video: {video_path}")
+        cap = open_capture(video_path)
 
         source_fps = cap.get(cv2.CAP_PROP_FPS)
         if source_fps <= 0:
@@ -91,15 +113,14 @@ class VideoProcessor:
         cap.release()
         return frames
 
-    def iter_frames(self, video_path: str) -> Generator[FrameData, None, None]:
+    def iter_frames(self, video_path: VideoSource) -> Generator[FrameData, None, None]:
         """
         Memory-efficient generator that yields one FrameData at a time.
         Only one frame tensor is live in RAM at any point — use this in the
         main pipeline instead of extract_frames() to avoid OOM on large videos.
+        With a stream, each frame is yielded as soon as its bytes arrive.
         """
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise IOError(f"Cannot open video: {video_path}")
+        cap = open_capture(video_path)
 
         source_fps = cap.get(cv2.CAP_PROP_FPS)
         if source_fps <= 0:
@@ -130,6 +151,94 @@ class VideoProcessor:
         finally:
             cap.release()
 
+    def iter_clips(
+        self,
+        video_path: str,
+        spans: Sequence[Tuple[float, float]],
+        num_frames: int = 32,
+        max_side: Optional[int] = 256,
+    ) -> Generator[Tuple[int, np.ndarray], None, None]:
+        """
+        Decode dense clips for a list of (start_s, end_s) spans in one
+        sequential pass over the file.
+
+        Each span yields (span_index, (num_frames, H, W, 3) uint8 RGB) with
+        frames evenly spaced across [start, end).  Spans are yielded in
+        order as soon as their last frame is decoded, so only clips still
+        being filled are held in memory.  Source frames no span needs are
+        grabbed but never converted.  Frames are downscaled so the long
+        side is at most max_side (None = source resolution).  Spans that
+        run past the end of the file are padded with their last frame.
+        """
+        if not spans:
+            return
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video: {video_path}")
+
+        source_fps = cap.get(cv2.CAP_PROP_FPS)
+        if source_fps <= 0:
+            source_fps = 25.0
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        # Source frame indices wanted by each span (repeats allowed when the
+        # source is sparser than num_frames over the span)
+        wants = []
+        for start, end in spans:
+            idx = np.floor(np.linspace(start, end, num_frames, endpoint=False) * source_fps)
+            idx = idx.astype(np.int64)
+            if total > 0:
+                idx = np.clip(idx, 0, total - 1)
+            wants.append(idx)
+        users: Dict[int, List[int]] = {}
+        for si, idx in enumerate(wants):
+            for src in idx.tolist():
+                users.setdefault(src, []).append(si)
+        last_needed = max(int(w[-1]) for w in wants)
+
+        buffers: List[Optional[List[np.ndarray]]] = [[] for _ in spans]
+        emitted = 0
+        src = 0
+        last_rgb = None
+        try:
+            while src <= last_needed:
+                if src not in users:
+                    if not cap.grab():
+                        break
+                    src += 1
+                    continue
+                ret, bgr = cap.read()
+                if not ret:
+                    break
+                rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+                if max_side is not None and max(rgb.shape[:2]) > max_side:
+                    scale = max_side / max(rgb.shape[:2])
+                    rgb = cv2.resize(
+                        rgb,
+                        (max(1, round(rgb.shape[1] * scale)), max(1, round(rgb.shape[0] * scale))),
+                        interpolation=cv2.INTER_AREA,
+                    )
+                last_rgb = rgb
+                for si in users[src]:
+                    buffers[si].append(rgb)
+                src += 1
+                while emitted < len(spans) and wants[emitted][-1] < src:
+                    yield emitted, np.stack(buffers[emitted])
+                    buffers[emitted] = None
+                    emitted += 1
+
+            # End of file before every span was filled — pad with last frame
+            for si in range(emitted, len(spans)):
+                frames = buffers[si]
+                pad = frames[-1] if frames else last_rgb
+                if pad is None:
+                    break
+                frames = frames + [pad] * (num_frames - len(frames))
+                yield si, np.stack(frames)
+                buffers[si] = None
+        finally:
+            cap.release()
+
     # ─────────────────────────────────────────────────────────────────
     #  Audio extraction
     # ─────────────────────────────────────────────────────────────────
@@ -238,16 +347,14 @@ class VideoProcessor:
     #  Video info
     # ─────────────────────────────────────────────────────────────────
 
-    def get_video_info(self, video_path: str) -> dict:
+    def get_video_info(self, video_path: VideoSource) -> dict:
         """
-        Return basic video metadata.
+        Return basic video metadata (path or stream).
 
         Returns:
             {duration, fps, width, height, frame_count}
         """
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise IOError(f"Cannot open video: {video_path}")
+        cap = open_capture(video_path)
 
         fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
         frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
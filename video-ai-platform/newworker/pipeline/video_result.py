@@ -9,7 +9,7 @@ from __future__ import annotations
 
 import json
 from dataclasses import dataclass, field
-from typing import List, Optional, TYPE_CHECKING
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from pipeline.frame_result import FrameResult
@@ -109,6 +109,9 @@ class VideoResult:
     total_processing_time: float        # wall-clock seconds for full video
     peak_vram_gb: Optional[float] = None
 
+    # ── Binary sidecars: name → S3 key (set by the worker after upload) ──
+    sidecars: Dict[str, str] = field(default_factory=dict)
+
     # ─────────────────────────────────────────────────────────────────
     #  Target check
     # ─────────────────────────────────────────────────────────────────
@@ -124,6 +127,28 @@ class VideoResult:
     #  Serialisation
     # ─────────────────────────────────────────────────────────────────
 
+    def mask_sidecar(self) -> Optional[bytes]:
+        """Per-video panoptic RLE masks as compressed .npz bytes (None if none)."""
+        from pipeline.sidecars import build_mask_sidecar
+        return build_mask_sidecar(self.frame_results)
+
+    def embedding_sidecar(self, dtype: str = "float16") -> Optional[bytes]:
+        """Per-frame SigLIP embeddings as .npz bytes (None if no frames)."""
+        from pipeline.sidecars import build_embedding_sidecar
+        return build_embedding_sidecar(self.frame_results, dtype=dtype)
+
+    def timeline(self, segment_s: float = 10.0) -> bytes:
+        """Per-frame records in segment_s-second segments (see pipeline/timeline.py)."""
+        from pipeline.timeline import build_timeline
+        return build_timeline(
+            self.video_id, self.duration, self.frame_results, self.temporal_assembly, segment_s=segment_s,
+        )
+
+    def chunked_results(self) -> bytes:
+        """to_dict() as analysis.jsonl.gz bytes (see pipeline/chunked_results.py)."""
+        from pipeline.chunked_results import build_chunked_results, split_sections
+        return build_chunked_results(self.video_id, split_sections(self.to_dict()))
+
     def to_dict(self) -> dict:
         """
         Serialise to a JSON-safe dict.
@@ -228,6 +253,8 @@ class VideoResult:
             # Temporal summary counts
             "num_scenes": len(self.temporal_assembly.scenes),
             "num_object_tracks": len(self.temporal_assembly.object_tracks),
+            # Binary sidecar references (masks, embeddings)
+            "sidecars": dict(self.sidecars),
         }
 
     def to_json(self, indent: int = 2) -> str:
@@ -11,6 +11,7 @@ Tests each perception module individually to verify:
 Run with: python tests/test_perception.py
 """
 
+import numpy as np
 import torch
 import sys
 import os
@@ -59,8 +60,9 @@ def test_siglip():
     # Verify output
     print("\n3. Verifying output...")
     assert output.module_name == "SigLIPEncoder"
-    assert "vision_embedding" in output.data
-    assert len(output.data["vision_embedding"]) == 768
+    assert "vision_embedding" in output.artifacts
+    assert output.artifacts["vision_embedding"].shape == (768,)
+    assert output.artifacts["vision_embedding"].dtype == np.float16
     print(f"   ✓ Embedding dimension: {output.data['embedding_dim']}")
     print(f"   ✓ Processing time: {output.processing_time:.3f}s")
     if output.gpu_memory_used:
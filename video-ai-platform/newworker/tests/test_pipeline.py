@@ -22,6 +22,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from optimization import TimingProfiler
 from pipeline import FramePipeline, FrameResult
+from vlm import Qwen2VLCaptioner
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -291,6 +292,523 @@ def test_real_pipeline_timing(force: bool = False):
     return True
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+#  Cascade gating harness
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Simulated per-call cost (s) of each GPU module — proportions follow the
+# real load → infer → unload timings, scaled down so the test stays fast
+_SIM_COST = {
+    "SigLIPEncoder": 0.004,
+    "DepthEstimator": 0.006,
+    "PanopticSegmenter": 0.030,
+    "ActionRecognizer": 0.020,
+    "AudioProcessor": 0.0,
+}
+
+
+class _NullCaptioner:
+    def unload(self):
+        pass
+
+
+class _SimulatedPipeline(FramePipeline):
+    """
+    FramePipeline whose GPU modules are replaced by timed stand-ins.
+
+    Frames belong to "shots": SigLIP returns the shot's embedding plus a
+    little noise, so consecutive frames in a shot are near-duplicates and
+    a cut produces a large cosine distance.  The real SceneGraph and
+    ByteTracker run on the simulated detections.
+    """
+
+    def __init__(self, shots, **kwargs):
+        kwargs.setdefault("disabled_modules", frozenset({"vlm", "audio"}))
+        # "vlm" is disabled by default, so the captioner is only unloaded
+        kwargs.setdefault("captioner", _NullCaptioner())
+        super().__init__(device="cpu", **kwargs)
+        self.shots = shots               # frame_id → shot index
+        self.calls = {}
+        rng = np.random.default_rng(0)
+        self._centres = rng.normal(size=(max(shots) + 1, 768)).astype(np.float32)
+        self._rng = rng
+
+    def _run_gpu_module(self, class_name, frame, frame_id, timestamp, **kwargs):
+        from perception.base import PerceptionOutput
+
+        self.calls[class_name] = self.calls.get(class_name, 0) + 1
+        time.sleep(_SIM_COST[class_name])
+        data, artifacts = {}, {}
+        shot = self.shots[frame_id]
+        if class_name == "SigLIPEncoder":
+            noise = self._rng.normal(scale=0.05, size=768).astype(np.float32)
+            artifacts["vision_embedding"] = (self._centres[shot] + noise).astype(np.float16)
+        elif class_name == "PanopticSegmenter":
+            x = 40.0 + 4.0 * frame_id
+            data = {
+                "things": [{"id": 1, "label": "person", "bbox": [x, 50.0, x + 60.0, 200.0],
+                            "coverage": 0.2}],
+                "stuff": [],
+                "num_things": 1,
+                "num_stuff": 0,
+            }
+        elif class_name == "ActionRecognizer":
+            data = {"actions": [{"action": f"action_{shot}", "confidence": 0.9}]}
+        return PerceptionOutput(
+            module_name=class_name, frame_id=frame_id, timestamp=timestamp,
+            data=data, metadata={}, processing_time=_SIM_COST[class_name],
+            gpu_memory_used=None, artifacts=artifacts,
+        )
+
+
+def _run_simulated(shots, frames, **kwargs):
+    pipeline = _SimulatedPipeline(shots, **kwargs)
+    t0 = time.perf_counter()
+    with pipeline:
+        results = [
+            pipeline.process_frame(f, frame_id=i, timestamp=float(i))
+            for i, f in enumerate(frames)
+        ]
+    return results, time.perf_counter() - t0, pipeline.calls
+
+
+def test_cascade_gating():
+    """Gated run skips Mask2Former/SlowFast on static shots and saves time."""
+    print("\n" + "=" * 70)
+    print("TEST 9: Cascade gating — time saved vs ungated run")
+    print("=" * 70)
+
+    shots = [0] * 8 + [1] * 6 + [2] * 6       # two cuts, at frames 8 and 14
+    frames = [_frame(64, 64) for _ in shots]
+
+    base_results, base_s, base_calls = _run_simulated(shots, frames)
+    gated_results, gated_s, gated_calls = _run_simulated(
+        shots, frames, gate_threshold=0.05, gate_full_every=4,
+    )
+
+    gates = [r.usr.processing_metadata["gate"] for r in gated_results]
+    decisions = [g["modules"]["panoptic"] for g in gates]
+    print(f"  Decisions : {' '.join('R' if d == 'reused' else 'F' for d in decisions)}")
+
+    # Ungated run never records a gate; gated run records every frame
+    assert all("gate" not in r.usr.processing_metadata for r in base_results)
+    assert base_calls["PanopticSegmenter"] == len(shots)
+
+    # First frame and each cut force a full pass
+    for i in (0, 8, 14):
+        assert decisions[i] == "ran", f"frame {i} should run fully"
+    assert gates[8]["cosine_distance"] > 0.05
+
+    # Never more than gate_full_every - 1 reused frames in a row
+    run = longest = 0
+    for d in decisions:
+        run = run + 1 if d == "reused" else 0
+        longest = max(longest, run)
+    assert longest <= 3, longest
+
+    n_full = decisions.count("ran")
+    assert gated_calls["PanopticSegmenter"] == n_full
+    assert gated_calls["ActionRecognizer"] == n_full
+    assert gated_calls["SigLIPEncoder"] == len(shots)
+    assert n_full < len(shots)
+
+    # Reused outputs keep the reference frame's content
+    r = gated_results[1]
+    assert r.usr.processing_metadata["gate"]["modules"]["tracker"] == "coasted"
+    assert r.usr.actions == gated_results[0].usr.actions == [{"action": "action_0", "confidence": 0.9}]
+
+    # Tracker coasts through gated frames without losing identity
+    ids = {t["track_id"] for r in gated_results for t in r.usr.objects}
+    assert len(ids) == 1, ids
+
+    saved = base_s - gated_s
+    print(f"  Ungated   : {base_s * 1000:.0f} ms  ({base_calls['PanopticSegmenter']} full passes)")
+    print(f"  Gated     : {gated_s * 1000:.0f} ms  ({n_full} full passes)")
+    print(f"  Saved     : {saved * 1000:.0f} ms  ({saved / base_s:.0%})")
+    assert gated_s < base_s
+
+    print("\n✅ TEST 9 PASSED")
+    return True
+
+
+class _ScriptedQwen(Qwen2VLCaptioner):
+    """Qwen2VLCaptioner with a fixed-cost generate call per batch (no model)."""
+
+    GENERATE_COST = 0.02     # s per generate call, roughly batch-size independent
+
+    def __init__(self):
+        super().__init__(device="cpu", batch_size=4)
+        self._model = object()           # is_loaded()
+        self.calls = []
+
+    def _generate(self, conversations):
+        self.calls.append(len(conversations))
+        time.sleep(self.GENERATE_COST)
+        return [(f"Scene for prompt of {len(m[1]['content'][-1]['text'])} chars, "
+                 f"{len(m[1]['content'])} parts.", 8) for m in conversations]
+
+    def unload(self):
+        pass
+
+
+def test_deferred_captions():
+    """defer_captions holds frames and captions them in batched calls."""
+    print("\n" + "=" * 70)
+    print("TEST 10: Deferred, batched Qwen2-VL captioning")
+    print("=" * 70)
+
+    shots = [0] * 10
+    frames = [_frame(96, 128) for _ in shots]
+    dm = frozenset({"audio"})
+
+    serial_cap = _ScriptedQwen()
+    serial, serial_s, _ = _run_simulated(shots, frames, disabled_modules=dm, captioner=serial_cap)
+
+    deferred_cap = _ScriptedQwen()
+    pipeline = _SimulatedPipeline(
+        shots, disabled_modules=dm, captioner=deferred_cap, defer_captions=True,
+    )
+    t0 = time.perf_counter()
+    with pipeline:
+        deferred = [pipeline.process_frame(f, frame_id=i, timestamp=float(i))
+                    for i, f in enumerate(frames)]
+        assert all(r.caption is None for r in deferred)
+        assert pipeline.flush_captions() == len(shots)
+        assert pipeline.flush_captions() == 0
+    deferred_s = time.perf_counter() - t0
+
+    assert serial_cap.calls == [1] * len(shots)
+    assert deferred_cap.calls == [4, 4, 2], deferred_cap.calls
+    for a, b in zip(serial, deferred):
+        assert b.caption.frame_id == b.frame_id
+        assert b.caption.caption == a.caption.caption
+        assert b.caption.metadata["image_provided"]
+        assert abs(b.total_time - sum(b.step_times.values())) < 1e-9
+        assert b.step_times["vlm"] >= b.caption.processing_time
+
+    # Automatic flush once MAX_PENDING_CAPTIONS frames are held
+    pipeline = _SimulatedPipeline(
+        shots, disabled_modules=dm, captioner=_ScriptedQwen(), defer_captions=True,
+    )
+    pipeline.MAX_PENDING_CAPTIONS = 6
+    with pipeline:
+        results = [pipeline.process_frame(f, frame_id=i, timestamp=float(i))
+                   for i, f in enumerate(frames)]
+        assert [r.caption is not None for r in results] == [True] * 6 + [False] * 4
+        pipeline.flush_captions()
+    assert all(r.caption is not None for r in results)
+
+    print(f"  Serial   : {len(serial_cap.calls)} generate calls, {serial_s * 1000:.0f} ms")
+    print(f"  Deferred : {len(deferred_cap.calls)} generate calls {deferred_cap.calls}, "
+          f"{deferred_s * 1000:.0f} ms")
+
+    print("\n✅ TEST 10 PASSED")
+    return True
+
+
+def test_segment_captions():
+    """caption_mode="segment": one Qwen2-VL call per scene segment."""
+    print("\n" + "=" * 70)
+    print("TEST 11: Segment-level multi-frame captions")
+    print("=" * 70)
+
+    from narrative import TemporalAssembly
+    from narrative.temporal_assembly import SceneSegment
+
+    shots = [0] * 10
+    frames = [_frame(96, 128) for _ in shots]
+    dm = frozenset({"audio"})
+
+    def segments():
+        return [
+            SceneSegment(0.0, 6.0, "urban", [], [], None, frame_ids=list(range(6))),
+            SceneSegment(6.0, 9.0, "indoor", [], [], None, frame_ids=list(range(6, 10))),
+        ]
+
+    for frame_captions in (False, True):
+        qwen = _ScriptedQwen()
+        pipeline = _SimulatedPipeline(
+            shots, disabled_modules=dm, captioner=qwen,
+            caption_mode="segment", segment_frame_captions=frame_captions,
+        )
+        with pipeline:
+            results = [pipeline.process_frame(f, frame_id=i, timestamp=float(i))
+                       for i, f in enumerate(frames)]
+            assert all(r.caption is None for r in results)
+            scenes = segments()
+            assert pipeline.caption_segments(scenes) == 2
+
+        assert all(s.caption for s in scenes)
+        assert all(r.caption is not None for r in results)
+        sources = {r.caption.metadata.get("source") for r in results}
+        if frame_captions:
+            assert qwen.calls == [4, 4, 2, 1, 1], qwen.calls      # frames batched, then 2 segments
+            assert sources == {None}
+        else:
+            assert qwen.calls == [1, 1], qwen.calls
+            assert sources == {"segment"}
+            assert results[7].caption.caption == scenes[1].caption
+            assert results[7].caption.frame_id == 7 and results[7].caption.tokens_generated == 0
+            seg_results, seg_scenes = results, scenes
+        assert results[0].step_times["vlm"] > 0
+        print(f"  frame_captions={frame_captions!s:<5}: generate calls {qwen.calls}")
+
+    # Narrative prompt carries the segment captions, not 10 copies of them
+    from narrative import NarrativeGenerator
+    assembly = TemporalAssembly.from_frame_results(seg_results)
+    assembly.scenes = seg_scenes
+    prompt = NarrativeGenerator._build_prompt(seg_results, assembly)
+    assert "SCENE SEGMENTS" in prompt
+    assert prompt.count("VLM Caption") == 2
+    print(f"  Narrative prompt: {prompt.count('VLM Caption')} caption lines for {len(frames)} frames")
+
+    try:
+        FramePipeline(dry_run=True, caption_mode="scene")
+        raise AssertionError("unknown caption_mode accepted")
+    except ValueError:
+        pass
+
+    print("\n✅ TEST 11 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Perception output cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _SimModule:
+    """Stand-in perception module: settings as attributes, counted loads."""
+
+    def __init__(self, pipeline, **settings):
+        self.name = type(self).__name__
+        self.device = "cpu"
+        self.__dict__.update(settings)
+        self._pipeline = pipeline
+
+    def load_model(self):
+        self._pipeline.loads[self.name] = self._pipeline.loads.get(self.name, 0) + 1
+        time.sleep(_SIM_COST[self.name])
+
+    def __call__(self, frame, frame_id, timestamp, **kwargs):
+        return _SimulatedPipeline._run_gpu_module(
+            self._pipeline, self.name, frame, frame_id, timestamp, **kwargs
+        )
+
+    def unload(self):
+        pass
+
+
+class _CachedSimPipeline(_SimulatedPipeline):
+    """Simulated modules run through FramePipeline's real cache path."""
+
+    def __init__(self, shots, **kwargs):
+        super().__init__(shots, **kwargs)
+        self.loads = {}
+
+    def _run_gpu_module(self, class_name, frame, frame_id, timestamp, **kwargs):
+        settings = {"model_name": f"sim/{class_name}"}
+        if class_name in ("DepthEstimator", "PanopticSegmenter"):
+            settings["analysis_max_side"] = self.analysis_max_side
+        module = type(class_name, (_SimModule,), {})(self, **settings)
+
+        def run():
+            module.load_model()
+            try:
+                return module(frame, frame_id, timestamp, **kwargs)
+            finally:
+                module.unload()
+
+        return self._cached(module, frame, frame_id, timestamp, inputs=kwargs, run=run)
+
+
+def test_perception_cache():
+    """Reruns and ablations reuse cached perception outputs per module."""
+    print("\n" + "=" * 70)
+    print("TEST 12: Perception output cache — reruns skip model loads")
+    print("=" * 70)
+
+    import tempfile
+    from pipeline.perception_cache import PerceptionCache
+
+    shots = [0, 0, 0, 1, 1, 1]
+    frames = [_frame(96, 128) for _ in shots]
+
+    def run(scope, **kwargs):
+        pipeline = _CachedSimPipeline(shots, perception_cache_path=path, **kwargs)
+        t0 = time.perf_counter()
+        with pipeline:
+            pipeline.cache_scope = scope
+            results = [
+                pipeline.process_frame(f, frame_id=i, timestamp=float(i))
+                for i, f in enumerate(frames)
+            ]
+            stats = pipeline._perception_cache.stats()
+        return results, pipeline.loads, stats, time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "perception.sqlite")
+        cold, cold_loads, cold_stats, cold_t = run("video-a")
+        assert cold_loads == {"SigLIPEncoder": 6, "DepthEstimator": 6, "PanopticSegmenter": 6,
+                              "ActionRecognizer": 6}
+        assert all(m["hits"] == 0 for m in cold_stats["modules"].values())
+
+        # Rerun (SQS retry): nothing loads, outputs identical
+        warm, warm_loads, warm_stats, warm_t = run("video-a")
+        assert warm_loads == {}
+        assert all(m["hit_rate"] == 1.0 for m in warm_stats["modules"].values())
+        assert set(warm_stats["modules"]) == {"SigLIPEncoder", "DepthEstimator", "PanopticSegmenter",
+                                              "SceneGraphGenerator", "ActionRecognizer"}
+        for c, w in zip(cold, warm):
+            assert w.usr.processing_metadata["perception_cache"]["PanopticSegmenter"] == "hit"
+            assert c.usr.panoptic == w.usr.panoptic and c.usr.scene_graph == w.usr.scene_graph
+            assert c.usr.actions == w.usr.actions and w.frame_id == c.frame_id
+        print(f"  Cold run {cold_t * 1000:.0f} ms → rerun {warm_t * 1000:.0f} ms "
+              f"({warm_stats['entries']} entries, {warm_stats['bytes']} B)")
+        assert warm_t < cold_t
+
+        # Config change: only the affected modules recompute; the scene
+        # graph's inputs are unchanged so it still hits
+        _, loads, stats, _ = run("video-a", analysis_max_side=256)
+        assert loads == {"DepthEstimator": 6, "PanopticSegmenter": 6}
+        assert stats["modules"]["SceneGraphGenerator"]["hit_rate"] == 1.0
+        print(f"  analysis_max_side changed → recomputed {sorted(loads)}")
+
+        # Different video content: all misses
+        _, loads, _, _ = run("video-b")
+        assert loads["SigLIPEncoder"] == 6
+
+    # TTL expiry and size-bounded LRU eviction
+    from perception.base import PerceptionOutput
+
+    def out(i):
+        return PerceptionOutput(
+            module_name="DepthEstimator", frame_id=i, timestamp=float(i),
+            data={"v": i}, metadata={}, processing_time=0.1,
+            artifacts={"map": np.full((32, 32), i, dtype=np.float32)},
+        )
+
+    ttl = PerceptionCache(":memory:", ttl_s=0.05)
+    ttl.put("k", out(0))
+    assert ttl.get("k", "DepthEstimator", 0, 0.0) is not None
+    time.sleep(0.1)
+    assert ttl.get("k", "DepthEstimator", 0, 0.0) is None and ttl.expired == 1
+
+    lru = PerceptionCache(":memory:", max_bytes=10**9, ttl_s=None)
+    for i in range(3):
+        lru.put(f"k{i}", out(i))
+    per_entry = lru.stats()["bytes"] // 3
+    lru.max_bytes = 3 * per_entry + per_entry // 2
+    hit = lru.get("k0", "DepthEstimator", 7, 7.0)              # refresh k0
+    assert hit.frame_id == 7 and hit.data == {"v": 0} and hit.metadata["cache_hit"]
+    assert float(hit.artifacts["map"][0, 0]) == 0.0
+    lru.put("k3", out(3))
+    assert lru.get("k1", "DepthEstimator", 1, 1.0) is None     # least recently used
+    assert lru.get("k0", "DepthEstimator", 0, 0.0) is not None and lru.evictions == 1
+    print(f"  TTL / LRU: {lru.stats()['modules']}")
+
+    print("\n✅ TEST 12 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Span tracer
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_span_tracer():
+    """Nested per-thread spans with context args, Chrome trace export, overhead."""
+    print("\n" + "=" * 70)
+    print("TEST 13: Span tracer — nested spans, Chrome trace, overhead")
+    print("=" * 70)
+
+    import threading
+    from optimization import chrome_trace, format_summary, summarize, tracer
+    from perception.base import BasePerceptionModule
+
+    class _Toy(BasePerceptionModule):
+        def load_model(self):
+            self.model = object()
+
+        def preprocess(self, frame):
+            return frame.float()
+
+        def inference(self, x):
+            return {"mean": float(x.mean())}
+
+        def postprocess(self, raw):
+            return raw
+
+    # Disabled (default): nothing recorded
+    assert not tracer.enabled
+    with tracer.span("ignored"):
+        pass
+    assert tracer.spans() == []
+
+    tracer.enable(memory=True)
+    try:
+        with tracer.context(video_id="vid-trace"):
+            with FramePipeline(dry_run=True) as pipeline:
+                for i in range(3):
+                    with tracer.context(frame_id=i), tracer.span("frame", cat="frame"):
+                        pipeline.process_frame(_frame(), frame_id=i, timestamp=float(i))
+            with tracer.context(frame_id=9):
+                _Toy(device="cpu")(_frame(), frame_id=9, timestamp=9.0)
+
+            def worker():
+                # Context is per thread — each stage thread sets its own
+                with tracer.context(video_id="vid-trace"), tracer.span("upload", cat="io", bytes=10):
+                    time.sleep(0.002)
+            t = threading.Thread(target=worker, name="worker-post")
+            t.start()
+            t.join()
+        with tracer.span("other-video", video_id="vid-other"):
+            pass
+
+        spans = tracer.pop("vid-trace")
+        assert [s.name for s in tracer.spans()] == ["other-video"]
+    finally:
+        tracer.disable()
+        tracer.clear()
+
+    names = [s.name for s in spans]
+    frames = [s for s in spans if s.name == "frame"]
+    assert len(frames) == 3 and names.count("siglip") == 3 and names.count("vlm") == 3
+    assert {"_Toy.preprocess", "_Toy.inference", "_Toy.postprocess"} <= set(names)
+
+    # Steps nest inside their frame span, on the same thread, with its frame_id
+    for s in spans:
+        if s.cat != "step":
+            continue
+        parent = frames[s.args["frame_id"]]
+        assert parent.args["frame_id"] == s.args["frame_id"] and s.tid == parent.tid
+        assert parent.start_ns <= s.start_ns and s.start_ns + s.dur_ns <= parent.start_ns + parent.dur_ns
+    assert all(s.args["video_id"] == "vid-trace" for s in spans)
+    assert all(s.rss_delta_mb is not None for s in spans)
+
+    upload = next(s for s in spans if s.name == "upload")
+    assert upload.tid != frames[0].tid and upload.args == {"video_id": "vid-trace", "bytes": 10}
+
+    summary = summarize(spans, overhead_us=10.0)
+    assert summary["spans"] == len(spans) and summary["steps"]["frame"]["count"] == 3
+    assert summary["steps"]["upload"]["total_ms"] >= 2.0
+    trace = json.loads(json.dumps(chrome_trace(spans, summary=summary)))
+    events = trace["traceEvents"]
+    complete = [e for e in events if e["ph"] == "X"]
+    threads = {e["args"]["name"] for e in events if e["name"] == "thread_name"}
+    assert len(complete) == len(spans) and "worker-post" in threads
+    assert all(e["dur"] >= 0 and e["ts"] > 1e15 for e in complete)    # epoch µs
+    assert trace["otherData"]["steps"]["frame"]["count"] == 3
+    print(format_summary(summary, top=8))
+
+    overhead = tracer.measure_overhead(n=5000)
+    print(f"  Overhead per span: {overhead}")
+    assert overhead["disabled_us"] < overhead["enabled_us"] <= overhead["memory_us"] * 1.5
+    assert overhead["memory_us"] < 200
+    assert tracer.spans() == []
+
+    print("\n✅ TEST 13 PASSED")
+    return True
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 #  Runner
 # ─────────────────────────────────────────────────────────────────────────────
@@ -308,6 +826,11 @@ def run_all_tests(run_gpu: bool = False):
         ("Dry-run 5 frames",                test_dry_run_multiple_frames),
         ("Error before setup",              test_pipeline_error_before_setup),
         ("Profiler summary format",         test_profiler_summary_format),
+        ("Cascade gating",                  test_cascade_gating),
+        ("Deferred batched captions",       test_deferred_captions),
+        ("Segment captions",                test_segment_captions),
+        ("Perception output cache",         test_perception_cache),
+        ("Span tracer",                     test_span_tracer),
         ("Real pipeline <5s (GPU)",         lambda: test_real_pipeline_timing(force=run_gpu)),
     ]
 
@@ -0,0 +1,813 @@
+"""
+Post-processing Test Suite — vectorised perception kernels
+
+Checks that the numpy kernels used by the perception post-processing
+produce exactly the same output as the straightforward per-mask code
+they replace, and prints a small benchmark for realistic frame sizes.
+
+All tests run on CPU with synthetic data — no model weights needed.
+
+Run with:  python tests/test_postprocess.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perception.utils.mask_ops import (
+    RLEMask,
+    analysis_size,
+    encode_segments,
+    rescale_bbox,
+    rle_intersection_area,
+    rle_iou,
+    rle_shift,
+    segment_stats,
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Shared helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _synthetic_panoptic_map(
+    num_segments: int,
+    h: int = 1080,
+    w: int = 1920,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Blocky segment-ID map: a coarse random grid upsampled to (h, w).
+
+    IDs run 1..num_segments; 0 is left as unlabeled background so the
+    kernel must ignore pixels that belong to no segment.
+    """
+    rng = np.random.default_rng(seed)
+    gh, gw = 27, 48
+    grid = rng.integers(0, num_segments + 1, (gh, gw), dtype=np.int32)
+    ys = np.arange(h) * gh // h
+    xs = np.arange(w) * gw // w
+    return grid[ys[:, None], xs[None, :]]
+
+
+def _reference_segment_stats(panoptic_map: np.ndarray, segment_ids) -> dict:
+    """The original one-mask-per-segment implementation."""
+    stats = {}
+    for seg_id in segment_ids:
+        mask = panoptic_map == seg_id
+        pixel_count = int(mask.sum())
+        rows = np.where(mask.any(axis=1))[0]
+        cols = np.where(mask.any(axis=0))[0]
+        bbox = (
+            [int(cols.min()), int(rows.min()), int(cols.max()), int(rows.max())]
+            if len(rows) > 0 and len(cols) > 0
+            else [0, 0, 0, 0]
+        )
+        stats[seg_id] = {"pixel_count": pixel_count, "bbox": bbox}
+    return stats
+
+
+def _fake_segmenter(panoptic_map: np.ndarray, segments_info: list):
+    """PanopticSegmenter whose processor/model are replaced by fixed outputs."""
+    import torch
+    from types import SimpleNamespace
+    from perception.panoptic_segmenter import PanopticSegmenter
+
+    seg = PanopticSegmenter(device="cpu")
+    seg.processor = SimpleNamespace(
+        post_process_panoptic_segmentation=lambda outputs, target_sizes: [{
+            "segmentation": torch.from_numpy(panoptic_map),
+            "segments_info": segments_info,
+        }]
+    )
+    seg.model = SimpleNamespace(config=SimpleNamespace(
+        id2label={i: f"label_{i}" for i in range(200)}
+    ))
+    return seg
+
+
+def _synthetic_mask2former_outputs(num_queries: int = 60, seed: int = 0):
+    """
+    Fake Mask2Former outputs: one background query plus elliptical blobs.
+
+    Mask logits are at the model's native 96×96 resolution so the real HF
+    post-processor does the same interpolation work it does in production.
+    """
+    import torch
+    from types import SimpleNamespace
+
+    g = torch.Generator().manual_seed(seed)
+    yy, xx = torch.meshgrid(
+        torch.linspace(0, 1, 96), torch.linspace(0, 1, 96), indexing="ij"
+    )
+    masks = [torch.full((96, 96), 0.5)]
+    for _ in range(num_queries - 1):
+        cy, cx = torch.rand(2, generator=g)
+        ry, rx = torch.rand(2, generator=g) * 0.08 + 0.02
+        masks.append((1 - ((yy - cy) / ry) ** 2 - ((xx - cx) / rx) ** 2) * 8)
+
+    class_logits = torch.full((1, num_queries, 134), -5.0)
+    for q in range(num_queries):
+        class_logits[0, q, (q * 2) % 133] = 5.0     # distinct label per query
+    return SimpleNamespace(
+        class_queries_logits=class_logits,
+        masks_queries_logits=torch.stack(masks)[None],
+    )
+
+
+def _time_ms(fn, *args, repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_segment_stats_parity():
+    """segment_stats matches the per-mask loop exactly, including edge cases."""
+    print("\n" + "=" * 70)
+    print("TEST 1: segment_stats parity with per-mask loop")
+    print("=" * 70)
+
+    pmap = _synthetic_panoptic_map(20, h=240, w=320, seed=1)
+    # 21 and 22 are listed but absent → empty bbox; 0 is background (ignored)
+    ids = list(range(1, 23))
+    assert segment_stats(pmap, ids) == _reference_segment_stats(pmap, ids)
+
+    # Single-pixel segment in the bottom-right corner
+    pmap[-1, -1] = 99
+    ids = [99, 3]
+    assert segment_stats(pmap, ids) == _reference_segment_stats(pmap, ids)
+
+    # Negative IDs (some post-processors use -1 for "no segment")
+    neg = np.full((4, 5), -1, dtype=np.int32)
+    neg[1:3, 2:4] = 7
+    assert segment_stats(neg, [7]) == {7: {"pixel_count": 4, "bbox": [2, 1, 3, 2]}}
+
+    # Sparse ID range takes the relabelling path
+    sparse = np.where(pmap == 5, 1_000_000, pmap)
+    ids = [1_000_000, 1, 2]
+    assert segment_stats(sparse, ids) == _reference_segment_stats(sparse, ids)
+
+    assert segment_stats(pmap, []) == {}
+
+    print("  ✓ counts and bboxes identical")
+    print("\n✅ TEST 1 PASSED")
+    return True
+
+
+def test_segment_stats_benchmark():
+    """Benchmark against the per-mask loop on 1080p maps."""
+    print("\n" + "=" * 70)
+    print("TEST 2: segment_stats benchmark (1080p)")
+    print("=" * 70)
+
+    print(f"  {'segments':>8}  {'per-mask (ms)':>14}  {'vectorised (ms)':>16}  {'speed-up':>9}")
+    for n in (10, 30, 60, 120):
+        pmap = _synthetic_panoptic_map(n, seed=n)
+        ids = list(range(1, n + 1))
+
+        assert segment_stats(pmap, ids) == _reference_segment_stats(pmap, ids)
+
+        t_ref = _time_ms(_reference_segment_stats, pmap, ids)
+        t_vec = _time_ms(segment_stats, pmap, ids)
+        print(f"  {n:>8}  {t_ref:>14.1f}  {t_vec:>16.1f}  {t_ref / t_vec:>8.1f}x")
+
+        if n >= 60:
+            assert t_vec < t_ref, f"vectorised slower than per-mask loop at {n} segments"
+
+    print("\n✅ TEST 2 PASSED")
+    return True
+
+
+def test_panoptic_postprocess_output():
+    """PanopticSegmenter.postprocess output is unchanged by the new kernel."""
+    print("\n" + "=" * 70)
+    print("TEST 3: PanopticSegmenter.postprocess output")
+    print("=" * 70)
+
+    from PIL import Image
+
+    pmap = _synthetic_panoptic_map(12, h=180, w=320, seed=3)
+    segments_info = [
+        {"id": i, "label_id": i * 3, "isthing": i % 2 == 0} for i in range(1, 13)
+    ]
+    seg = _fake_segmenter(pmap, segments_info)
+    data = seg.postprocess({"outputs": None, "image_size": (180, 320)})
+
+    ref = _reference_segment_stats(pmap, range(1, 13))
+    total = pmap.size
+    for t in data["things"]:
+        assert t["bbox"] == ref[t["id"]]["bbox"]
+        assert t["pixel_count"] == ref[t["id"]]["pixel_count"]
+        assert t["coverage"] == round(ref[t["id"]]["pixel_count"] / total, 4)
+    assert data["num_things"] == 6 and data["num_stuff"] == 6
+    assert data["image_size"] == [180, 320]
+    coverages = [t["coverage"] for t in data["things"]]
+    assert coverages == sorted(coverages, reverse=True)
+
+    print(f"  ✓ {data['num_things']} things, {data['num_stuff']} stuff")
+    print("\n✅ TEST 3 PASSED")
+    return True
+
+
+def test_reduced_resolution_accuracy():
+    """512 px analysis vs full-resolution post-processing: error, time, memory."""
+    print("\n" + "=" * 70)
+    print("TEST 4: Reduced-resolution panoptic post-processing accuracy")
+    print("=" * 70)
+
+    import logging
+    import torch
+    from transformers import Mask2FormerImageProcessor
+    logging.getLogger("transformers").setLevel(logging.ERROR)
+
+    processor = Mask2FormerImageProcessor()
+    outputs = _synthetic_mask2former_outputs()
+    num_queries = outputs.masks_queries_logits.shape[1]
+    src_hw = (1080, 1920)
+
+    def run(max_side):
+        an_hw = analysis_size(src_hw, max_side)
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            result = processor.post_process_panoptic_segmentation(
+                outputs, target_sizes=[an_hw]
+            )[0]
+        pmap = result["segmentation"].numpy()
+        info = result["segments_info"]
+        stats = segment_stats(pmap, [s["id"] for s in info])
+        elapsed = (time.perf_counter() - t0) * 1000
+        total = an_hw[0] * an_hw[1]
+        by_label = {
+            s["label_id"]: {
+                "coverage": stats[s["id"]]["pixel_count"] / total,
+                "bbox": rescale_bbox(stats[s["id"]]["bbox"], an_hw, src_hw),
+            }
+            for s in info
+        }
+        # Interpolated float32 mask stack + int32 segment map
+        mask_mb = (num_queries * total * 4 + total * 4) / 1e6
+        return by_label, elapsed, mask_mb
+
+    full, t_full, mb_full = run(None)
+    small, t_small, mb_small = run(512)
+
+    common = set(full) & set(small)
+    assert len(common) >= 0.9 * len(full), "segments lost at reduced resolution"
+    cov_err = max(abs(full[k]["coverage"] - small[k]["coverage"]) for k in common)
+    box_err = max(
+        max(abs(a - b) for a, b in zip(full[k]["bbox"], small[k]["bbox"]))
+        for k in common
+    )
+
+    print(f"  segments (full / 512 px) : {len(full)} / {len(small)}")
+    print(f"  max coverage error       : {cov_err:.4f}")
+    print(f"  max bbox error           : {box_err} px  (source {src_hw[1]}x{src_hw[0]})")
+    print(f"  time / frame             : {t_full:.0f} ms → {t_small:.0f} ms")
+    print(f"  mask memory / frame      : {mb_full:.0f} MB → {mb_small:.0f} MB")
+
+    # One analysis pixel is 3.75 source pixels at 1080p → 512 px
+    assert cov_err < 0.005
+    assert box_err <= 8
+    assert mb_small < mb_full / 10
+
+    print("\n✅ TEST 4 PASSED")
+    return True
+
+
+def test_depth_reduced_resolution():
+    """Depth stats on the 512 px map stay within 0.01 of native resolution."""
+    print("\n" + "=" * 70)
+    print("TEST 5: Depth stats at reduced resolution")
+    print("=" * 70)
+
+    import torch
+    from perception.depth_estimator import DepthEstimator
+
+    # Smooth ramp + noise at DepthAnything's native 518×924 output size
+    h, w = 518, 924
+    rng = np.random.default_rng(5)
+    ramp = np.linspace(0, 10, h, dtype=np.float32)[:, None] * np.ones((1, w), np.float32)
+    depth = torch.from_numpy(ramp + rng.normal(0, 0.05, (h, w)).astype(np.float32))[None]
+
+    full_est = DepthEstimator(device="cpu", analysis_max_side=None)
+    small_est = DepthEstimator(device="cpu", analysis_max_side=512)
+    full = full_est.postprocess({"predicted_depth": depth})
+    small = small_est.postprocess({"predicted_depth": depth})
+
+    for key in ("near_pct", "mid_pct", "far_pct"):
+        err = abs(full["depth_distribution"][key] - small["depth_distribution"][key])
+        print(f"  {key:<8}: {full['depth_distribution'][key]:.4f} vs "
+              f"{small['depth_distribution'][key]:.4f}")
+        assert err < 0.01
+    assert abs(full["depth_stats"]["mean"] - small["depth_stats"]["mean"]) < 0.01
+    assert full["dominant_zone"] == small["dominant_zone"]
+
+    print("\n✅ TEST 5 PASSED")
+    return True
+
+
+def test_rle_mask_ops():
+    """RLE encode / area / intersection / shift / COCO match dense masks."""
+    print("\n" + "=" * 70)
+    print("TEST 6: RLE mask operations")
+    print("=" * 70)
+
+    pmap = _synthetic_panoptic_map(20, h=288, w=512, seed=6)
+    ids = list(range(0, 21))
+    masks = encode_segments(pmap, ids)
+
+    for seg_id in ids:
+        dense = pmap == seg_id
+        m = masks[seg_id]
+        assert np.array_equal(m.decode(), dense), seg_id
+        assert m.area() == int(dense.sum())
+        assert np.array_equal(RLEMask.from_coco(m.to_coco()).decode(), dense)
+        if dense.any():
+            ys, xs = np.nonzero(dense)
+            assert m.bbox() == [xs.min(), ys.min(), xs.max(), ys.max()]
+
+    rng = np.random.default_rng(6)
+    for _ in range(20):
+        a, b = (int(v) for v in rng.integers(1, 21, 2))
+        dx, dy = (int(v) for v in rng.integers(-40, 41, 2))
+        shifted = np.zeros_like(pmap, dtype=bool)
+        src = pmap == a
+        h, w = pmap.shape
+        shifted[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)] = \
+            src[max(-dy, 0):h - max(dy, 0), max(-dx, 0):w - max(dx, 0)]
+        moved = rle_shift(masks[a], dx=dx, dy=dy)
+        assert np.array_equal(moved.decode(), shifted)
+        ref_inter = int((shifted & (pmap == b)).sum())
+        assert rle_intersection_area(moved, masks[b]) == ref_inter
+    assert rle_iou(masks[3], masks[3]) == 1.0
+    assert rle_iou(masks[3], masks[4]) == 0.0
+
+    # Benchmark: all-pairs contact test on RLE vs dense boolean masks
+    dense = {i: pmap == i for i in ids}
+    t_dense = _time_ms(lambda: [
+        int((np.roll(dense[a], 3, axis=0) & dense[b]).sum()) for a in ids for b in ids
+    ])
+    t_rle = _time_ms(lambda: [
+        rle_intersection_area(rle_shift(masks[a], dy=3), masks[b]) for a in ids for b in ids
+    ])
+    rle_bytes = sum(m.starts.nbytes + m.lengths.nbytes for m in masks.values())
+    print(f"  all-pairs contact ({len(ids)}² pairs): dense {t_dense:.1f} ms, RLE {t_rle:.1f} ms")
+    print(f"  storage: dense {pmap.size * len(ids) / 1024:.0f} KB, RLE {rle_bytes / 1024:.0f} KB")
+    assert rle_bytes < pmap.size * len(ids) / 8     # beats even bit-packed masks
+
+    print("\n✅ TEST 6 PASSED")
+    return True
+
+
+def test_mask_sidecar_and_support():
+    """Masks flow panoptic → scene graph ("on") → sidecar, never into JSON."""
+    print("\n" + "=" * 70)
+    print("TEST 7: Mask sidecar + support relations")
+    print("=" * 70)
+
+    import json
+    from types import SimpleNamespace
+    from PIL import Image
+    from perception import SceneGraphGenerator
+    from perception.base import ARTIFACTS_KEY
+    from pipeline.sidecars import build_mask_sidecar, read_mask_sidecar
+
+    # Person (1) standing on grass (2) under sky (3); car (4) floating in sky
+    h, w = 120, 160
+    pmap = np.full((h, w), 3, dtype=np.int32)
+    pmap[80:, :] = 2
+    pmap[30:80, 60:80] = 1
+    pmap[10:30, 110:150] = 4
+    segments_info = [
+        {"id": 1, "label_id": 1, "isthing": True},
+        {"id": 2, "label_id": 2, "isthing": False},
+        {"id": 3, "label_id": 3, "isthing": False},
+        {"id": 4, "label_id": 4, "isthing": True},
+    ]
+    seg = _fake_segmenter(pmap, segments_info)
+    seg.model.config.id2label.update({1: "person", 2: "grass-merged", 3: "sky-other-merged", 4: "car"})
+    data = seg.postprocess({"outputs": None, "image_size": (h, w)})
+    artifacts = data.pop(ARTIFACTS_KEY)
+    json.dumps(data)                                   # data stays JSON-only
+    masks = artifacts["masks"]
+    assert set(masks) == {1, 2, 3, 4}
+
+    gen = SceneGraphGenerator()
+    gen.load_model()
+    out = gen(None, 0, 0.0, panoptic_things=data["things"],
+              panoptic_stuff=data["stuff"], panoptic_masks=masks)
+    on = {(e["subject_label"], e["object_label"]) for e in out.data["edges"] if e["predicate"] == "on"}
+    print(f"  support edges: {sorted(on)}")
+    assert on == {("person", "grass-merged")}
+
+    frames = [
+        SimpleNamespace(frame_id=fid, timestamp=fid * 0.5,
+                        usr=SimpleNamespace(panoptic_masks=masks))
+        for fid in range(4)
+    ]
+    blob = build_mask_sidecar(frames)
+    restored = read_mask_sidecar(blob)
+    assert sorted(restored) == [0, 1, 2, 3]
+    for seg_id, m in masks.items():
+        assert np.array_equal(restored[2][seg_id].decode(), m.decode())
+    inline = len(json.dumps({k: m.to_coco() for k, m in masks.items()})) * len(frames)
+    print(f"  sidecar {len(blob)} B vs inline COCO JSON {inline} B")
+    assert len(blob) < inline
+    assert build_mask_sidecar([]) is None
+
+    print("\n✅ TEST 7 PASSED")
+    return True
+
+
+def test_box_depth_integral_image():
+    """Integral-image box means match direct slicing; O(1) per box."""
+    print("\n" + "=" * 70)
+    print("TEST 8: Per-box depth via summed-area table")
+    print("=" * 70)
+
+    from perception.utils.depth_ops import DepthMap
+
+    rng = np.random.default_rng(8)
+    src_h, src_w = 1080, 1920
+    small = rng.random((72, 128), dtype=np.float32)
+    dmap = DepthMap.from_array(small, (src_h, src_w))
+
+    n = 500
+    x1 = rng.uniform(0, src_w - 20, n)
+    y1 = rng.uniform(0, src_h - 20, n)
+    boxes = np.stack([x1, y1, x1 + rng.uniform(5, 600, n), y1 + rng.uniform(5, 400, n)], axis=1)
+
+    sx, sy = 128 / src_w, 72 / src_h
+
+    def direct():
+        out = []
+        for bx1, by1, bx2, by2 in boxes:
+            c0, r0 = int(np.floor(bx1 * sx)), int(np.floor(by1 * sy))
+            c1 = min(128, max(c0 + 1, int(np.ceil(bx2 * sx))))
+            r1 = min(72, max(r0 + 1, int(np.ceil(by2 * sy))))
+            out.append(small[r0:r1, c0:c1].mean())
+        return np.array(out)
+
+    ref = direct()
+    got = dmap.box_means(boxes)
+    err = float(np.abs(ref - got).max())
+    assert err < 1e-5, err
+
+    t_direct = _time_ms(direct)
+    t_sat = _time_ms(dmap.box_means, boxes)
+    print(f"  {n} boxes: slicing {t_direct:.2f} ms, integral image {t_sat:.2f} ms "
+          f"(max err {err:.1e})")
+    assert t_sat < t_direct
+    assert len(dmap.box_means([])) == 0
+
+    # DepthEstimator attaches the map; inverse depth → top rows are closest
+    import torch
+    from perception.base import ARTIFACTS_KEY
+    from perception.depth_estimator import DepthEstimator
+
+    inv_depth = torch.linspace(10, 0, 518)[:, None].expand(518, 924).contiguous()[None]
+    est = DepthEstimator(device="cpu", return_depth_map=True)
+    data = est.postprocess({"predicted_depth": inv_depth, "image_size": (src_h, src_w)})
+    emap = data.pop(ARTIFACTS_KEY)["depth_map"]
+    assert max(emap.depth.shape) == 128 and emap.source_size == (src_h, src_w)
+    top, bottom = emap.box_means([[0, 0, src_w, 100], [0, src_h - 100, src_w, src_h]])
+    assert top < 0.1 and bottom > 0.9
+
+    print("\n✅ TEST 8 PASSED")
+    return True
+
+
+def _reference_depth_stats(depth: np.ndarray) -> dict:
+    """The original full-map numpy statistics (two sorts, three masks)."""
+    d_min, d_max = float(depth.min()), float(depth.max())
+    norm = (d_max - depth) / (d_max - d_min + 1e-8)
+    return {
+        "mean": float(norm.mean()),
+        "std": float(norm.std()),
+        "min": float(norm.min()),
+        "max": float(norm.max()),
+        "near_p10": float(np.percentile(norm, 10)),
+        "far_p90": float(np.percentile(norm, 90)),
+        "near_pct": float((norm < 0.33).mean()),
+        "mid_pct": float(((norm >= 0.33) & (norm < 0.66)).mean()),
+        "far_pct": float((norm >= 0.66).mean()),
+    }
+
+
+def test_histogram_depth_stats():
+    """Histogram statistics stay within the documented tolerance; faster."""
+    print("\n" + "=" * 70)
+    print("TEST 9: Single-pass histogram depth statistics")
+    print("=" * 70)
+
+    import torch
+    from perception.utils.depth_ops import DEPTH_HIST_BINS, histogram_depth_stats
+
+    h, w = 518, 924
+    rng = np.random.default_rng(9)
+    ramp = np.linspace(0, 10, h, dtype=np.float32)[:, None] * np.ones((1, w), np.float32)
+    maps = {
+        "ramp+noise": ramp + rng.normal(0, 0.3, (h, w)).astype(np.float32),
+        "uniform":    rng.random((h, w), dtype=np.float32) * 5,
+        "bimodal":    np.where(rng.random((h, w)) < 0.3, 2.0, 8.0).astype(np.float32)
+                      + rng.normal(0, 0.5, (h, w)).astype(np.float32),
+    }
+
+    width = 1.0 / DEPTH_HIST_BINS
+    tolerance = {
+        "mean": width / 2, "std": width, "min": width, "max": width,
+        "near_p10": width, "far_p90": width,
+        "near_pct": 1e-4, "mid_pct": 1e-4, "far_pct": 1e-4,
+    }
+    for name, depth in maps.items():
+        ref = _reference_depth_stats(depth)
+        got = histogram_depth_stats(torch.from_numpy(depth))
+        worst = max(abs(got[k] - ref[k]) / tolerance[k] for k in tolerance)
+        for k, tol in tolerance.items():
+            assert abs(got[k] - ref[k]) <= tol, (name, k, got[k], ref[k])
+        print(f"  {name:<11}: worst error {worst:.2f}× tolerance")
+
+    depth = maps["ramp+noise"]
+    t_ref = _time_ms(_reference_depth_stats, depth)
+    t_hist = _time_ms(histogram_depth_stats, torch.from_numpy(depth))
+    print(f"  CPU time ({h}×{w}): numpy {t_ref:.1f} ms, histogram {t_hist:.1f} ms")
+    print(f"  device→host: {depth.nbytes / 1024:.0f} KB map → 9 scalars")
+
+    print("\n✅ TEST 9 PASSED")
+    return True
+
+
+def test_embedding_sidecar():
+    """float16 embeddings + .npz sidecar vs inline JSON float lists."""
+    print("\n" + "=" * 70)
+    print("TEST 10: Embedding sidecar")
+    print("=" * 70)
+
+    import json
+    import tracemalloc
+    from types import SimpleNamespace
+    from pipeline.sidecars import build_embedding_sidecar, read_embedding_sidecar
+
+    n_frames, dim = 300, 768
+    rng = np.random.default_rng(10)
+    raw = rng.normal(0, 1, (n_frames, dim)).astype(np.float32)
+
+    # Allocation: what one frame's embedding costs in each representation
+    tracemalloc.start()
+    as_list = raw[0].tolist()
+    list_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    as_f16 = raw[0].astype(np.float16)
+    f16_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del as_list, as_f16
+
+    frames = [
+        SimpleNamespace(frame_id=i, timestamp=i * 0.5,
+                        usr=SimpleNamespace(vision_embedding=raw[i].astype(np.float16)))
+        for i in range(n_frames)
+    ]
+    lists = [{"vision_embedding": r.tolist()} for r in raw]
+    t_json = _time_ms(lambda: json.dumps(lists))
+    t_f16 = _time_ms(build_embedding_sidecar, frames)
+    json_bytes = len(json.dumps(lists).encode())
+    f16_blob = build_embedding_sidecar(frames)
+    i8_blob = build_embedding_sidecar(frames, dtype="int8")
+
+    f16 = read_embedding_sidecar(f16_blob)
+    i8 = read_embedding_sidecar(i8_blob)
+    assert f16["frame_ids"].tolist() == list(range(n_frames))
+    assert np.array_equal(f16["embeddings"], raw.astype(np.float16))
+    cos = np.sum(i8["embeddings"].astype(np.float32) * raw, axis=1) / (
+        np.linalg.norm(i8["embeddings"].astype(np.float32), axis=1) * np.linalg.norm(raw, axis=1)
+    )
+    print(f"  allocation / frame : list {list_bytes / 1024:.1f} KB, float16 {f16_bytes / 1024:.1f} KB")
+    print(f"  serialise {n_frames} frames: JSON {t_json:.1f} ms, npz {t_f16:.2f} ms")
+    print(f"  bytes: JSON {json_bytes / 1024:.0f} KB, float16 {len(f16_blob) / 1024:.0f} KB, "
+          f"int8 {len(i8_blob) / 1024:.0f} KB (min cos {cos.min():.5f})")
+    assert f16_bytes * 10 < list_bytes
+    assert t_f16 < t_json
+    assert len(i8_blob) < len(f16_blob) < json_bytes / 5
+    assert cos.min() > 0.999
+    assert build_embedding_sidecar([]) is None
+
+    print("\n✅ TEST 10 PASSED")
+    return True
+
+
+def test_frame_context():
+    """
+    One FrameContext per frame: SigLIP, DepthAnything, Mask2Former and the
+    VLM share its conversions, and SigLIP's pre-resize is pixel-identical
+    to letting its (PIL-backed) processor resize the full frame.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 11: Shared FrameContext")
+    print("=" * 70)
+
+    import torch
+    from PIL import Image
+    try:                                      # transformers 5.x: explicit PIL backend
+        from transformers import SiglipImageProcessorPil as SiglipImageProcessor
+    except ImportError:
+        from transformers import SiglipImageProcessor
+    from perception.siglip_encoder import SigLIPEncoder
+    from perception.utils.frame_context import FrameContext, resizes_with_pil
+    from vlm.qwen2_vl import Qwen2VLCaptioner
+
+    class _Processor:
+        """SiglipProcessor's image path without the tokenizer download."""
+
+        def __init__(self, image_processor):
+            self.image_processor = image_processor
+
+        def __call__(self, images, return_tensors):
+            return self.image_processor(images=images, return_tensors=return_tensors)
+
+    rng = np.random.default_rng(11)
+    frame = torch.from_numpy(rng.integers(0, 256, (1080, 1920, 3), dtype=np.uint8))
+
+    image_processor = SiglipImageProcessor()
+    assert resizes_with_pil(image_processor)
+    enc = SigLIPEncoder(device="cpu")
+    enc.processor = _Processor(image_processor)
+
+    ctx = FrameContext(frame)
+    t0 = time.perf_counter()
+    shared = enc.preprocess(ctx)["pixel_values"]
+    ctx.pil()                                 # DepthAnything
+    ctx.pil()                                 # Mask2Former
+    vlm_image = Qwen2VLCaptioner._to_pil(ctx)
+    t_shared = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    reference = image_processor(images=Image.fromarray(frame.numpy()), return_tensors="pt")["pixel_values"]
+    for _ in range(3):                        # depth, panoptic, VLM each converted again
+        Image.fromarray(frame.numpy())
+    t_separate = time.perf_counter() - t0
+
+    assert torch.equal(shared, reference), "SigLIP input differs from processor-resized frame"
+    assert vlm_image is ctx.pil()
+    stats = ctx.stats()
+    frame_bytes = 1080 * 1920 * 3
+    # numpy view (zero-copy), full PIL, 224² PIL built once; PIL reused 4×
+    assert stats["builds"] == 3
+    assert stats["bytes_saved"] >= 3 * frame_bytes
+    assert FrameContext.of(ctx) is ctx
+    print(f"  SigLIP input : identical to processor output {tuple(shared.shape)}")
+    print(f"  Memo         : {stats['builds']} builds, {stats['hits']} hits, "
+          f"{stats['bytes_saved'] / 1e6:.1f} MB of conversions saved per frame")
+    print(f"  Time         : separate {t_separate * 1000:.1f} ms → shared {t_shared * 1000:.1f} ms")
+
+    print("\n✅ TEST 11 PASSED")
+    return True
+
+
+def test_device_preprocess():
+    """
+    Device-side preprocessing reproduces the PIL-backed HF processors of
+    SigLIP, DepthAnything V2 and Mask2Former (same input size, pixels
+    within 2/255) and batches frames into one pass.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 12: Device-side preprocessing parity")
+    print("=" * 70)
+
+    import torch
+    from PIL import Image
+    try:                                      # transformers 5.x: explicit PIL backend
+        from transformers import (
+            DPTImageProcessorPil as DPTImageProcessor,
+            Mask2FormerImageProcessorPil as Mask2FormerImageProcessor,
+            SiglipImageProcessorPil as SiglipImageProcessor,
+        )
+    except ImportError:
+        from transformers import DPTImageProcessor, Mask2FormerImageProcessor, SiglipImageProcessor
+    from perception.utils.device_preprocess import ImageSpec, device_preprocess
+    from perception.utils.frame_context import FrameContext
+
+    # Smooth pattern + noise: resampling error shows up, unlike flat noise
+    rng = np.random.default_rng(12)
+    yy, xx = np.mgrid[0:1080, 0:1920]
+    pattern = 127 + 60 * (np.sin(xx / 37.0) * np.cos(yy / 23.0))[..., None]
+    frame = (pattern + rng.normal(0, 20, (1080, 1920, 3))).clip(0, 255).astype(np.uint8)
+
+    processors = {
+        "SigLIP": SiglipImageProcessor(),
+        # Depth-Anything-V2-Small-hf preprocessor_config.json
+        "DepthAnything": DPTImageProcessor(
+            size={"height": 518, "width": 518}, keep_aspect_ratio=True, ensure_multiple_of=14,
+            resample=3, image_mean=[0.485, 0.456, 0.406], image_std=[0.229, 0.224, 0.225],
+        ),
+        "Mask2Former": Mask2FormerImageProcessor(),
+    }
+    for name, ip in processors.items():
+        spec = ImageSpec.from_processor(ip)
+        assert spec is not None, f"{name}: processor not supported"
+        reference = ip(images=Image.fromarray(frame), return_tensors="pt")["pixel_values"]
+        out = device_preprocess([torch.from_numpy(frame)], spec, "cpu")
+        assert out.shape == reference.shape, f"{name}: {tuple(out.shape)} != {tuple(reference.shape)}"
+        std = torch.tensor(spec.std).view(1, 3, 1, 1)
+        diff = ((out - reference) * std / spec.rescale_factor).abs()   # in 0-255 pixel units
+        assert diff.max() <= 2.0, f"{name}: max diff {diff.max():.2f}/255"
+        print(f"  {name:<14}: {tuple(out.shape)}  max {diff.max():.2f}/255  mean {diff.mean():.3f}/255")
+
+    # Batched pass over 8 frames vs 8 processor calls
+    spec = ImageSpec.from_processor(processors["SigLIP"])
+    frames = [torch.from_numpy(np.roll(frame, 8 * i, axis=1)) for i in range(8)]
+    t0 = time.perf_counter()
+    serial = torch.cat([
+        processors["SigLIP"](images=Image.fromarray(f.numpy()), return_tensors="pt")["pixel_values"]
+        for f in frames
+    ])
+    t_serial = time.perf_counter() - t0
+    ctxs = [FrameContext(f) for f in frames]
+    t0 = time.perf_counter()
+    batched = device_preprocess(ctxs, spec, "cpu")
+    t_batched = time.perf_counter() - t0
+    assert batched.shape == serial.shape == (8, 3, 224, 224)
+    device_preprocess(ctxs, ImageSpec.from_processor(processors["DepthAnything"]), "cpu")
+    stats = ctxs[0].stats()
+    assert stats["builds"] == 1 and stats["hits"] == 1, stats   # one upload shared by both models
+    print(f"  8 frames      : processor {t_serial * 1000:.0f} ms → batched torch {t_batched * 1000:.0f} ms (CPU)")
+
+    # Mixed frame sizes cannot share a batch
+    try:
+        device_preprocess([frames[0], torch.zeros((720, 1280, 3), dtype=torch.uint8)], spec, "cpu")
+        raise AssertionError("mixed frame sizes accepted")
+    except ValueError:
+        pass
+
+    # Settings the torch path does not reproduce → CPU fallback
+    assert ImageSpec.from_processor(DPTImageProcessor(do_pad=True, size_divisor=32)) is None
+    assert ImageSpec.from_processor(SiglipImageProcessor(do_resize=False)) is None
+    print("  Fallback      : padded / non-resizing processors → HF processor")
+
+    print("\n✅ TEST 12 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Runner
+# ─────────────────────────────────────────────────────────────────────────────
+
+def run_all_tests():
+    print("\n" + "=" * 70)
+    print("POST-PROCESSING KERNEL TESTS")
+    print("=" * 70)
+
+    tests = [
+        ("segment_stats parity",        test_segment_stats_parity),
+        ("segment_stats benchmark",     test_segment_stats_benchmark),
+        ("Panoptic postprocess output", test_panoptic_postprocess_output),
+        ("Reduced-resolution accuracy", test_reduced_resolution_accuracy),
+        ("Depth reduced resolution",    test_depth_reduced_resolution),
+        ("RLE mask operations",         test_rle_mask_ops),
+        ("Mask sidecar + support",      test_mask_sidecar_and_support),
+        ("Box depth integral image",    test_box_depth_integral_image),
+        ("Histogram depth statistics",  test_histogram_depth_stats),
+        ("Embedding sidecar",           test_embedding_sidecar),
+        ("Shared FrameContext",         test_frame_context),
+        ("Device-side preprocessing",   test_device_preprocess),
+    ]
+
+    results = []
+    for name, fn in tests:
+        try:
+            ok = fn()
+            results.append((name, ok))
+        except Exception as e:
+            import traceback
+            print(f"\n❌ {name} FAILED: {e}")
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 70)
+    print("SUMMARY")
+    print("=" * 70)
+    for name, ok in results:
+        print(f"{'✅ PASS' if ok else '❌ FAIL'}: {name}")
+
+    all_passed = all(ok for _, ok in results)
+    if all_passed:
+        print("\n🎉 ALL POST-PROCESSING TESTS PASSED")
+    else:
+        print("\n⚠️  Some tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    ok = run_all_tests()
+    sys.exit(0 if ok else 1)
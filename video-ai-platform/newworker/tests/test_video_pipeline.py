@@ -46,6 +46,8 @@ for _dep in [
     "einops",
     "anthropic",
     "boto3",
+    "boto3.s3",
+    "boto3.s3.transfer",
     "botocore",
     "botocore.exceptions",
     "scipy",
@@ -55,7 +57,9 @@ for _dep in [
     _stub(_dep)
 
 # botocore.exceptions.ClientError must be a real exception class
-import botocore.exceptions as _bce
+# (from sys.modules: `import a.b as c` would go through the stub's __getattr__)
+import botocore.exceptions
+_bce = sys.modules["botocore.exceptions"]
 if not isinstance(getattr(_bce, "ClientError", None), type):
     _bce.ClientError = type("ClientError", (Exception,), {
         "response": {"Error": {"Code": "Unknown"}}
@@ -528,6 +532,995 @@ def test_sqs_parse_s3_event():
     return True
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+#  Test 6 — ActionScheduler: windowed, batched SlowFast
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _TinySlowFast(torch.nn.Module):
+    """Stand-in for slowfast_r50: [slow, fast] → (B, 400) logits, counts calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.proj = torch.nn.Linear(6, 400)
+        self.calls = 0
+
+    def forward(self, pathways):
+        self.calls += 1
+        slow, fast = pathways
+        feats = torch.cat([slow.mean(dim=(2, 3, 4)), fast.mean(dim=(2, 3, 4))], dim=1)
+        return self.proj(feats)
+
+
+def test_action_scheduler():
+    """
+    Plan windows, decode dense clips in one pass, batch them through a
+    stand-in SlowFast and compare call counts with per-frame scheduling.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 6: ActionScheduler — windowed, batched SlowFast")
+    print("=" * 70)
+
+    from perception.action_recognizer import ActionRecognizer
+    from pipeline.action_scheduler import ActionScheduler, plan_windows
+    from pipeline.video_processor import VideoProcessor
+
+    # ── window planning ──────────────────────────────────────────────
+    frames = [(i, float(i)) for i in range(33)]            # 33 s at 1 fps
+    windows = plan_windows(frames, window_s=2.0)
+    assert len(windows) == 17
+    assert [w.frame_ids for w in windows[:2]] == [[0, 1], [2, 3]]
+    assert sorted(f for w in windows for f in w.frame_ids) == list(range(33))
+    strided = plan_windows(frames, window_s=2.0, stride_s=4.0)
+    assert len(strided) == 9 and strided[1].start == 4.0
+    assert sorted(f for w in strided for f in w.frame_ids) == list(range(33))
+    print(f"  33 frames → {len(windows)} windows (2 s), {len(strided)} strided (4 s)")
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+        video_path = tmp.name
+    try:
+        # 12 s at 10 fps; brightness ramps so clip order is checkable
+        import cv2
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (320, 240))
+        for i in range(120):
+            writer.write(np.full((240, 320, 3), 2 * i, dtype=np.uint8))
+        writer.release()
+
+        # ── dense clip decoding ──────────────────────────────────────
+        vp = VideoProcessor(sample_fps=1.0)
+        spans = [(0.0, 2.0), (2.0, 4.0), (10.0, 12.0), (11.0, 13.0)]
+        clips = list(vp.iter_clips(video_path, spans, num_frames=8, max_side=64))
+        assert [i for i, _ in clips] == [0, 1, 2, 3]
+        for _, clip in clips:
+            assert clip.shape == (8, 48, 64, 3) and clip.dtype == np.uint8
+        means = [c.mean(axis=(1, 2, 3)) for _, c in clips]
+        assert all(np.all(np.diff(m) >= -2) for m in means), "clip frames out of order"
+        assert means[0].mean() < means[1].mean() < means[2].mean()
+        print(f"  Clips decoded : {len(clips)} × {clips[0][1].shape} (last span clamped at EOF)")
+
+        # ── batched scoring ──────────────────────────────────────────
+        rec = ActionRecognizer(device="cpu")
+        rec.model = _TinySlowFast().eval()
+        _, c0 = clips[0]
+        _, c1 = clips[1]
+        batched = rec.classify_clips([c0, c1])
+        single = [rec.classify_clips([c])[0] for c in (c0, c1)]
+        for b, s1 in zip(batched, single):
+            assert b["top_action"]["class_id"] == s1["top_action"]["class_id"]
+            assert abs(b["top_action"]["confidence"] - s1["top_action"]["confidence"]) < 1e-3
+
+        sampled = vp.extract_frames(video_path)
+        rec.model.calls = 0
+        scheduler = ActionScheduler(device="cpu", window_s=2.0, batch_size=4, recognizer=rec)
+        outputs = scheduler.run(video_path, sampled, vp)
+        assert sorted(outputs) == [f.frame_id for f in sampled]
+        assert rec.model.calls == scheduler.stats["forward_passes"] == 2
+        out = outputs[3]
+        assert out.timestamp == sampled[3].timestamp
+        assert out.metadata["window"] == [2.0, 4.0]
+        assert out.data is outputs[2].data, "frames in one window share its result"
+        print(f"  SlowFast calls: {len(sampled)} per-frame → {rec.model.calls} batched "
+              f"({scheduler.stats['windows']} windows)")
+
+        print("\nTEST 6 PASSED")
+    finally:
+        os.remove(video_path)
+
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Test 7 — ClipRingBuffer: preallocated, downscaled SlowFast clip buffer
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_clip_ring_buffer():
+    """
+    Ordered zero-copy views across wrap-around, identical SlowFast input to
+    the full-resolution path, and the peak host memory of one preprocess.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 7: ClipRingBuffer — preallocated downscaled clip buffer")
+    print("=" * 70)
+
+    import tracemalloc
+    from perception.action_recognizer import ActionRecognizer
+    from pipeline.clip_buffer import ClipRingBuffer
+
+    buf = ClipRingBuffer(capacity=4, size=8)
+    nbytes = buf.nbytes
+    for i in range(10):
+        buf.append(np.full((16, 24, 3), i, dtype=np.uint8))
+        view = buf.view()
+        want = list(range(max(0, i - 3), i + 1))
+        assert view[:, 0, 0, 0].tolist() == want, (i, view[:, 0, 0, 0].tolist())
+        assert np.shares_memory(view, buf._data), "view must not copy"
+    assert buf.nbytes == nbytes and len(buf) == 4
+    print("  Wrap-around order + zero-copy views OK")
+
+    rec = ActionRecognizer(device="cpu")
+    rng = np.random.default_rng(0)
+    frames = [torch.from_numpy(rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8))
+              for _ in range(12)]
+    ring = ClipRingBuffer(32, rec.CROP_SIZE)
+    for f in frames:
+        ring.append(f)
+
+    tracemalloc.start()
+    slow_full, fast_full = rec.preprocess(None, clip=frames)
+    _, peak_full = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    slow_ring, fast_ring = rec.preprocess(None, clip=ring.view())
+    _, peak_ring = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert fast_ring.shape == (1, 3, 32, rec.CROP_SIZE, rec.CROP_SIZE)
+    assert slow_ring.shape[2] == 32 // rec.ALPHA
+    assert torch.equal(fast_full, fast_ring) and torch.equal(slow_full, slow_ring)
+    # Old path: 32 × 720p float32 before resizing ≈ 354 MB of temporaries
+    old_estimate = 32 * 720 * 1280 * 3 * 4
+    print(f"  Buffer       : {ring.nbytes / 1e6:.1f} MB preallocated")
+    print(f"  Peak (host)  : full-res list {peak_full / 1e6:.1f} MB, ring {peak_ring / 1e6:.1f} MB "
+          f"(was ~{old_estimate / 1e6:.0f} MB float32)")
+    assert peak_ring < 16e6
+
+    print("\nTEST 7 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Simulated frame pipeline (Tests 8–9)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Preempted(BaseException):
+    """Simulated worker kill (not an Exception, so no per-frame handler catches it)."""
+
+
+class _StubCaptioner:
+    def caption(self, usr, frame):
+        from vlm.vlm_caption import VLMCaption
+
+        text = f"{len(usr.panoptic.get('things', []))} things, zone {usr.depth_stats.get('dominant_zone')}"
+        return VLMCaption(
+            frame_id=usr.frame_id, timestamp=usr.timestamp, caption=text,
+            scene_type=usr.scene_type, context_tags=usr.context_tags, model="stub",
+            tokens_generated=3, processing_time=0.0, gpu_memory_used=None,
+        )
+
+    def unload(self):
+        pass
+
+
+def _sim_frame_pipeline(crash_at=None):
+    """
+    FramePipeline with stand-in GPU modules (counted in .runs) and the real
+    scene graph / tracker.  crash_at=frame_id raises _Preempted there.
+    """
+    from perception.base import PerceptionOutput
+    from pipeline.frame_pipeline import FramePipeline
+
+    class _SimFramePipeline(FramePipeline):
+        def _run_gpu_module(self, class_name, frame, frame_id, timestamp, **kwargs):
+            if self._module_disabled(class_name):
+                return super()._run_gpu_module(class_name, frame, frame_id, timestamp, **kwargs)
+            if frame_id == crash_at:
+                raise _Preempted(f"killed at frame {frame_id}")
+            self.runs[class_name] = self.runs.get(class_name, 0) + 1
+            x = 4.0 + 2.0 * frame_id
+            data = {
+                "DepthEstimator": {"depth_stats": {}, "dominant_zone": "near",
+                                   "depth_distribution": {"near_pct": 80, "mid_pct": 20, "far_pct": 0}},
+                "PanopticSegmenter": {"things": [{"id": 1, "label": "person",
+                                                  "bbox": [x, 4.0, x + 26.0, 40.0], "coverage": 0.3}],
+                                      "stuff": [], "num_things": 1, "num_stuff": 0},
+                "ActionRecognizer": {"actions": [{"action": "walking", "confidence": 0.9}]},
+            }.get(class_name, {})
+            artifacts = {}
+            if class_name == "SigLIPEncoder":
+                artifacts["vision_embedding"] = np.full(768, frame_id / 10, dtype=np.float16)
+            return PerceptionOutput(
+                module_name=class_name, frame_id=frame_id, timestamp=timestamp, data=data,
+                metadata={}, processing_time=0.0, gpu_memory_used=None, artifacts=artifacts,
+            )
+
+    sim = _SimFramePipeline(device="cpu", captioner=_StubCaptioner())
+    sim.runs = {}
+    return sim
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Test 8 — Ablation sweep: one perception pass, replayed variants
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_ablation_sweep():
+    """
+    The full variant runs every perception module once per frame; the
+    other variants replay its outputs (no module runs) and still differ
+    where their disabled modules say they should.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 8: Ablation sweep — shared perception pass, replayed variants")
+    print("=" * 70)
+
+    from pipeline.ablation_sweep import ABLATION_VARIANTS, run_sweep
+    from pipeline.video_pipeline import VideoPipeline
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = _make_synthetic_video(os.path.join(tmp, "city.mp4"), num_frames=5, fps=5)
+        pipeline = VideoPipeline(device="cpu", sample_fps=5.0, skip_audio=True, dry_run=True,
+                                 action_window_s=None)
+        pipeline.frame_pipeline = sim = _sim_frame_pipeline()
+
+        # Record, then replay: no module runs again, outputs differ per variant
+        # (the outer block keeps the pipeline set up across process() calls)
+        store = {}
+        with sim:
+            full = pipeline.process(video_path, video_id="city", perception_store=store)
+            runs = dict(sim.runs)
+            assert runs == {"SigLIPEncoder": 5, "DepthEstimator": 5, "PanopticSegmenter": 5,
+                            "ActionRecognizer": 5}, runs
+            assert sorted(store) == [0, 1, 2, 3, 4]
+            assert "SceneGraphGenerator" in store[0] and "AudioProcessor" not in store[0]
+
+            no_depth = pipeline.process(video_path, video_id="city",
+                                        disabled_modules=frozenset({"depth"}), perception_store=store)
+            vlm_only = pipeline.process(video_path, video_id="city",
+                                        disabled_modules=frozenset({"fusion"}), perception_store=store)
+        assert sim.runs == runs, "replay must not run perception modules"
+        f, d, v = full.frame_results[0], no_depth.frame_results[0], vlm_only.frame_results[0]
+        assert f.usr.depth_stats["dominant_zone"] == "near" and "dominant_zone" not in d.usr.depth_stats
+        assert f.usr.panoptic == d.usr.panoptic and f.usr.actions == d.usr.actions
+        assert v.usr.panoptic.get("things", []) == [] and v.usr.actions == []
+        assert f.caption.caption == "1 things, zone near"
+        print(f"  Captions : full {f.caption.caption!r}, no_depth {d.caption.caption!r}, "
+              f"vlm_only {v.caption.caption!r}")
+
+        # Whole sweep: one perception pass, files for ablation_summary.py
+        sim.runs = {}
+        sim._captioner = _StubCaptioner()   # teardown dropped the injected one
+        out_dir = os.path.join(tmp, "ablation")
+        report = run_sweep(pipeline, [(video_path, "city")], out_dir)
+        assert sim.runs == runs
+        assert [v["replayed"] for v in report["variants"]] == [False] + [True] * 5
+        for variant in ABLATION_VARIANTS:
+            with open(os.path.join(out_dir, variant.narratives_file)) as fh:
+                videos = json.load(fh)["videos"]
+            assert [e["video_id"] for e in videos] == ["city"] and videos[0]["narrative"]
+        assert os.path.exists(os.path.join(out_dir, "sweep_timing.json"))
+        print(f"  Sweep    : perception pass {report['perception_pass_s']:.2f}s, "
+              f"replays {report['replay_s']:.2f}s")
+
+    print("\nTEST 8 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Test 9 — Checkpoint / resume after a crash
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_checkpoint_resume():
+    """
+    A run killed at frame 3 leaves frames 0–2 in the checkpoint; the retry
+    restores them, runs only frames 3–4 and matches an uninterrupted run,
+    tracker state included.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 9: Checkpoint / resume — fault-injected crash, then retry")
+    print("=" * 70)
+
+    from pipeline.checkpoint import FrameCheckpoint, LocalCheckpointStore, _decode_frame
+    from pipeline.video_pipeline import VideoPipeline
+
+    def run(checkpoint=None, crash_at=None):
+        pipeline = VideoPipeline(device="cpu", sample_fps=5.0, skip_audio=True, dry_run=True,
+                                 action_window_s=None)
+        pipeline.frame_pipeline = sim = _sim_frame_pipeline(crash_at=crash_at)
+        return pipeline.process(video_path, video_id="city", checkpoint=checkpoint), sim.runs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = _make_synthetic_video(os.path.join(tmp, "city.mp4"), num_frames=5, fps=5)
+        reference, _ = run()
+
+        store = LocalCheckpointStore(os.path.join(tmp, "checkpoints", "city"))
+        try:
+            run(FrameCheckpoint(store), crash_at=3)
+            raise AssertionError("fault injection did not fire")
+        except _Preempted:
+            pass
+        assert sorted(store.names()) == ["frame_000000.npz", "frame_000001.npz",
+                                         "frame_000002.npz", "manifest.json"], store.names()
+
+        # Retry (ApproximateReceiveCount > 1): resume at frame 3
+        checkpoint = FrameCheckpoint(store)
+        resumed, runs = run(checkpoint)
+        assert runs["SigLIPEncoder"] == 2 and checkpoint.saved == 2, (runs, checkpoint.saved)
+        assert resumed.frame_count == reference.frame_count == 5
+        for ref, res in zip(reference.frame_results, resumed.frame_results):
+            assert ref.frame_id == res.frame_id and ref.caption.caption == res.caption.caption
+            # Tracker continued from the restored state: same ids, Kalman-smoothed boxes
+            assert ref.usr.objects == res.usr.objects, (ref.usr.objects, res.usr.objects)
+            assert np.array_equal(ref.usr.vision_embedding, res.usr.vision_embedding)
+        # Frame 4's saved tracker state continues frames 0–2's track (5 hits, not 2)
+        _, state = _decode_frame(store.get("frame_000004.npz"))
+        assert [t["hits"] for t in state["tracker"]["tracks"]] == [5]
+        assert resumed.to_dict()["narrative"] == reference.to_dict()["narrative"]
+        print(f"  Resumed  : {5 - checkpoint.saved} frames restored, {checkpoint.saved} processed")
+
+        # A failed attempt keeps the checkpoint for the retry; a failed last
+        # attempt (SQS_MAX_RECEIVE) has no retry to resume it, so it is cleared
+        import threading
+        from types import SimpleNamespace
+
+        import main as worker_main
+
+        stub = SimpleNamespace(upload_bytes=lambda *a: True, save_raw_log_key=lambda *a: None,
+                               delete_message=lambda *a: None)
+        for receive_count, kept in ((1, True), (worker_main.settings.SQS_MAX_RECEIVE, False)):
+            job = worker_main.VideoJob(
+                message={"ReceiptHandle": "rh"}, video_id="city", user_id="u1", s3_key="uploads/u1/city.mp4",
+                receive_count=receive_count, heartbeat=threading.Event(),
+                local_video=os.path.join(tmp, "gone.mp4"), checkpoint=FrameCheckpoint(store), failed=True,
+            )
+            worker_main.finish_video(job, stub, stub, stub, None)
+            assert ("manifest.json" in store.names()) == kept, (receive_count, store.names())
+
+        # Different settings → the stale checkpoint is discarded, not mixed in
+        assert FrameCheckpoint(store).open({"video_hash": "other"}) == {}
+        assert store.names() == ["manifest.json"]
+
+    print("\nTEST 9 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Test 10 — Staged worker: prefetch / GPU / post stages over in-memory AWS
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _MemSQSClient:
+    """sqs client stand-in: a FIFO of messages, deletes and visibility extensions recorded."""
+
+    def __init__(self, bodies):
+        import collections
+        import time
+
+        sent = str(int(time.time() * 1000))
+        self.pending = collections.deque(
+            {"Body": b, "ReceiptHandle": f"rh-{i}",
+             "Attributes": {"ApproximateReceiveCount": "1", "SentTimestamp": sent}}
+            for i, b in enumerate(bodies)
+        )
+        self.deleted, self.extended = [], []
+
+    def receive_message(self, **kwargs):
+        import time
+
+        try:
+            return {"Messages": [self.pending.popleft()]}
+        except IndexError:
+            time.sleep(0.01)
+            return {}
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self.deleted.append(ReceiptHandle)
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout):
+        self.extended.append(ReceiptHandle)
+
+
+class _MemS3Client:
+    """
+    s3 client stand-in: objects in a dict, ranged GETs recorded in .ranges
+    and slowed by range_delay; on_download(key) runs before each download.
+    """
+
+    def __init__(self, objects, on_download=None, range_delay=0.0, fail_ranges=False):
+        self.objects = dict(objects)
+        self.on_download = on_download or (lambda key: None)
+        self.range_delay, self.fail_ranges = range_delay, fail_ranges
+        self.ranges = []
+
+    def _missing(self, key):
+        from botocore.exceptions import ClientError
+
+        return ClientError({"Error": {"Code": "404"}}, "HeadObject")
+
+    def download_file(self, bucket, key, path, Config=None):
+        self.on_download(key)
+        if key not in self.objects:
+            raise self._missing(key)
+        with open(path, "wb") as f:
+            f.write(self.objects[key])
+
+    def head_object(self, Bucket, Key):
+        self.on_download(Key)
+        if Key not in self.objects:
+            raise self._missing(Key)
+        return {"ContentLength": len(self.objects[Key])}
+
+    def get_object(self, Bucket, Key, Range):
+        import io
+        import time
+
+        start, end = (int(x) for x in Range[len("bytes="):].split("-"))
+        self.ranges.append(start)
+        time.sleep(self.range_delay)
+        if self.fail_ranges and start > 0:
+            raise ConnectionError("connection reset")
+        return {"Body": io.BytesIO(self.objects[Key][start:end + 1])}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[Key] = Body
+
+
+class _MemTable:
+    """DynamoDB Table stand-in for put_item / update_item ("SET a = :x, ...") / get_item."""
+
+    def __init__(self):
+        import threading
+
+        self.items, self._lock = {}, threading.Lock()
+
+    def put_item(self, Item):
+        with self._lock:
+            self.items[Item["video_id"]] = dict(Item)
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ExpressionAttributeNames=None):
+        names = ExpressionAttributeNames or {}
+        with self._lock:
+            item = self.items.setdefault(Key["video_id"], dict(Key))
+            for assignment in UpdateExpression[len("SET "):].split(","):
+                name, value = (part.strip() for part in assignment.split("="))
+                item[names.get(name, name)] = ExpressionAttributeValues[value]
+
+    def get_item(self, Key):
+        with self._lock:
+            return {"Item": self.items[Key["video_id"]]} if Key["video_id"] in self.items else {}
+
+
+def test_staged_worker():
+    """
+    Four messages (plus one unparseable) through the staged worker: the
+    next download overlaps the current analysis, the previous narrative
+    overlaps it too, every message is settled and each worker.log holds
+    only its own video's output.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 10: Staged worker — prefetch / GPU / post over in-memory SQS, S3, DynamoDB")
+    print("=" * 70)
+
+    import threading
+    import time
+
+    import urllib.request
+
+    import main as worker_main
+    from optimization.tracing import tracer
+    from worker import metrics as worker_metrics
+    from pipeline.chunked_results import read_chunked_results
+    from pipeline.video_pipeline import VideoPipeline
+    from worker.db_handler import DBHandler
+    from worker.s3_handler import S3Handler
+    from worker.sqs_handler import SQSHandler
+
+    names = ["alpha", "bravo", "charlie", "ghost"]       # ghost was never uploaded
+    started = {n: threading.Event() for n in names}      # analysis of n has begun
+    overlaps, in_flight = [], []
+    downloads, analysed = [], []
+
+    def event_body(name):
+        return json.dumps({"Records": [{"eventName": "ObjectCreated:Put", "s3": {
+            "bucket": {"name": "mem"}, "object": {"key": f"uploads/u1/{name}.mp4", "size": 1}}}]})
+
+    def on_download(key):
+        name = os.path.splitext(os.path.basename(key))[0]
+        downloads.append(name)
+        # downloaded, not yet through the GPU: one on the GPU + the prefetched one
+        in_flight.append(len(downloads) - len(analysed))
+        i = names.index(name)
+        if 0 < i < 3:
+            # prefetch: downloads while the previous video is on the GPU
+            overlaps.append(("download", name, started[names[i - 1]].wait(10)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        objects = {}
+        for name in names[:3]:
+            path = _make_synthetic_video(os.path.join(tmp, f"{name}_src.mp4"), num_frames=5, fps=5)
+            with open(path, "rb") as f:
+                objects[f"uploads/u1/{name}.mp4"] = f.read()
+
+        sqs = object.__new__(SQSHandler)
+        sqs.sqs_client, sqs.queue_url = _MemSQSClient(["not json"] + [event_body(n) for n in names]), "mem"
+        s3 = object.__new__(S3Handler)
+        s3.s3_client, s3.bucket_name = _MemS3Client(objects, on_download), "mem"
+        db = object.__new__(DBHandler)
+        db.table = _MemTable()
+
+        pipeline = VideoPipeline(device="cpu", sample_fps=5.0, skip_audio=True, dry_run=True,
+                                 action_window_s=None)
+        pipeline.frame_pipeline = sim = _sim_frame_pipeline()
+        analyze, finish = pipeline.analyze, pipeline.finish
+
+        def analyze_hook(video_path, video_id=None, **kwargs):
+            started[video_id].set()
+            try:
+                return analyze(video_path, video_id=video_id, **kwargs)
+            finally:
+                analysed.append(video_id)
+
+        def finish_hook(analysis):
+            i = names.index(analysis.video_id)
+            if i < 2:
+                # post stage: narrative while the next video is on the GPU
+                overlaps.append(("narrative", analysis.video_id, started[names[i + 1]].wait(10)))
+            return finish(analysis)
+
+        pipeline.analyze, pipeline.finish = analyze_hook, finish_hook
+
+        saved_temp = worker_main.settings.TEMP_DIR
+        worker_main.settings.TEMP_DIR = os.path.join(tmp, "work")
+        jobs_before = {o: worker_metrics.JOBS.value(outcome=o) for o in ("success", "permanent_failure")}
+        frames_before = worker_metrics.FRAMES.value()
+        server = worker_metrics.serve_metrics(0, worker_metrics.metrics, worker_metrics.health, host="127.0.0.1")
+        tracer.enable()
+        t0 = time.time()
+        try:
+            with sim:
+                worker = worker_main.run_staged(sqs, s3, pipeline, make_db=lambda: db,
+                                                prefetch=1, max_jobs=len(names))
+        finally:
+            worker_main.settings.TEMP_DIR = saved_temp
+            tracer.disable()
+        elapsed = time.time() - t0
+
+        assert worker.jobs_received == worker.jobs_finished == 4
+        assert sorted(sqs.sqs_client.deleted) == [f"rh-{i}" for i in range(5)], sqs.sqs_client.deleted
+        assert overlaps and all(ok for _, _, ok in overlaps), overlaps
+        assert max(in_flight) <= 2, in_flight                 # prefetch bound held
+        statuses = {n: db.table.items[n]["status"] for n in names}
+        assert statuses == {"alpha": "completed", "bravo": "completed",
+                            "charlie": "completed", "ghost": "failed"}, statuses
+        for name in names:
+            log = s3.s3_client.objects[f"logs/{name}/worker.log"].decode("utf-8")
+            assert f"Video ID : {name}" in log
+            assert not [other for other in names if other != name and other in log], (name, log)
+            if name != "ghost":
+                results = read_chunked_results(s3.s3_client.objects[f"results/{name}/analysis.jsonl.gz"])
+                assert results["summary"][0]["video_id"] == name
+                assert results["summary"][0]["sidecars"]["timeline"] == f"results/{name}/timeline.bin"
+                assert f"ID      : {name}" in log and "Generating narrative" in log
+        assert os.listdir(os.path.join(tmp, "work")) == []    # downloads cleaned up
+
+        # TRACE: one trace.json per video, spans from all three stage threads
+        trace = json.loads(s3.s3_client.objects["logs/bravo/trace.json"])
+        spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        assert {e["args"]["video_id"] for e in spans} == {"bravo"}
+        assert {"prepare", "analyze", "finish", "download", "decode", "frame", "narrative",
+                "s3.upload"} <= {e["name"] for e in spans}
+        assert len({e["tid"] for e in spans if e["cat"] == "stage"}) == 3
+        assert trace["otherData"]["steps"]["frame"]["count"] == 5
+        assert [s for s in tracer.spans() if s.args.get("video_id") in names] == []
+        tracer.clear()
+        print(f"  Staged   : 4 jobs in {elapsed:.2f}s, overlaps {[(s, n) for s, n, _ in overlaps]}")
+
+        # Metrics endpoint: the run shows up in the exposition
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            text = urllib.request.urlopen(f"{url}/metrics", timeout=5).read().decode("utf-8")
+            health = json.loads(urllib.request.urlopen(f"{url}/healthz", timeout=5).read())
+        finally:
+            server.shutdown()
+        assert worker_metrics.JOBS.value(outcome="success") - jobs_before["success"] == 3
+        assert worker_metrics.JOBS.value(outcome="permanent_failure") - jobs_before["permanent_failure"] == 1
+        assert worker_metrics.FRAMES.value() - frames_before == 15
+        assert 'worker_jobs_total{outcome="success"}' in text
+        for q in ("sqs", "gpu", "post"):
+            assert f'worker_queue_wait_seconds_count{{queue="{q}"}}' in text, q
+        assert 'worker_module_latency_seconds_bucket{module="siglip",le="+Inf"}' in text
+        assert 'worker_stage_seconds_count{stage="analyze"}' in text
+        assert health["status"] == "ok" and health["polling"]
+
+        # prepare raising (DynamoDB throttled): the job is still failed,
+        # counted and left on the queue for a retry — no stage crashes
+        def throttled(*args):
+            raise RuntimeError("ProvisionedThroughputExceededException")
+
+        failed_before = worker_metrics.JOBS.value(outcome="failed")
+        sqs.sqs_client = _MemSQSClient([event_body("alpha")])
+        db.table = _MemTable()
+        db.create_video_record = throttled
+        pipeline.frame_pipeline = sim = _sim_frame_pipeline()
+        worker_main.settings.TEMP_DIR = os.path.join(tmp, "work")
+        try:
+            with sim:
+                worker = worker_main.run_staged(sqs, s3, pipeline, make_db=lambda: db,
+                                                prefetch=1, max_jobs=1)
+        finally:
+            worker_main.settings.TEMP_DIR = saved_temp
+        assert worker.jobs_finished == 1 and sqs.sqs_client.deleted == []
+        assert worker_metrics.JOBS.value(outcome="failed") - failed_before == 1
+        assert db.table.items["alpha"]["status"] == "failed", db.table.items
+        log = s3.s3_client.objects["logs/alpha/worker.log"].decode("utf-8")
+        assert "Preparing video failed" in log and "TypeError" not in log, log
+
+        # Heartbeat is bounded: it stops extending after max_seconds
+        sqs.start_heartbeat("rh-hb", max_seconds=0.15, interval=0.05)
+        time.sleep(0.4)
+        n_ext = sqs.sqs_client.extended.count("rh-hb")
+        time.sleep(0.2)
+        assert 1 <= n_ext <= 3 and sqs.sqs_client.extended.count("rh-hb") == n_ext, n_ext
+        print(f"  Heartbeat: {n_ext} extensions, then stopped")
+
+    print("\nTEST 10 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Test 11 — Ranged download decoded while it streams
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_ranged_download_stream():
+    """
+    Parallel ranged GETs from a slow in-memory S3: the first frame is
+    decoded before the download completes, frames match decoding the
+    finished file, and a failing range surfaces as IOError.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 11: RangedDownload — parallel ranges, decode while streaming")
+    print("=" * 70)
+
+    import time
+
+    from pipeline.video_pipeline import VideoPipeline
+    from pipeline.video_processor import VideoProcessor
+    from worker.ranged_download import RangedDownload
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = _make_synthetic_video(os.path.join(tmp, "src.mp4"), num_frames=40, fps=10,
+                                    width=160, height=120)
+        with open(src, "rb") as f:
+            data = f.read()
+        chunk = 16 * 1024
+        n_chunks = -(-len(data) // chunk)
+        assert n_chunks >= 6, n_chunks
+        processor = VideoProcessor(sample_fps=10.0)
+        reference = processor.extract_frames(src)
+
+        client = _MemS3Client({"v.mp4": data}, range_delay=0.03)
+        download = RangedDownload(client, "mem", "v.mp4", os.path.join(tmp, "v.mp4"),
+                                  chunk_size=chunk, max_concurrency=2).start()
+        frames, complete_at_first = [], None
+        with download.reader() as stream:
+            for fd in processor.iter_frames(stream):
+                if complete_at_first is None:
+                    complete_at_first = download.complete
+                    ttff = time.time() - download.started_at
+                frames.append(fd)
+        stats = download.wait()
+
+        assert complete_at_first is False, "first frame should decode before the last range lands"
+        assert sorted(client.ranges[:2]) == [0, (n_chunks - 1) * chunk], client.ranges[:2]
+        assert sorted(client.ranges) == [i * chunk for i in range(n_chunks)]
+        with open(os.path.join(tmp, "v.mp4"), "rb") as f:
+            assert f.read() == data
+        assert len(frames) == len(reference) == 40
+        assert all(torch.equal(a.frame, b.frame) for a, b in zip(frames, reference))
+        assert stats["bytes"] == len(data) and stats["chunks"] == n_chunks and stats["mb_per_s"] > 0
+        print(f"  Stream   : first frame {ttff:.2f}s, download {stats['seconds']:.2f}s "
+              f"({stats['mb_per_s']:.2f} MB/s, {n_chunks} ranges)")
+
+        # Through VideoPipeline.analyze(): decoded while streaming, stats reported
+        pipeline = VideoPipeline(device="cpu", sample_fps=5.0, skip_audio=True, dry_run=True,
+                                 action_window_s=None)
+        pipeline.frame_pipeline = _sim_frame_pipeline()
+        download = RangedDownload(client, "mem", "v.mp4", os.path.join(tmp, "v2.mp4"),
+                                  chunk_size=chunk, max_concurrency=2).start()
+        analysis = pipeline.analyze(os.path.join(tmp, "v2.mp4"), video_id="v", download=download)
+        assert len(analysis.frame_results) == 20
+        assert analysis.download_stats["bytes"] == len(data)
+        assert 0 < analysis.time_to_first_frame < analysis.download_stats["seconds"]
+
+        # OpenCV without stream capture (< 4.10): wait for the download, decode the file
+        import cv2
+
+        path_capture = cv2.VideoCapture
+
+        def no_streams(source, *args):
+            if not isinstance(source, str):
+                raise TypeError("VideoCapture(): no stream overload")
+            return path_capture(source, *args)
+
+        pipeline.frame_pipeline = _sim_frame_pipeline()
+        download = RangedDownload(client, "mem", "v.mp4", os.path.join(tmp, "v4.mp4"),
+                                  chunk_size=chunk, max_concurrency=2).start()
+        cv2.VideoCapture = no_streams
+        try:
+            fallback = pipeline.analyze(os.path.join(tmp, "v4.mp4"), video_id="v", download=download)
+        finally:
+            cv2.VideoCapture = path_capture
+        assert len(fallback.frame_results) == 20 and fallback.time_to_first_frame is None
+        assert fallback.download_stats["bytes"] == len(data)
+
+        # A range that keeps failing: readers hit end-of-file, wait() raises
+        broken = RangedDownload(_MemS3Client({"v.mp4": data}, fail_ranges=True), "mem", "v.mp4",
+                                os.path.join(tmp, "v3.mp4"), chunk_size=chunk, max_concurrency=2).start()
+        try:
+            assert len(processor.extract_frames(broken.reader())) < 40
+        except IOError:
+            pass                                # header range never arrived
+        try:
+            broken.wait()
+            raise AssertionError("a failed range must raise")
+        except IOError:
+            pass
+        print("  Failure  : failed range → truncated stream, IOError from wait()")
+
+    print("\nTEST 11 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Test 12 — Chunked results: header index, per-section decode
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_chunked_results():
+    """
+    VideoResult.chunked_results(): the header indexes one gzip member per
+    section, any subset of sections decodes from its byte range alone,
+    and the merged sections equal to_dict().
+    """
+    print("\n" + "=" * 70)
+    print("TEST 12: Chunked results — analysis.jsonl.gz sections and index")
+    print("=" * 70)
+
+    import gzip
+
+    from narrative.narrative_result import NarrativeResult
+    from narrative.temporal_assembly import TemporalAssembly
+    from pipeline.chunked_results import merge_records, read_chunked_results, read_header
+    from pipeline.video_result import VideoResult
+
+    frame_results = [_make_dummy_frame_result(i, float(i)) for i in range(4)]
+    vr = VideoResult(
+        video_path="/tmp/test.mp4",
+        video_id="chunky",
+        duration=3.0,
+        frame_count=4,
+        frame_results=frame_results,
+        temporal_assembly=TemporalAssembly.from_frame_results(frame_results),
+        narrative=NarrativeResult(
+            narrative="[mock narrative] " + "A person walks down a street. " * 40,
+            video_duration=3.0, frame_count=4, model="dry-run",
+            input_tokens=100, output_tokens=20, processing_time=0.5,
+        ),
+        total_processing_time=10.0,
+        sidecars={"masks": "results/chunky/masks.npz"},
+    )
+    data = vr.chunked_results()
+    expected = json.loads(vr.to_json())
+
+    header, base = read_header(data)
+    assert header["video_id"] == "chunky"
+    assert [e["name"] for e in header["sections"]] == ["summary", "narrative", "audio"]
+    assert base + sum(e["length"] for e in header["sections"]) == len(data)
+
+    # Every section decodes from its own byte range
+    for entry in header["sections"]:
+        start = base + entry["offset"]
+        lines = gzip.decompress(data[start:start + entry["length"]]).splitlines()
+        assert len(lines) == entry["records"] == 1
+
+    audio = read_chunked_results(data, sections=["audio", "missing"])
+    assert list(audio) == ["audio"]
+    assert audio["audio"][0]["audio_analysis"] == expected["audio_analysis"]
+    summary = read_chunked_results(data, sections=["summary"])["summary"][0]
+    assert "narrative" not in summary and summary["sidecars"] == {"masks": "results/chunky/masks.npz"}
+    assert merge_records(read_chunked_results(data)) == expected
+
+    # Concatenated members are one valid gzip stream of JSONL
+    assert len(gzip.decompress(data).splitlines()) == 4
+    plain = len(json.dumps(expected, indent=2).encode("utf-8"))
+    print(f"  Sizes    : analysis.json {plain} B → analysis.jsonl.gz {len(data)} B "
+          f"(header {base} B)")
+
+    print("\nTEST 12 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Test 13 — Per-frame timeline: segments + timestamp index
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_timeline_window():
+    """
+    VideoResult.timeline(): frames land in segment_s-second segments, the
+    fixed-width index locates each, empty segments cost nothing, and a
+    window returns exactly its frames plus the tracks / scenes alive in it.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 13: Timeline — per-frame segments and time-window reads")
+    print("=" * 70)
+
+    import gzip
+    import zlib
+
+    from narrative.narrative_result import NarrativeResult
+    from narrative.temporal_assembly import TemporalAssembly
+    from pipeline.timeline import INDEX_ENTRY, read_timeline_window
+    from pipeline.video_result import VideoResult
+
+    # 1 fps for 60 s with a hole at 40–54 s; car tracked 5–14 s, bus 30–33 s;
+    # the scene changes to "park" at 20 s
+    frame_results = []
+    for ts in list(range(40)) + list(range(55, 60)):
+        fr = _make_dummy_frame_result(ts, float(ts))
+        if 5 <= ts <= 14:
+            fr.usr.objects = [{"track_id": 1, "label": "car", "depth_zone": "near"}]
+        if 30 <= ts <= 33:
+            fr.usr.objects = [{"track_id": 2, "label": "bus", "depth_zone": "far"}]
+        if ts >= 20:
+            fr.usr.scene_type = "park"
+        frame_results.append(fr)
+    vr = VideoResult(
+        video_path="/tmp/test.mp4",
+        video_id="timeline",
+        duration=60.0,
+        frame_count=len(frame_results),
+        frame_results=frame_results,
+        temporal_assembly=TemporalAssembly.from_frame_results(frame_results),
+        narrative=NarrativeResult(
+            narrative="[mock narrative]", video_duration=60.0, frame_count=len(frame_results),
+            model="dry-run", input_tokens=0, output_tokens=0, processing_time=0.0,
+        ),
+        total_processing_time=1.0,
+    )
+    data = vr.timeline(segment_s=10.0)
+
+    inflater = zlib.decompressobj(wbits=31)
+    header = json.loads(inflater.decompress(data))
+    index_at = len(data) - len(inflater.unused_data)
+    assert header["segments"] == 6 and header["frames"] == 45
+    entries = [INDEX_ENTRY.unpack_from(data, index_at + i * INDEX_ENTRY.size) for i in range(6)]
+    assert entries[4][2] == 1, entries[4]           # 40–50 s: only the "park" scene spanning it
+    base = index_at + 6 * INDEX_ENTRY.size
+    assert base + sum(length for _, length, _ in entries) == len(data)
+    seg1 = gzip.decompress(data[base + entries[1][0]:base + entries[1][0] + entries[1][1]])
+    assert len(seg1.splitlines()) == entries[1][2]
+
+    window = read_timeline_window(data, 12.0, 31.5)
+    assert [f["timestamp"] for f in window["frames"]] == [float(t) for t in range(12, 32)]
+    assert sorted(t["track_id"] for t in window["tracks"]) == [1, 2]
+    assert [s["scene_type"] for s in window["scenes"]] == ["street", "park"]
+    frame = window["frames"][0]
+    assert frame["caption"] == "[mock caption frame 12]"
+    assert "vlm_prompt" not in frame["usr"] and "vision_embedding" not in frame["usr"]
+    assert frame["usr"]["objects"][0]["label"] == "car"
+
+    gap = read_timeline_window(data, 41.0, 49.0)
+    assert gap["frames"] == [] and [s["scene_type"] for s in gap["scenes"]] == ["park"]
+    late = read_timeline_window(data, 56.0, 500.0)
+    assert [f["frame_id"] for f in late["frames"]] == [56, 57, 58, 59] and late["tracks"] == []
+    print(f"  Timeline : {len(data)} B, 6 × 10s segments, window 12–31.5s → "
+          f"{len(window['frames'])} frames, {len(window['tracks'])} tracks")
+
+    print("\nTEST 13 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Test 14 — Prometheus metrics and health check
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_metrics_endpoint():
+    """
+    Sharded histograms / counters stay exact under concurrent writers,
+    render as Prometheus text, and /metrics + /healthz answer over HTTP.
+    """
+    print("\n" + "=" * 70)
+    print("TEST 14: Metrics — histograms, counters, /metrics and /healthz")
+    print("=" * 70)
+
+    import threading
+    import time
+    import urllib.error
+    import urllib.request
+
+    from worker.metrics import HealthState, MetricsRegistry, serve_metrics
+
+    registry = MetricsRegistry()
+    latency = registry.histogram("t_latency_seconds", "Step time.", ("module",), buckets=(0.1, 1.0))
+    frames = registry.counter("t_frames_total", "Frames.")
+    registry.gauge("t_answer", "Scrape-time value.", fn=lambda: 42)
+    try:
+        registry.counter("t_frames_total", "again")
+        raise AssertionError("duplicate metric accepted")
+    except ValueError:
+        pass
+
+    # 8 writers, no locks on the hot path: counts still exact
+    n, writers = 20_000, 8
+
+    def write(i):
+        for k in range(n):
+            latency.observe(0.05 if k % 2 else 0.5, module=f"m{i % 2}")
+            frames.inc()
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    per_op_us = (time.perf_counter() - t0) / (n * writers * 2) * 1e6
+    assert frames.value() == n * writers
+    count, total = latency.totals(module="m0")
+    assert count == n * writers // 2 and abs(total - count * 0.275) < 1e-3 * count
+
+    text = registry.render()
+    assert "# TYPE t_latency_seconds histogram" in text
+    assert f't_latency_seconds_bucket{{module="m0",le="0.1"}} {count // 2}' in text
+    assert f't_latency_seconds_bucket{{module="m0",le="1"}} {count}' in text
+    assert f't_latency_seconds_bucket{{module="m0",le="+Inf"}} {count}' in text
+    assert f't_latency_seconds_count{{module="m1"}} {count}' in text
+    assert f"t_frames_total {n * writers}" in text and "t_answer 42" in text
+    try:
+        latency.observe(1.0)
+        raise AssertionError("missing label accepted")
+    except ValueError:
+        pass
+
+    # Health: a silent poll loop is unhealthy unless a stage is running
+    health = HealthState(max_idle_s=0.05, max_stage_s=0.3)
+    health.beat()
+    assert health.check()[0]
+    time.sleep(0.1)
+    assert not health.check()[0]
+    with health.active("analyze"):
+        ok, checks = health.check()
+        assert ok and "analyze" in checks["active_stages"]
+        time.sleep(0.35)
+        ok, checks = health.check()
+        assert not ok and checks["stuck_stages"] == ["analyze"]
+    health.beat()
+
+    server = serve_metrics(0, registry, health, host="127.0.0.1")
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        resp = urllib.request.urlopen(f"{url}/metrics", timeout=5)
+        assert resp.status == 200 and resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert resp.read().decode("utf-8") == registry.render()
+        assert json.loads(urllib.request.urlopen(f"{url}/healthz", timeout=5).read())["status"] == "ok"
+        time.sleep(0.1)
+        try:
+            urllib.request.urlopen(f"{url}/healthz", timeout=5)
+            raise AssertionError("stale poll loop reported healthy")
+        except urllib.error.HTTPError as e:
+            assert e.code == 503 and json.loads(e.read())["status"] == "unhealthy"
+    finally:
+        server.shutdown()
+    print(f"  Metrics  : {n * writers * 2} updates from {writers} threads, {per_op_us:.2f} µs each")
+
+    print("\nTEST 14 PASSED")
+    return True
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 #  Runner
 # ─────────────────────────────────────────────────────────────────────────────
@@ -543,6 +1536,15 @@ def run_all_tests():
         ("VideoPipeline dry_run",             test_video_pipeline_dry_run),
         ("worker/config Settings",            test_worker_config),
         ("SQSHandler parse_s3_event",         test_sqs_parse_s3_event),
+        ("ActionScheduler windows",           test_action_scheduler),
+        ("ClipRingBuffer",                    test_clip_ring_buffer),
+        ("Ablation sweep replay",             test_ablation_sweep),
+        ("Checkpoint resume after crash",     test_checkpoint_resume),
+        ("Staged worker stages overlap",      test_staged_worker),
+        ("Ranged download streaming decode",  test_ranged_download_stream),
+        ("Chunked results sections",          test_chunked_results),
+        ("Timeline time-window reads",        test_timeline_window),
+        ("Metrics endpoint",                  test_metrics_endpoint),
     ]
 
     results = []
@@ -13,6 +13,8 @@ import sys
 import os
 import json
 import argparse
+from types import SimpleNamespace
+
 import numpy as np
 import torch
 
@@ -405,6 +407,413 @@ def test_qwen2vl_real(force: bool = False):
     return True
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+#  Batched captioning (CPU — generate replaced by a script)
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Qwen2-VL-7B text decoder dimensions (config.json)
+_QWEN2VL_7B = SimpleNamespace(
+    hidden_size=3584, num_attention_heads=28, num_key_value_heads=4, num_hidden_layers=28,
+)
+
+
+class _ScriptedCaptioner(Qwen2VLCaptioner):
+    """
+    Qwen2VLCaptioner whose generate call is a deterministic script, so the
+    real caption_batch chunking / OOM back-off / caption assembly run
+    without the model.  Batches larger than oom_above raise CUDA OOM.
+    """
+
+    def __init__(self, oom_above=None, **kwargs):
+        super().__init__(device="cpu", **kwargs)
+        self._model = SimpleNamespace(config=SimpleNamespace(text_config=_QWEN2VL_7B))
+        self.oom_above = oom_above
+        self.calls = []
+        self.images = []                 # images per conversation, per call
+
+    def _generate(self, conversations):
+        self.calls.append(len(conversations))
+        self.images.append([
+            sum(1 for c in m[1]["content"] if c["type"] == "image") for m in conversations
+        ])
+        if self.oom_above is not None and len(conversations) > self.oom_above:
+            raise torch.cuda.OutOfMemoryError("simulated OOM")
+        out = []
+        for messages in conversations:
+            content = messages[1]["content"]
+            kind = "image" if content[0]["type"] == "image" else "text"
+            text = f"{kind} caption: {content[-1]['text'][:40]}"
+            out.append((text, len(text.split())))
+        return out
+
+
+def test_caption_batch():
+    """caption_batch chunks, backs off on OOM, keeps order; left-padded split."""
+    print("\n" + "=" * 70)
+    print("TEST 8: Batched captioning — chunks, OOM back-off, adaptive size")
+    print("=" * 70)
+
+    from perception.utils.frame_context import FrameContext
+
+    usrs = [_make_usr(frame_id=i, timestamp=i * 1.0) for i in range(10)]
+    frames = [_make_frame() for _ in range(9)] + [None]      # last one text-only
+
+    # Fixed batch size: 4 + 4 + 2, results in input order
+    cap = _ScriptedCaptioner(batch_size=4)
+    captions = cap.caption_batch(usrs, frames)
+    assert cap.calls == [4, 4, 2], cap.calls
+    assert [c.frame_id for c in captions] == list(range(10))
+    assert [c.metadata["batch_size"] for c in captions] == [4] * 8 + [2] * 2
+    assert captions[0].metadata["image_provided"] and not captions[9].metadata["image_provided"]
+    assert captions[9].caption.startswith("text caption")
+    assert all(c.validate() == [] for c in captions)
+    print(f"  batch_size=4 : generate calls {cap.calls}")
+
+    # OOM: batch 8 → 4 → 2, then the rest continues at 2
+    cap = _ScriptedCaptioner(batch_size=8, oom_above=2)
+    captions = cap.caption_batch(usrs, frames)
+    assert cap.calls == [8, 4, 2, 2, 2, 2, 2], cap.calls
+    assert [c.frame_id for c in captions] == list(range(10))
+    print(f"  OOM back-off : generate calls {cap.calls}")
+
+    try:
+        cap.caption_batch(usrs, frames[:3])
+        raise AssertionError("length mismatch accepted")
+    except ValueError:
+        pass
+
+    # Adaptive batch size from the memory budget (7B: ~176 MB per sample)
+    cap = _ScriptedCaptioner()
+    per_sample = cap._sample_bytes()
+    assert 100e6 < per_sample < 300e6, per_sample
+    assert cap.plan_batch_size(free_bytes=int(14e9)) == cap.max_batch_size
+    assert cap.plan_batch_size(free_bytes=int(5 * per_sample + 1)) == 5
+    assert cap.plan_batch_size(free_bytes=0) == 1
+    print(f"  Memory plan  : {per_sample / 1e6:.0f} MB/sample → "
+          f"batch {cap.plan_batch_size(free_bytes=int(1e9))} in 1 GB, "
+          f"{cap.plan_batch_size(free_bytes=int(14e9))} (cap) in 14 GB")
+
+    # Left-padded batch: prompts end at the same column; trailing EOS padding stripped
+    eos = 2
+    output_ids = torch.tensor([
+        [0, 0, 7, 7, 11, 12, eos, eos],    # shorter prompt (left-padded), early stop
+        [7, 7, 7, 7, 13, 14, 15, eos],
+        [0, 7, 7, 7, 16, 17, 18, 19],      # hit max_new_tokens
+    ])
+    split = Qwen2VLCaptioner._split_generated(output_ids, prompt_len=4, pad_token_id=eos)
+    assert split == [[11, 12], [13, 14, 15], [16, 17, 18, 19]], split
+
+    # Deferred-pass image: the processor's smart_resize size, memoised
+    ctx = FrameContext(_make_frame(1080, 1920))
+    image = cap.prepare_image(ctx)
+    assert image.width % 28 == 0 and image.height % 28 == 0
+    assert image.width * image.height <= Qwen2VLCaptioner.MAX_PIXELS
+    assert cap.prepare_image(ctx) is image and cap.prepare_image(None) is None
+    print(f"  Held image   : 1920x1080 → {image.width}x{image.height}")
+
+    print("\n✅ TEST 8 PASSED")
+    return True
+
+
+def test_segment_caption():
+    """One multi-image call per segment with a merged prompt."""
+    print("\n" + "=" * 70)
+    print("TEST 9: Segment captioning — merged prompt, evenly spread images")
+    print("=" * 70)
+
+    from vlm.qwen2_vl import build_segment_prompt, spread_indices
+
+    assert spread_indices(3, 4) == [0, 1, 2]
+    assert spread_indices(10, 4) == [0, 3, 6, 9]
+    assert spread_indices(9, 1) == [4]
+
+    usrs = [_make_usr(frame_id=i, timestamp=10.0 + i) for i in range(7)]
+    usrs[5].audio = dict(usrs[5].audio, transcription="watch out")
+    frames = [_make_frame() for _ in range(6)] + [None]      # last frame not held
+
+    prompt = build_segment_prompt(usrs, [0, 2, 5])
+    assert prompt.count("Scene Type:") == 1
+    assert prompt.count("[Frame at") == 3 and "Image 3 — [Frame at 15.00s]" in prompt
+    assert '15.0s: "watch out"' in prompt
+    assert prompt.startswith("[Segment 10.00s–16.00s: 7 frames, 3 shown in order]")
+    assert prompt.rstrip().endswith("atmosphere.")
+
+    cap = _ScriptedCaptioner()
+    caption = cap.caption_segment(usrs, frames, max_images=4)
+    assert cap.calls == [1] and cap.images == [[4]]
+    meta = caption.metadata
+    assert meta["source"] == "segment"
+    assert meta["frame_ids"] == list(range(7))
+    assert meta["shown_frame_ids"] == [0, 2, 3, 5]              # spread over the 6 held
+    assert caption.frame_id == 0 and caption.timestamp == 10.0
+    assert caption.vlm_prompt_used.count("[Frame at") == 4
+
+    print(f"  Prompt ({len(caption.vlm_prompt_used)} chars) for 7 frames, 4 images:")
+    print("    " + caption.vlm_prompt_used.splitlines()[0])
+    print(f"  VLM calls: 7 frames → {len(cap.calls)}")
+
+    print("\n✅ TEST 9 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Prefix KV-cache reuse (CPU — tiny random Qwen2-VL stand-in)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_CHAT_TEMPLATE = (
+    "{% for m in messages %}<|im_start|>{{ m['role'] }}\n"
+    "{% if m['content'] is string %}{{ m['content'] }}"
+    "{% else %}{% for c in m['content'] %}"
+    "{% if c['type'] == 'image' %}<|vision_start|><|image_pad|><|vision_end|>"
+    "{% else %}{{ c['text'] }}{% endif %}{% endfor %}{% endif %}<|im_end|>\n{% endfor %}"
+    "{% if add_generation_prompt %}<|im_start|>assistant\n{% endif %}"
+)
+
+
+class _TinyQwenProcessor:
+    """
+    Text side of Qwen2VLProcessor over a character-level tokenizer (the
+    real processor also needs torchvision for its video processor).
+    __call__ expands each image placeholder to one token per merged patch
+    like the real one does.
+    """
+
+    SPECIALS = ["<|endoftext|>", "<|im_start|>", "<|im_end|>", "<|vision_start|>",
+                "<|vision_end|>", "<|image_pad|>", "<|video_pad|>"]
+
+    def __init__(self):
+        from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+        from transformers import PreTrainedTokenizerFast, Qwen2VLImageProcessorPil
+
+        chars = [chr(i) for i in range(32, 127)] + ["\n"]
+        self.vocab = {t: i for i, t in enumerate(self.SPECIALS + chars)}
+        tk = Tokenizer(models.WordLevel(vocab=self.vocab, unk_token="<|endoftext|>"))
+        tk.pre_tokenizer = pre_tokenizers.Split("", "isolated")
+        tk.decoder = decoders.Fuse()
+        self.tokenizer = PreTrainedTokenizerFast(
+            tokenizer_object=tk, eos_token="<|im_end|>", pad_token="<|endoftext|>",
+            chat_template=_CHAT_TEMPLATE,
+        )
+        self.tokenizer.add_special_tokens({"additional_special_tokens": self.SPECIALS[1:]})
+        self.tokenizer.padding_side = "left"
+        self.image_processor = Qwen2VLImageProcessorPil(min_pixels=4 * 28 * 28, max_pixels=16 * 28 * 28)
+
+    def apply_chat_template(self, messages, **kwargs):
+        return self.tokenizer.apply_chat_template(messages, **kwargs)
+
+    def batch_decode(self, ids, **kwargs):
+        return self.tokenizer.batch_decode(ids, **kwargs)
+
+    def __call__(self, text, images=None, padding=True, return_tensors="pt"):
+        out = {}
+        if images:
+            out = dict(self.image_processor(images=images, return_tensors="pt"))
+            counts = iter((out["image_grid_thw"].prod(-1) // 4).tolist())
+            text = [
+                "<|image_pad|>".join(
+                    part if i == 0 else "<|image_pad|>" * (next(counts) - 1) + part
+                    for i, part in enumerate(t.split("<|image_pad|>"))
+                )
+                for t in text
+            ]
+        enc = self.tokenizer(text, padding=padding, return_tensors=return_tensors)
+        image_pad = self.vocab["<|image_pad|>"]
+        out.update(
+            input_ids=enc.input_ids,
+            attention_mask=enc.attention_mask,
+            mm_token_type_ids=(enc.input_ids == image_pad).int(),
+        )
+        return out
+
+
+def _tiny_qwen2vl(processor: _TinyQwenProcessor):
+    """Randomly initialised 2-layer Qwen2-VL with the real architecture."""
+    from transformers import Qwen2VLConfig, Qwen2VLForConditionalGeneration
+
+    v = processor.vocab
+    torch.manual_seed(0)
+    cfg = Qwen2VLConfig(
+        text_config=dict(
+            vocab_size=len(v), hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+            num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=4096,
+            rope_scaling={"type": "mrope", "mrope_section": [2, 3, 3]},
+            bos_token_id=None, eos_token_id=v["<|im_end|>"],
+        ),
+        vision_config=dict(
+            depth=1, embed_dim=32, hidden_size=64, num_heads=2, mlp_ratio=2,
+            patch_size=14, spatial_merge_size=2, temporal_patch_size=2,
+        ),
+        image_token_id=v["<|image_pad|>"], video_token_id=v["<|video_pad|>"],
+        vision_start_token_id=v["<|vision_start|>"], vision_end_token_id=v["<|vision_end|>"],
+    )
+    return Qwen2VLForConditionalGeneration(cfg).eval()
+
+
+def _tiny_captioner(processor, model, reuse_prefix_cache: bool, max_new_tokens: int = 12):
+    cap = Qwen2VLCaptioner(
+        device="cpu", temperature=0.0, max_new_tokens=max_new_tokens,
+        reuse_prefix_cache=reuse_prefix_cache,
+    )
+    cap._model, cap._processor = model, processor
+    return cap
+
+
+def _tiny_inputs(cap, prompts, images):
+    messages = [cap._build_messages(p, [img]) for p, img in zip(prompts, images)]
+    texts = [
+        cap._processor.apply_chat_template(m, tokenize=False, add_generation_prompt=True)
+        for m in messages
+    ]
+    return cap._processor(text=texts, images=[i for i in images if i is not None])
+
+
+def test_prefix_cache():
+    """Cached system-prompt prefill gives the same greedy tokens, faster."""
+    print("\n" + "=" * 70)
+    print("TEST 10: Prefix KV-cache reuse — greedy parity on a tiny Qwen2-VL")
+    print("=" * 70)
+
+    from PIL import Image
+
+    processor = _TinyQwenProcessor()
+    model = _tiny_qwen2vl(processor)
+    plain = _tiny_captioner(processor, model, reuse_prefix_cache=False)
+    cached = _tiny_captioner(processor, model, reuse_prefix_cache=True)
+
+    rng = np.random.default_rng(0)
+    images = [
+        Image.fromarray(rng.integers(0, 255, (60, 90, 3), dtype=np.uint8)),
+        None,                                                     # text-only row
+        Image.fromarray(rng.integers(0, 255, (100, 70, 3), dtype=np.uint8)),
+    ]
+    prompts = ["a dog runs on the beach", "two people talk", "car"]
+
+    for rows in ([0], [0, 1, 2]):
+        p = [prompts[i] for i in rows]
+        im = [images[i] for i in rows]
+        expected = plain._generate_from_inputs(_tiny_inputs(plain, p, im))
+        got = cached._generate_from_inputs(_tiny_inputs(cached, p, im))
+        assert got == expected, (rows, got, expected)
+        assert cached._last_prefix_tokens == len(cached._prefix_ids) > 0
+        assert plain._last_prefix_tokens == 0
+        print(f"  batch {len(rows)}: greedy output identical ({sum(t for _, t in got)} tokens)")
+
+    # Prompts that don't start with the cached prefix run a plain generate
+    foreign = processor(text=["<|im_start|>user\nhello<|im_end|>\n<|im_start|>assistant\n"])
+    assert cached._with_prefix_cache(foreign) is None
+
+    # transformers without full-prompt position ids: disabled once, plain generate
+    old_api = _tiny_captioner(processor, model, reuse_prefix_cache=True)
+    old_api._supports_prefix_cache = lambda: False
+    p, im = prompts[:1], images[:1]
+    assert old_api._generate_from_inputs(_tiny_inputs(old_api, p, im)) == \
+        plain._generate_from_inputs(_tiny_inputs(plain, p, im))
+    assert old_api.reuse_prefix_cache is False and old_api._prefix_cache is None
+
+    # Prefill time per caption: a 1-token generate is (almost) all prefill
+    timed = {}
+    for name, reuse in (("full prefill", False), ("cached prefix", True)):
+        cap = _tiny_captioner(processor, model, reuse_prefix_cache=reuse, max_new_tokens=1)
+        inputs = _tiny_inputs(cap, prompts, images)
+        cap._generate_from_inputs(inputs)                        # warm-up (+ prefix prefill)
+        t0 = time.perf_counter()
+        for _ in range(3):
+            cap._generate_from_inputs(inputs)
+        timed[name] = (time.perf_counter() - t0) / (3 * len(prompts)) * 1000
+    prompt_len = inputs["input_ids"].shape[1]
+    print(f"  Prompt {prompt_len} tokens, {len(cached._prefix_ids)} of them the system prompt")
+    for name, ms in timed.items():
+        print(f"  {name:<14}: {ms:.1f} ms prefill per caption")
+
+    print("\n✅ TEST 10 PASSED")
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Caption cache (CPU — generate replaced by a script)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_caption_cache():
+    """Repeated (image, prompt, model, params) are answered from SQLite."""
+    print("\n" + "=" * 70)
+    print("TEST 11: Caption cache — content addressing, LRU, persistence")
+    print("=" * 70)
+
+    import io
+    import tempfile
+    from PIL import Image
+    from vlm import CaptionCache
+    from vlm.caption_cache import image_phash
+
+    def hamming(a, b):
+        return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+    # Perceptual hash: a re-encoded frame hashes (almost) alike, another frame doesn't
+    y, x = np.mgrid[0:360, 0:640]
+    frame = torch.from_numpy(np.stack([x * 255 // 640, y * 255 // 360, (x + y) % 256], -1).astype(np.uint8))
+    img = Image.fromarray(frame.numpy())
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    reencoded = Image.open(io.BytesIO(buf.getvalue())).convert("RGB")
+    other = Image.fromarray(np.ascontiguousarray(frame.numpy()[::-1, ::-1]))
+    h, h_jpeg, h_other = image_phash(img), image_phash(reencoded), image_phash(other)
+    print(f"  pHash {h}: JPEG re-encode {hamming(h, h_jpeg)} bits, other frame {hamming(h, h_other)} bits")
+    assert hamming(h, h_jpeg) <= 2 < 16 <= hamming(h, h_other)
+    assert image_phash(None) == "none"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "captions.sqlite")
+        cache = CaptionCache(path)
+        usr = _make_usr(frame_id=3, timestamp=3.0)
+
+        cap = _ScriptedCaptioner(caption_cache=cache)
+        first = cap.caption(usr, frame)
+        again = cap.caption(usr, frame)
+        assert cap.calls == [1]                                   # second call never reached the model
+        assert first.metadata["cache_hit"] is False and again.metadata["cache_hit"] is True
+        assert again.caption == first.caption and again.tokens_generated == first.tokens_generated
+        assert again.frame_id == 3 and again.vlm_prompt_used == usr.vlm_prompt
+
+        # Prompt, generation params and image all take part in the key
+        usr2 = _make_usr(frame_id=3, timestamp=3.0)
+        usr2.vlm_prompt += "\nExtra context."
+        cap.caption(usr2, frame)
+        _ScriptedCaptioner(caption_cache=cache, temperature=0.2).caption(usr, frame)
+        cap.caption(usr, None)
+        assert cap.calls == [1, 1, 1]
+        print(f"  caption(): {cache.stats()}")
+
+        # caption_batch: only misses reach the model, output stays in order
+        usrs = [_make_usr(frame_id=i, timestamp=float(i)) for i in range(4)]
+        usrs[1], usrs[3] = usr, usr2                               # both cached above
+        batch = _ScriptedCaptioner(caption_cache=cache, batch_size=8)
+        captions = batch.caption_batch(usrs, [frame] * 4)
+        assert batch.calls == [2]
+        assert [c.metadata["cache_hit"] for c in captions] == [False, True, False, True]
+        assert [c.frame_id for c in captions] == [0, 3, 2, 3]
+        cache.close()
+
+        # Persistent: a new process (new cache object) hits the same file
+        reopened = CaptionCache(path)
+        assert len(reopened) == 6
+        cap = _ScriptedCaptioner(caption_cache=reopened)
+        assert cap.caption(usr, frame).metadata["cache_hit"] and cap.calls == []
+        reopened.close()
+
+    # LRU eviction beyond max_bytes (each entry: 64-char key + caption)
+    lru = CaptionCache(":memory:", max_bytes=3 * (64 + 10))
+    for k in "abc":
+        lru.put(k * 64, "x" * 10, 1)
+    assert lru.get("a" * 64) is not None                           # refresh "a"
+    lru.put("d" * 64, "x" * 10, 1)
+    assert lru.get("b" * 64) is None and lru.get("a" * 64) is not None
+    assert len(lru) == 3 and lru.evictions == 1
+    print(f"  LRU: {lru.stats()}")
+
+    print("\n✅ TEST 11 PASSED")
+    return True
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 #  Runner
 # ─────────────────────────────────────────────────────────────────────────────
@@ -425,6 +834,10 @@ def run_all_tests(run_gpu: bool = False):
         ("VLM prompt quality",            lambda: test_vlm_prompt_quality()),
         ("Multi-frame captions",          lambda: test_multi_frame_captions()),
         ("Real Qwen2-VL (GPU)",           lambda: test_qwen2vl_real(force=run_gpu)),
+        ("Batched captioning",            lambda: test_caption_batch()),
+        ("Segment captioning",            lambda: test_segment_caption()),
+        ("Prefix KV-cache reuse",         lambda: test_prefix_cache()),
+        ("Caption cache",                 lambda: test_caption_cache()),
     ]
 
     results = []
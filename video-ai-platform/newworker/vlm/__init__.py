@@ -4,10 +4,12 @@ VLM Layer — Qwen2-VL-7B unified reasoning brain.
 Phase 3: Qwen2-VL generates coherent captions from UnifiedSceneRepresentation.
 """
 
+from .caption_cache import CaptionCache
 from .qwen2_vl import Qwen2VLCaptioner
 from .vlm_caption import VLMCaption
 
 __all__ = [
+    "CaptionCache",
     "Qwen2VLCaptioner",
     "VLMCaption",
 ]
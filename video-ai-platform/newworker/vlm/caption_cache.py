@@ -0,0 +1,163 @@
+"""
+CaptionCache — persistent, content-addressed Qwen2-VL caption store.
+
+Re-processing a video, running an ablation or meeting near-identical
+frames used to call Qwen2-VL again for the same image and prompt.  The
+cache sits in front of Qwen2VLCaptioner.caption() / caption_batch() and
+returns the stored caption when all of these match:
+
+  image       64-bit perceptual hash (DCT pHash) — only the coarse
+              structure counts, so repeated and near-identical frames
+              usually share a key (a JPEG re-encode flips 0–2 bits, an
+              unrelated frame ~32); text-only = "none"
+  prompt      SHA-256 of usr.vlm_prompt
+  model       model id
+  generation  max_new_tokens, temperature, repetition_penalty,
+              quantisation and image pixel budget
+
+Entries live in one SQLite file; once the stored captions exceed
+max_bytes the least recently used are evicted.  hits / misses /
+evictions are counted per instance (stats()).
+
+Usage:
+    cache = CaptionCache("/tmp/captions.sqlite", max_bytes=256 * 2**20)
+    captioner = Qwen2VLCaptioner(caption_cache=cache)
+    captioner.caption(usr, frame).metadata["cache_hit"]     # True / False
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis: dct(x) = M @ x."""
+    k, i = np.arange(n)[:, None], np.arange(n)[None, :]
+    m = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def image_phash(image: Optional[Image.Image]) -> str:
+    """
+    16-hex-digit DCT perceptual hash: 32×32 grayscale → 2-D DCT → the 8×8
+    lowest frequencies (DC excluded from the median) thresholded at their
+    median.  None (text-only) → "none".
+    """
+    if image is None:
+        return "none"
+    small = image.convert("L").resize((32, 32), Image.LANCZOS)
+    freq = _DCT32 @ np.asarray(small, dtype=np.float64) @ _DCT32.T
+    low = freq[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):016x}"
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def cache_key(image_hash: str, prompt: str, model_id: str, params: Dict[str, Any]) -> str:
+    """SHA-256 over (image hash, prompt hash, model id, generation params)."""
+    blob = json.dumps(
+        [image_hash, prompt_hash(prompt), model_id, params], sort_keys=True, default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class CaptionCache:
+    """
+    SQLite-backed LRU of (caption, tokens) by cache_key().
+
+    Args:
+        path      : SQLite file (created with its directory); ":memory:"
+                    for a process-local cache.
+        max_bytes : Budget for stored caption text; least recently used
+                    entries beyond it are evicted on put().
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 2**20):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS captions ("
+            " key TEXT PRIMARY KEY, caption TEXT NOT NULL, tokens INTEGER NOT NULL,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS captions_lru ON captions (last_used)")
+
+    def get(self, key: str) -> Optional[Tuple[str, int]]:
+        """(caption, tokens) for key, or None; a hit refreshes its LRU slot."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT caption, tokens FROM captions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE captions SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self.hits += 1
+            return row[0], row[1]
+
+    def put(self, key: str, caption: str, tokens: int):
+        size = len(caption.encode("utf-8")) + len(key)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO captions VALUES (?, ?, ?, ?, ?, ?)",
+                (key, caption, int(tokens), size, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM captions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed, doomed = 0, []
+        for key, size in self._db.execute("SELECT key, size FROM captions ORDER BY last_used"):
+            if total - freed <= self.max_bytes:
+                break
+            doomed.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM captions WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM captions").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -13,19 +13,29 @@ Design constraints (from architecture):
   - Always runs AFTER all perception modules have unloaded
   - Must itself unload before any next-frame perception pass
   - Uses bitsandbytes 8-bit quantization by default
-  - Batch size = 1
+  - caption() runs one frame; caption_batch() runs many frames per
+    generate call (left-padded), batch size picked from free VRAM
+  - caption_segment() captions one scene segment from several of its
+    frames (multi-image input) with a merged prompt
+  - The constant system-prompt prefix is prefilled once; its KV cache is
+    reused by every generate call and every row of a batch
+  - An optional CaptionCache answers repeated (image, prompt) pairs
+    without calling the model
 """
 
 from __future__ import annotations
 
+import copy
 import gc
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import torch
 from PIL import Image
 
 from fusion.unified_representation import UnifiedSceneRepresentation
+from perception.utils.frame_context import FrameContext
+from .caption_cache import CaptionCache, cache_key, image_phash, prompt_hash
 from .vlm_caption import VLMCaption
 
 
@@ -41,6 +51,75 @@ _SYSTEM_PROMPT = (
     "Be accurate, concrete, and vivid."
 )
 
+# Text tokens per sample besides the image (system prompt + USR prompt +
+# chat template), used to size batches
+_PROMPT_TEXT_TOKENS = 768
+
+# Per-sample memory = KV cache × this, covering prefill activations and the
+# vision tower's patch activations
+_ACTIVATION_FACTOR = 2.0
+
+_SEGMENT_INSTRUCTION = (
+    "Describe what happens across these frames as one continuous scene: "
+    "who or what is present, how they move or change over time, their "
+    "spatial arrangement, and the overall atmosphere."
+)
+
+
+def spread_indices(n: int, k: int) -> List[int]:
+    """Up to k indices evenly spaced over range(n), first and last included."""
+    if n <= k:
+        return list(range(n))
+    if k == 1:
+        return [n // 2]
+    return sorted({round(i * (n - 1) / (k - 1)) for i in range(k)})
+
+
+def build_segment_prompt(
+    usrs: Sequence[UnifiedSceneRepresentation],
+    shown: Sequence[int],
+) -> str:
+    """
+    Merge the fused per-frame prompts of one scene segment into one prompt.
+
+    Args:
+        usrs  : Every frame of the segment, in time order.
+        shown : Indices into usrs of the frames passed as images (in order).
+
+    Scene type and context are stated once; each shown frame keeps its
+    perception block (objects, environment, depth, actions, relations);
+    speech from every frame of the segment is listed with timestamps.
+    """
+    first, last = usrs[0], usrs[-1]
+    tags = list(dict.fromkeys(t for u in usrs for t in u.context_tags))
+    lines = [
+        f"[Segment {first.timestamp:.2f}s–{last.timestamp:.2f}s: "
+        f"{len(usrs)} frames, {len(shown)} shown in order]",
+        f"Scene Type: {first.scene_type}",
+    ]
+    if tags:
+        lines.append(f"Context: {', '.join(tags)}")
+
+    for n, i in enumerate(shown, 1):
+        # Per-frame block = the fused prompt minus its closing instruction
+        block = usrs[i].vlm_prompt.split("\n\n")[0].splitlines()
+        kept = [
+            line for line in block
+            if not line.startswith(("Scene Type:", "Context:", "Speech:"))
+        ]
+        lines.append("")
+        lines.append(f"Image {n} — " + "\n".join(kept))
+
+    speech = [
+        f'  {u.timestamp:.1f}s: "{u.audio["transcription"]}"'
+        for u in usrs if u.audio.get("transcription")
+    ]
+    if speech:
+        lines += ["", "Speech:"] + speech
+
+    lines += ["", _SEGMENT_INSTRUCTION]
+    return "\n".join(lines)
+
 
 class Qwen2VLCaptioner:
     """
@@ -60,8 +139,17 @@ class Qwen2VLCaptioner:
 
     Text-only mode (no frame available):
         caption = captioner.caption(usr, frame=None)
+
+    Batched (one generate call per batch, batch size from free VRAM):
+        captions = captioner.caption_batch(usrs, frames)
     """
 
+    # Image token budget (pixels) — smaller = faster, less VRAM
+    MIN_PIXELS = 128 * 28 * 28     # ~100k pixels minimum
+    MAX_PIXELS = 512 * 28 * 28     # ~400k pixels maximum
+    # Per-image budget for multi-image segment captions (256 image tokens)
+    SEGMENT_MAX_PIXELS = 256 * 28 * 28
+
     def __init__(
         self,
         model_id: str = _MODEL_ID,
@@ -70,6 +158,11 @@ class Qwen2VLCaptioner:
         temperature: float = 0.7,
         repetition_penalty: float = 1.1,
         device: str = "cuda",
+        batch_size: Optional[int] = None,        # caption_batch; None = from free VRAM
+        max_batch_size: int = 8,
+        memory_budget_gb: Optional[float] = None,  # None = 80% of free VRAM
+        reuse_prefix_cache: bool = True,         # prefill the system prompt once
+        caption_cache: Optional[CaptionCache] = None,
     ):
         self.model_id = model_id
         self.quantize_bits = quantize_bits
@@ -77,9 +170,17 @@ class Qwen2VLCaptioner:
         self.temperature = temperature
         self.repetition_penalty = repetition_penalty
         self.device = device
+        self.batch_size = batch_size
+        self.max_batch_size = max(1, max_batch_size)
+        self.memory_budget_gb = memory_budget_gb
+        self.reuse_prefix_cache = reuse_prefix_cache
+        self.caption_cache = caption_cache
 
         self._model = None
         self._processor = None
+        self._prefix_ids: Optional[torch.Tensor] = None     # system-prompt token ids
+        self._prefix_cache = None                           # their KV cache (batch 1)
+        self._last_prefix_tokens = 0                        # reused by the last call
 
     # ─────────────────────────────────────────────────────────────────
     #  Load / unload
@@ -110,9 +211,12 @@ class Qwen2VLCaptioner:
         # Use smaller pixel budget to save VRAM on A10
         self._processor = AutoProcessor.from_pretrained(
             self.model_id,
-            min_pixels=128 * 28 * 28,   # ~100k pixels minimum
-            max_pixels=512 * 28 * 28,   # ~400k pixels maximum
+            min_pixels=self.MIN_PIXELS,
+            max_pixels=self.MAX_PIXELS,
         )
+        # Batched prompts are left-padded so every row generates from the
+        # same position
+        self._processor.tokenizer.padding_side = "left"
 
         vram = self._current_vram_gb()
         print(f"✓ Qwen2-VL-7B loaded — VRAM used: {vram:.1f} GB")
@@ -125,10 +229,16 @@ class Qwen2VLCaptioner:
         if self._processor is not None:
             del self._processor
             self._processor = None
+        self._prefix_ids = None
+        self._prefix_cache = None
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         gc.collect()
         print("✓ Qwen2-VL unloaded")
+        if self.caption_cache is not None:
+            st = self.caption_cache.stats()
+            print(f"✓ Caption cache: {st['hits']} hits / {st['hits'] + st['misses']} lookups, "
+                  f"{st['entries']} entries")
 
     def is_loaded(self) -> bool:
         return self._model is not None
@@ -147,7 +257,8 @@ class Qwen2VLCaptioner:
 
         Args:
             usr   : UnifiedSceneRepresentation from Phase 2 fusion.
-            frame : Raw video frame tensor (H, W, 3) uint8, or PIL Image.
+            frame : Raw video frame tensor (H, W, 3) uint8, PIL Image, or
+                    the pipeline's FrameContext.
                     If None, runs in text-only mode (no image token).
 
         Returns:
@@ -161,42 +272,199 @@ class Qwen2VLCaptioner:
             torch.cuda.reset_peak_memory_stats()
 
         pil_image = self._to_pil(frame)
-        messages = self._build_messages(usr.vlm_prompt, pil_image)
-        response, tokens = self._generate(messages)
+        key = self._cache_key(usr, pil_image)
+        cached = self.caption_cache.get(key) if key else None
+        if cached is not None:
+            return self._cached_caption(usr, cached, time.time() - t0, pil_image is not None)
+
+        messages = self._build_messages(usr.vlm_prompt, [pil_image])
+        (response, tokens), = self._generate([messages])
 
         gpu_mem = None
         if torch.cuda.is_available():
             gpu_mem = round(torch.cuda.max_memory_allocated() / 1e9, 2)
 
-        caption = VLMCaption(
-            frame_id=usr.frame_id,
-            timestamp=usr.timestamp,
+        if key:
+            self.caption_cache.put(key, response, tokens)
+        return self._make_caption(
+            usr, response, tokens, round(time.time() - t0, 3), gpu_mem,
+            image_provided=pil_image is not None, batch_size=1,
+        )
+
+    def caption_batch(
+        self,
+        usrs: Sequence[UnifiedSceneRepresentation],
+        frames: Optional[Sequence[Optional[Any]]] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[VLMCaption]:
+        """
+        Generate scene captions for many frames, several per generate call.
+
+        Args:
+            usrs       : One UnifiedSceneRepresentation per frame.
+            frames     : Matching frames (tensor / PIL / FrameContext / None
+                         for text-only), or None for all text-only.
+            batch_size : Samples per generate call; default self.batch_size,
+                         else plan_batch_size().  Halved and retried on OOM.
+
+        Returns:
+            VLMCaptions in input order.  processing_time is each sample's
+            share of its batch.  Caption-cache hits are answered before
+            batching; only misses reach the model.
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Call load() before caption_batch()")
+        frames = list(frames) if frames is not None else [None] * len(usrs)
+        if len(frames) != len(usrs):
+            raise ValueError(f"{len(usrs)} USRs but {len(frames)} frames")
+
+        images = [self._to_pil(f) for f in frames]
+        captions: List[Optional[VLMCaption]] = [None] * len(usrs)
+        keys = [self._cache_key(usr, image) for usr, image in zip(usrs, images)]
+        todo = []
+        for j, key in enumerate(keys):
+            t0 = time.time()
+            cached = self.caption_cache.get(key) if key else None
+            if cached is None:
+                todo.append(j)
+            else:
+                captions[j] = self._cached_caption(
+                    usrs[j], cached, time.time() - t0, images[j] is not None,
+                )
+
+        size = batch_size or self.batch_size or self.plan_batch_size()
+        i = 0
+        while i < len(todo):
+            n = min(size, len(todo) - i)
+            chunk = todo[i:i + n]
+            try:
+                done = self._caption_chunk([usrs[j] for j in chunk], [images[j] for j in chunk])
+            except torch.cuda.OutOfMemoryError:
+                if n == 1:
+                    raise
+                size = n // 2
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                print(f"⚠️  Qwen2-VL OOM at batch {n} — retrying with {size}")
+                continue
+            for j, caption in zip(chunk, done):
+                captions[j] = caption
+                if keys[j]:
+                    self.caption_cache.put(keys[j], caption.caption, caption.tokens_generated)
+            i += n
+        return captions
+
+    def plan_batch_size(self, free_bytes: Optional[int] = None) -> int:
+        """
+        Largest batch whose KV cache and activations fit the memory budget
+        (memory_budget_gb, else 80% of free VRAM), capped at max_batch_size.
+        CPU runs use max_batch_size.
+        """
+        if free_bytes is None:
+            if self.memory_budget_gb is not None:
+                free_bytes = int(self.memory_budget_gb * 1e9)
+            elif torch.cuda.is_available():
+                free_bytes = int(torch.cuda.mem_get_info()[0] * 0.8)
+            else:
+                return self.max_batch_size
+        per_sample = self._sample_bytes()
+        return max(1, min(self.max_batch_size, int(free_bytes // per_sample)))
+
+    def caption_segment(
+        self,
+        usrs: Sequence[UnifiedSceneRepresentation],
+        frames: Sequence[Optional[Any]],
+        max_images: int = 4,
+    ) -> VLMCaption:
+        """
+        Caption one scene segment with a single multi-image generate call.
+
+        Args:
+            usrs       : Every frame's USR in the segment, in time order.
+            frames     : Matching frames (None where no image is held).
+            max_images : Frames passed as images, evenly spaced over the
+                         segment; the rest contribute only speech.
+
+        Returns:
+            VLMCaption stamped with the segment's first frame;
+            metadata["frame_ids"] lists the segment's frames and
+            metadata["shown_frame_ids"] the ones passed as images.
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Call load() before caption_segment()")
+        if len(frames) != len(usrs):
+            raise ValueError(f"{len(usrs)} USRs but {len(frames)} frames")
+
+        t0 = time.time()
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+
+        with_image = [i for i, f in enumerate(frames) if f is not None]
+        shown = [with_image[j] for j in spread_indices(len(with_image), max_images)]
+        prompt = build_segment_prompt(usrs, shown)
+        images = [self._to_pil(frames[i]) for i in shown]
+        (response, tokens), = self._generate([self._build_messages(prompt, images)])
+
+        gpu_mem = None
+        if torch.cuda.is_available():
+            gpu_mem = round(torch.cuda.max_memory_allocated() / 1e9, 2)
+
+        first = usrs[0]
+        return VLMCaption(
+            frame_id=first.frame_id,
+            timestamp=first.timestamp,
             caption=response,
-            scene_type=usr.scene_type,
-            context_tags=usr.context_tags,
+            scene_type=first.scene_type,
+            context_tags=list(dict.fromkeys(t for u in usrs for t in u.context_tags)),
             model=self.model_id,
             tokens_generated=tokens,
             processing_time=round(time.time() - t0, 3),
             gpu_memory_used=gpu_mem,
-            vlm_prompt_used=usr.vlm_prompt,
+            vlm_prompt_used=prompt,
             metadata={
                 "quantize_bits": self.quantize_bits,
                 "max_new_tokens": self.max_new_tokens,
-                "image_provided": pil_image is not None,
+                "source": "segment",
+                "frame_ids": [u.frame_id for u in usrs],
+                "shown_frame_ids": [usrs[i].frame_id for i in shown],
+                "prefix_cached_tokens": self._last_prefix_tokens,
             },
         )
-        return caption
+
+    def prepare_image(
+        self, frame: Optional[Any], max_pixels: Optional[int] = None
+    ) -> Optional[Image.Image]:
+        """
+        The frame resized to the processor's input size (its smart_resize
+        rule and bicubic filter), for holding frames until a batched pass:
+        ~1 MB instead of the full-resolution frame.  max_pixels lowers the
+        budget (e.g. SEGMENT_MAX_PIXELS).  A FrameContext memoises the resize.
+        """
+        if frame is None:
+            return None
+        try:                                  # transformers 5.x
+            from transformers.models.qwen2_vl.image_processing_pil_qwen2_vl import smart_resize
+        except ImportError:
+            from transformers.models.qwen2_vl.image_processing_qwen2_vl import smart_resize
+
+        ctx = FrameContext.of(frame)
+        h, w = ctx.shape[:2]
+        out_h, out_w = smart_resize(
+            h, w, factor=28,
+            min_pixels=self.MIN_PIXELS, max_pixels=max_pixels or self.MAX_PIXELS,
+        )
+        return ctx.resized((out_w, out_h), resample=Image.BICUBIC)
 
     # ─────────────────────────────────────────────────────────────────
     #  Internals
     # ─────────────────────────────────────────────────────────────────
 
     def _build_messages(
-        self, vlm_prompt: str, pil_image: Optional[Image.Image]
+        self, vlm_prompt: str, pil_images: Sequence[Optional[Image.Image]]
     ) -> list:
-        content = []
-        if pil_image is not None:
-            content.append({"type": "image", "image": pil_image})
+        content = [
+            {"type": "image", "image": image} for image in pil_images if image is not None
+        ]
         content.append({"type": "text", "text": vlm_prompt})
 
         return [
@@ -204,29 +472,146 @@ class Qwen2VLCaptioner:
             {"role": "user",   "content": content},
         ]
 
-    def _generate(self, messages: list) -> tuple[str, int]:
-        """Run the Qwen2-VL forward pass and return (text, token_count)."""
+    def _caption_chunk(
+        self,
+        usrs: Sequence[UnifiedSceneRepresentation],
+        images: Sequence[Optional[Image.Image]],
+    ) -> List[VLMCaption]:
+        """One generate call over a chunk of samples."""
+        t0 = time.time()
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+
+        conversations = [
+            self._build_messages(usr.vlm_prompt, [image]) for usr, image in zip(usrs, images)
+        ]
+        generated = self._generate(conversations)
+
+        gpu_mem = None
+        if torch.cuda.is_available():
+            gpu_mem = round(torch.cuda.max_memory_allocated() / 1e9, 2)
+
+        per_sample = round((time.time() - t0) / len(usrs), 3)
+        return [
+            self._make_caption(
+                usr, response, tokens, per_sample, gpu_mem,
+                image_provided=image is not None, batch_size=len(usrs),
+            )
+            for usr, image, (response, tokens) in zip(usrs, images, generated)
+        ]
+
+    def _make_caption(
+        self,
+        usr: UnifiedSceneRepresentation,
+        response: str,
+        tokens: int,
+        processing_time: float,
+        gpu_mem: Optional[float],
+        image_provided: bool,
+        batch_size: int,
+    ) -> VLMCaption:
+        return VLMCaption(
+            frame_id=usr.frame_id,
+            timestamp=usr.timestamp,
+            caption=response,
+            scene_type=usr.scene_type,
+            context_tags=usr.context_tags,
+            model=self.model_id,
+            tokens_generated=tokens,
+            processing_time=processing_time,
+            gpu_memory_used=gpu_mem,
+            vlm_prompt_used=usr.vlm_prompt,
+            metadata={
+                "quantize_bits": self.quantize_bits,
+                "max_new_tokens": self.max_new_tokens,
+                "image_provided": image_provided,
+                "batch_size": batch_size,
+                "prefix_cached_tokens": self._last_prefix_tokens,
+                "cache_hit": False,
+            },
+        )
+
+    def _cached_caption(
+        self,
+        usr: UnifiedSceneRepresentation,
+        cached: Tuple[str, int],
+        lookup_time: float,
+        image_provided: bool,
+    ) -> VLMCaption:
+        caption = self._make_caption(
+            usr, cached[0], cached[1], round(lookup_time, 3), None,
+            image_provided=image_provided, batch_size=0,
+        )
+        caption.metadata.update(cache_hit=True, prefix_cached_tokens=0)
+        return caption
+
+    def _cache_key(
+        self, usr: UnifiedSceneRepresentation, image: Optional[Image.Image]
+    ) -> Optional[str]:
+        """Content address of one caption request, or None without a cache."""
+        if self.caption_cache is None:
+            return None
+        params = {
+            "system_prompt": prompt_hash(_SYSTEM_PROMPT),
+            "max_new_tokens": self.max_new_tokens,
+            "temperature": self.temperature,
+            "repetition_penalty": self.repetition_penalty,
+            "quantize_bits": self.quantize_bits,
+            "min_pixels": self.MIN_PIXELS,
+            "max_pixels": self.MAX_PIXELS,
+        }
+        return cache_key(image_phash(image), usr.vlm_prompt, self.model_id, params)
+
+    def _sample_bytes(self) -> int:
+        """Estimated GPU bytes one sample adds to a generate call."""
+        cfg = self._model.config
+        text_cfg = getattr(cfg, "text_config", None) or cfg
+        head_dim = text_cfg.hidden_size // text_cfg.num_attention_heads
+        kv_heads = getattr(text_cfg, "num_key_value_heads", None) or text_cfg.num_attention_heads
+        seq_len = self.MAX_PIXELS // (28 * 28) + _PROMPT_TEXT_TOKENS + self.max_new_tokens
+        kv_cache = 2 * text_cfg.num_hidden_layers * kv_heads * head_dim * seq_len * 2   # K+V, fp16
+        return int(kv_cache * _ACTIVATION_FACTOR)
+
+    def _generate(self, conversations: List[list]) -> List[Tuple[str, int]]:
+        """
+        Run one (left-padded) Qwen2-VL generate call over a list of chat
+        conversations and return [(text, token_count)] in input order.
+        """
         from qwen_vl_utils import process_vision_info
 
         # Build text input from chat template
-        text = self._processor.apply_chat_template(
-            messages, tokenize=False, add_generation_prompt=True
-        )
+        texts = [
+            self._processor.apply_chat_template(
+                messages, tokenize=False, add_generation_prompt=True
+            )
+            for messages in conversations
+        ]
 
-        # Extract image/video tensors
-        image_inputs, video_inputs = process_vision_info(messages)
+        # Extract image/video tensors (in sample order)
+        image_inputs, video_inputs = process_vision_info(conversations)
 
         inputs = self._processor(
-            text=[text],
+            text=texts,
             images=image_inputs,
             videos=video_inputs,
             padding=True,
             return_tensors="pt",
         ).to(self._model.device)
+        return self._generate_from_inputs(inputs)
+
+    def _generate_from_inputs(self, inputs) -> List[Tuple[str, int]]:
+        """generate() over processor outputs, reusing the prefix cache if possible."""
+        prompt_len = inputs["input_ids"].shape[1]
+        reused = self._with_prefix_cache(inputs) if self.reuse_prefix_cache else None
+        extra: Dict[str, Any] = {}
+        if reused is not None:
+            inputs, extra["past_key_values"] = reused
+        self._last_prefix_tokens = 0 if reused is None else len(self._prefix_ids)
 
         with torch.no_grad():
             output_ids = self._model.generate(
                 **inputs,
+                **extra,
                 max_new_tokens=self.max_new_tokens,
                 temperature=self.temperature,
                 do_sample=self.temperature > 0,
@@ -234,25 +619,105 @@ class Qwen2VLCaptioner:
                 pad_token_id=self._processor.tokenizer.eos_token_id,
             )
 
-        # Strip prompt tokens from output
-        generated_ids = [
-            out[len(inp):]
-            for inp, out in zip(inputs.input_ids, output_ids)
-        ]
-        response = self._processor.batch_decode(
+        generated_ids = self._split_generated(
+            output_ids, prompt_len, self._processor.tokenizer.eos_token_id
+        )
+        responses = self._processor.batch_decode(
             generated_ids,
             skip_special_tokens=True,
             clean_up_tokenization_spaces=False,
-        )[0].strip()
+        )
+        return [(text.strip(), len(ids)) for text, ids in zip(responses, generated_ids)]
+
+    def _with_prefix_cache(self, inputs) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """
+        (inputs, past_key_values) that reuse the system-prompt KV cache, or
+        None to run a plain generate.
+
+        Left padding puts each row's pads before the shared prefix; they
+        are moved after it ([prefix][pads][rest], still masked) so the
+        prefix sits at positions 0..P-1 in every row and one cached copy,
+        repeated over the batch, serves them all.  Masked pads don't change
+        any position or attention, so greedy output is unchanged.
+        """
+        if not self._supports_prefix_cache():
+            import transformers
+
+            print(f"⚠️  Qwen2-VL prefix cache disabled: needs transformers ≥ 5.0 "
+                  f"(installed {transformers.__version__})")
+            self.reuse_prefix_cache = False     # log once, then plain generate
+            return None
+        if self._prefix_cache is None:
+            self._build_prefix_cache()
+        prefix = self._prefix_ids
+        ids, mask = inputs["input_ids"], inputs["attention_mask"]
+        rows, length = ids.shape
+        p = len(prefix)
+
+        order = []
+        for row, pad in zip(ids, (mask == 0).sum(dim=1).tolist()):
+            if pad + p >= length or not torch.equal(row[pad:pad + p], prefix):
+                return None
+            order.append(torch.cat([
+                torch.arange(pad, pad + p), torch.arange(pad), torch.arange(pad + p, length),
+            ]))
+        index = torch.stack(order).to(ids.device)
+        moved = {
+            k: v.gather(1, index) if isinstance(v, torch.Tensor) and v.shape == ids.shape else v
+            for k, v in inputs.items()
+        }
+
+        # generate() extends the cache in place — hand it a copy
+        cache = copy.deepcopy(self._prefix_cache)
+        cache.batch_repeat_interleave(rows)
+        # Stale M-RoPE deltas from the last call would be applied to this
+        # prompt; None makes generate() compute them over the whole prompt
+        self._model.model.rope_deltas = None
+        return moved, cache
+
+    def _build_prefix_cache(self):
+        """Prefill the system-prompt turn once; keep its token ids and KV cache."""
+        text = self._processor.apply_chat_template(
+            [{"role": "system", "content": _SYSTEM_PROMPT}], tokenize=False,
+        )
+        ids = self._processor.tokenizer(text, return_tensors="pt").input_ids.to(self._model.device)
+        with torch.no_grad():
+            out = self._model(input_ids=ids, use_cache=True)
+        self._prefix_ids = ids[0]
+        self._prefix_cache = out.past_key_values
+        print(f"✓ Qwen2-VL system prompt prefilled ({len(self._prefix_ids)} tokens cached)")
 
-        tokens = sum(len(ids) for ids in generated_ids)
-        return response, tokens
+    def _supports_prefix_cache(self) -> bool:
+        # transformers 5.x builds Qwen2-VL's 3D positions over the full prompt
+        # when generate() gets a prefilled cache; 4.x only over the uncached
+        # tail, which would misplace the image tokens
+        return "_prepare_position_ids_for_generation" in vars(type(self._model))
+
+    @staticmethod
+    def _split_generated(output_ids: torch.Tensor, prompt_len: int, pad_token_id: int) -> List[List[int]]:
+        """
+        Per-sample generated ids from a left-padded batch: every row's
+        prompt ends at prompt_len; rows that finished early are padded
+        with pad_token_id (= EOS) after their answer.
+        """
+        rows = []
+        for row in output_ids[:, prompt_len:].tolist():
+            while row and row[-1] == pad_token_id:
+                row.pop()
+            rows.append(row)
+        return rows
 
     @staticmethod
     def _to_pil(frame: Optional[Any]) -> Optional[Image.Image]:
-        """Convert frame tensor / ndarray / PIL to PIL Image, or return None."""
+        """
+        Convert frame tensor / ndarray / PIL / FrameContext to PIL Image,
+        or return None.  A FrameContext hands back the PIL image the
+        perception modules already built for this frame.
+        """
         if frame is None:
             return None
+        if isinstance(frame, FrameContext):
+            return frame.pil()
         if isinstance(frame, Image.Image):
             return frame
         import numpy as np
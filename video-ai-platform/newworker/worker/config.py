@@ -16,6 +16,67 @@ class Settings:
     SAMPLE_FPS             = float(os.environ.get("SAMPLE_FPS", "1.0"))
     DEVICE                 = os.environ.get("DEVICE", "cuda")
     QUANTIZE_BITS          = int(os.environ.get("QUANTIZE_BITS", "8"))
+    # Long-side cap (px) for depth / panoptic post-processing; 0 = full source res
+    ANALYSIS_MAX_SIDE      = int(os.environ.get("ANALYSIS_MAX_SIDE", "512")) or None
+    # Embedding sidecar storage: "float16" or "int8" (per-row scale)
+    EMBEDDING_DTYPE        = os.environ.get("EMBEDDING_DTYPE", "float16").lower()
+    # Results object: "chunked" (analysis.jsonl.gz, indexed sections) or
+    # "json" (one analysis.json document, for backends not yet reading chunks)
+    RESULTS_FORMAT         = os.environ.get("RESULTS_FORMAT", "chunked").lower()
+    # Per-frame timeline sidecar: seconds of video per ranged-readable segment
+    TIMELINE_SEGMENT_S     = float(os.environ.get("TIMELINE_SEGMENT_S", "10"))
+    # Cascade gating: SigLIP cosine distance below which Mask2Former/SlowFast
+    # outputs are reused (0 = off); full pass forced every GATE_FULL_EVERY frames
+    GATE_THRESHOLD         = float(os.environ.get("GATE_THRESHOLD", "0")) or None
+    GATE_FULL_EVERY        = int(os.environ.get("GATE_FULL_EVERY", "5"))
+    # SlowFast window length (s, 0 = per-frame clips) and windows per forward pass
+    ACTION_WINDOW_S        = float(os.environ.get("ACTION_WINDOW_S", "2.0")) or None
+    ACTION_BATCH_SIZE      = int(os.environ.get("ACTION_BATCH_SIZE", "8"))
+    # Vision-model resize/normalise in torch on DEVICE (0 = HF processors on CPU)
+    DEVICE_PREPROCESS      = os.environ.get("DEVICE_PREPROCESS", "1") not in ("0", "false", "False")
+    # Caption frames in one batched Qwen2-VL pass after perception (1 = on);
+    # VLM_BATCH_SIZE samples per generate call (0 = from free VRAM)
+    DEFER_CAPTIONS         = os.environ.get("DEFER_CAPTIONS", "0") not in ("0", "false", "False")
+    VLM_BATCH_SIZE         = int(os.environ.get("VLM_BATCH_SIZE", "0")) or None
+    # Reuse the system prompt's KV cache across Qwen2-VL calls (0 = prefill every call)
+    VLM_PREFIX_CACHE       = os.environ.get("VLM_PREFIX_CACHE", "1") not in ("0", "false", "False")
+    # Persistent caption cache keyed by image pHash + prompt + model + params
+    # ("" = off), LRU-evicted beyond CAPTION_CACHE_MB of caption text
+    CAPTION_CACHE_PATH     = os.environ.get("CAPTION_CACHE_PATH", "")
+    CAPTION_CACHE_MB       = float(os.environ.get("CAPTION_CACHE_MB", "256"))
+    # Per-module perception output cache ("" = off): size budget and entry TTL
+    PERCEPTION_CACHE_PATH  = os.environ.get("PERCEPTION_CACHE_PATH", "")
+    PERCEPTION_CACHE_GB    = float(os.environ.get("PERCEPTION_CACHE_GB", "4"))
+    PERCEPTION_CACHE_TTL_H = float(os.environ.get("PERCEPTION_CACHE_TTL_H", "72")) or None
+    # Per-frame checkpoints so an SQS retry resumes a crashed video:
+    # "" = off, "local" (CHECKPOINT_DIR, same host) or "s3" (checkpoints/ prefix)
+    CHECKPOINT_BACKEND     = os.environ.get("CHECKPOINT_BACKEND", "").lower()
+    CHECKPOINT_DIR         = os.environ.get("CHECKPOINT_DIR", os.path.join(TEMP_DIR, "checkpoints"))
+    # The queue's redrive maxReceiveCount: a failed attempt with this receive
+    # count is the last one, so its checkpoint is cleared (0 = unbounded)
+    SQS_MAX_RECEIVE        = int(os.environ.get("SQS_MAX_RECEIVE", "5"))
+    # Staged worker: messages downloaded ahead of the GPU (0 = serial worker,
+    # one message at a time); narrative / upload / DB writes run on their own
+    # thread.  A message's heartbeat stops after HEARTBEAT_MAX_H hours
+    WORKER_PREFETCH        = int(os.environ.get("WORKER_PREFETCH", "1"))
+    HEARTBEAT_MAX_H        = float(os.environ.get("HEARTBEAT_MAX_H", "6")) or None
+    # S3 download: ranged GETs of DOWNLOAD_CHUNK_MB on DOWNLOAD_CONCURRENCY
+    # threads; STREAM_DOWNLOAD=1 decodes frames while the download runs
+    DOWNLOAD_CHUNK_MB      = float(os.environ.get("DOWNLOAD_CHUNK_MB", "8"))
+    DOWNLOAD_CONCURRENCY   = int(os.environ.get("DOWNLOAD_CONCURRENCY", "8"))
+    STREAM_DOWNLOAD        = os.environ.get("STREAM_DOWNLOAD", "1") not in ("0", "false", "False")
+    # "frame" = caption every frame; "segment" = one multi-frame caption per
+    # scene segment (SEGMENT_FRAME_CAPTIONS=1 keeps per-frame captions too)
+    CAPTION_MODE           = os.environ.get("CAPTION_MODE", "frame").lower()
+    SEGMENT_FRAME_CAPTIONS = os.environ.get("SEGMENT_FRAME_CAPTIONS", "0") not in ("0", "false", "False")
+    # Span tracing: TRACE=1 uploads logs/<id>/trace.json (Chrome trace_event
+    # format) per video; TRACE_MEMORY=1 adds RSS / CUDA memory per span
+    TRACE                  = os.environ.get("TRACE", "0") not in ("0", "false", "False")
+    TRACE_MEMORY           = os.environ.get("TRACE_MEMORY", "1") not in ("0", "false", "False")
+    # Prometheus /metrics and /healthz (0 = off); unhealthy when the SQS poll
+    # loop has been silent HEALTH_MAX_IDLE_S with no stage running
+    METRICS_PORT           = int(os.environ.get("METRICS_PORT", "8080"))
+    HEALTH_MAX_IDLE_S      = float(os.environ.get("HEALTH_MAX_IDLE_S", "300"))
 
     _raw_disabled = os.environ.get("DISABLED_MODULES", "")
     DISABLED_MODULES: frozenset = frozenset(
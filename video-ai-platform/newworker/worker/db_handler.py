@@ -14,7 +14,7 @@ Schema (DynamoDB primary key: video_id):
   duration        float
   scene_types     list
   processing_time float
-  results_s3_key  str   S3 key for the full analysis JSON
+  results_s3_key  str   S3 key of the analysis results (analysis.jsonl.gz or .json)
 """
 
 from __future__ import annotations
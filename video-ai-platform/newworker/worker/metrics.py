@@ -0,0 +1,407 @@
+"""
+Metrics — Prometheus counters / gauges / histograms and a health check.
+
+The worker's only record of where time went was stdout.  This module keeps
+process-wide metrics and serves them next to a health check on
+METRICS_PORT (8080, the port the Dockerfile EXPOSEs):
+
+  GET /metrics   Prometheus text exposition format 0.0.4
+  GET /healthz   200 {"status": "ok", ...} or 503 {"status": "unhealthy", ...}
+
+Recording is lock-free: every thread writes its own shard of each metric
+(a dict only that thread mutates), and a scrape sums the shards.  A lock
+is taken once per thread per metric, to register the shard.  Per-frame
+figures (module latency, model loads, cache lookups, VRAM peaks) are
+observed in one batch per video by observe_analysis().
+
+Worker metrics:
+  worker_jobs_total{outcome}                       success / failed / permanent_failure
+  worker_stage_seconds{stage}                      prepare / analyze / finish
+  worker_queue_wait_seconds{queue}                 sqs (sent → received), gpu, post
+  worker_frames_total
+  worker_video_frames_per_second                   frames analysed / analysis wall time
+  worker_module_latency_seconds{module}            FrameResult.step_times
+  worker_model_load_seconds{module}
+  worker_perception_cache_lookups_total{module,result}
+  worker_caption_cache_lookups_total{result}
+  worker_frame_peak_vram_bytes
+  worker_gpu_memory_allocated_bytes                at scrape time
+  worker_uptime_seconds
+
+Local check:
+    METRICS_PORT=8080 python main.py &
+    curl -s localhost:8080/metrics | grep worker_module_latency
+    curl -si localhost:8080/healthz
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# Seconds — per-module steps and model loads (ms … minutes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Seconds — whole stages and queue waits (seconds … hours)
+STAGE_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0, 7200.0)
+FPS_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+VRAM_BUCKETS = tuple(gb * 1e9 for gb in (1, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24))
+
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Metric types
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, ...], Any]] = []
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _shard(self) -> Dict[Tuple[str, ...], Any]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> List[List[Tuple[Tuple[str, ...], Any]]]:
+        with self._lock:
+            shards = list(self._shards)
+        return [list(shard.items()) for shard in shards]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic total, per label set."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        return sum(v for items in self._snapshot() for k, v in items if k == key)
+
+    def _samples(self) -> List[str]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for items in self._snapshot():
+            for key, v in items:
+                totals[key] = totals.get(key, 0.0) + v
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in sorted(totals.items())]
+
+
+class Gauge(_Metric):
+    """
+    Last value per label set (set() from any thread), or — given fn — a
+    value read at scrape time.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], Optional[float]]] = None):
+        super().__init__(name, help, labelnames)
+        self._fn = fn
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def _samples(self) -> List[str]:
+        if self._fn is not None:
+            value = self._fn()
+            return [] if value is None else [f"{self.name} {_fmt(value)}"]
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}"
+                for k, v in sorted(list(self._values.items()))]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram, per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        row = shard.get(key)
+        if row is None:
+            # bucket counts (last = +Inf), then sum
+            row = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def observe_many(self, values, **labels):
+        for v in values:
+            self.observe(v, **labels)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the block's wall time in seconds."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def totals(self, **labels) -> Tuple[int, float]:
+        """(count, sum) for one label set."""
+        key = self._key(labels)
+        rows = [row for items in self._snapshot() for k, row in items if k == key]
+        return sum(sum(r[:-1]) for r in rows), sum(r[-1] for r in rows)
+
+    def _samples(self) -> List[str]:
+        merged: Dict[Tuple[str, ...], List[float]] = {}
+        for items in self._snapshot():
+            for key, row in items:
+                acc = merged.setdefault(key, [0] * len(row))
+                for i, v in enumerate(list(row)):
+                    acc[i] += v
+        lines = []
+        for key, row in sorted(merged.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), row[:-1]):
+                cumulative += n
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {_fmt(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(row[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {_fmt(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together as one exposition."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (), fn=None) -> Gauge:
+        return self._add(Gauge(name, help, labelnames, fn=fn))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets=buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Health
+# ─────────────────────────────────────────────────────────────────────────────
+
+class HealthState:
+    """
+    The worker is healthy while its poll loop is alive — it polled within
+    max_idle_s, or every stage it is running started less than max_stage_s
+    ago (a long video keeps the loop away from SQS) — and, when
+    require_cuda, CUDA is still usable.
+
+    Args:
+        max_idle_s  : Longest gap between SQS polls while no stage runs.
+        max_stage_s : Longest a single stage may run (None = unbounded).
+        require_cuda: Fail the check if torch can no longer see a GPU.
+    """
+
+    def __init__(self, max_idle_s: float = 300.0, max_stage_s: Optional[float] = None,
+                 require_cuda: bool = False):
+        self.max_idle_s = max_idle_s
+        self.max_stage_s = max_stage_s
+        self.require_cuda = require_cuda
+        self.started_at = time.monotonic()
+        self.last_poll: Optional[float] = None
+        self._active: Dict[int, Tuple[str, float]] = {}
+
+    def beat(self):
+        """The poll loop received (or timed out waiting for) messages."""
+        self.last_poll = time.monotonic()
+
+    @contextmanager
+    def active(self, stage: str):
+        """Mark a stage as running for the block."""
+        token = object()
+        self._active[id(token)] = (stage, time.monotonic())
+        try:
+            yield
+        finally:
+            self._active.pop(id(token), None)
+
+    def check(self) -> Tuple[bool, Dict[str, Any]]:
+        now = time.monotonic()
+        since_poll = now - (self.last_poll if self.last_poll is not None else self.started_at)
+        stages = {}
+        for stage, started in list(self._active.values()):
+            stages[stage] = max(stages.get(stage, 0.0), now - started)
+        stuck = [s for s, age in stages.items() if self.max_stage_s is not None and age > self.max_stage_s]
+        polling = since_poll <= self.max_idle_s or (bool(stages) and not stuck)
+        checks: Dict[str, Any] = {
+            "polling": polling,
+            "seconds_since_poll": round(since_poll, 1),
+            "active_stages": {s: round(age, 1) for s, age in stages.items()},
+        }
+        if stuck:
+            checks["stuck_stages"] = stuck
+        ok = polling and not stuck
+        if self.require_cuda:
+            checks["cuda"] = torch is not None and torch.cuda.is_available()
+            ok = ok and checks["cuda"]
+        return ok, checks
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  HTTP endpoint
+# ─────────────────────────────────────────────────────────────────────────────
+
+def serve_metrics(port: int, registry: "MetricsRegistry", health: "HealthState",
+                  host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve /metrics and /healthz on a daemon thread; returns the server
+    (port 0 binds a free port — see server.server_address; shutdown() stops it).
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                status, ctype, body = 200, _CONTENT_TYPE, registry.render().encode("utf-8")
+            elif path in ("/healthz", "/health"):
+                ok, checks = health.check()
+                status, ctype = (200 if ok else 503), "application/json"
+                body = json.dumps({"status": "ok" if ok else "unhealthy", **checks}).encode("utf-8")
+            else:
+                status, ctype, body = 404, "text/plain", b"not found\n"
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass    # scrapes every few seconds would flood the job logs
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Worker metrics
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _gpu_allocated() -> Optional[float]:
+    if torch is None or not torch.cuda.is_available():
+        return None
+    return float(torch.cuda.memory_allocated())
+
+
+metrics = MetricsRegistry()
+health = HealthState()
+
+JOBS = metrics.counter("worker_jobs_total", "Messages settled, by outcome.", ("outcome",))
+STAGE_SECONDS = metrics.histogram(
+    "worker_stage_seconds", "Wall time of each worker stage per job.", ("stage",), buckets=STAGE_BUCKETS)
+QUEUE_WAIT = metrics.histogram(
+    "worker_queue_wait_seconds",
+    "Time a job waited: in SQS before being received, for the GPU stage, for the post stage.",
+    ("queue",), buckets=STAGE_BUCKETS)
+FRAMES = metrics.counter("worker_frames_total", "Frames analysed.")
+VIDEO_FPS = metrics.histogram(
+    "worker_video_frames_per_second", "Frames analysed per second of analysis wall time, per video.",
+    buckets=FPS_BUCKETS)
+MODULE_LATENCY = metrics.histogram(
+    "worker_module_latency_seconds", "Per-frame time of each pipeline step.", ("module",))
+MODEL_LOAD = metrics.histogram(
+    "worker_model_load_seconds", "Perception model load_model() time.", ("module",))
+PERCEPTION_CACHE = metrics.counter(
+    "worker_perception_cache_lookups_total", "Perception cache lookups by module and result.",
+    ("module", "result"))
+CAPTION_CACHE = metrics.counter(
+    "worker_caption_cache_lookups_total", "Caption cache lookups by result.", ("result",))
+FRAME_VRAM = metrics.histogram(
+    "worker_frame_peak_vram_bytes", "Peak CUDA memory allocated while analysing a frame.",
+    buckets=VRAM_BUCKETS)
+metrics.gauge("worker_gpu_memory_allocated_bytes", "CUDA memory allocated now.", fn=_gpu_allocated)
+metrics.gauge("worker_uptime_seconds", "Seconds since the worker started.",
+              fn=lambda: round(time.monotonic() - health.started_at, 3))
+
+
+def observe_analysis(analysis) -> None:
+    """Record one VideoAnalysis's per-frame figures in a single batch."""
+    frame_results = analysis.frame_results
+    FRAMES.inc(len(frame_results))
+    if analysis.processing_time > 0 and frame_results:
+        VIDEO_FPS.observe(len(frame_results) / analysis.processing_time)
+    for fr in frame_results:
+        for module, seconds in fr.step_times.items():
+            MODULE_LATENCY.observe(seconds, module=module)
+        meta = fr.usr.processing_metadata
+        for module, seconds in meta.get("model_load_s", {}).items():
+            MODEL_LOAD.observe(seconds, module=module)
+        for module, result in meta.get("perception_cache", {}).items():
+            PERCEPTION_CACHE.inc(module=module, result=result)
+        if fr.caption is not None and "cache_hit" in fr.caption.metadata:
+            CAPTION_CACHE.inc(result="hit" if fr.caption.metadata["cache_hit"] else "miss")
+        if fr.peak_vram_gb is not None:
+            FRAME_VRAM.observe(fr.peak_vram_gb * 1e9)
@@ -0,0 +1,245 @@
+"""
+RangedDownload — parallel ranged S3 GETs that can be decoded while in flight.
+
+S3Handler.download_video() returns only once the whole object is on disk,
+so the pipeline could not decode a single frame before the last byte
+arrived.  RangedDownload splits the object into chunk_size ranges, fetches
+them on max_concurrency threads straight into a preallocated local file,
+and hands out readers that block only until the bytes they ask for are
+present:
+
+  order      first chunk, last chunk, then the rest in ascending order —
+             the MP4 index (moov) is in the first chunk of a faststart
+             file and in the last of a plain one, so decoding can start
+             after the first one or two ranges either way
+  reader()   io.BufferedIOBase over the growing file; cv2.VideoCapture
+             (CAP_FFMPEG stream backend) decodes from it while later
+             ranges are still downloading
+  wait()     joins the download and reports throughput
+
+A range that keeps failing (after RETRIES attempts) fails the download:
+blocked readers see end-of-file (cv2 crashes on an exception raised from
+a stream callback) and wait() raises IOError — call it after decoding.
+
+Usage:
+    download = RangedDownload(s3_client, bucket, key, "/tmp/v.mp4").start()
+    cap = cv2.VideoCapture(download.reader(), cv2.CAP_FFMPEG, [])
+    ...                                  # frames arrive as ranges land
+    download.wait()                      # {"mb_per_s": ..., "first_chunk_s": ...}
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class RangedDownload:
+    """
+    Args:
+        client          : boto3 S3 client (head_object / get_object).
+        bucket, key     : Object to download.
+        path            : Local file (created / truncated to the object size).
+        chunk_size      : Bytes per ranged GET.
+        max_concurrency : Download threads.
+    """
+
+    # Attempts per range before the download fails
+    RETRIES = 3
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: str,
+        key: str,
+        path: str,
+        chunk_size: int = 8 * 2**20,
+        max_concurrency: int = 8,
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.path = path
+        self.chunk_size = max(1, chunk_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.size = 0
+        self.started_at: Optional[float] = None
+        self.first_chunk_s: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self.stats: Dict[str, Any] = {}
+        self._done: List[bool] = []
+        self._cond = threading.Condition()
+        self._cancelled = False
+        self._threads: List[threading.Thread] = []
+
+    # ─────────────────────────────────────────────────────────────────
+    #  Download
+    # ─────────────────────────────────────────────────────────────────
+
+    def start(self) -> "RangedDownload":
+        """HEAD the object, preallocate the file, start the range threads."""
+        self.started_at = time.time()
+        self.size = self.client.head_object(Bucket=self.bucket, Key=self.key)["ContentLength"]
+        with open(self.path, "wb") as f:
+            f.truncate(self.size)
+
+        n_chunks = -(-self.size // self.chunk_size)
+        self._done = [False] * n_chunks
+        order = list(range(n_chunks))
+        if n_chunks > 2:
+            order = [0, n_chunks - 1] + order[1:-1]
+        todo: "queue.Queue[int]" = queue.Queue()
+        for idx in order:
+            todo.put(idx)
+
+        fd = os.open(self.path, os.O_WRONLY)
+        remaining = [min(self.max_concurrency, n_chunks)]
+
+        def _fetch():
+            try:
+                while not self._cancelled and self.error is None:
+                    try:
+                        idx = todo.get_nowait()
+                    except queue.Empty:
+                        return
+                    self._fetch_chunk(fd, idx)
+            except BaseException as e:
+                with self._cond:
+                    self.error = self.error or e
+                    self._cond.notify_all()
+            finally:
+                with self._cond:
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        os.close(fd)
+
+        if n_chunks == 0:
+            os.close(fd)
+        for i in range(min(self.max_concurrency, n_chunks)):
+            t = threading.Thread(target=_fetch, name=f"download-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def _fetch_chunk(self, fd: int, idx: int):
+        start = idx * self.chunk_size
+        end = min(start + self.chunk_size, self.size) - 1
+        for attempt in range(self.RETRIES):
+            try:
+                body = self.client.get_object(
+                    Bucket=self.bucket, Key=self.key, Range=f"bytes={start}-{end}",
+                )["Body"].read()
+                if len(body) != end - start + 1:
+                    raise IOError(f"range {start}-{end}: got {len(body)} bytes")
+                break
+            except Exception:
+                if attempt == self.RETRIES - 1 or self._cancelled:
+                    raise
+        os.pwrite(fd, body, start)
+        with self._cond:
+            self._done[idx] = True
+            if self.first_chunk_s is None:
+                self.first_chunk_s = time.time() - self.started_at
+            self._cond.notify_all()
+
+    def wait_range(self, start: int, end: int) -> bool:
+        """Block until bytes [start, end) are on disk; False if they never will be."""
+        end = min(end, self.size)
+        if end <= start:
+            return True
+        first, last = start // self.chunk_size, (end - 1) // self.chunk_size
+        with self._cond:
+            while not all(self._done[first:last + 1]):
+                if self.error is not None or self._cancelled:
+                    return False
+                self._cond.wait()
+        return True
+
+    def wait(self) -> Dict[str, Any]:
+        """Join the download; returns (and prints) its throughput."""
+        for t in self._threads:
+            t.join()
+        if self.error is not None:
+            raise IOError(f"Download of {self.key} failed: {self.error}")
+        if self.stats:
+            return self.stats
+        seconds = max(time.time() - self.started_at, 1e-6)
+        mb = self.size / 2**20
+        self.stats = {
+            "bytes": self.size,
+            "seconds": round(seconds, 3),
+            "mb_per_s": round(mb / seconds, 2),
+            "first_chunk_s": round(self.first_chunk_s or 0.0, 3),
+            "chunks": len(self._done),
+            "concurrency": len(self._threads),
+        }
+        print(f"✓ Downloaded {mb:.1f} MB in {seconds:.1f}s ({mb / seconds:.1f} MB/s, "
+              f"{len(self._done)} ranges on {len(self._threads)} threads, "
+              f"first range after {self.stats['first_chunk_s']:.2f}s)")
+        return self.stats
+
+    def cancel(self):
+        """Stop fetching (in-flight ranges finish); blocked readers see end-of-file."""
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+
+    @property
+    def complete(self) -> bool:
+        with self._cond:
+            return all(self._done)
+
+    def reader(self) -> "_GrowingReader":
+        """A new binary stream over the file that waits for missing ranges."""
+        return _GrowingReader(self)
+
+
+class _GrowingReader(io.BufferedIOBase):
+    """
+    Read-only view of a RangedDownload's file; read() blocks on absent
+    ranges and returns b"" once the download has failed.
+    """
+
+    def __init__(self, download: RangedDownload):
+        super().__init__()
+        self._download = download
+        # Unbuffered: a read-ahead buffer would cache ranges not yet written
+        self._f = open(download.path, "rb", buffering=0)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._f.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._f.tell()
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        pos = self._f.tell()
+        end = self._download.size if size is None or size < 0 else pos + size
+        if not self._download.wait_range(pos, end):
+            return b""
+        return self._f.read(-1 if size is None else size)
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._f.close()
+        super().close()
@@ -6,11 +6,27 @@ Mirrors the old worker's S3Handler interface, extended with upload_json().
 
 import json
 import os
+import time
+from typing import Optional
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 
+from optimization.tracing import tracer
 from worker.config import settings
+from worker.ranged_download import RangedDownload
+
+
+def transfer_config() -> TransferConfig:
+    """Parallel ranged GETs for download_file: DOWNLOAD_CHUNK_MB × DOWNLOAD_CONCURRENCY."""
+    chunk = int(settings.DOWNLOAD_CHUNK_MB * 2**20)
+    return TransferConfig(
+        multipart_threshold=chunk,
+        multipart_chunksize=chunk,
+        max_concurrency=settings.DOWNLOAD_CONCURRENCY,
+        use_threads=True,
+    )
 
 
 class S3Handler:
@@ -28,16 +44,36 @@ class S3Handler:
     # ─────────────────────────────────────────────────────────────────
 
     def download_video(self, s3_key: str, local_path: str) -> bool:
-        """Download video from S3 to a local file."""
+        """Download video from S3 to a local file (parallel ranged GETs)."""
         try:
             print(f"Downloading {s3_key} from S3...")
-            self.s3_client.download_file(self.bucket_name, s3_key, local_path)
-            print(f"Downloaded to {local_path}")
+            t0 = time.time()
+            with tracer.span("download", cat="io", key=s3_key):
+                self.s3_client.download_file(self.bucket_name, s3_key, local_path, Config=transfer_config())
+            seconds = max(time.time() - t0, 1e-6)
+            mb = os.path.getsize(local_path) / 2**20
+            print(f"Downloaded to {local_path} ({mb:.1f} MB in {seconds:.1f}s, {mb / seconds:.1f} MB/s)")
             return True
         except ClientError as e:
             print(f"Failed to download: {e}")
             return False
 
+    def start_download(self, s3_key: str, local_path: str) -> Optional[RangedDownload]:
+        """
+        Start a background ranged download whose file can be decoded while
+        it downloads (RangedDownload.reader()). None if the object can't be read.
+        """
+        try:
+            print(f"Streaming {s3_key} from S3...")
+            return RangedDownload(
+                self.s3_client, self.bucket_name, s3_key, local_path,
+                chunk_size=int(settings.DOWNLOAD_CHUNK_MB * 2**20),
+                max_concurrency=settings.DOWNLOAD_CONCURRENCY,
+            ).start()
+        except ClientError as e:
+            print(f"Failed to download: {e}")
+            return None
+
     # ─────────────────────────────────────────────────────────────────
     #  Upload
     # ─────────────────────────────────────────────────────────────────
@@ -63,12 +99,13 @@ class S3Handler:
         try:
             print(f"Uploading JSON to S3: {s3_key}")
             body = json.dumps(data, indent=2).encode("utf-8")
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=body,
-                ContentType="application/json",
-            )
+            with tracer.span("s3.upload", cat="io", key=s3_key, bytes=len(body)):
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    Body=body,
+                    ContentType="application/json",
+                )
             print("JSON uploaded")
             return True
         except ClientError as e:
@@ -79,12 +116,13 @@ class S3Handler:
         """Upload raw bytes to S3 (used for thumbnails, etc.)."""
         try:
             print(f"Uploading bytes to S3: {s3_key} ({len(data)} bytes)")
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=data,
-                ContentType=content_type,
-            )
+            with tracer.span("s3.upload", cat="io", key=s3_key, bytes=len(data)):
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    Body=data,
+                    ContentType=content_type,
+                )
             print("Bytes uploaded")
             return True
         except ClientError as e:
@@ -102,3 +140,10 @@ class S3Handler:
             return True
         except ClientError:
             return False
+
+    def object_size(self, s3_key: str):
+        """Size in bytes of the object, or None if it cannot be read."""
+        try:
+            return self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)["ContentLength"]
+        except ClientError:
+            return None
@@ -6,6 +6,8 @@ Mirrors the old worker's SQSHandler exactly, only the config import changes.
 
 import json
 import threading
+import time
+from typing import Optional
 
 import boto3
 from botocore.exceptions import ClientError
@@ -62,17 +64,30 @@ class SQSHandler:
             print(f"Warning: could not extend visibility timeout: {e}")
             return False
 
-    def start_heartbeat(self, receipt_handle: str) -> threading.Event:
+    def start_heartbeat(
+        self,
+        receipt_handle: str,
+        max_seconds: Optional[float] = None,
+        interval: float = _HEARTBEAT_INTERVAL,
+    ) -> threading.Event:
         """
         Start a background thread that periodically extends the visibility
         timeout for a message being processed.
 
+        max_seconds bounds the heartbeat: after that long the message is no
+        longer extended, so a job stuck in the worker becomes visible again
+        (and is retried elsewhere) instead of being held forever.
+
         Returns a stop_event — call stop_event.set() when processing is done.
         """
         stop_event = threading.Event()
+        deadline = None if max_seconds is None else time.monotonic() + max_seconds
 
         def _heartbeat():
-            while not stop_event.wait(timeout=_HEARTBEAT_INTERVAL):
+            while not stop_event.wait(timeout=interval):
+                if deadline is not None and time.monotonic() >= deadline:
+                    print(f"[SQS] Heartbeat stopped after {max_seconds:.0f}s — message will become visible")
+                    return
                 ok = self.extend_visibility(receipt_handle, _HEARTBEAT_EXTENSION)
                 if ok:
                     print(f"[SQS] Visibility extended by {_HEARTBEAT_EXTENSION}s")
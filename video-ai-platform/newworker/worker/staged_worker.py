@@ -0,0 +1,139 @@
+"""
+StagedWorker — three pipelined stages over SQS messages.
+
+The serial worker left the GPU idle while a video downloaded and while
+Claude wrote the previous narrative.  Here each message is a job that
+moves through three stages, each on its own thread:
+
+  prefetch   receive a message, start its download               (thread)
+  gpu        perception + captions (VideoPipeline.analyze)       (caller)
+  post       thumbnail, music ID, narrative, sidecar / results
+             upload, DynamoDB, raw log, delete the message         (thread)
+
+so while video N is on the GPU, video N+1 is downloading and video N-1
+is being written up.  The GPU stage runs on the calling thread — the one
+that owns the models.
+
+Bounds:
+  prefetch   at most `prefetch` jobs are received ahead of the GPU stage;
+             the next message is not even received until one is taken
+  post       at most `post_queue` analysed jobs wait for the post stage;
+             a slow post stage stalls the GPU instead of piling up frames
+
+The stage callables own their error handling (a failed job still goes
+through every stage so the post stage can record it and settle the
+message); an exception escaping one is printed and the job moves on.
+
+Usage:
+    worker = StagedWorker(receive, prepare, analyze, finish, prefetch=1)
+    worker.run()                 # until stop() (or max_jobs)
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import traceback
+from typing import Any, Callable, Optional
+
+# End-of-stream marker passed down the stages
+_DONE = object()
+
+
+class StagedWorker:
+    """
+    Args:
+        receive    : () → job or None (poll timed out / nothing to do).
+        prepare    : job → None, prefetch thread.
+        analyze    : job → None, calling thread (GPU).
+        finish     : job → None, post thread.
+        prefetch   : Jobs received ahead of the GPU stage (≥ 1).
+        post_queue : Analysed jobs waiting for the post stage (≥ 1).
+    """
+
+    def __init__(
+        self,
+        receive: Callable[[], Optional[Any]],
+        prepare: Callable[[Any], None],
+        analyze: Callable[[Any], None],
+        finish: Callable[[Any], None],
+        prefetch: int = 1,
+        post_queue: int = 1,
+    ):
+        self.receive = receive
+        self.prepare = prepare
+        self.analyze = analyze
+        self.finish = finish
+        self.prefetch = max(1, prefetch)
+        self.post_queue = max(1, post_queue)
+        self.jobs_received = 0
+        self.jobs_finished = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Receive no more messages; jobs already received still finish."""
+        self._stop.set()
+
+    def run(self, max_jobs: Optional[int] = None):
+        """
+        Run until stop() (or max_jobs received) and every received job has
+        been through the post stage.
+        """
+        self._stop.clear()
+        slots = threading.Semaphore(self.prefetch)
+        ready: "queue.Queue[Any]" = queue.Queue()
+        post: "queue.Queue[Any]" = queue.Queue(maxsize=self.post_queue)
+
+        def _prefetch():
+            try:
+                while not self._stop.is_set():
+                    if max_jobs is not None and self.jobs_received >= max_jobs:
+                        break
+                    slots.acquire()                 # released when the GPU takes a job
+                    if self._stop.is_set():
+                        break
+                    job = self._call(self.receive)
+                    if job is None:
+                        slots.release()
+                        continue
+                    self.jobs_received += 1
+                    self._call(self.prepare, job)
+                    ready.put(job)
+            finally:
+                ready.put(_DONE)
+
+        def _post():
+            while True:
+                job = post.get()
+                if job is _DONE:
+                    return
+                self._call(self.finish, job)
+                self.jobs_finished += 1
+
+        prefetcher = threading.Thread(target=_prefetch, name="worker-prefetch", daemon=True)
+        poster = threading.Thread(target=_post, name="worker-post", daemon=True)
+        prefetcher.start()
+        poster.start()
+
+        try:
+            while True:
+                job = ready.get()
+                if job is _DONE:
+                    break
+                slots.release()
+                self._call(self.analyze, job)
+                post.put(job)                       # blocks while the post stage is behind
+        finally:
+            self._stop.set()
+            slots.release()                         # unblock a waiting prefetch
+            post.put(_DONE)
+        poster.join()
+
+    @staticmethod
+    def _call(fn: Callable, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            print(f"\nUnexpected error in {getattr(fn, '__name__', 'stage')}: {e}")
+            traceback.print_exc()
+            return None